@@ -0,0 +1,282 @@
+"""
+Admission control for POST /discover.
+
+Discovery cost grows with num_molecules, and every run in flight holds
+model memory, so runs are admitted by weight (= num_molecules): at most
+DISCOVERY_MAX_INFLIGHT_MOLECULES and DISCOVERY_WORKERS runs execute at
+once. The rest wait in a bounded queue:
+
+  - per client (the peer address, or CLIENT_ID_HEADER when a trusted
+    gateway sets it) FIFO queues,
+    served round-robin, so one client's burst cannot push everyone
+    else's requests back;
+  - a client with DISCOVERY_MAX_QUEUED_PER_CLIENT requests already
+    waiting gets 429, a full queue (DISCOVERY_MAX_QUEUED_MOLECULES) or a
+    wait longer than DISCOVERY_QUEUE_TIMEOUT_SECONDS gets 503, both
+    immediately and with a Retry-After estimated from the backlog and
+    the recent time per molecule.
+
+Capping what runs at once keeps the latency of admitted runs close to
+their unloaded latency; overload turns into fast rejections instead of
+swap. A slot is held until the run's executor job finishes: a client
+that disconnects cancels the request, not the thread doing the work, so
+its slot stays taken until that thread is free again. Limits are per
+process (per uvicorn worker). State lives on the event loop, so no
+locks: only call this from async code.
+"""
+
+import asyncio
+import concurrent.futures
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from fastapi import Request
+
+from .core.config import (
+    CLIENT_ID_HEADER,
+    DISCOVERY_MAX_INFLIGHT_MOLECULES,
+    DISCOVERY_MAX_QUEUED_MOLECULES,
+    DISCOVERY_MAX_QUEUED_PER_CLIENT,
+    DISCOVERY_QUEUE_TIMEOUT_SECONDS,
+    DISCOVERY_WORKERS,
+)
+from .metrics import Counter, Gauge, Histogram
+
+ADMISSION_DECISIONS = Counter(
+    "elysium_admission_decisions_total",
+    "POST /discover admission outcomes.",
+    ("outcome",),  # admitted, queued, rejected_client, rejected_full, timeout
+)
+ADMISSION_LOAD = Gauge(
+    "elysium_admission_load",
+    "Discovery runs and molecules executing or waiting.",
+    ("state", "unit"),  # state: inflight / queued, unit: requests / molecules
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "elysium_admission_wait_seconds",
+    "Time admitted discovery requests spent in the queue.",
+)
+
+# Prior for the Retry-After estimate until runs have been timed
+_DEFAULT_SECONDS_PER_MOLECULE = 0.05
+_EWMA_ALPHA = 0.2
+MAX_RETRY_AFTER_SECONDS = 120
+
+
+class AdmissionRejected(Exception):
+    """Turned into a 429 / 503 with Retry-After by the endpoint."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("client", "weight", "future", "enqueued_at")
+
+    def __init__(self, client: str, weight: int, future: asyncio.Future) -> None:
+        self.client = client
+        self.weight = weight
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+class Slot:
+    """An admitted run; hold_until() ties its release to the job doing the work."""
+
+    __slots__ = ("job",)
+
+    def __init__(self) -> None:
+        self.job: Optional[concurrent.futures.Future] = None
+
+    def hold_until(self, job: concurrent.futures.Future) -> None:
+        self.job = job
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_inflight_molecules: int = DISCOVERY_MAX_INFLIGHT_MOLECULES,
+        max_inflight_requests: int = DISCOVERY_WORKERS,
+        max_queued_molecules: int = DISCOVERY_MAX_QUEUED_MOLECULES,
+        max_queued_per_client: int = DISCOVERY_MAX_QUEUED_PER_CLIENT,
+        queue_timeout: float = DISCOVERY_QUEUE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.max_inflight_molecules = max(1, max_inflight_molecules)
+        self.max_inflight_requests = max(1, max_inflight_requests)
+        self.max_queued_molecules = max_queued_molecules
+        self.max_queued_per_client = max_queued_per_client
+        self.queue_timeout = queue_timeout
+        self.inflight_molecules = 0
+        self.inflight_requests = 0
+        self.queued_molecules = 0
+        # client -> its waiters; insertion order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._seconds_per_molecule = _DEFAULT_SECONDS_PER_MOLECULE
+
+    # ---------- public ----------
+
+    @asynccontextmanager
+    async def slot(self, client: str, num_molecules: int) -> AsyncIterator[Slot]:
+        """
+        Hold an execution slot for one discovery run (raises AdmissionRejected).
+        Pass the executor future to Slot.hold_until: if the request is
+        cancelled while that job runs, the slot is released when it ends.
+        """
+        # A run bigger than the whole budget may still run, alone
+        weight = max(1, min(num_molecules, self.max_inflight_molecules))
+        await self._acquire(client, weight)
+        start = time.perf_counter()
+        held = Slot()
+        try:
+            yield held
+        finally:
+            job = held.job
+            # cancel() only succeeds for a job that has not started yet
+            if job is None or job.done() or job.cancel():
+                self._finish(start, weight)
+            else:
+                loop = asyncio.get_running_loop()
+                job.add_done_callback(lambda _: self._finish_threadsafe(loop, start, weight))
+
+    def queued_requests(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "inflight_requests": self.inflight_requests,
+            "inflight_molecules": self.inflight_molecules,
+            "queued_requests": self.queued_requests(),
+            "queued_molecules": self.queued_molecules,
+            "clients_waiting": len(self._queues),
+            "seconds_per_molecule": round(self._seconds_per_molecule, 5),
+        }
+
+    # ---------- internals ----------
+
+    def _fits(self, weight: int) -> bool:
+        return (
+            self.inflight_requests < self.max_inflight_requests
+            and self.inflight_molecules + weight <= self.max_inflight_molecules
+        )
+
+    def _retry_after(self) -> int:
+        backlog = self.inflight_molecules + self.queued_molecules
+        seconds = backlog * self._seconds_per_molecule / self.max_inflight_requests
+        return int(min(MAX_RETRY_AFTER_SECONDS, max(1, math.ceil(seconds))))
+
+    def _reject(self, status_code: int, outcome: str, detail: str) -> AdmissionRejected:
+        ADMISSION_DECISIONS.inc(outcome=outcome)
+        return AdmissionRejected(status_code, detail, self._retry_after())
+
+    async def _acquire(self, client: str, weight: int) -> None:
+        if not self._queues and self._fits(weight):
+            self._start(weight)
+            ADMISSION_DECISIONS.inc(outcome="admitted")
+            return
+
+        queue = self._queues.get(client)
+        if queue is not None and len(queue) >= self.max_queued_per_client:
+            raise self._reject(429, "rejected_client", "Too many queued discovery requests for this client")
+        if self.queued_molecules + weight > self.max_queued_molecules:
+            raise self._reject(503, "rejected_full", "Discovery queue is full")
+
+        waiter = _Waiter(client, weight, asyncio.get_running_loop().create_future())
+        if queue is None:
+            queue = self._queues[client] = deque()
+        queue.append(waiter)
+        self.queued_molecules += weight
+        ADMISSION_DECISIONS.inc(outcome="queued")
+        self._export()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except BaseException as exc:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just as we gave up: hand the slot back
+                self._release(weight)
+            else:
+                waiter.future.cancel()
+                self._remove(waiter)
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject(503, "timeout", "Timed out waiting for a discovery slot") from None
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - waiter.enqueued_at)
+
+    def _start(self, weight: int) -> None:
+        self.inflight_requests += 1
+        self.inflight_molecules += weight
+        self._export()
+
+    def _release(self, weight: int) -> None:
+        self.inflight_requests -= 1
+        self.inflight_molecules -= weight
+        self._dispatch()
+        self._export()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.client)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self.queued_molecules -= waiter.weight
+        if not queue:
+            del self._queues[waiter.client]
+        # The waiter may have been what blocked the head of the line
+        self._dispatch()
+        self._export()
+
+    def _dispatch(self) -> None:
+        """Admit waiting requests, one per client in turn, while they fit."""
+        while self._queues:
+            client, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if not self._fits(waiter.weight):
+                # Strict turn order: skipping a big head for smaller ones behind it would starve it
+                return
+            queue.popleft()
+            self.queued_molecules -= waiter.weight
+            if queue:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            self._start(waiter.weight)
+            waiter.future.set_result(None)
+
+    def _finish(self, start: float, weight: int) -> None:
+        self._observe(time.perf_counter() - start, weight)
+        self._release(weight)
+
+    def _finish_threadsafe(self, loop: asyncio.AbstractEventLoop, start: float, weight: int) -> None:
+        # Called from the worker thread when an abandoned job ends
+        try:
+            loop.call_soon_threadsafe(self._finish, start, weight)
+        except RuntimeError:
+            pass  # loop closed (shutdown): nothing left to admit
+
+    def _observe(self, seconds: float, weight: int) -> None:
+        per_molecule = seconds / weight
+        self._seconds_per_molecule += _EWMA_ALPHA * (per_molecule - self._seconds_per_molecule)
+
+    def _export(self) -> None:
+        ADMISSION_LOAD.set(self.inflight_requests, state="inflight", unit="requests")
+        ADMISSION_LOAD.set(self.inflight_molecules, state="inflight", unit="molecules")
+        ADMISSION_LOAD.set(self.queued_requests(), state="queued", unit="requests")
+        ADMISSION_LOAD.set(self.queued_molecules, state="queued", unit="molecules")
+
+
+def client_key(request: Request) -> str:
+    """Fair-queuing identity: CLIENT_ID_HEADER (set by a trusted gateway) or the peer address."""
+    if CLIENT_ID_HEADER:
+        value = request.headers.get(CLIENT_ID_HEADER)
+        if value:
+            return value[:128]
+    return request.client.host if request.client else "unknown"
+
+
+DISCOVERY_ADMISSION = AdmissionController()
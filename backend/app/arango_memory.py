@@ -0,0 +1,402 @@
+# app/arango_memory.py
+
+"""
+In-memory stand-in for the parts of python-arango ELYSIUM uses.
+
+Selected with ARANGO_BACKEND=memory (see arangodb_client.get_arango_db),
+so the discovery pipeline, the outbox replicator and the benchmarks can
+run without an ArangoDB server. Documents live in plain dicts per
+collection; nothing is persisted.
+
+Only the calls the backend makes are implemented: version, has_collection /
+create_collection / collection, aql.execute, and per collection insert,
+insert_many, import_bulk, update, has, get, count, all, edges, indexes and
+add_persistent_index. `fail_next(n)` makes the next n write calls
+raise, to exercise retry paths.
+
+There is no AQL engine: modules that send AQL register a Python
+equivalent of each query with register_aql(), and aql.execute() runs the
+one registered for the query text. The equivalents of the graph views
+(services/graph_aql.py) are at the bottom of this module.
+"""
+
+import copy
+import itertools
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .arangodb_client import ArangoDocumentError
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_\-:.@()+,=;$!*'%]{1,254}$")
+
+# Normalized AQL text -> handler(database, bind_vars) returning the rows
+_AQL_HANDLERS: Dict[str, Callable[["MemoryArangoDatabase", Dict[str, Any]], List[Any]]] = {}
+
+
+def _normalize_aql(query: str) -> str:
+    return " ".join(query.split())
+
+
+def register_aql(query: str, handler: Callable[["MemoryArangoDatabase", Dict[str, Any]], List[Any]]) -> None:
+    """Register the Python equivalent of an AQL query for the stand-in."""
+    _AQL_HANDLERS[_normalize_aql(query)] = handler
+
+
+class MemoryArangoError(Exception):
+    """
+    Raised where python-arango would raise CollectionCreateError,
+    AQLQueryExecuteError & co. Rejected documents raise the shared
+    ArangoDocumentError instead, so callers need not know the backend.
+    """
+
+
+class MemoryCollection:
+    def __init__(self, database: "MemoryArangoDatabase", name: str, edge: bool = False):
+        self._database = database
+        self.name = name
+        self.edge = edge
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._next_key = itertools.count(1)
+        self._indexes: List[Dict[str, Any]] = []
+        # Edge index: vertex id -> keys of edges leaving / entering it
+        self._out: Dict[str, set] = {}
+        self._in: Dict[str, set] = {}
+
+    # ---------- helpers ----------
+
+    def _prepare(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        doc = copy.deepcopy(document)
+        key = doc.get("_key")
+        if key is None:
+            key = str(next(self._next_key))
+            while key in self._docs:
+                key = str(next(self._next_key))
+            doc["_key"] = key
+        if not isinstance(key, str) or not _KEY_RE.match(key):
+            raise ArangoDocumentError(f"illegal document key {key!r} in {self.name}")
+        if self.edge and ("_from" not in doc or "_to" not in doc):
+            raise ArangoDocumentError(f"edge document in {self.name} needs _from and _to")
+        doc["_id"] = f"{self.name}/{key}"
+        return doc
+
+    def _meta(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {"_id": doc["_id"], "_key": doc["_key"]}
+
+    def _store(self, doc: Dict[str, Any]) -> None:
+        key = doc["_key"]
+        old = self._docs.get(key)
+        if old is not None and "_from" in old:
+            self._out.get(old["_from"], set()).discard(key)
+            self._in.get(old["_to"], set()).discard(key)
+        self._docs[key] = doc
+        if "_from" in doc and "_to" in doc:
+            self._out.setdefault(doc["_from"], set()).add(key)
+            self._in.setdefault(doc["_to"], set()).add(key)
+
+    # ---------- python-arango API subset ----------
+
+    def has(self, key: str) -> bool:
+        with self._database._lock:
+            return key in self._docs
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._database._lock:
+            doc = self._docs.get(key)
+            return copy.deepcopy(doc) if doc is not None else None
+
+    def count(self) -> int:
+        with self._database._lock:
+            return len(self._docs)
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self._database._lock:
+            return [copy.deepcopy(d) for d in self._docs.values()]
+
+    def edges(self, vertex: str, direction: Optional[str] = None) -> Dict[str, Any]:
+        """Edges at a vertex id ("in", "out" or both), like EdgeCollection.edges."""
+        with self._database._lock:
+            keys: set = set()
+            if direction in (None, "out"):
+                keys |= self._out.get(vertex, set())
+            if direction in (None, "in"):
+                keys |= self._in.get(vertex, set())
+            edges = [copy.deepcopy(self._docs[k]) for k in sorted(keys)]
+            return {"edges": edges, "stats": {"scanned_index": len(edges), "filtered": 0}}
+
+    def indexes(self) -> List[Dict[str, Any]]:
+        with self._database._lock:
+            primary = {"id": f"{self.name}/0", "type": "primary", "fields": ["_key"], "unique": True, "sparse": False}
+            return [primary] + [dict(i) for i in self._indexes]
+
+    def add_persistent_index(
+        self,
+        fields: List[str],
+        unique: Optional[bool] = None,
+        sparse: Optional[bool] = None,
+        name: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """Recorded only (lookups are dict scans); idempotent like the server."""
+        with self._database._lock:
+            for index in self._indexes:
+                if index["fields"] == list(fields) and index["unique"] == bool(unique) \
+                        and index["sparse"] == bool(sparse):
+                    return {**index, "new": False}
+            index = {
+                "id": f"{self.name}/{len(self._indexes) + 1}",
+                "name": name or f"idx_{len(self._indexes) + 1}",
+                "type": "persistent",
+                "fields": list(fields),
+                "unique": bool(unique),
+                "sparse": bool(sparse),
+            }
+            self._indexes.append(index)
+            return {**index, "new": True}
+
+    def insert(self, document: Dict[str, Any], overwrite: bool = False, **kwargs) -> Dict[str, Any]:
+        with self._database._lock:
+            self._database._maybe_fail()
+            doc = self._prepare(document)
+            if doc["_key"] in self._docs and not overwrite:
+                raise ArangoDocumentError(f"unique constraint violated: {doc['_id']}")
+            self._store(doc)
+            return self._meta(doc)
+
+    def insert_many(self, documents: Iterable[Dict[str, Any]], overwrite: bool = False, **kwargs) -> List[Any]:
+        """Per-document results: metadata dicts, or the error for documents that failed."""
+        with self._database._lock:
+            self._database._maybe_fail()
+            results: List[Any] = []
+            for document in documents:
+                try:
+                    doc = self._prepare(document)
+                    if doc["_key"] in self._docs and not overwrite:
+                        raise ArangoDocumentError(f"unique constraint violated: {doc['_id']}")
+                    self._store(doc)
+                    results.append(self._meta(doc))
+                except ArangoDocumentError as e:
+                    results.append(e)
+            return results
+
+    def update(self, document: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        with self._database._lock:
+            self._database._maybe_fail()
+            key = document.get("_key")
+            if key not in self._docs:
+                raise ArangoDocumentError(f"document not found: {self.name}/{key}")
+            self._store({**self._docs[key], **copy.deepcopy(document)})
+            return self._meta(self._docs[key])
+
+    def import_bulk(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        halt_on_error: bool = True,
+        details: bool = True,
+        on_duplicate: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Same result shape as python-arango: created / updated / ignored /
+        errors / empty counts. With halt_on_error, nothing is written if
+        any document fails.
+        """
+        on_duplicate = on_duplicate or "error"
+        with self._database._lock:
+            self._database._maybe_fail()
+            result = {"created": 0, "errors": 0, "empty": 0, "updated": 0, "ignored": 0, "details": []}
+            staged: Dict[str, Dict[str, Any]] = {}
+            for pos, document in enumerate(documents):
+                if not document:
+                    result["empty"] += 1
+                    continue
+                try:
+                    doc = self._prepare(document)
+                except ArangoDocumentError as e:
+                    result["errors"] += 1
+                    result["details"].append(f"at position {pos}: {e}")
+                    continue
+                key = doc["_key"]
+                existing = staged.get(key, self._docs.get(key))
+                if existing is None:
+                    result["created"] += 1
+                    staged[key] = doc
+                elif on_duplicate == "update":
+                    result["updated"] += 1
+                    staged[key] = {**existing, **doc}
+                elif on_duplicate == "replace":
+                    result["updated"] += 1
+                    staged[key] = doc
+                elif on_duplicate == "ignore":
+                    result["ignored"] += 1
+                else:
+                    result["errors"] += 1
+                    result["details"].append(f"at position {pos}: unique constraint violated: {doc['_id']}")
+
+            if result["errors"] and halt_on_error:
+                raise ArangoDocumentError("; ".join(result["details"]))
+            for doc in staged.values():
+                self._store(doc)
+            if not details:
+                result.pop("details")
+            return result
+
+
+class MemoryAQL:
+    """db.aql: execute() dispatches to the handler registered for the query."""
+
+    def __init__(self, database: "MemoryArangoDatabase"):
+        self._database = database
+
+    def execute(self, query: str, bind_vars: Optional[Dict[str, Any]] = None, **kwargs) -> Iterator[Any]:
+        handler = _AQL_HANDLERS.get(_normalize_aql(query))
+        if handler is None:
+            raise MemoryArangoError(f"no stand-in registered for AQL query: {query.strip()[:80]}...")
+        with self._database._lock:
+            return iter(handler(self._database, dict(bind_vars or {})))
+
+
+class MemoryArangoDatabase:
+    """Database handle with the python-arango StandardDatabase calls ELYSIUM uses."""
+
+    def __init__(self, name: str = "elysium_kg"):
+        self.name = name
+        self.aql = MemoryAQL(self)
+        self._lock = threading.RLock()
+        self._collections: Dict[str, MemoryCollection] = {}
+        self._failures = 0
+        self._failure_error: Exception = ConnectionError("injected failure")
+
+    def _maybe_fail(self) -> None:
+        if self._failures > 0:
+            self._failures -= 1
+            raise self._failure_error
+
+    def fail_next(self, calls: int = 1, error: Optional[Exception] = None) -> None:
+        """
+        Make the next `calls` write operations raise `error` (default: a
+        ConnectionError, i.e. an outage; pass an ArangoDocumentError to
+        simulate a rejected document).
+        """
+        with self._lock:
+            self._failures = calls
+            if error is not None:
+                self._failure_error = error
+
+    def version(self) -> str:
+        return "memory"
+
+    def has_collection(self, name: str) -> bool:
+        with self._lock:
+            return name in self._collections
+
+    def create_collection(self, name: str, edge: bool = False, **kwargs) -> MemoryCollection:
+        with self._lock:
+            if name in self._collections:
+                raise MemoryArangoError(f"duplicate collection name: {name}")
+            self._collections[name] = MemoryCollection(self, name, edge=edge)
+            return self._collections[name]
+
+    def collection(self, name: str) -> MemoryCollection:
+        # python-arango hands out handles lazily and fails on first use; here
+        # a missing collection is simply created, like an auto-created one.
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = MemoryCollection(self, name)
+            return self._collections[name]
+
+    def collections(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"name": c.name, "type": "edge" if c.edge else "document"}
+                for c in self._collections.values()
+            ]
+
+
+# ---------- graph views (services/graph_aql.py) ----------
+#
+# Python twins of TARGET_GRAPH_AQL / DRUG_GRAPH_AQL, registered there.
+# tests/test_graph_aql.py checks them against the SQL views, and the AQL
+# itself against a real server when one is reachable.
+
+def _passes(edge: Dict[str, Any], bind_vars: Dict[str, Any]) -> bool:
+    # AQL compares null as lower than any number
+    for field, var in (("semantic", "min_cosine"), ("tanimoto", "min_tanimoto")):
+        threshold = bind_vars.get(var)
+        if threshold is not None and (edge.get(field) is None or edge[field] < threshold):
+            return False
+    return True
+
+
+def _desc(value: Optional[float]) -> Tuple[int, float]:
+    """Sort key for `value DESC` with AQL's null-is-smallest rule."""
+    return (1, 0.0) if value is None else (0, -value)
+
+
+def _keyset(keyed_rows: List[Tuple[tuple, Dict[str, Any]]], after_key: Optional[tuple],
+            limit: int) -> List[Dict[str, Any]]:
+    """SORT by key, FILTER key > after_key, LIMIT."""
+    keyed_rows.sort(key=lambda r: r[0])
+    if after_key is not None:
+        keyed_rows = [r for r in keyed_rows if r[0] > after_key]
+    return [row for _, row in keyed_rows[:limit]]
+
+
+def _vertex(db: MemoryArangoDatabase, vertex_id: str) -> Dict[str, Any]:
+    collection, _, key = vertex_id.partition("/")
+    return db.collection(collection).get(key) or {}
+
+
+def memory_target_graph(db: MemoryArangoDatabase, bind_vars: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for b in db.collection("binds").edges(bind_vars["target"], direction="in")["edges"]:
+        m = _vertex(db, b["_from"])
+        sims = [s for s in db.collection("similar_to").edges(b["_from"], direction="out")["edges"]
+                if _passes(s, bind_vars)]
+        sims.sort(key=lambda s: (_desc(s.get("tanimoto")), s["_key"]))
+        sim = None
+        if sims:
+            d = _vertex(db, sims[0]["_to"])
+            sim = {"name": d.get("name"), "smiles": d.get("smiles"), "indication": d.get("indication"),
+                   "tanimoto": sims[0].get("tanimoto"), "semantic": sims[0].get("semantic")}
+        if bind_vars["require_similar"] and sim is None:
+            continue
+        if bind_vars["sort_by"] == "score":
+            metric = b.get("score")
+        else:
+            metric = None if sim is None else sim["tanimoto" if bind_vars["sort_by"] == "tanimoto" else "semantic"]
+        rows.append(((_desc(metric), _desc(b.get("score")), m.get("run_id") or "", m.get("index") or 0), {
+            "run_id": m.get("run_id"), "index": m.get("index"), "smiles": m.get("smiles"),
+            "score": b.get("score"), "similar": sim, "metric": metric,
+        }))
+    after = bind_vars["after"]
+    after_key = None if after is None else (_desc(after[0]), _desc(after[1]), after[2] or "", after[3] or 0)
+    return _keyset(rows, after_key, bind_vars["limit"])
+
+
+def memory_drug_graph(db: MemoryArangoDatabase, bind_vars: Dict[str, Any]) -> List[Dict[str, Any]]:
+    drugs = sorted((d for d in db.collection("drugs").all() if d.get("name") == bind_vars["name"]),
+                   key=lambda d: d["_key"])
+    if not drugs:
+        return []
+    rows = []
+    for s in db.collection("similar_to").edges(drugs[0]["_id"], direction="in")["edges"]:
+        if not _passes(s, bind_vars):
+            continue
+        m = _vertex(db, s["_from"])
+        binds = db.collection("binds").edges(s["_from"], direction="out")["edges"]
+        binds.sort(key=lambda b: (_desc(b.get("score")), b["_key"]))
+        bind = None
+        if binds:
+            bind = {"score": binds[0].get("score"), "target_id": _vertex(db, binds[0]["_to"]).get("symbol")}
+        if bind is not None and bind["score"] is not None:
+            score = bind["score"]
+        else:
+            score = s.get("tanimoto") if s.get("tanimoto") is not None else 0
+        rows.append(((-score, m.get("run_id") or "", m.get("index") or 0), {
+            "target_id": None if bind is None else bind["target_id"],
+            "run_id": m.get("run_id"), "index": m.get("index"), "smiles": m.get("smiles"), "score": score,
+        }))
+    after = bind_vars["after"]
+    after_key = None if after is None else (-after[0], after[1] or "", after[2] or 0)
+    return _keyset(rows, after_key, bind_vars["limit"])
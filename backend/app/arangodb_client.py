@@ -1,7 +1,15 @@
 # app/arangodb_client.py
 
-from arango import ArangoClient
+import asyncio
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from arango import ArangoClient
+from arango.exceptions import DocumentInsertError
+from arango.http import DefaultHTTPClient
 
 # For now we read settings directly from environment variables.
 # This avoids importing anything from core.config so the backend can
@@ -11,6 +19,61 @@ ARANGO_USERNAME = os.getenv("ARANGO_USERNAME", "root")
 ARANGO_PASSWORD = os.getenv("ARANGO_PASSWORD", "")
 ARANGO_DB_NAME = os.getenv("ARANGO_DB_NAME", "elysium_kg")
 
+# "http" -> a real ArangoDB server at ARANGO_URL
+# "memory" -> in-process stand-in (app/arango_memory.py), no server needed
+ARANGO_BACKEND = os.getenv("ARANGO_BACKEND", "http")
+
+# HTTP connection pool (kept-alive connections reused across requests)
+ARANGO_POOL_SIZE = int(os.getenv("ARANGO_POOL_SIZE", "10"))
+ARANGO_POOL_TIMEOUT = float(os.getenv("ARANGO_POOL_TIMEOUT", "10"))        # wait for a free connection
+ARANGO_REQUEST_TIMEOUT = float(os.getenv("ARANGO_REQUEST_TIMEOUT", "30"))  # per request
+ARANGO_RETRY_ATTEMPTS = int(os.getenv("ARANGO_RETRY_ATTEMPTS", "3"))
+
+# How long a health check result is reused
+ARANGO_HEALTH_TTL = float(os.getenv("ARANGO_HEALTH_TTL", "30"))
+
+
+
+class ArangoDocumentError(Exception):
+    """
+    Arango refused a document (illegal key, edge without _from/_to,
+    unique constraint, ...), as opposed to being unreachable. Raised by
+    the in-memory stand-in where python-arango raises DocumentInsertError.
+    """
+
+
+# What a write raises when the documents, not the connection, are at fault
+DOCUMENT_ERRORS = (DocumentInsertError, ArangoDocumentError)
+
+_lock = threading.Lock()
+_client: Optional[ArangoClient] = None
+_db = None
+_memory_db = None
+
+
+def get_arango_client() -> ArangoClient:
+    """
+    The process-wide ArangoClient. Its HTTP session keeps up to
+    ARANGO_POOL_SIZE connections alive, so requests reuse connections
+    instead of opening one per call.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = ArangoClient(
+                    hosts=ARANGO_URL,
+                    http_client=DefaultHTTPClient(
+                        request_timeout=ARANGO_REQUEST_TIMEOUT,
+                        retry_attempts=ARANGO_RETRY_ATTEMPTS,
+                        pool_connections=ARANGO_POOL_SIZE,
+                        pool_maxsize=ARANGO_POOL_SIZE,
+                        pool_timeout=ARANGO_POOL_TIMEOUT,
+                    ),
+                    request_timeout=ARANGO_REQUEST_TIMEOUT,
+                )
+    return _client
+
 
 def get_arango_db():
     """
@@ -18,12 +81,114 @@ def get_arango_db():
 
     This function is safe to have in the codebase even if you are not
     calling it yet. It will only try to connect if something actually
-    imports and calls get_arango_db().
+    imports and calls get_arango_db(). The handle is created once per
+    process and shared (it is backed by the pooled client).
+    """
+    global _db, _memory_db
+    if ARANGO_BACKEND == "memory":
+        if _memory_db is None:
+            from .arango_memory import MemoryArangoDatabase
+            _memory_db = MemoryArangoDatabase(ARANGO_DB_NAME)
+        return _memory_db
+
+    if _db is None:
+        client = get_arango_client()
+        with _lock:
+            if _db is None:
+                # verify=False: no round-trip here; see arango_health()
+                _db = client.db(
+                    ARANGO_DB_NAME,
+                    username=ARANGO_USERNAME,
+                    password=ARANGO_PASSWORD,
+                    verify=False,
+                )
+    return _db
+
+
+def close_arango_client() -> None:
+    """Close pooled connections (app shutdown)."""
+    global _client, _db
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _db = None
+
+
+_health: Dict[str, Any] = {}
+
+
+def arango_health(force: bool = False) -> Dict[str, Any]:
+    """
+    Lazy health check: asks the server for its version at most once per
+    ARANGO_HEALTH_TTL seconds and caches the answer. Never raises.
     """
-    client = ArangoClient(hosts=ARANGO_URL)
-    db = client.db(
-        ARANGO_DB_NAME,
-        username=ARANGO_USERNAME,
-        password=ARANGO_PASSWORD,
+    global _health
+    now = time.time()
+    if not force and _health and now - _health["checked_at"] < ARANGO_HEALTH_TTL:
+        return _health
+
+    started = time.perf_counter()
+    try:
+        version = get_arango_db().version()
+        result = {"ok": True, "version": version, "error": None}
+    except Exception as e:
+        result = {"ok": False, "version": None, "error": f"{type(e).__name__}: {e}"}
+    result.update(
+        backend=ARANGO_BACKEND,
+        latency_ms=round((time.perf_counter() - started) * 1000, 2),
+        checked_at=now,
     )
-    return db
+    _health = result
+    return result
+
+
+class AsyncArangoDB:
+    """
+    Async-friendly wrapper: runs blocking python-arango calls on a thread
+    pool sized to the HTTP connection pool, so graph writes and queries
+    can be awaited and overlapped (asyncio.gather) without blocking the
+    event loop.
+
+        arango = get_async_arango()
+        await asyncio.gather(
+            arango.import_bulk("molecules", docs),
+            arango.aql("FOR d IN drugs RETURN d"),
+        )
+    """
+
+    def __init__(self, max_workers: int = ARANGO_POOL_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="arango")
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+
+    async def aql(self, query: str, bind_vars: Optional[Dict[str, Any]] = None, **kwargs) -> list:
+        def _execute():
+            return list(get_arango_db().aql.execute(query, bind_vars=bind_vars or {}, **kwargs))
+        return await self.run(_execute)
+
+    async def import_bulk(self, collection: str, documents: list, **kwargs) -> Any:
+        return await self.run(lambda: get_arango_db().collection(collection).import_bulk(documents, **kwargs))
+
+    async def insert(self, collection: str, document: dict, **kwargs) -> Any:
+        return await self.run(lambda: get_arango_db().collection(collection).insert(document, **kwargs))
+
+    async def health(self, force: bool = False) -> Dict[str, Any]:
+        return await self.run(arango_health, force)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+_async_db: Optional[AsyncArangoDB] = None
+
+
+def get_async_arango() -> AsyncArangoDB:
+    global _async_db
+    if _async_db is None:
+        with _lock:
+            if _async_db is None:
+                _async_db = AsyncArangoDB()
+    return _async_db
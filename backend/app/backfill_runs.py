@@ -0,0 +1,93 @@
+"""
+Backfill stored neighbors + ADMET for registered molecules that have none
+(molecules written before they were persisted with each run), and the
+semantic neighbor of molecules annotated while chemBERTa was unavailable.
+
+Usage (from the backend/ folder):
+    python -m app.backfill_runs              # all runs
+    python -m app.backfill_runs --run-id ID  # a single run
+"""
+
+import argparse
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from .db import Base, SessionLocal, engine
+from .migrations import run_migrations
+from .models import MoleculeRecord, RegisteredMolecule
+from .services.embeddings import embedder_available
+from .services.records import annotation_columns
+from .services.registry import compute_annotation
+from .services.runs import bump_run_revisions
+
+
+def backfill(run_id: Optional[str] = None, batch_size: int = 500) -> int:
+    """
+    Compute neighbors and ADMET for registry rows that have none stored,
+    or no embedding while chemBERTa is available (optionally only those
+    appearing in one run). Each structure is annotated once, however many
+    runs contain it. The runs showing an updated row get a new revision,
+    so their cached responses are replaced. Commits after every batch so
+    progress survives interruption.
+    Returns the number of registry rows updated.
+    """
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    needs_annotation = and_(
+        RegisteredMolecule.fp_neighbor_name.is_(None),
+        RegisteredMolecule.semantic_neighbor_name.is_(None),
+        RegisteredMolecule.lipinski_pass.is_(None),
+    )
+    if embedder_available():
+        # Annotated while chemBERTa was unavailable: no semantic neighbor yet
+        needs_annotation = or_(needs_annotation, RegisteredMolecule.embedding.is_(None))
+    query = (
+        select(RegisteredMolecule.id, RegisteredMolecule.canonical_smiles, RegisteredMolecule.embedding)
+        .where(needs_annotation)
+        .order_by(RegisteredMolecule.id)
+    )
+    if run_id is not None:
+        query = query.where(RegisteredMolecule.id.in_(
+            select(MoleculeRecord.registry_id).where(MoleculeRecord.run_id == run_id)
+        ))
+
+    updated = 0
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            batch = db.execute(query.where(RegisteredMolecule.id > last_id).limit(batch_size)).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            params = []
+            for row in batch:
+                ann = compute_annotation(row.canonical_smiles)
+                params.append({
+                    "id": row.id,
+                    "embedding": ann.embedding if ann.embedding is not None else row.embedding,
+                    **annotation_columns(ann.fp_neighbor, ann.semantic_neighbor, ann.admet),
+                })
+
+            db.execute(update(RegisteredMolecule), params)
+            # Same transaction: cached /runs/{id} responses showing these rows go stale
+            bump_run_revisions(db, [p["id"] for p in params])
+            db.commit()
+            updated += len(params)
+            print(f"[backfill] {updated} molecules updated")
+
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill neighbors + ADMET for stored molecules.")
+    parser.add_argument("--run-id", default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    backfill(run_id=args.run_id, batch_size=args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Dedicated thread pools for blocking work awaited from async endpoints.
+
+Sync endpoints and run_in_threadpool share one anyio threadpool (40
+threads by default). A handful of long discovery runs parked there would
+leave read requests queueing for a thread, so discovery gets its own
+pool (DISCOVERY_WORKERS) and reads run on the event loop / async engine.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from .core.config import DISCOVERY_WORKERS
+
+
+class BlockingExecutor:
+    """
+    A named thread pool whose jobs can be awaited. Context variables
+    (profiling session, metric labels) are carried into the worker
+    thread, as run_in_threadpool does.
+    """
+
+    def __init__(self, max_workers: int, name: str) -> None:
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Start fn on the pool; the returned future keeps tracking the job if its awaiter goes away."""
+        return self._executor.submit(contextvars.copy_context().run, functools.partial(fn, *args, **kwargs))
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+DISCOVERY_EXECUTOR = BlockingExecutor(DISCOVERY_WORKERS, "discovery")
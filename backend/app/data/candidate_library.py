@@ -6,9 +6,14 @@ This is a stand-in for:
   - or TamGen-generated libraries.
 
 Each entry can have a name + SMILES; generation will mainly use SMILES.
+Large libraries are loaded through a LibraryStore instead
+(ELYSIUM_CANDIDATE_LIBRARY_STORE, built with `python -m app.data.loaders`).
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from ..core.config import CANDIDATE_LIBRARY_STORE
+from .library_store import LibraryStore, open_store
 
 Candidate = Dict[str, str]
 
@@ -58,3 +63,8 @@ CANDIDATE_LIBRARY: List[Candidate] = [
         "smiles": "CCN(CC)CC",
     },
 ]
+
+
+def candidate_store() -> Optional[LibraryStore]:
+    """The configured candidate LibraryStore, or None to use CANDIDATE_LIBRARY."""
+    return open_store(CANDIDATE_LIBRARY_STORE)
@@ -0,0 +1,121 @@
+"""
+Compact columnar store for large molecule libraries.
+
+A store is a directory of flat binary columns that can be memory-mapped,
+so the generator, fingerprint search and embedder never load the whole
+library into Python objects:
+
+    meta.json          row count, column list, fingerprint size, source checkpoint
+    <col>.bin / .idx   UTF-8 string column: concatenated bytes + int64 end offsets
+    fps.bin            packed Morgan fingerprints, uint8 (N, fp_bits // 8)
+    fpcount.bin        popcount of each fingerprint, uint16 (N,)
+    emb.bin / embok.bin  optional chemBERTa embeddings of the first K rows:
+                       float32 unit vectors (K, dim) and a uint8 "embedded"
+                       flag per row; meta.json records model, dim and K
+
+Stores are written by app.data.loaders (streaming, incremental) and read
+through LibraryStore.
+"""
+
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+STRING_COLUMNS: Sequence[str] = ("smiles", "name", "info")
+FP_BITS = 2048
+META_FILE = "meta.json"
+EMBEDDING_FILE = "emb.bin"
+EMBEDDED_FILE = "embok.bin"
+
+
+def _memmap(path: str, dtype, shape) -> np.ndarray:
+    # np.memmap refuses zero-length files
+    if shape[0] == 0 or not os.path.exists(path):
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+class LibraryStore:
+    """
+    Read-only, memory-mapped view of a library store.
+
+    Records are exposed as dicts with the same keys as FDA_LIKE_DRUGS /
+    CANDIDATE_LIBRARY entries ("name", "smiles", "indication").
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as fh:
+            self.meta: Dict = json.load(fh)
+
+        n = int(self.meta["count"])
+        fp_bytes = int(self.meta.get("fp_bits", FP_BITS)) // 8
+        self._count = n
+        self._bytes: Dict[str, np.ndarray] = {}
+        self._ends: Dict[str, np.ndarray] = {}
+        for col in self.meta.get("columns", STRING_COLUMNS):
+            # Sizes come from the checkpoint, not the file: a build interrupted
+            # mid-chunk may have left bytes past the last committed row.
+            size = int(self.meta.get("bytes", {}).get(col, 0))
+            self._bytes[col] = _memmap(os.path.join(path, f"{col}.bin"), np.uint8, (size,))
+            self._ends[col] = _memmap(os.path.join(path, f"{col}.idx"), np.int64, (n,))
+
+        self.fingerprints = _memmap(os.path.join(path, "fps.bin"), np.uint8, (n, fp_bytes))
+        self.fp_counts = _memmap(os.path.join(path, "fpcount.bin"), np.uint16, (n,))
+
+        embedding = self.meta.get("embedding") or {}
+        self.embedding_model: Optional[str] = embedding.get("model")
+        k, dim = int(embedding.get("count", 0)), int(embedding.get("dim", 0))
+        self.embeddings = _memmap(os.path.join(path, EMBEDDING_FILE), np.float32, (k, dim))
+        self.embedded = _memmap(os.path.join(path, EMBEDDED_FILE), np.uint8, (k,))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _value(self, col: str, i: int) -> str:
+        ends = self._ends[col]
+        start = int(ends[i - 1]) if i > 0 else 0
+        return bytes(self._bytes[col][start:int(ends[i])]).decode("utf-8")
+
+    def smiles(self, i: int) -> str:
+        return self._value("smiles", i)
+
+    def record(self, i: int) -> Dict[str, Optional[str]]:
+        return {
+            "name": self._value("name", i) or f"mol_{i}",
+            "smiles": self._value("smiles", i),
+            "indication": self._value("info", i) or None,
+        }
+
+    def iter_records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Optional[str]]]:
+        stop = self._count if stop is None else min(stop, self._count)
+        for i in range(start, stop):
+            yield self.record(i)
+
+    def sample_smiles(self, k: int, rng: Optional[np.random.Generator] = None) -> List[str]:
+        """Sample k SMILES with replacement without touching the rest of the store."""
+        if self._count == 0 or k <= 0:
+            return []
+        rng = rng or np.random.default_rng()
+        return [self.smiles(int(i)) for i in rng.integers(0, self._count, size=k)]
+
+
+_OPEN_STORES: Dict[str, LibraryStore] = {}
+
+
+def open_store(path: Optional[str]) -> Optional[LibraryStore]:
+    """
+    Open (and cache) the store at `path`, or return None when no path is
+    configured or the store has not been built yet.
+    """
+    if not path:
+        return None
+    if path not in _OPEN_STORES:
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            print(f"[LibraryStore] No store at {path}, using built-in library")
+            return None
+        _OPEN_STORES[path] = LibraryStore(path)
+    return _OPEN_STORES[path]
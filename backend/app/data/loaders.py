@@ -0,0 +1,532 @@
+"""
+Streaming loaders for large reference / candidate libraries.
+
+Reads SMILES, CSV/TSV and SDF exports (optionally gzipped) in chunks,
+standardizes + canonicalizes molecules in a process pool and appends them
+to a LibraryStore directory (see library_store.py). The raw file is never
+held in memory: only `chunk_size` records per worker are in flight.
+
+Builds are incremental. The store remembers how many source bytes it has
+consumed plus a hash of the leading bytes; if the source has only grown
+since the last build, loading resumes at the old offset and appends.
+
+Usage (from the backend/ folder):
+    python -m app.data.loaders chembl_33.smi stores/chembl
+    python -m app.data.loaders drugbank.sdf.gz stores/drugbank --name-col GENERIC_NAME
+    python -m app.data.loaders zinc.csv stores/zinc --smiles-col smiles --workers 8
+    python -m app.data.loaders chembl_33.smi stores/chembl --embeddings   # + chemBERTa column
+
+--embeddings adds (or extends) the store's embedding column the same way:
+only rows without one are encoded, in checkpointed batches, so the
+embedder memory-maps the column at startup instead of encoding the
+library.
+"""
+
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import BinaryIO, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+from rdkit.Chem.MolStandardize import rdMolStandardize
+from rdkit.rdBase import BlockLogs
+
+from .library_store import EMBEDDED_FILE, EMBEDDING_FILE, FP_BITS, META_FILE, STRING_COLUMNS, LibraryStore
+
+
+STORE_VERSION = 1
+HEAD_HASH_BYTES = 1 << 20  # bytes of source prefix used to detect rewrites
+
+SMILES_COLUMNS = ("smiles", "canonical_smiles", "smiles_string", "structure")
+NAME_COLUMNS = ("name", "pref_name", "generic_name", "drugbank_id", "chembl_id", "zinc_id", "id")
+INFO_COLUMNS = ("indication", "indications", "info", "description")
+
+# (smiles, name, info, packed fingerprint, popcount)
+Row = Tuple[str, str, str, bytes, int]
+
+
+# ---------- source detection / reading ----------
+
+def detect_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".sdf", ".sd", ".mol")):
+        return "sdf"
+    if name.endswith((".csv", ".tsv")):
+        return "csv"
+    return "smiles"
+
+
+def _open_source(path: str) -> BinaryIO:
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    return open(path, "rb")
+
+
+def _skip_to(fh: BinaryIO, offset: int, path: str) -> None:
+    if offset <= 0:
+        return
+    if path.lower().endswith(".gz"):
+        # Compressed streams cannot seek cheaply; read and discard instead.
+        remaining = offset
+        while remaining > 0:
+            block = fh.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            remaining -= len(block)
+    else:
+        fh.seek(offset)
+
+
+def _head_hash(path: str, length: int) -> str:
+    digest = hashlib.sha1()
+    with _open_source(path) as fh:
+        remaining = min(length, HEAD_HASH_BYTES)
+        while remaining > 0:
+            block = fh.read(min(remaining, 1 << 16))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _read_chunks(
+    fh: BinaryIO,
+    fmt: str,
+    start_offset: int,
+    chunk_size: int,
+) -> Iterator[Tuple[List[str], int]]:
+    """
+    Yield (records, end_offset) chunks of raw records.
+
+    Only complete records are emitted: a trailing line without a newline
+    (or an SDF record without "$$$$") is left for the next incremental build,
+    since the source may still be being written.
+    """
+    offset = start_offset
+    records: List[str] = []
+    pending: List[bytes] = []
+
+    for line in fh:
+        if not line.endswith(b"\n"):
+            break
+        if fmt == "sdf":
+            pending.append(line)
+            offset += len(line)
+            if line.startswith(b"$$$$"):
+                records.append(b"".join(pending).decode("utf-8", errors="replace"))
+                pending = []
+            else:
+                continue
+        else:
+            offset += len(line)
+            text = line.decode("utf-8", errors="replace").strip()
+            if not text or text.startswith("#"):
+                continue
+            records.append(text)
+
+        if len(records) >= chunk_size:
+            yield records, offset
+            records = []
+
+    if records:
+        yield records, offset - sum(len(p) for p in pending)
+
+
+# ---------- standardization (runs in worker processes) ----------
+
+_FP_GEN = None
+_CLEANUP = None
+
+
+def _worker_state():
+    global _FP_GEN, _CLEANUP
+    if _FP_GEN is None:
+        _FP_GEN = rdFingerprintGenerator.GetMorganGenerator(radius=2, fpSize=FP_BITS)
+        _CLEANUP = (
+            rdMolStandardize.CleanupParameters(),
+            rdMolStandardize.LargestFragmentChooser(),
+            rdMolStandardize.Uncharger(),
+        )
+    return _FP_GEN, _CLEANUP
+
+
+def standardize_mol(mol: Optional[Chem.Mol]) -> Optional[Chem.Mol]:
+    """Cleanup, keep the largest fragment, neutralize charges."""
+    if mol is None:
+        return None
+    _, (params, chooser, uncharger) = _worker_state()
+    try:
+        mol = rdMolStandardize.Cleanup(mol, params)
+        mol = chooser.choose(mol)
+        mol = uncharger.uncharge(mol)
+        Chem.SanitizeMol(mol)
+    except Exception:
+        return None
+    return mol
+
+
+def _row_from_mol(mol: Optional[Chem.Mol], name: str, info: str) -> Optional[Row]:
+    mol = standardize_mol(mol)
+    if mol is None or mol.GetNumAtoms() == 0:
+        return None
+    fp_gen, _ = _worker_state()
+    bits = fp_gen.GetFingerprintAsNumPy(mol).astype(np.uint8)
+    return (
+        Chem.MolToSmiles(mol),
+        name,
+        info,
+        np.packbits(bits).tobytes(),
+        int(bits.sum()),
+    )
+
+
+def _pick(header: Sequence[str], explicit: Optional[str], candidates: Sequence[str]) -> Optional[int]:
+    lowered = [h.strip().lower() for h in header]
+    if explicit:
+        return lowered.index(explicit.lower()) if explicit.lower() in lowered else None
+    for cand in candidates:
+        if cand in lowered:
+            return lowered.index(cand)
+    return None
+
+
+def _standardize_chunk(fmt: str, records: List[str], options: Dict) -> List[Row]:
+    block = BlockLogs()  # keep RDKit quiet about bad records in this chunk
+    rows = _standardize_records(fmt, records, options)
+    del block
+    return rows
+
+
+def _standardize_records(fmt: str, records: List[str], options: Dict) -> List[Row]:
+    rows: List[Row] = []
+
+    if fmt == "sdf":
+        supplier = Chem.SDMolSupplier()
+        supplier.SetData("".join(records), sanitize=True)
+        name_field = options.get("name_col")
+        info_field = options.get("info_col")
+        for mol in supplier:
+            if mol is None:
+                continue
+            name = mol.GetProp(name_field) if name_field and mol.HasProp(name_field) else (
+                mol.GetProp("_Name") if mol.HasProp("_Name") else ""
+            )
+            info = mol.GetProp(info_field) if info_field and mol.HasProp(info_field) else ""
+            row = _row_from_mol(mol, name.strip(), info.strip())
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    if fmt == "csv":
+        smi_idx, name_idx, info_idx = options["smiles_idx"], options["name_idx"], options["info_idx"]
+        for fields in csv.reader(records, delimiter=options["delimiter"]):
+            if smi_idx >= len(fields):
+                continue
+            name = fields[name_idx] if name_idx is not None and name_idx < len(fields) else ""
+            info = fields[info_idx] if info_idx is not None and info_idx < len(fields) else ""
+            row = _row_from_mol(Chem.MolFromSmiles(fields[smi_idx]), name, info)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+    # SMILES: "<smiles> [name ...]"
+    for line in records:
+        parts = line.split(None, 1)
+        name = parts[1].strip() if len(parts) > 1 else ""
+        row = _row_from_mol(Chem.MolFromSmiles(parts[0]), name, "")
+        if row is not None:
+            rows.append(row)
+    return rows
+
+
+# ---------- store writer ----------
+
+class _StoreWriter:
+    """
+    Appends rows to the column files and checkpoints meta.json atomically
+    after every chunk, so an interrupted build resumes cleanly.
+    """
+
+    def __init__(self, path: str, meta: Dict) -> None:
+        self.path = path
+        self.meta = meta
+        os.makedirs(path, exist_ok=True)
+        self._files: Dict[str, BinaryIO] = {}
+
+        committed = meta.setdefault("bytes", {c: 0 for c in STRING_COLUMNS})
+        count = int(meta["count"])
+        fp_bytes = FP_BITS // 8
+        sizes = {f"{c}.bin": committed[c] for c in STRING_COLUMNS}
+        sizes.update({f"{c}.idx": count * 8 for c in STRING_COLUMNS})
+        sizes.update({"fps.bin": count * fp_bytes, "fpcount.bin": count * 2})
+        for fname, size in sizes.items():
+            fh = open(os.path.join(path, fname), "ab")
+            fh.truncate(size)  # drop anything written after the last checkpoint
+            self._files[fname] = fh
+
+    def append(self, rows: List[Row]) -> None:
+        if not rows:
+            return
+        for col_idx, col in enumerate(STRING_COLUMNS):
+            encoded = [r[col_idx].encode("utf-8") for r in rows]
+            lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+            ends = self.meta["bytes"][col] + np.cumsum(lengths)
+            self._files[f"{col}.bin"].write(b"".join(encoded))
+            self._files[f"{col}.idx"].write(ends.astype(np.int64).tobytes())
+            self.meta["bytes"][col] = int(ends[-1])
+        self._files["fps.bin"].write(b"".join(r[3] for r in rows))
+        self._files["fpcount.bin"].write(
+            np.fromiter((r[4] for r in rows), dtype=np.uint16, count=len(rows)).tobytes()
+        )
+        self.meta["count"] = int(self.meta["count"]) + len(rows)
+
+    def checkpoint(self, offset: int) -> None:
+        for fh in self._files.values():
+            fh.flush()
+            os.fsync(fh.fileno())
+        self.meta["source"]["offset"] = offset
+        _write_meta(self.path, self.meta)
+
+    def close(self) -> None:
+        for fh in self._files.values():
+            fh.close()
+
+
+def _write_meta(store_dir: str, meta: Dict) -> None:
+    tmp = os.path.join(store_dir, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    os.replace(tmp, os.path.join(store_dir, META_FILE))
+
+
+def _load_meta(store_dir: str) -> Optional[Dict]:
+    path = os.path.join(store_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _fresh_meta(source: str, fmt: str) -> Dict:
+    return {
+        "version": STORE_VERSION,
+        "count": 0,
+        "columns": list(STRING_COLUMNS),
+        "fp_bits": FP_BITS,
+        "fp_type": "morgan_r2",
+        "bytes": {c: 0 for c in STRING_COLUMNS},
+        "source": {"path": os.path.abspath(source), "format": fmt, "offset": 0, "head_sha1": None},
+    }
+
+
+def build_store(
+    source: str,
+    store_dir: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = 5000,
+    workers: Optional[int] = None,
+    smiles_col: Optional[str] = None,
+    name_col: Optional[str] = None,
+    info_col: Optional[str] = None,
+    rebuild: bool = False,
+) -> Dict:
+    """
+    Stream `source` into the store at `store_dir`.
+
+    Returns a small stats dict (rows read/written, seconds, mode).
+    """
+    fmt = fmt or detect_format(source)
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    meta = None if rebuild else _load_meta(store_dir)
+    mode = "fresh"
+    if meta is not None:
+        src = meta["source"]
+        prev_offset = int(src.get("offset", 0))
+        if (
+            src.get("format") == fmt
+            and meta.get("version") == STORE_VERSION
+            and src.get("head_sha1") == _head_hash(source, prev_offset)
+        ):
+            mode = "incremental"
+        else:
+            meta = None
+    if meta is None:
+        # Column files are truncated to the (empty) checkpoint by the writer.
+        meta = _fresh_meta(source, fmt)
+
+    start_offset = int(meta["source"]["offset"])
+    t0 = time.perf_counter()
+    rows_in = 0
+    rows_out = 0
+
+    writer = _StoreWriter(store_dir, meta)
+    try:
+        with _open_source(source) as fh:
+            _skip_to(fh, start_offset, source)
+
+            options: Dict = {"name_col": name_col, "info_col": info_col}
+            if fmt == "csv":
+                delimiter = "\t" if ".tsv" in source.lower() else ","
+                if start_offset == 0:
+                    header_line = fh.readline()
+                    start_offset = len(header_line)
+                    meta["source"]["header"] = next(
+                        csv.reader([header_line.decode("utf-8").strip()], delimiter=delimiter)
+                    )
+                header = meta["source"]["header"]
+                smiles_idx = _pick(header, smiles_col, SMILES_COLUMNS)
+                if smiles_idx is None:
+                    raise ValueError(f"No SMILES column found in header: {header}")
+                options.update(
+                    delimiter=delimiter,
+                    smiles_idx=smiles_idx,
+                    name_idx=_pick(header, name_col, NAME_COLUMNS),
+                    info_idx=_pick(header, info_col, INFO_COLUMNS),
+                )
+
+            chunks = _read_chunks(fh, fmt, start_offset, chunk_size)
+
+            def _commit(rows: List[Row], end: int) -> None:
+                nonlocal rows_out
+                writer.append(rows)
+                rows_out += len(rows)
+                writer.checkpoint(end)
+
+            if workers <= 1:
+                for records, end in chunks:
+                    rows_in += len(records)
+                    _commit(_standardize_chunk(fmt, records, options), end)
+            else:
+                # Bounded in-flight window: Executor.map would drain the whole
+                # source iterator up front.
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    inflight: Deque[Tuple[Future, int]] = deque()
+                    for records, end in chunks:
+                        rows_in += len(records)
+                        inflight.append((pool.submit(_standardize_chunk, fmt, records, options), end))
+                        if len(inflight) >= workers * 2:
+                            fut, fut_end = inflight.popleft()
+                            _commit(fut.result(), fut_end)
+                    while inflight:
+                        fut, fut_end = inflight.popleft()
+                        _commit(fut.result(), fut_end)
+
+            end_offset = int(meta["source"]["offset"]) if rows_in else start_offset
+            meta["source"]["head_sha1"] = _head_hash(source, end_offset)
+            writer.checkpoint(end_offset)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "mode": mode,
+        "records_read": rows_in,
+        "rows_written": rows_out,
+        "total_rows": int(meta["count"]),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_in / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+# ---------- embedding column ----------
+
+def embed_store(store_dir: str, model_name: str, batch_size: int = 1024) -> Dict:
+    """
+    Append chemBERTa embeddings for the store rows that have none yet
+    (emb.bin / embok.bin, see library_store.py), checkpointing meta.json
+    after every batch like the row columns. A different model than the
+    one recorded starts the column over.
+    """
+    from ..services.chemberta import ChemBERTaModel  # torch + transformers, only when asked for
+
+    meta = _load_meta(store_dir)
+    if meta is None:
+        raise ValueError(f"No store at {store_dir}")
+    model = ChemBERTaModel(model_name)
+    embedding = meta.get("embedding")
+    if not embedding or embedding.get("model") != model_name or int(embedding.get("dim", 0)) != model.dim:
+        embedding = {"model": model_name, "dim": model.dim, "count": 0}
+    meta["embedding"] = embedding
+
+    store = LibraryStore(store_dir)
+    total = len(store)
+    start = done = int(embedding["count"])
+    t0 = time.perf_counter()
+    with open(os.path.join(store_dir, EMBEDDING_FILE), "ab") as emb, \
+            open(os.path.join(store_dir, EMBEDDED_FILE), "ab") as flags:
+        # Drop anything written after the last checkpoint
+        emb.truncate(done * model.dim * 4)
+        flags.truncate(done)
+        for lo in range(start, total, batch_size):
+            hi = min(lo + batch_size, total)
+            vectors, ok = model.encode([store.smiles(i) for i in range(lo, hi)])
+            emb.write(vectors.tobytes())
+            flags.write(ok.astype(np.uint8).tobytes())
+            for fh in (emb, flags):
+                fh.flush()
+                os.fsync(fh.fileno())
+            embedding["count"] = done = hi
+            _write_meta(store_dir, meta)
+        _write_meta(store_dir, meta)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "model": model_name,
+        "rows_embedded": done - start,
+        "total_embedded": done,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round((done - start) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or extend a LibraryStore from an SDF/SMILES/CSV export.")
+    parser.add_argument("source")
+    parser.add_argument("store_dir")
+    parser.add_argument("--format", choices=["sdf", "smiles", "csv"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--smiles-col", default=None)
+    parser.add_argument("--name-col", default=None)
+    parser.add_argument("--info-col", default=None)
+    parser.add_argument("--rebuild", action="store_true", help="ignore any existing store")
+    parser.add_argument("--embeddings", action="store_true",
+                        help="also store chemBERTa embeddings for rows that have none (reference libraries)")
+    parser.add_argument("--embedding-model", default=None, help="default: ELYSIUM_CHEMBERTA_MODEL")
+    parser.add_argument("--embedding-batch", type=int, default=1024, help="rows per embedding checkpoint")
+    args = parser.parse_args()
+
+    stats = build_store(
+        args.source,
+        args.store_dir,
+        fmt=args.format,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        smiles_col=args.smiles_col,
+        name_col=args.name_col,
+        info_col=args.info_col,
+        rebuild=args.rebuild,
+    )
+    if args.embeddings:
+        from ..core.config import CHEMBERTA_MODEL
+
+        stats["embeddings"] = embed_store(
+            args.store_dir, args.embedding_model or CHEMBERTA_MODEL, batch_size=args.embedding_batch
+        )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
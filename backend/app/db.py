@@ -1,14 +1,93 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional
 
-# SQLite database file in the backend folder
-SQLALCHEMY_DATABASE_URL = "sqlite:///./elysium.db"
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
+from starlette.concurrency import run_in_threadpool
 
-# For SQLite in FastAPI we must disable check_same_thread
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .core.config import (
+    ASYNC_DB,
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KIB,
+    SQLITE_WAL,
 )
 
+# Defaults to the SQLite database file in the backend folder
+SQLALCHEMY_DATABASE_URL = DATABASE_URL
+
+
+def _sqlite_pragmas(wal: bool):
+    """connect listener applying the SQLite pragmas; only journal_mode depends on `wal`."""
+
+    def set_pragmas(dbapi_conn, _record) -> None:
+        cursor = dbapi_conn.cursor()
+        # WAL lets readers proceed while a discovery run is being written;
+        # synchronous=NORMAL is durable across app crashes in WAL mode.
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+    return set_pragmas
+
+
+def build_engine(url: str = SQLALCHEMY_DATABASE_URL, sqlite_wal: bool = SQLITE_WAL) -> Engine:
+    """
+    Create the engine for `url`.
+
+    SQLite files get tuned pragmas (plus WAL unless sqlite_wal is off) and
+    a thread-shared QueuePool sized for multi-threaded uvicorn; in-memory
+    SQLite uses a single static connection. Other databases get a
+    pre-pinged, recycled QueuePool.
+    """
+    parsed = make_url(url)
+
+    if parsed.get_backend_name() == "sqlite":
+        # For SQLite in FastAPI we must disable check_same_thread
+        connect_args = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+        if parsed.database in (None, "", ":memory:"):
+            return create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+        event.listen(engine, "connect", _sqlite_pragmas(sqlite_wal))
+        return engine
+
+    return create_engine(
+        url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+engine = build_engine()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -21,3 +100,112 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------- async access (read endpoints) ----------
+
+# Sync driver -> asyncio driver for the same database
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+
+
+def async_database_url(url: str) -> str:
+    """The URL with its asyncio driver (postgresql+psycopg is async-capable as is)."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False) if driver else url
+
+
+def build_async_engine(url: str = SQLALCHEMY_DATABASE_URL, sqlite_wal: bool = SQLITE_WAL) -> "AsyncEngine":
+    """
+    Async counterpart of build_engine(): same pool sizing and SQLite
+    pragmas, over aiosqlite / asyncpg. Raises if SQLAlchemy's asyncio
+    support (greenlet) or the driver is missing.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = async_database_url(url)
+    parsed = make_url(async_url)
+
+    if parsed.get_backend_name() == "sqlite":
+        connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if parsed.database in (None, "", ":memory:"):
+            # A separate in-memory database would be empty: share nothing, fail loudly
+            raise ValueError("In-memory SQLite cannot be shared with an async engine")
+        engine = create_async_engine(
+            async_url,
+            connect_args=connect_args,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas(sqlite_wal))
+        return engine
+
+    return create_async_engine(
+        async_url,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+class ThreadedSession:
+    """
+    Fallback for get_async_db() without an async driver: the same
+    run_sync() interface as AsyncSession, over a sync Session whose calls
+    run in the threadpool.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await run_in_threadpool(fn, self._session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self._session.close)
+
+
+async_engine: Optional["AsyncEngine"] = None
+AsyncSessionLocal = None
+if ASYNC_DB:
+    try:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        async_engine = build_async_engine()
+        AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    except Exception as e:
+        print("[db] Async engine unavailable, async endpoints use the threadpool:", e)
+
+
+def dispose_inherited_connections() -> None:
+    """
+    Drop pooled connections inherited through fork() without closing
+    them (they belong to the parent); call first thing in a forked worker.
+    """
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+# Dependency for async routes: an AsyncSession (or ThreadedSession).
+# Reuse the sync query helpers with `await db.run_sync(helper, ...)`.
+async def get_async_db() -> AsyncIterator[Any]:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -1,10 +1,15 @@
 """
 Tiny demo library of known drugs for ELYSIUM similarity search.
 
-In a real system this would come from DrugBank / ChEMBL / FDA datasets.
+In a real system this would come from DrugBank / ChEMBL / FDA datasets:
+build a LibraryStore with `python -m app.data.loaders` and point
+ELYSIUM_REFERENCE_LIBRARY_STORE at it to replace this list.
 """
 
-from typing import List, Dict
+from typing import Iterator, List, Dict, Optional
+
+from .core.config import REFERENCE_LIBRARY_STORE
+from .data.library_store import LibraryStore, open_store
 
 
 DrugRecord = Dict[str, str]
@@ -36,3 +41,17 @@ FDA_LIKE_DRUGS: List[DrugRecord] = [
         "indication": "Local anesthetic, antiarrhythmic",
     },
 ]
+
+
+def reference_store() -> Optional[LibraryStore]:
+    """The configured reference LibraryStore, or None to use FDA_LIKE_DRUGS."""
+    return open_store(REFERENCE_LIBRARY_STORE)
+
+
+def iter_reference_drugs() -> Iterator[DrugRecord]:
+    """Stream reference drug records from the store if configured, else the built-in list."""
+    store = reference_store()
+    if store is not None:
+        yield from store.iter_records()
+    else:
+        yield from FDA_LIKE_DRUGS
@@ -0,0 +1,207 @@
+"""
+HTTP caching and compression for stored run data (GET /runs/{id}).
+
+A run's rows never change once its transaction commits; what can change
+are the registry annotations it shows (app.backfill_runs), and every such
+change bumps the run's revision (discovery_runs.revision). A run response
+is therefore determined by (run id, revision, query parameters). That gives
+  - a strong ETag computed from that key, so a conditional GET is
+    answered 304 after a single primary-key read;
+  - Cache-Control with a short max-age (RUN_CACHE_MAX_AGE_SECONDS) and
+    must-revalidate, so clients pick up a new revision soon after it;
+  - RUN_BODIES, a per-process LRU of serialized bodies keyed the same
+    way (bounded by entries and bytes), holding each compressed variant
+    next to the plain body so every encoding is compressed once.
+
+Bodies above COMPRESSION_MIN_BYTES are sent with br (when the brotli
+package is installed) or gzip, whichever the client accepts first by our
+preference. Responses are marked Vary: Accept-Encoding and carry a
+Content-Encoding, so a GZip middleware in front will not compress them
+again. The ETag of an encoded variant gets an encoding suffix, as RFC
+9110 requires of strong validators; If-None-Match accepts any variant.
+
+Bump RUN_REPRESENTATION_VERSION when the JSON of every stored run changes
+(schema or ordering change) to invalidate all cached responses at once.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .core.config import (
+    COMPRESSION_MIN_BYTES,
+    RUN_CACHE_MAX_AGE_SECONDS,
+    RUN_CACHE_MAX_BYTES,
+    RUN_CACHE_MAX_ENTRIES,
+)
+from .metrics import register_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # gzip only
+
+RUN_REPRESENTATION_VERSION = 2  # 2: molecules in ranked (insertion) order, new cursors
+
+RUN_CACHE_CONTROL = f"public, max-age={RUN_CACHE_MAX_AGE_SECONDS}, must-revalidate"
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content-Encoding values in order of preference
+_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def run_etag(*key) -> str:
+    """Strong ETag for one representation of a run (key = run id, revision, query parameters)."""
+    raw = "|".join(str(part) for part in (RUN_REPRESENTATION_VERSION,) + key)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def _variant_etag(etag: str, encoding: Optional[str]) -> str:
+    return etag if encoding is None else etag[:-1] + "-" + encoding + '"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: Optional[str]) -> Optional[str]:
+    """
+    The variant of `etag` (plain or encoded) listed in If-None-Match, or
+    None. Weak comparison, as RFC 9110 prescribes for If-None-Match.
+    "*" matches any etag: only pass one for a resource that exists.
+    """
+    if etag is None or not if_none_match:
+        return None
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if "*" in candidates:
+        return etag
+    for variant in (etag,) + tuple(_variant_etag(etag, encoding) for encoding in ("br", "gzip")):
+        if variant in candidates:
+            return variant
+    return None
+
+
+def accepted_encoding(request: Request) -> Optional[str]:
+    """Best encoding the client accepts (q=0 means refused)."""
+    header = request.headers.get("accept-encoding", "")
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    for encoding in _ENCODINGS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CachedBody:
+    """A serialized response body plus its compressed variants, filled on demand."""
+
+    def __init__(self, etag: str, body: bytes, media_type: str = "application/json") -> None:
+        self.etag = etag
+        self.body = body
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(v) for v in self.variants.values())
+
+    def variant(self, accepted: Optional[str]) -> Optional[str]:
+        """Encoding to send to a client whose best is `accepted` (None: plain)."""
+        return accepted if len(self.body) >= COMPRESSION_MIN_BYTES else None
+
+    def has_variant(self, encoding: Optional[str]) -> bool:
+        return encoding is None or encoding in self.variants
+
+    def encoded(self, encoding: str) -> bytes:
+        """
+        The body compressed with `encoding`, compressed on first use. That
+        is CPU work under a lock: async callers run it in the threadpool
+        unless has_variant() says it is already there.
+        """
+        with self._lock:
+            data = self.variants.get(encoding)
+            if data is None:
+                data = self.variants[encoding] = _compress(self.body, encoding)
+        return data
+
+    def response(self, encoding: Optional[str], headers: Optional[Dict[str, str]] = None) -> Response:
+        """The body in `encoding` (from variant()), with ETag / Vary set."""
+        headers = dict(headers or {})
+        headers["Vary"] = "Accept-Encoding"
+        if encoding is None:
+            headers["ETag"] = self.etag
+            return Response(content=self.body, media_type=self.media_type, headers=headers)
+        headers["ETag"] = _variant_etag(self.etag, encoding)
+        headers["Content-Encoding"] = encoding
+        return Response(content=self.encoded(encoding), media_type=self.media_type, headers=headers)
+
+
+class _BodyCache:
+    """Thread-safe LRU of CachedBody, bounded by entry count and total bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple, entry: CachedBody) -> CachedBody:
+        # Bodies bigger than a quarter of the budget would just churn the cache
+        if self.max_entries <= 0 or entry.size > self.max_bytes // 4:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        # Sizes grow as variants are compressed, so recount on every put
+        total = sum(e.size for e in self._entries.values())
+        while self._entries and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, dropped = self._entries.popitem(last=False)
+            total -= dropped.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            size = sum(e.size for e in self._entries.values())
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "bytes": size}
+
+
+RUN_BODIES = _BodyCache(RUN_CACHE_MAX_ENTRIES, RUN_CACHE_MAX_BYTES)
+
+register_cache("run_bodies", RUN_BODIES.stats)
@@ -1,15 +1,48 @@
 from .arangodb_client import get_arango_db
 
-def init_arango_schema():
-    db = get_arango_db()
+VERTEX_COLLECTIONS = ["targets", "drugs", "diseases", "molecules"]
+EDGE_COLLECTIONS = ["binds", "treats", "associated_with", "similar_to"]
 
-    for name in ["targets", "drugs", "diseases", "molecules"]:
+# Persistent indexes: (collection, fields, sparse). Edge collections
+# already have the built-in _from/_to edge index; the vertex-centric ones
+# ([_to, score], [_from, tanimoto], ...) serve the AQL graph views in
+# services/graph_aql.py, which traverse from one vertex and sort by metric.
+PERSISTENT_INDEXES = [
+    ("targets", ["symbol"], True),
+    ("targets", ["uniprot_id"], True),
+    ("drugs", ["name"], True),
+    ("drugs", ["chembl_id"], True),
+    ("drugs", ["drugbank_id"], True),
+    ("diseases", ["name"], True),
+    ("molecules", ["run_id"], True),
+    ("molecules", ["target_id", "score"], True),
+    ("binds", ["score"], True),
+    ("binds", ["_to", "score"], False),
+    ("similar_to", ["tanimoto"], True),
+    ("similar_to", ["_from", "tanimoto"], False),
+    ("similar_to", ["_to", "tanimoto"], False),
+]
+
+
+def ensure_indexes(db=None) -> None:
+    """Create the persistent indexes above (no-op for ones that exist)."""
+    db = db or get_arango_db()
+    for collection, fields, sparse in PERSISTENT_INDEXES:
+        db.collection(collection).add_persistent_index(fields, sparse=sparse, in_background=True)
+
+
+def init_arango_schema(db=None):
+    db = db or get_arango_db()
+
+    for name in VERTEX_COLLECTIONS:
         if not db.has_collection(name):
             db.create_collection(name)
 
-    for name in ["binds", "treats", "associated_with", "similar_to"]:
+    for name in EDGE_COLLECTIONS:
         if not db.has_collection(name):
             db.create_collection(name, edge=True)
 
+    ensure_indexes(db)
+
 if __name__ == "__main__":
     init_arango_schema()
@@ -0,0 +1,366 @@
+"""
+Streaming bulk seeding of the ArangoDB knowledge graph from CSV / JSONL
+dumps (ChEMBL, DrugBank, DisGeNET-style exports, optionally gzipped).
+
+Each source file holds one kind of record: a vertex collection (targets,
+drugs, diseases) or an edge collection (binds, treats, associated_with,
+similar_to). The kind comes from the file name (`drugs.csv.gz`) or an
+explicit `kind=path` argument. Records are read in a stream, mapped to
+documents with deterministic keys and written with
+import_bulk(on_duplicate="update") in batches of thousands, a few batches
+in flight at once. Re-running a file therefore updates documents instead
+of duplicating them.
+
+Persistent indexes (init_arango.PERSISTENT_INDEXES) are created before
+loading. Progress (source byte offset + a hash of the leading bytes) is
+checkpointed after every acknowledged batch, so an interrupted seed
+resumes where it stopped; a source that changed is re-read from the top.
+
+Usage (from the backend/ folder):
+    python -m app.kg_import targets.csv drugs.jsonl.gz binds.csv
+    python -m app.kg_import binds=chembl_activities.csv --batch-size 10000 --workers 4
+    python -m app.kg_import drugs=drugbank.csv --key-col drugbank_id
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .arangodb_client import get_arango_db
+from .data.loaders import HEAD_HASH_BYTES, _head_hash, _open_source, _skip_to
+from .init_arango import init_arango_schema
+from .services.replication import arango_key
+
+# Candidate columns for a vertex key, per collection (first match wins)
+VERTEX_KEY_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "targets": ("_key", "key", "symbol", "target_id", "gene_symbol", "uniprot_id", "chembl_id", "id"),
+    "drugs": ("_key", "key", "name", "pref_name", "generic_name", "drugbank_id", "chembl_id", "id"),
+    "diseases": ("_key", "key", "disease_id", "mesh_id", "name", "id"),
+}
+
+# Edge collection -> (from collection, to collection)
+EDGE_ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "binds": ("drugs", "targets"),
+    "treats": ("drugs", "diseases"),
+    "associated_with": ("targets", "diseases"),
+    "similar_to": ("drugs", "drugs"),
+}
+
+_SINGULAR = {"targets": "target", "drugs": "drug", "diseases": "disease", "molecules": "molecule"}
+
+# Columns holding identifiers: kept as text, since "007" is not 7
+_ID_COLUMNS = frozenset(
+    [column for columns in VERTEX_KEY_COLUMNS.values() for column in columns]
+    + ["_from", "_to", "from", "to", "source", "target", "from_key", "to_key"]
+    + list(_SINGULAR.values())
+)
+
+_INT_RE = re.compile(r"^-?\d+$")
+_FLOAT_RE = re.compile(r"^-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$")
+
+
+# ---------- record -> document ----------
+
+def vertex_key(collection: str, value: Any) -> str:
+    """Key for a vertex; drug names are lower-cased, like replicated runs."""
+    value = str(value).strip()
+    return arango_key(value.lower() if collection == "drugs" else value)
+
+
+def edge_key(from_id: str, to_id: str, extra: str = "") -> str:
+    """Deterministic edge key, so the same relation loaded twice is one edge."""
+    return hashlib.sha1(f"{from_id}|{to_id}|{extra}".encode("utf-8")).hexdigest()[:32]
+
+
+def _is_id_column(name: str, key_col: Optional[str] = None) -> bool:
+    return name == key_col or name in _ID_COLUMNS or name.endswith(("_id", "_key"))
+
+
+def _text(value: str) -> Optional[str]:
+    value = value.strip()
+    return value or None
+
+
+def _coerce(value: str) -> Any:
+    """CSV cells arrive as text; turn numbers into numbers so indexes/sorts work."""
+    value = value.strip()
+    if value == "":
+        return None
+    if _INT_RE.match(value) and len(value) < 18:
+        return int(value)
+    if _FLOAT_RE.match(value):
+        return float(value)
+    return value
+
+
+def _first(record: Dict[str, Any], columns) -> Optional[Any]:
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _endpoint(record: Dict[str, Any], side: str, collection: str) -> Optional[str]:
+    """`_from` / `_to` as a document id, from an id column or a bare key column."""
+    value = record.get(f"_{side}")
+    if value:
+        return str(value)
+    value = _first(record, (side, "source" if side == "from" else "target", _SINGULAR[collection],
+                            f"{_SINGULAR[collection]}_id", f"{side}_key"))
+    if value is None:
+        return None
+    value = str(value)
+    if "/" in value:
+        return value
+    return f"{collection}/{vertex_key(collection, value)}"
+
+
+def to_document(kind: str, record: Dict[str, Any], key_col: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Map one source record to an Arango document (None = skip the record)."""
+    doc = {k: v for k, v in record.items() if v is not None and k}
+
+    if kind in EDGE_ENDPOINTS:
+        from_col, to_col = EDGE_ENDPOINTS[kind]
+        from_id = _endpoint(record, "from", from_col)
+        to_id = _endpoint(record, "to", to_col)
+        if from_id is None or to_id is None:
+            return None
+        doc["_from"], doc["_to"] = from_id, to_id
+        if key_col and record.get(key_col) not in (None, ""):
+            doc["_key"] = arango_key(str(record[key_col]))
+        elif not doc.get("_key"):
+            doc["_key"] = edge_key(from_id, to_id, str(record.get("type", "")))
+        return doc
+
+    columns = (key_col,) if key_col else VERTEX_KEY_COLUMNS.get(kind, ("_key", "key", "id", "name"))
+    key = _first(record, columns)
+    if key is None:
+        return None
+    doc["_key"] = vertex_key(kind, key)
+    doc.pop("key", None)
+    return doc
+
+
+# ---------- streaming readers ----------
+
+def _detect_kind(path: str) -> str:
+    base = os.path.basename(path).split(".", 1)[0].lower()
+    for kind in list(VERTEX_KEY_COLUMNS) + list(EDGE_ENDPOINTS):
+        if base == kind or base.startswith(kind + "_") or base.endswith("_" + kind):
+            return kind
+    raise ValueError(f"Cannot tell the collection of {path}; pass it as kind=path")
+
+
+def _detect_format(path: str) -> str:
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    if name.endswith((".csv", ".tsv")):
+        return "csv"
+    raise ValueError(f"Unsupported dump format: {path} (expected .csv/.tsv/.jsonl, optionally .gz)")
+
+
+def _iter_records(fh, fmt: str, offset: int, header: Optional[List[str]], delimiter: str,
+                  key_col: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """Yield (record, byte offset just past it). CSV id columns stay text."""
+    position = offset
+
+    def lines():
+        nonlocal position
+        for raw in fh:
+            position += len(raw)
+            yield raw.decode("utf-8")
+
+    if fmt == "jsonl":
+        for line in lines():
+            line = line.strip()
+            if line:
+                yield json.loads(line), position
+        return
+
+    converters = [_text if _is_id_column(name, key_col) else _coerce for name in header]
+    # csv.reader pulls exactly the lines of one record before yielding it,
+    # so `position` is the end of that record (quoted newlines included).
+    for row in csv.reader(lines(), delimiter=delimiter):
+        if not row:
+            continue
+        yield {name: convert(cell) for name, convert, cell in zip(header, converters, row)}, position
+
+
+# ---------- checkpoints ----------
+
+def _load_checkpoints(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _save_checkpoints(path: str, checkpoints: Dict[str, Dict[str, Any]]) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(checkpoints, fh, indent=2)
+    os.replace(tmp, path)
+
+
+# ---------- seeding ----------
+
+def seed_file(
+    path: str,
+    kind: Optional[str] = None,
+    db=None,
+    batch_size: int = 5000,
+    workers: int = 2,
+    key_col: Optional[str] = None,
+    checkpoint_path: str = "kg_import_checkpoint.json",
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """Stream one dump into its collection. Returns a small stats dict."""
+    db = db or get_arango_db()
+    kind = kind or _detect_kind(path)
+    fmt = _detect_format(path)
+    collection = db.collection(kind)
+
+    source = os.path.abspath(path)
+    checkpoints = _load_checkpoints(checkpoint_path)
+    state = None if restart else checkpoints.get(source)
+    if state is not None and (state.get("kind") != kind or state.get("head_sha1") != _head_hash(path, state["offset"])):
+        state = None  # different collection or a rewritten file: start over
+    mode = "resume" if state else "fresh"
+    state = state or {"kind": kind, "offset": 0, "rows": 0, "head_sha1": None, "header": None}
+
+    delimiter = "\t" if ".tsv" in path.lower() else ","
+    stats = {"created": 0, "updated": 0, "errors": 0, "skipped": 0}
+    rows_read = 0
+    t0 = time.perf_counter()
+    last_report = t0
+    # The hash covers at most HEAD_HASH_BYTES: past that it no longer changes
+    hashed = min(int(state["offset"]), HEAD_HASH_BYTES) if state["head_sha1"] else -1
+
+    def commit(result: Dict[str, Any], end: int, count: int) -> None:
+        nonlocal last_report, hashed
+        for field in ("created", "updated", "errors"):
+            stats[field] += int(result.get(field, 0))
+        state["offset"] = end
+        state["rows"] += count
+        if min(end, HEAD_HASH_BYTES) != hashed:
+            state["head_sha1"] = _head_hash(path, end)
+            hashed = min(end, HEAD_HASH_BYTES)
+        checkpoints[source] = state
+        _save_checkpoints(checkpoint_path, checkpoints)
+
+        now = time.perf_counter()
+        if now - last_report >= 5:
+            last_report = now
+            print(f"[kg_import] {kind}: {state['rows']} rows "
+                  f"({rows_read / (now - t0):.0f} rows/s), errors={stats['errors']}")
+
+    with _open_source(path) as fh:
+        offset = int(state["offset"])
+        _skip_to(fh, offset, path)
+        if fmt == "csv" and offset == 0:
+            header_line = fh.readline()
+            offset = len(header_line)
+            state["header"] = next(
+                csv.reader(io.StringIO(header_line.decode("utf-8-sig")), delimiter=delimiter), []
+            )
+            state["header"] = [h.strip() for h in state["header"]]
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            # Bounded window of batches in flight; checkpoints advance in order.
+            inflight: Deque[Tuple[Future, int, int]] = deque()
+            batch: List[Dict[str, Any]] = []
+            batch_rows = 0
+
+            def submit(end: int) -> None:
+                nonlocal batch, batch_rows
+                inflight.append((
+                    pool.submit(collection.import_bulk, batch, on_duplicate="update",
+                                halt_on_error=False, details=False),
+                    end,
+                    batch_rows,
+                ))
+                batch, batch_rows = [], 0
+                if len(inflight) >= max(1, workers) * 2:
+                    fut, fut_end, fut_rows = inflight.popleft()
+                    commit(fut.result(), fut_end, fut_rows)
+
+            end = offset
+            for record, end in _iter_records(fh, fmt, offset, state["header"], delimiter, key_col):
+                rows_read += 1
+                batch_rows += 1
+                doc = to_document(kind, record, key_col)
+                if doc is None:
+                    stats["skipped"] += 1
+                else:
+                    batch.append(doc)
+                if len(batch) >= batch_size:
+                    submit(end)
+            if batch or batch_rows:
+                if batch:
+                    submit(end)
+                else:
+                    # Only skipped rows at the tail: nothing to send, just advance
+                    commit({}, end, batch_rows)
+            while inflight:
+                fut, fut_end, fut_rows = inflight.popleft()
+                commit(fut.result(), fut_end, fut_rows)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "file": path,
+        "collection": kind,
+        "mode": mode,
+        "rows_read": rows_read,
+        "total_rows": state["rows"],
+        **stats,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-seed the ArangoDB knowledge graph from CSV/JSONL dumps.")
+    parser.add_argument("sources", nargs="+", help="dump files, optionally as kind=path (e.g. binds=activities.csv)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=2, help="import_bulk calls in flight")
+    parser.add_argument("--key-col", default=None, help="column holding the document key")
+    parser.add_argument("--checkpoint", default="kg_import_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore checkpoints and re-read from the top")
+    args = parser.parse_args()
+
+    db = get_arango_db()
+    # Collections + persistent indexes first: building indexes on a full
+    # collection is far slower than maintaining them while loading.
+    init_arango_schema(db)
+
+    for source in args.sources:
+        kind, sep, path = source.partition("=")
+        if not sep:
+            kind, path = None, source
+        stats = seed_file(
+            path,
+            kind=kind,
+            db=db,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            key_col=args.key_col,
+            checkpoint_path=args.checkpoint,
+            restart=args.restart,
+        )
+        print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,55 @@
 from .arangodb_client import get_arango_db
+from .init_arango import init_arango_schema
+from .kg_import import edge_key
+
 
 def seed_basic_kg():
     db = get_arango_db()
+    init_arango_schema(db)
+
+    # Documents per collection; written with one import_bulk call each
+    # (on_duplicate="update" = upsert, no has() round-trip per document).
+    # For real dumps use the streaming loader: python -m app.kg_import
+    seed = {
+        "targets": [
+            # EGFR example
+            {
+                "_key": "EGFR",
+                "symbol": "EGFR",
+                "name": "Epidermal growth factor receptor",
+                "uniprot_id": "P00533",
+                "sequence": "...optional...",
+            },
+        ],
+        "drugs": [
+            {
+                "_key": "ibuprofen",
+                "name": "Ibuprofen",
+                "smiles": "CC(C)CC1=CC=C(C=C1)C(C)C(=O)O",
+                "indication": "Pain relief, anti-inflammatory",
+            },
+            # paracetamol, aspirin, caffeine, lidocaine … same pattern
+        ],
+        # Example disease
+        "diseases": [
+            {"_key": "nsclc", "name": "Non-small cell lung cancer"},
+        ],
+        # Relationships (deterministic keys, so re-seeding does not duplicate edges)
+        "binds": [
+            {
+                "_key": edge_key("drugs/ibuprofen", "targets/EGFR"),
+                "_from": "drugs/ibuprofen",
+                "_to": "targets/EGFR",
+                "source": "literature_stub",
+            },
+            # Eg. some EGFR-targeted real TKIs if you later add them:
+            # {"_from": "drugs/gefitinib", "_to": "targets/EGFR", ...}
+        ],
+    }
+
+    for collection, docs in seed.items():
+        db.collection(collection).import_bulk(docs, on_duplicate="update", halt_on_error=True)
 
-    targets = db.collection("targets")
-    drugs = db.collection("drugs")
-    binds = db.collection("binds")
-    diseases = db.collection("diseases")
-    treats = db.collection("treats")
-
-    # Upsert helper
-    def upsert(col, key, doc):
-        if col.has(key):
-            col.update({ "_key": key, **doc })
-        else:
-            col.insert({ "_key": key, **doc })
-
-    # EGFR example
-    upsert(
-        targets,
-        "EGFR",
-        {
-            "symbol": "EGFR",
-            "name": "Epidermal growth factor receptor",
-            "uniprot_id": "P00533",
-            "sequence": "...optional..."
-        },
-    )
-
-    # Drugs
-    upsert(
-        drugs,
-        "ibuprofen",
-        {
-            "name": "Ibuprofen",
-            "smiles": "CC(C)CC1=CC=C(C=C1)C(C)C(=O)O",
-            "indication": "Pain relief, anti-inflammatory",
-        },
-    )
-    # paracetamol, aspirin, caffeine, lidocaine … same pattern
-
-    # Example disease
-    upsert(
-        diseases,
-        "nsclc",
-        {"name": "Non-small cell lung cancer"}
-    )
-
-    # Relationships
-    binds.insert({
-        "_from": "drugs/ibuprofen",
-        "_to": "targets/EGFR",
-        "source": "literature_stub",
-    })
-
-    # Eg. some EGFR-targeted real TKIs if you later add them:
-    # binds.insert({"_from": "drugs/gefitinib", "_to": "targets/EGFR", ...})
 
 if __name__ == "__main__":
     seed_basic_kg()
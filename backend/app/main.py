@@ -1,26 +1,73 @@
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import hashlib
+from typing import List, Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from .arangodb_client import get_arango_db
+from .arangodb_client import close_arango_client, get_arango_db, get_async_arango
 from fastapi import APIRouter
 
 from .schemas import (
     DiscoveryRequest,
     DiscoveryResponse,
     DiscoveryRunListResponse,
-    DiscoveryRunSummary,
-    Molecule as MoleculeSchema,
+    MoleculeRunsResponse,
+    ProfileDetail,
+    ProfileListResponse,
     TargetGraphResponse, 
+    TargetGraphSummary,
     DrugGraphResponse,      # <-- add this
+    GraphNeighborhoodResponse,
+    GraphPathsResponse,
+    ReplicationStatus,
 )
-from .models import DiscoveryRun
 from .services.discovery import run_discovery
-from .db import Base, engine, get_db
+from .db import Base, SessionLocal, async_engine, engine, get_async_db, get_db
+from .admission import DISCOVERY_ADMISSION, AdmissionRejected, client_key
+from .concurrency import DISCOVERY_EXECUTOR
+from .core.config import (
+    ARANGO_REPLICATION,
+    FAST_JSON,
+    GRAPH_BACKEND,
+    GRAPH_MAX_FANOUT,
+    GRAPH_MAX_NODES,
+    GRAPH_PROJECTION,
+    PROFILING_ENABLED,
+)
+from . import metrics
+from .memory import update_memory_metrics, worker_memory_report
+from .profiling import (
+    PROFILE_HEADER,
+    ProfilingMiddleware,
+    in_profile,
+    list_profiles,
+    load_profile,
+    profiled,
+    pstats_path,
+    token_accepted,
+)
+from .http_cache import RUN_BODIES, RUN_CACHE_CONTROL, CachedBody, accepted_encoding, matching_etag, run_etag
+from .serialization import LAYOUT_PATTERN, FastJSONResponse, molecules_response
 from . import models  # ensure models are imported so metadata knows them
-from .similarity import find_combined_similar_drugs
-from .services.kg import get_target_graph, get_drug_graph
+from .migrations import run_migrations
+from .services.kg import (
+    get_target_graph,
+    get_drug_graph,
+    get_target_summary,
+    get_target_summary_version,
+)
+from .services.graph_aql import get_drug_graph_aql, get_target_graph_aql
+from .services.graph_projection import get_projection, load_projection
+from .services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, excluded_fields, parse_exclude
+from .services.registry import find_registered
+from .services.runs import fetch_run_page, list_runs_page, run_page_content, run_page_response, run_revision
+from .services.replication import replication_status, start_replicator, stop_replicator
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
 app = FastAPI(
     title="ELYSIUM – AI-Driven Drug Discovery Toolkit",
@@ -36,92 +83,483 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+
+@app.on_event("startup")
+def load_graph_projection():
+    if not GRAPH_PROJECTION:
+        return
+    try:
+        with SessionLocal() as db:
+            load_projection(db)
+    except Exception as e:
+        # Graph endpoints will retry the load on first use
+        print(f"[graph] Failed to load projection at startup: {e}")
+
+
+@app.on_event("startup")
+def start_arango_replication():
+    if ARANGO_REPLICATION:
+        start_replicator()
+
+
+@app.on_event("shutdown")
+def stop_arango_replication():
+    stop_replicator()
+    close_arango_client()
+
+
+@app.on_event("shutdown")
+async def close_async_db():
+    DISCOVERY_EXECUTOR.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def _projection(db: Session):
+    if not GRAPH_PROJECTION:
+        raise HTTPException(status_code=503, detail="Graph projection disabled (ELYSIUM_GRAPH_PROJECTION=0)")
+    return get_projection(db)
+
+
+def _resolve_node(projection, ref: str) -> int:
+    node_id = projection.resolve_ref(ref)
+    if node_id is None:
+        raise HTTPException(status_code=404, detail=f"Graph node not found: {ref}")
+    return node_id
+
+
+def _target_etag(target_id: str, version: Optional[int], *params) -> Optional[str]:
+    """Strong ETag for a target view: changes whenever a run is attached to the target."""
+    if version is None:
+        return None
+    key = "|".join(str(p) for p in (target_id, version) + params)
+    return '"' + hashlib.sha1(key.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+_EXCLUDE_QUERY = Query(
+    [],
+    description='Omit molecule blocks: "notes", "neighbors", "admet" (repeat or comma-separate)',
+)
+
+
+_LAYOUT_QUERY = Query(
+    "rows",
+    pattern=LAYOUT_PATTERN,
+    description='"rows" (a list of molecule objects) or "columnar" (one array per field)',
+)
+
+
+def _exclude_groups(exclude: List[str]):
+    try:
+        return parse_exclude(exclude)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _projected(model, fields=(), headers: Optional[dict] = None) -> JSONResponse:
+    """
+    The encoded response, without the excluded per-molecule fields.
+    Returned as a JSONResponse: response_model would put excluded fields
+    back as nulls, and would re-validate the whole graph on the event loop.
+    """
+    exclude = {"molecules": {"__all__": set(fields)}} if fields else None
+    content = model.model_dump(mode="json", exclude=exclude)
+    response_class = FastJSONResponse if FAST_JSON else JSONResponse
+    return response_class(content=content, headers=headers)
+
+
+def _graph_view(builder, key: str, params: dict, fields=(), headers: Optional[dict] = None) -> JSONResponse:
+    """
+    Build and encode a SQL graph view with its own sync Session. Called
+    through run_in_threadpool: reading the rows, building the models and
+    encoding a large graph would otherwise block the event loop.
+    """
+    with SessionLocal() as db:
+        return _projected(builder(db, key, **params), fields, headers)
+
+
+def _not_modified(request: Request, etag: Optional[str]) -> bool:
+    return matching_etag(request.headers.get("if-none-match"), etag) is not None
+
 
 @app.get("/health")
 def health_check():
     return {"status": "ok", "service": "elysium-backend"}
 
-@app.get("/runs", response_model=DiscoveryRunListResponse)
-def list_runs(db: Session = Depends(get_db)):
-    runs = (
-        db.query(DiscoveryRun)
-        .order_by(DiscoveryRun.created_at.desc())
-        .limit(50)
-        .all()
-    )
+@app.get("/health/arango")
+async def arango_health_check(force: bool = False):
+    """ArangoDB reachability (cached for ARANGO_HEALTH_TTL seconds unless force=true)."""
+    return await get_async_arango().health(force)
 
-    summaries = [
-        DiscoveryRunSummary(
-            run_id=run.id,
-            target_id=run.target_id,
-            num_molecules=run.num_molecules,
-            created_at=run.created_at,
-        )
-        for run in runs
-    ]
+@app.get("/health/discovery")
+async def discovery_admission_status():
+    """Discovery runs / molecules in flight and queued in this process."""
+    return DISCOVERY_ADMISSION.stats()
+
+@app.get("/health/memory")
+def memory_report():
+    """RSS / PSS / shared / private bytes of the server master and each worker (Linux)."""
+    return worker_memory_report()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Per-stage discovery latencies, model load times, cache hit rates and fallbacks (Prometheus text format)."""
+    update_memory_metrics()
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+def _require_profiling(request: Request) -> None:
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (ELYSIUM_PROFILING=0)")
+    # Profiles expose code paths and request timings: same token as triggering one
+    if not token_accepted(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=403, detail="Send the X-Elysium-Profile header with the profiling token")
+
+@app.get("/profiles", response_model=ProfileListResponse)
+def profiles(request: Request):
+    """
+    Stored request profiles, newest first. Profile a request by sending
+    the X-Elysium-Profile header; its id comes back in X-Elysium-Profile-Id.
+    The profile endpoints require the same header.
+    """
+    _require_profiling(request)
+    return {"profiles": list_profiles()}
+
+@app.get("/profiles/{profile_id}", response_model=ProfileDetail)
+def profile_detail(profile_id: str, request: Request):
+    """One profile: per-stage time and memory plus the top functions by cumulative time."""
+    _require_profiling(request)
+    profile = load_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+@app.get("/profiles/{profile_id}/pstats")
+def profile_pstats(profile_id: str, request: Request):
+    """Raw cProfile dump (load with pstats or snakeviz)."""
+    _require_profiling(request)
+    path = pstats_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile has no pstats dump")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
 
-    return DiscoveryRunListResponse(runs=summaries)
+@app.get("/replication/arango", response_model=ReplicationStatus)
+def arango_replication_status(db: Session = Depends(get_db)):
+    """Outbox backlog and lag of the write-behind ArangoDB replication."""
+    return replication_status(db)
+
+@app.get("/runs", response_model=DiscoveryRunListResponse)
+@profiled
+async def list_runs(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db=Depends(get_async_db),
+):
+    """Runs, newest first. Pass next_cursor back as ?cursor= for the next page."""
+    try:
+        return await db.run_sync(in_profile(list_runs_page), limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @app.get("/graph/target/{target_id}", response_model=TargetGraphResponse)
-def graph_for_target(target_id: str, db: Session = Depends(get_db)):
+@profiled
+async def graph_for_target(
+    target_id: str,
+    request: Request,
+    min_cosine: Optional[float] = Query(None, ge=0.0, le=1.0),
+    min_tanimoto: Optional[float] = Query(None, ge=0.0, le=1.0),
+    sort_by: str = Query("score", pattern="^(score|tanimoto|cosine)$"),
+    top_k: Optional[int] = Query(None, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    exclude: List[str] = _EXCLUDE_QUERY,
+    db=Depends(get_async_db),
+):
     """
     Graph view: all generated molecules for a given target,
     along with their closest known drug (if available).
+    Optionally only molecules whose similar drug clears min_cosine /
+    min_tanimoto, sorted by score, tanimoto or cosine.
+
+    top_k keeps the k best molecules; limit (DEFAULT_PAGE_SIZE unless
+    given) pages through them: follow next_cursor for the rest.
+    exclude=neighbors drops the similar_drug blocks.
+
+    Sends an ETag from the target's summary version; a matching
+    If-None-Match gets 304 without touching the graph tables.
+
+    With GRAPH_BACKEND=arango the view comes from one AQL traversal
+    (falling back to SQL if Arango fails) and carries no ETag: Arango
+    trails the SQL version by the replication lag.
+    """
+    fields = excluded_fields(_exclude_groups(exclude), allowed=("similar_drug",))
+    params = dict(min_cosine=min_cosine, min_tanimoto=min_tanimoto, sort_by=sort_by,
+                  top_k=top_k, limit=limit, cursor=cursor)
+    try:
+        if GRAPH_BACKEND == "arango":
+            try:
+                graph = await get_async_arango().run(get_target_graph_aql, target_id, **params)
+                return await run_in_threadpool(in_profile(_projected), graph, fields)
+            except InvalidCursor:
+                raise
+            except Exception as e:
+                print(f"[graph] AQL target view failed, using SQL: {e}")
+            return await run_in_threadpool(in_profile(_graph_view), get_target_graph, target_id, params, fields)
+
+        version = await db.run_sync(in_profile(get_target_summary_version), target_id)
+        etag = _target_etag(target_id, version, "graph", min_cosine, min_tanimoto, sort_by,
+                            top_k, limit, cursor, sorted(fields))
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        headers = {"ETag": etag} if etag is not None else None
+        return await run_in_threadpool(in_profile(_graph_view), get_target_graph, target_id, params, fields, headers)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/graph/target/{target_id}/summary", response_model=TargetGraphSummary)
+@profiled
+async def graph_summary_for_target(
+    target_id: str,
+    request: Request,
+    response: Response,
+    db=Depends(get_async_db),
+):
     """
-    return get_target_graph(db, target_id)
+    Materialized target view: molecule and run counts, top molecules by
+    BINDS score and the nearest-drug histogram. Maintained as runs are
+    attached, so serving it is a single primary-key lookup.
+    """
+    version = await db.run_sync(in_profile(get_target_summary_version), target_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="No graph summary for target")
+    etag = _target_etag(target_id, version, "summary")
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
+    return await db.run_sync(in_profile(get_target_summary), target_id)
 
 
 @app.get("/graph/drug/{drug_name}", response_model=DrugGraphResponse)
-def graph_for_drug(drug_name: str, db: Session = Depends(get_db)):
+@profiled
+async def graph_for_drug(
+    drug_name: str,
+    min_cosine: Optional[float] = Query(None, ge=0.0, le=1.0),
+    min_tanimoto: Optional[float] = Query(None, ge=0.0, le=1.0),
+    top_k: Optional[int] = Query(None, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
     """
     Graph view: all generated molecules across all targets
-    that are similar to a given known drug.
+    that are similar to a given known drug, best score first
+    (top_k / limit / cursor as for /graph/target).
+    """
+    params = dict(min_cosine=min_cosine, min_tanimoto=min_tanimoto, top_k=top_k, limit=limit, cursor=cursor)
+    try:
+        if GRAPH_BACKEND == "arango":
+            try:
+                graph = await get_async_arango().run(get_drug_graph_aql, drug_name, **params)
+                return await run_in_threadpool(in_profile(_projected), graph)
+            except InvalidCursor:
+                raise
+            except Exception as e:
+                print(f"[graph] AQL drug view failed, using SQL: {e}")
+        return await run_in_threadpool(in_profile(_graph_view), get_drug_graph, drug_name, params)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/graph/neighborhood", response_model=GraphNeighborhoodResponse)
+@profiled
+def graph_neighborhood(
+    node: List[str] = Query(..., description='e.g. "target:EGFR", "drug:Aspirin" or a node id'),
+    hops: int = Query(2, ge=1, le=4),
+    relation: Optional[List[str]] = Query(None, description="Relations to follow (default: all)"),
+    direction: str = Query("both", pattern="^(out|in|both)$"),
+    max_fanout: int = Query(GRAPH_MAX_FANOUT, ge=1, le=1000),
+    max_nodes: int = Query(GRAPH_MAX_NODES, ge=1, le=100000),
+    db: Session = Depends(get_db),
+):
+    """
+    Multi-hop view: the k-hop neighborhood of one or more nodes, served
+    from the in-memory graph projection.
+    """
+    projection = _projection(db)
+    seeds = [_resolve_node(projection, ref) for ref in node]
+    return projection.neighborhood(
+        seeds, hops=hops, relations=relation, direction=direction,
+        max_fanout=max_fanout, max_nodes=max_nodes,
+    )
+
+
+@app.get("/graph/paths", response_model=GraphPathsResponse)
+@profiled
+def graph_paths(
+    source: str,
+    target: str,
+    max_hops: int = Query(3, ge=1, le=6),
+    relation: Optional[List[str]] = Query(None),
+    direction: str = Query("both", pattern="^(out|in|both)$"),
+    max_fanout: int = Query(GRAPH_MAX_FANOUT, ge=1, le=1000),
+    max_paths: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
     """
-    return get_drug_graph(db, drug_name)
+    Paths between two nodes (e.g. target -> generated molecule -> drug),
+    shortest first, served from the in-memory graph projection.
+    """
+    projection = _projection(db)
+    return projection.paths(
+        _resolve_node(projection, source), _resolve_node(projection, target),
+        max_hops=max_hops, relations=relation, direction=direction,
+        max_fanout=max_fanout, max_paths=max_paths,
+    )
 
 
 @app.get("/runs/{run_id}", response_model=DiscoveryResponse)
-def get_run(run_id: str, db: Session = Depends(get_db)):
-    run = db.query(DiscoveryRun).filter(DiscoveryRun.id == run_id).first()
-    if run is None:
+@profiled
+async def get_run(
+    run_id: str,
+    request: Request,
+    top_k: Optional[int] = Query(None, ge=1),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    exclude: List[str] = _EXCLUDE_QUERY,
+    layout: str = _LAYOUT_QUERY,
+    db=Depends(get_async_db),
+):
+    """
+    A stored run, molecules in ranked order. Pure read: neighbors and
+    ADMET were stored when the run was written.
+
+    top_k keeps the k best molecules; limit (DEFAULT_PAGE_SIZE unless
+    given) pages through them: follow next_cursor for the rest. exclude
+    drops notes / neighbors / admet blocks;
+    layout=columnar returns one array per molecule field.
+
+    Responses carry a strong ETag keyed on the run's revision (bumped
+    when a backfill changes what the run shows) and a short max-age;
+    If-None-Match gets 304 after one primary-key read, and serialized
+    (and compressed) bodies are kept in an LRU.
+    """
+    revision = await db.run_sync(in_profile(run_revision), run_id)
+    if revision is None:
         raise HTTPException(status_code=404, detail="Run not found")
+    groups = _exclude_groups(exclude)
+    params = (top_k, limit, cursor, ",".join(sorted(groups)), layout)
+    key = (run_id, revision) + params
+    etag = run_etag(*key, FAST_JSON)  # the two serializers differ in bytes
+    headers = {"Cache-Control": RUN_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    matched = matching_etag(request.headers.get("if-none-match"), etag)
+    if matched is not None:
+        return Response(status_code=304, headers={**headers, "ETag": matched})
+
+    accepted = accepted_encoding(request)
+    cached = RUN_BODIES.get(key)
+    if cached is None:
+        try:
+            page = await db.run_sync(in_profile(fetch_run_page), run_id, limit, cursor, top_k, groups)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if page is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        if page[0].revision != revision:
+            # A backfill committed in between: key the body on what was read
+            key = (run_id, page[0].revision) + params
+            etag = run_etag(*key, FAST_JSON)
+        # Building, serializing and compressing a large run is CPU work: keep it off the event loop
+        cached = await run_in_threadpool(in_profile(_run_body), etag, page, groups, layout, accepted)
+        cached = RUN_BODIES.put(key, cached)
+    encoding = cached.variant(accepted)
+    if not cached.has_variant(encoding):
+        # First client of a cached body to ask for this encoding
+        await run_in_threadpool(in_profile(cached.encoded), encoding)
+    return cached.response(encoding, headers)
 
-    mol_objs = []
-    for m in sorted(run.molecules, key=lambda m: m.score, reverse=True):
-        fp_neighbor, semantic_neighbor = find_combined_similar_drugs(m.smiles)
-
-        note_parts = [m.notes or ""]
-        if fp_neighbor is not None and fp_neighbor.similarity is not None:
-            note_parts.append(
-                f"(FP neighbor: {fp_neighbor.name}, Tanimoto={fp_neighbor.similarity:.2f})"
-            )
-        if semantic_neighbor is not None and semantic_neighbor.semantic_similarity is not None:
-            note_parts.append(
-                f"(chemBERTa neighbor: {semantic_neighbor.name}, "
-                f"cosine={semantic_neighbor.semantic_similarity:.2f})"
-            )
-
-        mol_objs.append(
-            MoleculeSchema(
-                smiles=m.smiles,
-                score=m.score,
-                source=m.source,
-                notes=" ".join(note_parts).strip(),
-                similar_drug=fp_neighbor,
-                similar_drug_semantic=semantic_neighbor,
-            )
-        )
 
-    return DiscoveryResponse(
-        run_id=run.id,
-        target_id=run.target_id,
-        num_molecules=run.num_molecules,
-        molecules=mol_objs,
+def _run_body(etag: str, page, groups, layout: str, accepted: Optional[str]) -> CachedBody:
+    """GET /runs/{id} body for a fetched page, with the variant for `accepted` compressed."""
+    if FAST_JSON or layout != "rows":
+        body = molecules_response(run_page_content(page, groups), layout).body
+    else:
+        fields = excluded_fields(groups)
+        exclude_fields = {"molecules": {"__all__": set(fields)}} if fields else None
+        run = run_page_response(page, groups)
+        body = JSONResponse(content=run.model_dump(mode="json", exclude=exclude_fields)).body
+    cached = CachedBody(etag, body)
+    encoding = cached.variant(accepted)
+    if encoding is not None:
+        cached.encoded(encoding)
+    return cached
+
+
+@app.get("/molecules/runs", response_model=MoleculeRunsResponse)
+@profiled
+async def runs_for_molecule(
+    smiles: Optional[str] = None,
+    inchikey: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db=Depends(get_async_db),
+):
+    """
+    All runs containing a molecule, newest first. Identify it by SMILES
+    (any spelling of the structure) or InChIKey.
+    """
+    if not smiles and not inchikey:
+        raise HTTPException(status_code=400, detail="Pass smiles or inchikey")
+    registered = await db.run_sync(in_profile(find_registered), smiles=smiles, inchikey=inchikey)
+    if registered is None:
+        raise HTTPException(status_code=404, detail="Molecule not found in any run")
+    try:
+        page = await db.run_sync(in_profile(list_runs_page), limit=limit, cursor=cursor, registry_id=registered.id)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MoleculeRunsResponse(
+        registry_id=registered.id,
+        registry_key=registered.registry_key,
+        inchikey=registered.inchikey,
+        canonical_smiles=registered.canonical_smiles,
+        runs=page.runs,
+        next_cursor=page.next_cursor,
     )
 
 @app.post("/discover", response_model=DiscoveryResponse)
-def discover_molecules(
+async def discover_molecules(
     payload: DiscoveryRequest,
-    db: Session = Depends(get_db),
+    request: Request,
+    layout: str = _LAYOUT_QUERY,
 ):
-    return run_discovery(payload, db)
\ No newline at end of file
+    """
+    Run the discovery pipeline. Runs on DISCOVERY_EXECUTOR, not the shared
+    threadpool, so concurrent discoveries cannot starve the read endpoints.
+
+    Admission is weighted by num_molecules and fair across clients; when
+    the queue is full the answer is an immediate 429 (this client has too
+    many waiting) or 503 (server saturated), with Retry-After.
+    """
+    try:
+        async with DISCOVERY_ADMISSION.slot(client_key(request), payload.num_molecules) as slot:
+            job = DISCOVERY_EXECUTOR.submit(_discover, payload, layout)
+            # A disconnect cancels the await, not the run: keep the slot until it ends
+            slot.hold_until(job)
+            return await asyncio.wrap_future(job)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+@profiled
+def _discover(payload: DiscoveryRequest, layout: str):
+    with SessionLocal() as db:
+        response = run_discovery(payload, db)
+    if FAST_JSON or layout != "rows":
+        return molecules_response(response.model_dump(), layout)
+    return response
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Per-process memory accounting from /proc (Linux).
+
+RSS counts every resident page a process maps, so with workers forked
+from a preloaded master it counts the shared model weights and library
+arrays once per worker. PSS splits each shared page between the processes
+mapping it: summed over the master and its workers it is the real
+footprint, and a worker's Private_* pages are what it costs on its own.
+
+    python -m app.memory MASTER_PID     # master + its workers
+"""
+
+import os
+import sys
+from typing import Dict, List, Optional
+
+from .metrics import Gauge
+
+PROCESS_MEMORY_BYTES = Gauge(
+    "elysium_process_memory_bytes",
+    "Memory of this worker process from /proc/self/smaps_rollup.",
+    ("kind",),  # rss, pss, shared, private, swap
+)
+
+# smaps_rollup field -> report key
+_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+    "Swap": "swap",
+}
+
+
+def _read_kib_fields(path: str, fields: Dict[str, str]) -> Dict[str, int]:
+    values: Dict[str, int] = {}
+    with open(path, "r", encoding="ascii") as fh:
+        for line in fh:
+            name, _, rest = line.partition(":")
+            key = fields.get(name)
+            if key is not None:
+                values[key] = int(rest.split()[0]) * 1024
+    return values
+
+
+def process_memory(pid: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """
+    Memory of `pid` (default: this process) in bytes: rss, pss, shared,
+    private and swap, plus the raw smaps_rollup split. Without
+    smaps_rollup (kernel < 4.14) only rss is known; None off Linux or when
+    the process is gone.
+    """
+    proc = f"/proc/{pid or 'self'}"
+    try:
+        values = _read_kib_fields(f"{proc}/smaps_rollup", _FIELDS)
+    except FileNotFoundError:
+        try:
+            values = _read_kib_fields(f"{proc}/status", {"VmRSS": "rss"})
+        except OSError:
+            return None
+    except OSError:
+        return None
+    values["shared"] = values.get("shared_clean", 0) + values.get("shared_dirty", 0)
+    values["private"] = values.get("private_clean", 0) + values.get("private_dirty", 0)
+    values["pid"] = pid or os.getpid()
+    return values
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", "r", encoding="ascii") as fh:
+            return [int(p) for p in fh.read().split()]
+    except OSError:
+        pass
+    # Kernels without CONFIG_PROC_CHILDREN: scan the process table
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="ascii") as fh:
+                # ppid is the 2nd field after the parenthesised command name
+                ppid = int(fh.read().rpartition(")")[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _same_program(pid: int, other: int) -> bool:
+    try:
+        return os.readlink(f"/proc/{pid}/exe") == os.readlink(f"/proc/{other}/exe")
+    except OSError:
+        return False
+
+
+def worker_memory_report(master_pid: Optional[int] = None) -> Dict[str, object]:
+    """
+    Memory of a master process and its worker children (the same
+    executable), with totals. Defaults to this process's parent, so called
+    from a gunicorn / uvicorn worker it reports the whole server; a server
+    without a master just reports itself.
+    """
+    if master_pid is None and not _same_program(os.getppid(), os.getpid()):
+        master, workers = None, [process_memory()]
+    else:
+        master_pid = master_pid or os.getppid()
+        master = process_memory(master_pid)
+        workers = [process_memory(pid) for pid in _children(master_pid) if _same_program(pid, master_pid)]
+    workers = [w for w in workers if w is not None]
+    processes = workers + ([master] if master is not None else [])
+    totals = {key: sum(p.get(key, 0) for p in processes) for key in ("rss", "pss", "private", "swap")}
+    return {"master": master, "workers": workers, "totals": totals}
+
+
+def update_memory_metrics() -> None:
+    """Refresh elysium_process_memory_bytes (called per /metrics scrape)."""
+    memory = process_memory()
+    if memory is None:
+        return
+    for kind in ("rss", "pss", "shared", "private", "swap"):
+        if kind in memory:
+            PROCESS_MEMORY_BYTES.set(memory[kind], kind=kind)
+
+
+def _format_mib(n: int) -> str:
+    return f"{n / (1024 * 1024):9.1f}"
+
+
+def main(argv: List[str]) -> None:
+    master_pid = int(argv[0]) if argv else None
+    report = worker_memory_report(master_pid)
+    print(f"{'process':>16} {'RSS MiB':>9} {'PSS MiB':>9} {'shared':>9} {'private':>9}")
+    rows = ([("master", report["master"])] if report["master"] else []) + [
+        ("worker", w) for w in report["workers"]
+    ]
+    for role, p in rows:
+        print(
+            f"{role + ' ' + str(p['pid']):>16} {_format_mib(p.get('rss', 0))} {_format_mib(p.get('pss', 0))}"
+            f" {_format_mib(p.get('shared', 0))} {_format_mib(p.get('private', 0))}"
+        )
+    totals = report["totals"]
+    print(f"{'total':>16} {_format_mib(totals['rss'])} {_format_mib(totals['pss'])} {'':>9} {_format_mib(totals['private'])}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,310 @@
+"""
+In-process metrics for ELYSIUM, exported at /metrics in the Prometheus
+text format (0.0.4).
+
+No client library: counters, gauges and histograms live in a module-level
+registry and are rendered on scrape. Values are per process, so with
+several workers each one is scraped (or aggregated) separately.
+
+Discovery stages are timed with `stage("score")` etc. inside a
+`pipeline_labels(scorer=..., generator=...)` block, so every stage sample
+carries the backends that produced it without threading labels through
+each service.
+"""
+
+import math
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; wide enough for a sub-ms cache hit and a slow DeepPurpose batch
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LOCK = threading.Lock()
+_METRICS: Dict[str, "_Metric"] = {}
+_CACHES: Dict[str, Callable[[], Dict[str, int]]] = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        with _LOCK:
+            if name in _METRICS:
+                raise ValueError(f"Metric {name} is already registered")
+            _METRICS[name] = self
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count, e.g. elysium_scorer_fallbacks_total."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Current value, e.g. model load time or cache size."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with _LOCK:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with _sum and _count, as Prometheus expects."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with _LOCK:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        row = self._values.get(self._key(labels))
+        return int(sum(row[:-1])) if row else 0
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for key, row in sorted(self._values.items()):
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (math.inf,), row[:-1]):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+# ---------- discovery pipeline ----------
+
+STAGE_SECONDS = Histogram(
+    "elysium_discovery_stage_seconds",
+    "Time spent in each run_discovery stage.",
+    ("stage", "scorer", "generator"),
+)
+DISCOVERY_SECONDS = Histogram(
+    "elysium_discovery_seconds",
+    "End-to-end run_discovery time.",
+    ("scorer", "generator"),
+)
+DISCOVERY_MOLECULES = Counter(
+    "elysium_discovery_molecules_total",
+    "Molecules returned by run_discovery.",
+    ("scorer", "generator"),
+)
+
+_NO_PIPELINE = {"scorer": "none", "generator": "none"}
+_STAGE_HOOKS: List[Callable[[str], ContextManager[None]]] = []
+_PIPELINE_LABELS: ContextVar[Dict[str, str]] = ContextVar("elysium_pipeline_labels", default=_NO_PIPELINE)
+
+
+@contextmanager
+def pipeline_labels(scorer: str, generator: str) -> Iterator[None]:
+    """Label stage() samples in this block (and end-to-end time) with the backends in use."""
+    labels = {"scorer": scorer, "generator": generator}
+    token = _PIPELINE_LABELS.set(labels)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DISCOVERY_SECONDS.observe(time.perf_counter() - start, **labels)
+        _PIPELINE_LABELS.reset(token)
+
+
+def current_pipeline_labels() -> Dict[str, str]:
+    return _PIPELINE_LABELS.get()
+
+
+def add_stage_hook(hook: Callable[[str], ContextManager[None]]) -> None:
+    """Also run every stage() inside hook(stage name), e.g. the profiler's memory tracking."""
+    _STAGE_HOOKS.append(hook)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time one discovery stage into elysium_discovery_stage_seconds."""
+    with ExitStack() as hooks:
+        for hook in _STAGE_HOOKS:
+            hooks.enter_context(hook(name))
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, **_PIPELINE_LABELS.get())
+
+
+def backend_label(backend: object) -> str:
+    """Short label for a scorer/generator instance (its `name`, else the class name)."""
+    return str(getattr(backend, "name", None) or type(backend).__name__)
+
+
+# ---------- models, fallbacks, caches ----------
+
+MODEL_LOAD_SECONDS = Gauge(
+    "elysium_model_load_seconds",
+    "Wall time of the last load of each model or index.",
+    ("model",),
+)
+MODEL_AVAILABLE = Gauge(
+    "elysium_model_available",
+    "1 if the model loaded and is in use, 0 if it is disabled or replaced by a fallback.",
+    ("model",),
+)
+FALLBACKS = Counter(
+    "elysium_fallbacks_total",
+    "Requests served by a fallback (e.g. the stub scorer) instead of the configured model.",
+    ("component", "reason"),
+)
+
+
+@contextmanager
+def model_load(model: str) -> Iterator[None]:
+    """Record how long loading `model` took (also when it fails)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODEL_LOAD_SECONDS.set(time.perf_counter() - start, model=model)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, int]]) -> None:
+    """
+    Export a cache's hits / misses / entries (a stats() dict like
+    graph_cache_stats) as elysium_cache_* series labelled cache=name.
+    """
+    _CACHES[name] = stats
+
+
+def _render_caches() -> List[str]:
+    series = {
+        "elysium_cache_hits_total": ("counter", "Cache lookups answered from the cache.", []),
+        "elysium_cache_misses_total": ("counter", "Cache lookups that fell through.", []),
+        "elysium_cache_entries": ("gauge", "Entries currently cached.", []),
+        "elysium_cache_hit_ratio": ("gauge", "hits / (hits + misses) since start.", []),
+    }
+    for name, stats_fn in sorted(_CACHES.items()):
+        try:
+            stats = stats_fn()
+        except Exception as e:
+            print(f"[metrics] Cache stats for {name} failed:", e)
+            continue
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        label = _format_labels(("cache",), (name,))
+        series["elysium_cache_hits_total"][2].append(f"elysium_cache_hits_total{label} {hits}")
+        series["elysium_cache_misses_total"][2].append(f"elysium_cache_misses_total{label} {misses}")
+        series["elysium_cache_entries"][2].append(f"elysium_cache_entries{label} {stats.get('entries', 0)}")
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        series["elysium_cache_hit_ratio"][2].append(f"elysium_cache_hit_ratio{label} {_format_value(ratio)}")
+
+    lines: List[str] = []
+    for metric, (kind, documentation, samples) in series.items():
+        if samples:
+            lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {kind}"] + samples
+    return lines
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _LOCK:
+        metrics = list(_METRICS.values())
+    lines: List[str] = []
+    for metric in metrics:
+        with _LOCK:
+            lines.extend(metric.render())
+    lines.extend(_render_caches())
+    return "\n".join(lines) + "\n"
+
+
+def get_metric(name: str) -> Optional[_Metric]:
+    return _METRICS.get(name)
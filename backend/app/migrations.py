@@ -0,0 +1,208 @@
+"""
+Lightweight, idempotent schema migrations for existing databases.
+
+Base.metadata.create_all() only creates missing tables. For tables that
+already exist we add any model columns and indexes the database is
+missing, and drop indexes the models no longer define (RETIRED_INDEXES),
+so older elysium.db files keep working after a model change.
+Safe to run on every startup.
+"""
+
+from typing import Optional, Tuple
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .db import Base
+from . import models  # noqa: F401 - register models on Base.metadata
+from .services.kg import rebuild_target_summary
+
+# (table, index) pairs removed from the models; dropped where they still exist
+RETIRED_INDEXES = (
+    # Replaced by ix_molecules_run_id_id when runs switched to ranked (id) order
+    ("molecules", "ix_molecules_run_score_id"),
+)
+
+
+def _add_missing_columns(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        present = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+            print(f"[migrations] Added column {table.name}.{column.name}")
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _drop_retired_indexes(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    for table_name, index_name in RETIRED_INDEXES:
+        if table_name not in existing_tables:
+            continue
+        if index_name not in {index["name"] for index in inspector.get_indexes(table_name)}:
+            continue
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP INDEX "{index_name}"'))
+        print(f"[migrations] Dropped index {table_name}.{index_name}")
+
+
+def _parse_edge_metrics(extra: str) -> Tuple[Optional[float], Optional[float], Optional[str]]:
+    """
+    Split a legacy SIMILAR_TO `extra` string like
+    "Tanimoto=0.8123; chemBERTa_cosine=0.91" into (tanimoto, cosine, rest),
+    where rest is whatever non-metric text was left (usually None).
+    """
+    metrics = {"Tanimoto": None, "chemBERTa_cosine": None}
+    rest = []
+    for part in extra.split(";"):
+        part = part.strip()
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        if sep and key in metrics:
+            try:
+                metrics[key] = float(value)
+                continue
+            except ValueError:
+                pass
+        rest.append(part)
+    return metrics["Tanimoto"], metrics["chemBERTa_cosine"], "; ".join(rest) or None
+
+
+def _backfill_edge_metrics(engine: Engine, batch_size: int = 5000) -> None:
+    """
+    Move Tanimoto / chemBERTa cosine from kg_edges.extra into the typed
+    tanimoto / cosine columns for edges written before those columns existed.
+    """
+    edges = models.KGEdge.__table__
+    pending = (
+        select(edges.c.id, edges.c.extra)
+        .where(
+            edges.c.relation == "SIMILAR_TO",
+            edges.c.tanimoto.is_(None),
+            edges.c.cosine.is_(None),
+            edges.c.extra.like("%=%"),
+        )
+        .order_by(edges.c.id)
+    )
+    stmt = (
+        update(edges)
+        .where(edges.c.id == bindparam("edge_id"))
+        .values(tanimoto=bindparam("t"), cosine=bindparam("c"), extra=bindparam("rest"))
+    )
+
+    moved = 0
+    last_id = 0
+    with engine.begin() as conn:
+        while True:
+            rows = conn.execute(pending.where(edges.c.id > last_id).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            params = []
+            for edge_id, extra in rows:
+                tanimoto, cosine, rest = _parse_edge_metrics(extra)
+                if tanimoto is None and cosine is None:
+                    continue
+                params.append({"edge_id": edge_id, "t": tanimoto, "c": cosine, "rest": rest})
+            if params:
+                conn.execute(stmt, params)
+                moved += len(params)
+
+        # Anything left (no extra at all): SIMILAR_TO weight has always been Tanimoto.
+        conn.execute(
+            update(edges)
+            .where(
+                edges.c.relation == "SIMILAR_TO",
+                edges.c.tanimoto.is_(None),
+                edges.c.weight.is_not(None),
+            )
+            .values(tanimoto=edges.c.weight)
+        )
+
+    if moved:
+        print(f"[migrations] Moved metrics out of kg_edges.extra for {moved} edges")
+
+
+def _backfill_target_summaries(engine: Engine) -> None:
+    """Build kg_target_summaries rows for targets attached before summaries existed."""
+    with Session(engine) as db:
+        missing = db.scalars(
+            select(models.KGNode.external_id)
+            .where(
+                models.KGNode.node_type == "target",
+                models.KGNode.external_id.is_not(None),
+                models.KGNode.external_id.not_in(select(models.KGTargetSummary.target_id)),
+            )
+            .distinct()
+        ).all()
+        for target_id in missing:
+            rebuild_target_summary(db, target_id)
+            db.commit()
+            print(f"[migrations] Built graph summary for target {target_id}")
+
+
+def _backfill_molecule_registry(engine: Engine, batch_size: int = 2000) -> None:
+    """
+    Point molecules written before the registry existed at their registry
+    row (created from the first stored copy of each structure) and clear
+    their inline neighbor/ADMET columns. Commits per batch, so an
+    interrupted startup resumes where it stopped. On SQLite the freed
+    pages are only returned to the OS by a manual VACUUM.
+    """
+    molecules = models.MoleculeRecord
+    with Session(engine) as db:
+        if db.scalar(select(molecules.id).where(molecules.registry_id.is_(None)).limit(1)) is None:
+            return
+
+        # Imported here: it loads the fingerprint library and chemBERTa.
+        from .services.records import ADMET_FIELDS, NEIGHBOR_FIELDS
+        from .services.registry import register
+
+        legacy = NEIGHBOR_FIELDS + ADMET_FIELDS
+        pending = (
+            select(molecules.id, molecules.smiles, *(getattr(molecules, name) for name in legacy))
+            .where(molecules.registry_id.is_(None))
+            .order_by(molecules.id)
+            .limit(batch_size)
+        )
+        cleared = dict.fromkeys(legacy)
+
+        moved = 0
+        while True:
+            # Rows leave the filter as they are updated, so no offset is needed.
+            rows = db.execute(pending).all()
+            if not rows:
+                break
+            ids = register(db, [(row.smiles, {name: getattr(row, name) for name in legacy}) for row in rows])
+            db.execute(
+                update(molecules),
+                [{"id": row.id, "registry_id": registry_id, **cleared} for row, registry_id in zip(rows, ids)],
+            )
+            db.commit()
+            moved += len(rows)
+            print(f"[migrations] Linked {moved} molecules to the molecule registry")
+
+
+def run_migrations(engine: Engine) -> None:
+    _add_missing_columns(engine)
+    _create_missing_indexes(engine)
+    _drop_retired_indexes(engine)
+    _backfill_edge_metrics(engine)
+    _backfill_target_summaries(engine)
+    _backfill_molecule_registry(engine)
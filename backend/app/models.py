@@ -2,12 +2,15 @@ import uuid
 import datetime as dt
 
 from sqlalchemy import (
+    Boolean,
     Column,
     String,
     Integer,
     Float,
     DateTime,
     ForeignKey,
+    Index,
+    LargeBinary,
     Text,
 )
 from sqlalchemy.orm import relationship
@@ -22,6 +25,9 @@ class DiscoveryRun(Base):
     target_id = Column(String, index=True, nullable=False)
     num_molecules = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=dt.datetime.utcnow)
+    # Bumped when the stored annotations its molecules show change
+    # (app.backfill_runs); part of the GET /runs/{id} ETag. NULL = 1.
+    revision = Column(Integer, nullable=True, default=1)
 
     molecules = relationship(
         "MoleculeRecord",
@@ -29,6 +35,11 @@ class DiscoveryRun(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # /runs keyset pages: ORDER BY created_at DESC, id DESC
+        Index("ix_discovery_runs_created_at_id", "created_at", "id"),
+    )
+
 
 class MoleculeRecord(Base):
     __tablename__ = "molecules"
@@ -40,7 +51,83 @@ class MoleculeRecord(Base):
     source = Column(String, nullable=False)
     notes = Column(Text)
 
+    # Canonical molecule (neighbors + ADMET live there). The per-row
+    # neighbor/ADMET columns below are only read for rows written before
+    # the registry existed; migrations move them over and clear them.
+    registry_id = Column(Integer, ForeignKey("molecule_registry.id"), nullable=True)
+
+    # Nearest known drug by Morgan-fingerprint Tanimoto
+    fp_neighbor_name = Column(String, nullable=True)
+    fp_neighbor_smiles = Column(String, nullable=True)
+    fp_neighbor_indication = Column(Text, nullable=True)
+    fp_similarity = Column(Float, nullable=True)
+
+    # Nearest known drug by chemBERTa cosine
+    semantic_neighbor_name = Column(String, nullable=True)
+    semantic_neighbor_smiles = Column(String, nullable=True)
+    semantic_neighbor_indication = Column(Text, nullable=True)
+    semantic_similarity = Column(Float, nullable=True)
+
+    # ADMET / drug-likeness (see services.admet)
+    molecular_weight = Column(Float, nullable=True)
+    logp = Column(Float, nullable=True)
+    hbd = Column(Integer, nullable=True)
+    hba = Column(Integer, nullable=True)
+    rotatable_bonds = Column(Integer, nullable=True)
+    tpsa = Column(Float, nullable=True)
+    lipinski_violations = Column(Integer, nullable=True)
+    lipinski_pass = Column(Boolean, nullable=True)
+
     run = relationship("DiscoveryRun", back_populates="molecules")
+    registered = relationship("RegisteredMolecule")
+
+    __table_args__ = (
+        # /runs/{id} keyset pages: WHERE run_id = ? ORDER BY id (ranked order)
+        Index("ix_molecules_run_id_id", "run_id", "id"),
+        # "all runs containing molecule X"
+        Index("ix_molecules_registry_run", "registry_id", "run_id"),
+    )
+
+
+class RegisteredMolecule(Base):
+    """
+    One row per distinct molecule across all runs, keyed by InChIKey
+    (canonical SMILES when RDKit cannot make one). Holds everything that
+    depends only on the structure: fingerprint, embedding, nearest known
+    drugs and ADMET. MoleculeRecord rows point here via registry_id.
+    """
+    __tablename__ = "molecule_registry"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    registry_key = Column(String, unique=True, nullable=False)  # InChIKey or "smiles:<canonical SMILES>"
+    inchikey = Column(String, index=True, nullable=True)
+    canonical_smiles = Column(String, nullable=False)
+    fingerprint = Column(LargeBinary, nullable=True)  # packed Morgan bits (similarity.FP_BITS // 8 bytes)
+    fp_popcount = Column(Integer, nullable=True)
+    embedding = Column(LargeBinary, nullable=True)    # chemBERTa float32 unit vector
+    created_at = Column(DateTime, default=dt.datetime.utcnow)
+
+    # Nearest known drug by Morgan-fingerprint Tanimoto
+    fp_neighbor_name = Column(String, nullable=True)
+    fp_neighbor_smiles = Column(String, nullable=True)
+    fp_neighbor_indication = Column(Text, nullable=True)
+    fp_similarity = Column(Float, nullable=True)
+
+    # Nearest known drug by chemBERTa cosine
+    semantic_neighbor_name = Column(String, nullable=True)
+    semantic_neighbor_smiles = Column(String, nullable=True)
+    semantic_neighbor_indication = Column(Text, nullable=True)
+    semantic_similarity = Column(Float, nullable=True)
+
+    # ADMET / drug-likeness (see services.admet)
+    molecular_weight = Column(Float, nullable=True)
+    logp = Column(Float, nullable=True)
+    hbd = Column(Integer, nullable=True)
+    hba = Column(Integer, nullable=True)
+    rotatable_bonds = Column(Integer, nullable=True)
+    tpsa = Column(Float, nullable=True)
+    lipinski_violations = Column(Integer, nullable=True)
+    lipinski_pass = Column(Boolean, nullable=True)
 
 class KGNode(Base):
     __tablename__ = "kg_nodes"
@@ -66,13 +153,26 @@ class KGNode(Base):
 
 class KGEdge(Base):
     __tablename__ = "kg_edges"
+    __table_args__ = (
+        # Graph views: "all BINDS into target X", "all SIMILAR_TO into drug Y"
+        Index("ix_kg_edges_relation_target", "relation", "target_id"),
+        # "best SIMILAR_TO / BINDS edge out of molecule Z" without a table lookup
+        Index("ix_kg_edges_relation_source_weight", "relation", "source_id", "weight"),
+        # Projection sync: the edges of nodes another worker just added
+        Index("ix_kg_edges_source", "source_id"),
+        # Metric filters/sorts, e.g. "SIMILAR_TO edges with cosine > 0.8"
+        Index("ix_kg_edges_relation_cosine", "relation", "cosine"),
+        Index("ix_kg_edges_relation_tanimoto", "relation", "tanimoto"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     source_id = Column(Integer, ForeignKey("kg_nodes.id"), nullable=False)
     target_id = Column(Integer, ForeignKey("kg_nodes.id"), nullable=False)
     relation = Column(String, index=True)  # 'SIMILAR_TO', 'BINDS', 'TREATS'
     weight = Column(Float, nullable=True)  # e.g. similarity or score
-    extra = Column(Text, nullable=True)    # JSON/string with extra info
+    tanimoto = Column(Float, nullable=True)  # SIMILAR_TO: Morgan-fingerprint Tanimoto
+    cosine = Column(Float, nullable=True)    # SIMILAR_TO: chemBERTa cosine
+    extra = Column(Text, nullable=True)    # free-form extra info (not metrics)
 
     source = relationship(
         "KGNode",
@@ -84,3 +184,39 @@ class KGEdge(Base):
         foreign_keys=[target_id],
         back_populates="incoming_edges",
     )
+
+
+class KGTargetSummary(Base):
+    """
+    Materialized per-target view, kept current by attach_run_to_kg.
+    `version` goes up by one with every attached run and backs the ETag
+    of the target graph endpoints.
+    """
+    __tablename__ = "kg_target_summaries"
+
+    target_id = Column(String, primary_key=True)  # KGNode.external_id of the target
+    version = Column(Integer, nullable=False, default=0)
+    molecule_count = Column(Integer, nullable=False, default=0)
+    run_count = Column(Integer, nullable=False, default=0)
+    top_molecules = Column(Text, nullable=False, default="[]")   # JSON list of MoleculeGraphEntry
+    drug_histogram = Column(Text, nullable=False, default="{}")  # JSON {drug name: molecule count}
+    updated_at = Column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+
+
+class ArangoOutbox(Base):
+    """
+    Transactional outbox for ArangoDB replication: rows are written in the
+    same SQL transaction as the run and drained by services.replication.
+    """
+    __tablename__ = "arango_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    collection = Column(String, nullable=False)  # e.g. 'molecules', 'binds'
+    doc_key = Column(String, nullable=False)     # deterministic _key, so replays are idempotent
+    document = Column(Text, nullable=False)      # JSON document including _key
+    created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)  # times Arango rejected this row on its own
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)  # rejected rows wait until then; NULL = ready
+    claimed_by = Column(String, nullable=True)         # replicator claim token while a batch is in flight
+    claimed_until = Column(DateTime, nullable=True)    # claim lease; expired claims are taken over
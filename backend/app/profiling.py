@@ -0,0 +1,403 @@
+"""
+Opt-in per-request profiling (ELYSIUM_PROFILING=1, see core.config).
+
+A request is profiled when it sends the X-Elysium-Profile header (whose
+value must equal ELYSIUM_PROFILING_TOKEN when one is set) or is picked by
+ELYSIUM_PROFILING_SAMPLE_RATE. ProfilingMiddleware opens a ProfileSession
+in a contextvar for it; then
+
+  - endpoints wrapped with @profiled run under cProfile. cProfile only
+    records the thread it was enabled in, so it is never enabled on the
+    event loop: sync endpoints are profiled in the threadpool thread that
+    executes them, and async endpoints only record the callables they
+    pass to run_in_threadpool / db.run_sync wrapped with in_profile()
+    (the rows, models and encoding; their awaits are not included);
+  - every metrics.stage() inside records its wall time and tracemalloc
+    peak, i.e. per discovery stage memory.
+
+The session is written to PROFILING_DIR as <id>.prof (pstats, open with
+snakeviz / pstats) and <id>.json (summary + top functions); only the
+newest PROFILING_MAX_FILES are kept. GET /profiles lists them, for
+requests carrying the same header (and token) that triggers profiling.
+
+cProfile runs one request at a time (others are served unprofiled and say
+so), and tracemalloc peaks are process-wide, so stage memory is only exact
+when nothing else runs concurrently.
+"""
+
+import cProfile
+import datetime as dt
+import functools
+import hmac
+import inspect
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .core.config import (
+    PROFILING_DIR,
+    PROFILING_ENABLED,
+    PROFILING_MAX_FILES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_TOKEN,
+    PROFILING_TRACEMALLOC,
+)
+from .metrics import add_stage_hook
+
+try:
+    import greenlet  # SQLAlchemy's asyncio support (db.run_sync)
+except ImportError:
+    greenlet = None
+
+PROFILE_HEADER = "x-elysium-profile"
+PROFILE_ID_HEADER = "x-elysium-profile-id"
+
+# Functions listed in the JSON summary, by cumulative time
+TOP_FUNCTIONS = 40
+
+_PROFILE_ID = re.compile(r"^\d{8}T\d{12}-[0-9a-f]{8}$")
+
+
+class ProfileSession:
+    """Everything captured for one profiled request."""
+
+    def __init__(self, method: str, path: str, reason: str) -> None:
+        self.created_at = dt.datetime.utcnow()
+        # Sortable by creation time (rotation drops the smallest ids)
+        self.id = f"{self.created_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.reason = reason  # "header" or "sampled"
+        self.status_code: Optional[int] = None
+        self.duration_seconds: Optional[float] = None
+        self.profile: Optional[cProfile.Profile] = None
+        self.profiling_thread: Optional[int] = None  # thread the profiler is enabled in
+        self.note: Optional[str] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record_stage(self, name: str, seconds: float, peak_bytes: Optional[int]) -> None:
+        # Stages can repeat (e.g. backfills): add times, keep the worst peak
+        with self._lock:
+            entry = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": None})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            if peak_bytes is not None:
+                entry["peak_bytes"] = max(entry["peak_bytes"] or 0, peak_bytes)
+
+
+_SESSION: ContextVar[Optional[ProfileSession]] = ContextVar("elysium_profile_session", default=None)
+
+# cProfile is one profiler per process on newer Pythons; keep it simple everywhere.
+_PROFILER_LOCK = threading.Lock()
+
+_TRACING_LOCK = threading.Lock()
+_tracing_sessions = 0
+
+
+def current_session() -> Optional[ProfileSession]:
+    return _SESSION.get()
+
+
+# ---------- capture ----------
+
+@contextmanager
+def _request_profiler(session: Optional[ProfileSession]) -> Iterator[Optional[cProfile.Profile]]:
+    """The request's profiler (created on first use), None if it is not being profiled."""
+    if session is None or session.profile is not None:
+        yield session.profile if session is not None else None
+        return
+    if not _PROFILER_LOCK.acquire(blocking=False):
+        session.note = "cProfile was busy with another request; only stages were recorded"
+        yield None
+        return
+    session.profile = cProfile.Profile()
+    try:
+        yield session.profile
+    finally:
+        _PROFILER_LOCK.release()
+
+
+@contextmanager
+def _paused_on_switch(profile: cProfile.Profile) -> Iterator[None]:
+    """
+    db.run_sync runs its function in a greenlet on the event loop thread,
+    which switches back to the loop whenever it waits for the database:
+    pause the profiler while other greenlets (the loop, other requests) run.
+    """
+    if greenlet is None or greenlet.getcurrent().parent is None:
+        yield
+        return
+    mine = greenlet.getcurrent()
+    previous = greenlet.gettrace()
+
+    def trace(event, args):
+        if event in ("switch", "throw"):
+            origin, target = args
+            if origin is mine:
+                profile.disable()
+            elif target is mine:
+                profile.enable()
+        if previous is not None:
+            previous(event, args)
+
+    greenlet.settrace(trace)
+    try:
+        yield
+    finally:
+        greenlet.settrace(previous)
+
+
+def _run_profiled(session: Optional[ProfileSession], fn: Callable, *args, **kwargs) -> Any:
+    """fn under the request's profiler, enabled in the calling thread only."""
+    profile = session.profile if session is not None else None
+    if profile is None or session.profiling_thread is not None:
+        return fn(*args, **kwargs)
+    session.profiling_thread = threading.get_ident()
+    try:
+        with _paused_on_switch(profile):
+            profile.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+    finally:
+        session.profiling_thread = None
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Profile an endpoint when its request is being profiled. Sync functions
+    run under cProfile in the thread executing them. For async endpoints
+    the profiler is only set up: cProfile records the thread it is enabled
+    in, so the event loop (and every other request on it) stays out of it,
+    and the endpoint's blocking work is recorded through in_profile().
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with _request_profiler(_SESSION.get()):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _SESSION.get()
+        with _request_profiler(session):
+            return _run_profiled(session, func, *args, **kwargs)
+    return wrapper
+
+
+def in_profile(fn: Callable) -> Callable:
+    """
+    fn, run under the request's profiler in whichever thread calls it.
+    Wrap what an async @profiled endpoint hands to run_in_threadpool or
+    db.run_sync. The request context (and so the session) is carried into
+    both; without a profiled request this is a plain call.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return _run_profiled(_SESSION.get(), fn, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def _stage_memory(name: str) -> Iterator[None]:
+    """metrics.stage() hook: wall time + tracemalloc peak of the stage."""
+    session = _SESSION.get()
+    if session is None:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] - base if tracing else None
+        session.record_stage(name, time.perf_counter() - start, peak)
+
+
+add_stage_hook(_stage_memory)
+
+
+def _start_tracing() -> None:
+    global _tracing_sessions
+    if not PROFILING_TRACEMALLOC:
+        return
+    with _TRACING_LOCK:
+        if _tracing_sessions == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_sessions += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_sessions
+    if not PROFILING_TRACEMALLOC:
+        return
+    with _TRACING_LOCK:
+        _tracing_sessions -= 1
+        if _tracing_sessions == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def token_accepted(token: Optional[str]) -> bool:
+    """Whether an X-Elysium-Profile value may trigger profiles (and read them)."""
+    token = (token or "").strip()
+    if PROFILING_TOKEN:
+        return hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+    return token not in ("", "0", "false")
+
+
+def _profile_reason(scope) -> Optional[str]:
+    if scope["path"].startswith("/profiles"):
+        return None  # reading profiles sends the header too; nothing to profile there
+    for name, value in scope.get("headers") or ():
+        if name == PROFILE_HEADER.encode():
+            return "header" if token_accepted(value.decode("latin-1")) else None
+    if PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that opens a ProfileSession for requests selected for profiling."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        reason = _profile_reason(scope) if scope["type"] == "http" and PROFILING_ENABLED else None
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope["method"], scope["path"], reason)
+
+        async def send_with_id(message) -> None:
+            if message["type"] == "http.response.start":
+                session.status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers") or []) + [(PROFILE_ID_HEADER.encode(), session.id.encode())],
+                }
+            await send(message)
+
+        token = _SESSION.set(session)
+        _start_tracing()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            session.duration_seconds = time.perf_counter() - start
+            _stop_tracing()
+            _SESSION.reset(token)
+            if session.profile is not None or session.stages:
+                await run_in_threadpool(save_session, session)
+
+
+# ---------- storage ----------
+
+def _top_functions(profile: cProfile.Profile) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile).stats  # {(file, line, func): (cc, nc, tt, ct, callers)}
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{os.path.basename(file)}:{line}({func})",
+            "calls": nc,
+            "total_seconds": round(tt, 6),
+            "cumulative_seconds": round(ct, 6),
+        }
+        for (file, line, func), (cc, nc, tt, ct, _) in rows
+    ]
+
+
+def _summary(session: ProfileSession) -> Dict[str, Any]:
+    return {
+        "id": session.id,
+        "method": session.method,
+        "path": session.path,
+        "reason": session.reason,
+        "status_code": session.status_code,
+        "created_at": session.created_at.isoformat(),
+        "duration_seconds": round(session.duration_seconds or 0.0, 6),
+        "has_pstats": session.profile is not None,
+        "note": session.note,
+        "stages": session.stages,
+    }
+
+
+def save_session(session: ProfileSession, directory: str = PROFILING_DIR) -> None:
+    """Write <id>.prof + <id>.json, then drop the oldest beyond PROFILING_MAX_FILES."""
+    try:
+        os.makedirs(directory, exist_ok=True)
+        summary = _summary(session)
+        if session.profile is not None:
+            session.profile.dump_stats(os.path.join(directory, f"{session.id}.prof"))
+            summary["top_functions"] = _top_functions(session.profile)
+        tmp = os.path.join(directory, f".{session.id}.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(summary, f)
+        os.replace(tmp, os.path.join(directory, f"{session.id}.json"))
+        _rotate(directory)
+    except Exception as e:
+        print("[profiling] Failed to save profile:", e)
+
+
+def _profile_ids(directory: str) -> List[str]:
+    """Stored profile ids, newest first (ids start with a UTC timestamp)."""
+    if not os.path.isdir(directory):
+        return []
+    ids = [name[:-5] for name in os.listdir(directory) if name.endswith(".json") and _PROFILE_ID.match(name[:-5])]
+    return sorted(ids, reverse=True)
+
+
+def _rotate(directory: str) -> None:
+    for profile_id in _profile_ids(directory)[max(PROFILING_MAX_FILES, 1):]:
+        for suffix in (".json", ".prof"):
+            path = os.path.join(directory, profile_id + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def list_profiles(directory: str = PROFILING_DIR) -> List[Dict[str, Any]]:
+    """Summaries of the stored profiles, newest first (without top_functions)."""
+    profiles = []
+    for profile_id in _profile_ids(directory):
+        summary = load_profile(profile_id, directory)
+        if summary is not None:
+            summary.pop("top_functions", None)
+            profiles.append(summary)
+    return profiles
+
+
+def load_profile(profile_id: str, directory: str = PROFILING_DIR) -> Optional[Dict[str, Any]]:
+    """Full JSON summary of one profile, or None."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def pstats_path(profile_id: str, directory: str = PROFILING_DIR) -> Optional[str]:
+    """Path of the raw cProfile dump of a profile, if it has one."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(directory, f"{profile_id}.prof")
+    return path if os.path.exists(path) else None
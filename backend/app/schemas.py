@@ -1,12 +1,49 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
 import datetime as dt
 
 
+# Molecule values usable as ranking objectives (see services/ranking.py)
+RankingMetric = Literal[
+    "score",                # DTI score
+    "similarity",           # Tanimoto to the nearest known drug
+    "semantic_similarity",  # chemBERTa cosine to the nearest known drug
+    "molecular_weight",
+    "logp",
+    "tpsa",
+    "hbd",
+    "hba",
+    "rotatable_bonds",
+    "lipinski_violations",
+]
+
+class RankingObjective(BaseModel):
+    metric: RankingMetric
+    direction: Literal["max", "min", "target"] = "max"
+    weight: float = Field(1.0, ge=0)
+    # Desirability ramp for max / min (default: the candidates' own range);
+    # the accepted range for target (both required)
+    low: Optional[float] = None
+    high: Optional[float] = None
+
+    @model_validator(mode="after")
+    def _check_bounds(self):
+        if self.direction == "target" and (self.low is None or self.high is None):
+            raise ValueError("target objectives need low and high")
+        if self.low is not None and self.high is not None and self.low > self.high:
+            raise ValueError("low must not exceed high")
+        return self
+
+
 class DiscoveryRequest(BaseModel):
     target_id: str
     num_molecules: int = Field(..., ge=1, le=100)
     lipinski_only: bool = False
+    # How the returned molecules are ordered; the default is plain score order
+    objectives: List[RankingObjective] = Field(
+        default_factory=lambda: [RankingObjective(metric="score")], min_length=1, max_length=10
+    )
+    ranking: Literal["pareto", "weighted", "desirability"] = "pareto"
 
 class ADMETProperties(BaseModel):
     molecular_weight: float
@@ -41,6 +78,7 @@ class DiscoveryResponse(BaseModel):
     target_id: str
     num_molecules: int
     molecules: List[Molecule]
+    next_cursor: Optional[str] = None  # set when more molecules follow (paged reads)
 
 class DiscoveryRunSummary(BaseModel):
     run_id: str
@@ -50,7 +88,16 @@ class DiscoveryRunSummary(BaseModel):
 
 
 class DiscoveryRunListResponse(BaseModel):
-    runs: List[DiscoveryRunSummary]    
+    runs: List[DiscoveryRunSummary]
+    next_cursor: Optional[str] = None
+
+class MoleculeRunsResponse(BaseModel):
+    registry_id: int
+    registry_key: str  # InChIKey, or "smiles:<canonical SMILES>"
+    inchikey: Optional[str] = None
+    canonical_smiles: str
+    runs: List[DiscoveryRunSummary]  # newest first
+    next_cursor: Optional[str] = None
 
 class MoleculeGraphEntry(BaseModel):
     run_id: str
@@ -63,6 +110,16 @@ class MoleculeGraphEntry(BaseModel):
 class TargetGraphResponse(BaseModel):
     target_id: str
     molecules: List[MoleculeGraphEntry]
+    next_cursor: Optional[str] = None
+
+class TargetGraphSummary(BaseModel):
+    target_id: str
+    version: int
+    molecule_count: int
+    run_count: int
+    top_molecules: List[MoleculeGraphEntry]  # best BINDS scores first
+    drug_histogram: Dict[str, int]           # nearest known drug -> molecule count
+    updated_at: Optional[dt.datetime] = None
 
 class DrugGraphEntry(BaseModel):
     target_id: str
@@ -75,3 +132,82 @@ class DrugGraphEntry(BaseModel):
 class DrugGraphResponse(BaseModel):
     drug_name: str
     molecules: List[DrugGraphEntry]
+    next_cursor: Optional[str] = None
+
+
+class GraphNode(BaseModel):
+    id: int  # kg_nodes.id
+    node_type: str
+    name: str
+    external_id: Optional[str] = None
+    smiles: Optional[str] = None
+
+
+class GraphEdge(BaseModel):
+    source: int  # kg_nodes.id, in the stored edge direction
+    target: int
+    relation: str
+    weight: Optional[float] = None
+
+
+class GraphNeighborhoodResponse(BaseModel):
+    seeds: List[int]
+    hops: int
+    nodes: List[GraphNode]
+    edges: List[GraphEdge]
+    truncated: bool = False  # fan-out or node budget cut the expansion short
+
+
+class GraphPath(BaseModel):
+    nodes: List[int]      # kg_nodes.id from source to target
+    relations: List[str]  # relation of each hop
+
+
+class GraphPathsResponse(BaseModel):
+    source: int
+    target: int
+    paths: List[GraphPath]
+    nodes: List[GraphNode]
+
+
+class ReplicationStatus(BaseModel):
+    running: bool
+    pending: int              # outbox rows waiting for ArangoDB
+    parked: int               # rows that exhausted their retries
+    retrying: int = 0         # rejected rows set aside until their next attempt
+    lag_seconds: float        # age of the oldest pending row
+    oldest_pending_at: Optional[dt.datetime] = None
+    replicated_total: int     # rows replicated by this process
+    consecutive_failures: int
+    last_success_at: Optional[dt.datetime] = None
+    last_error: Optional[str] = None
+
+
+class ProfileStage(BaseModel):
+    calls: int
+    seconds: float
+    peak_bytes: Optional[int] = None  # tracemalloc peak during the stage
+
+class ProfileFunction(BaseModel):
+    function: str
+    calls: int
+    total_seconds: float
+    cumulative_seconds: float
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    reason: str  # "header" or "sampled"
+    status_code: Optional[int] = None
+    created_at: dt.datetime
+    duration_seconds: float
+    has_pstats: bool
+    note: Optional[str] = None
+    stages: Dict[str, ProfileStage] = {}
+
+class ProfileDetail(ProfileSummary):
+    top_functions: List[ProfileFunction] = []
+
+class ProfileListResponse(BaseModel):
+    profiles: List[ProfileSummary]  # newest first
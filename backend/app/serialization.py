@@ -0,0 +1,89 @@
+"""
+Fast JSON responses for large molecule lists (ELYSIUM_FAST_JSON, on by
+default).
+
+With response_model, FastAPI validates what an endpoint returns a second
+time and encodes it with the stdlib json module: for a 10k-molecule run
+that costs more than reading the run. The fast path instead
+  - returns a FastJSONResponse, so response_model is only documentation;
+  - builds plain dicts straight from stored columns where it can
+    (services.runs.get_run_content) - the data is ours and already typed;
+  - encodes with orjson (stdlib json when orjson is not installed).
+
+?layout=columnar turns the molecule list into one array per field
+(nested blocks as objects of arrays), which is smaller and quicker to
+load into a dataframe:
+
+    {"molecules": {"smiles": [...], "score": [...],
+                   "similar_drug": {"name": [...], ...}, "admet": {...}}}
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from .schemas import ADMETProperties, Molecule, SimilarDrug
+
+try:
+    import orjson
+except ImportError as e:
+    print("[serialization] orjson not available, using the stdlib json encoder:", e)
+    orjson = None
+
+LAYOUT_PATTERN = "^(rows|columnar)$"
+
+# Nested Molecule blocks and their fields, for columnar output
+_BLOCK_FIELDS: Dict[str, List[str]] = {
+    "similar_drug": list(SimilarDrug.model_fields),
+    "similar_drug_semantic": list(SimilarDrug.model_fields),
+    "admet": list(ADMETProperties.model_fields),
+}
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes of plain dicts / lists / scalars."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps() (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def columnar_molecules(molecules: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Molecule dicts (as from model_dump / molecule_dict_from_record) -> one
+    list per field. Fields missing from the dicts (?exclude=) are left
+    out; a missing nested block gives None in each of its field lists.
+    """
+    present = set(molecules[0]) if molecules else set(Molecule.model_fields)
+    columns: Dict[str, Any] = {}
+    for field in Molecule.model_fields:
+        if field not in present:
+            continue
+        sub_fields = _BLOCK_FIELDS.get(field)
+        if sub_fields is None:
+            columns[field] = [mol[field] for mol in molecules]
+            continue
+        blocks = [mol[field] for mol in molecules]
+        columns[field] = {
+            sub: [block[sub] if block is not None else None for block in blocks]
+            for sub in sub_fields
+        }
+    return columns
+
+
+def molecules_response(
+    content: Dict[str, Any],
+    layout: str = "rows",
+    headers: Optional[Dict[str, str]] = None,
+) -> FastJSONResponse:
+    """A response dict with a "molecules" list, in the requested layout."""
+    if layout == "columnar":
+        content = {**content, "layout": "columnar", "molecules": columnar_molecules(content["molecules"])}
+    return FastJSONResponse(content=content, headers=headers)
@@ -0,0 +1,73 @@
+"""
+The chemBERTa encoder on its own: tokenizer + model, SMILES in, unit
+vectors out, in batches.
+
+Kept apart from app.services.embeddings (whose module-level embedder
+loads the reference library at import) so the store builder
+(python -m app.data.loaders ... --embeddings) can encode a library
+without a running app.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+MAX_LENGTH = 128
+BATCH_SIZE = 64
+
+
+class ChemBERTaModel:
+    """Loads `model_name` (Hugging Face id or directory); raises if it cannot."""
+
+    def __init__(self, model_name: str) -> None:
+        self.model_name = model_name
+        self._device = torch.device("cpu")
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self._model = AutoModel.from_pretrained(model_name)
+        self._model.to(self._device)
+        self._model.eval()
+        self.dim = int(self._model.config.hidden_size)
+
+    def _forward(self, smiles: Sequence[str]) -> np.ndarray:
+        inputs = self._tokenizer(
+            list(smiles),
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=MAX_LENGTH,
+        )
+        inputs = {k: v.to(self._device) for k, v in inputs.items()}
+        with torch.no_grad():
+            outputs = self._model(**inputs)
+        # CLS token representation
+        return outputs.last_hidden_state[:, 0, :].cpu().numpy().astype(np.float32)
+
+    def encode(self, smiles: Sequence[str], batch_size: int = BATCH_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (vectors, ok): float32 (N, dim) unit vectors and a bool mask of the
+        rows that could be embedded (failed rows are zeros). A batch that
+        fails is retried one SMILES at a time, so one bad input only costs
+        its own row.
+        """
+        vectors = np.zeros((len(smiles), self.dim), dtype=np.float32)
+        for start in range(0, len(smiles), batch_size):
+            batch = smiles[start:start + batch_size]
+            try:
+                vectors[start:start + len(batch)] = self._forward(batch)
+            except Exception:
+                for i, smi in enumerate(batch):
+                    try:
+                        vectors[start + i] = self._forward([smi])[0]
+                    except Exception as e:
+                        print("[ChemBERTaModel] Error embedding SMILES:", e)
+        norms = np.linalg.norm(vectors, axis=1)
+        ok = norms > 0
+        vectors[ok] /= norms[ok, None]
+        return vectors, ok
+
+    def encode_list(self, smiles: Sequence[str]) -> List:
+        """encode() as a list of vectors, None for rows that failed."""
+        vectors, ok = self.encode(smiles)
+        return [vectors[i] if ok[i] else None for i in range(len(smiles))]
@@ -1,16 +1,21 @@
 import uuid
-from typing import List
+from typing import List, Tuple
 
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from ..schemas import Molecule, DiscoveryRequest, DiscoveryResponse
-from ..core.config import resolve_target_sequence
+from ..core.config import ARANGO_REPLICATION, resolve_target_sequence
+from ..metrics import DISCOVERY_MOLECULES, backend_label, pipeline_labels, stage
 from ..models import DiscoveryRun, MoleculeRecord
-from ..similarity import find_combined_similar_drugs
 from .scoring import get_scorer
 from .generation import get_generator
 from .kg import attach_run_to_kg
-from .admet import calculate_admet
+from .graph_projection import GraphDelta, apply_graph_delta
+from .ranking import rank_molecules
+from .records import molecule_record_row
+from .registry import annotate_smiles, register_molecules
+from .replication import enqueue_run, notify_replicator
 
 
 scorer = get_scorer()
@@ -56,6 +61,47 @@ def _simple_score(smiles_list: List[str], target_sequence: str, target_id: str)
     return scores
 
 
+def persist_run(db: Session, target_id: str, molecules: List[Molecule]) -> Tuple[DiscoveryRun, GraphDelta]:
+    """
+    Write a run, its molecules and its KG nodes/edges without committing.
+    Returns the run and the KG delta to apply to the graph projection
+    after commit.
+
+    The run row is the only ORM object (one flush, to make it visible for
+    the foreign keys); molecules and KG rows go in as executemany INSERTs,
+    so the number of round-trips no longer grows with the molecule count.
+    Neighbors and ADMET are stored once per structure in the molecule
+    registry, which the molecule rows reference, so reads never recompute
+    them.
+    """
+    run_record = DiscoveryRun(
+        id=str(uuid.uuid4()),
+        target_id=target_id,
+        num_molecules=len(molecules),
+    )
+
+    with stage("sql_persist"):
+        db.add(run_record)
+        db.flush()
+
+        if molecules:
+            registry_ids = register_molecules(db, molecules)
+            db.execute(
+                insert(MoleculeRecord),
+                [molecule_record_row(run_record.id, m, rid) for m, rid in zip(molecules, registry_ids)],
+            )
+
+    # Attach this run to the knowledge graph (nodes + edges)
+    with stage("kg_attach"):
+        graph_delta = attach_run_to_kg(db, run_record, molecules)
+
+    # Queue the ArangoDB copy in the same transaction (see services.replication)
+    if ARANGO_REPLICATION:
+        with stage("arango_enqueue"):
+            enqueue_run(db, run_record.id, target_id, molecules)
+    return run_record, graph_delta
+
+
 def run_discovery(req: DiscoveryRequest, db: Session) -> DiscoveryResponse:
     """
     ELYSIUM discovery pipeline:
@@ -65,24 +111,36 @@ def run_discovery(req: DiscoveryRequest, db: Session) -> DiscoveryResponse:
     3. Score molecules with configured backend (stub or DeepPurpose).
     4. Compute similarity to known drugs.
     5. Save to DB.
-    6. Return ranked molecules.
+    6. Return molecules ranked by the request's objectives.
     """
+    labels = {"scorer": backend_label(scorer), "generator": backend_label(generator)}
+    with pipeline_labels(**labels):
+        response = _run_discovery(req, db)
+    DISCOVERY_MOLECULES.inc(len(response.molecules), **labels)
+    return response
+
 
+def _run_discovery(req: DiscoveryRequest, db: Session) -> DiscoveryResponse:
     # 1) Generate candidate molecules (library-based for now)
-    smiles_list = generator.generate(req.target_id, req.num_molecules)
+    with stage("generate"):
+        smiles_list = generator.generate(req.target_id, req.num_molecules)
 
 
     # 2) Resolve target sequence
-    target_seq = resolve_target_sequence(req.target_id)
+    with stage("resolve_target"):
+        target_seq = resolve_target_sequence(req.target_id)
 
     # 3) Score with configured backend
-    scores = scorer.score(smiles_list, target_seq, req.target_id)
+    with stage("score"):
+        scores = scorer.score(smiles_list, target_seq, req.target_id)
 
     # 4) Build Molecule objects with similarity info
+    #    (once per structure: cached or registered molecules are not recomputed)
+    annotations = annotate_smiles(db, smiles_list)
     molecules: List[Molecule] = []
     for smi, score in zip(smiles_list, scores):
-        fp_neighbor, semantic_neighbor = find_combined_similar_drugs(smi)
-        admet_props = calculate_admet(smi)
+        ann = annotations[smi]
+        fp_neighbor, semantic_neighbor, admet_props = ann.fp_neighbor, ann.semantic_neighbor, ann.admet
 
         note_parts = ["Scored with ELYSIUM backend."]
 
@@ -131,67 +189,24 @@ def run_discovery(req: DiscoveryRequest, db: Session) -> DiscoveryResponse:
         # if filtered is empty, we keep original list, so the user still gets something
 
 
-    # Sort by score desc
-    molecules.sort(key=lambda m: m.score, reverse=True)
+    # Rank: Pareto fronts / weighted / desirability over the requested
+    # objectives (score only by default)
+    with stage("rank"):
+        molecules = rank_molecules(molecules, req.objectives, req.ranking)
 
-    # 5) Save to DB (same as before)
-    run_record = DiscoveryRun(
-        target_id=req.target_id,
-        num_molecules=len(molecules),
-    )
-    db.add(run_record)
-    db.flush()  # assign ID
-
-    for m in molecules:
-        db.add(
-            MoleculeRecord(
-                run_id=run_record.id,
-                smiles=m.smiles,
-                score=m.score,
-                source=m.source,
-                notes=m.notes,
-            )
-        )
+    # 5) Save to DB (bulk: one flush for the run row, then batched INSERTs)
+    run_record, graph_delta = persist_run(db, req.target_id, molecules)
 
-    # Attach this run to the knowledge graph (nodes + edges)
-    attach_run_to_kg(db, run_record, molecules)
-
-    db.commit()
-    db.refresh(run_record)
-
-    arango = get_arango_db()
-    molecules_col = arango.collection("molecules")
-    binds_edge = arango.collection("binds")
-    similar_edge = arango.collection("similar_to")
-
-    for idx, m in enumerate(molecules):
-        mol_key = f"{run_record.id}_{idx}"
-        molecules_col.insert({
-            "_key": mol_key,
-            "run_id": run_record.id,
-            "index": idx,
-            "target_id": req.target_id,
-            "smiles": m.smiles,
-            "score": m.score,
-        })
-
-        # molecule BINDS target
-        binds_edge.insert({
-            "_from": f"molecules/{mol_key}",
-            "_to": f"targets/{req.target_id}",
-            "score": m.score,
-            "source": "ELYSIUM/DeepPurpose"
-        })
-
-        # SIMILAR_TO known drug(s)
-        if m.similar_drug is not None:
-            similar_edge.insert({
-                "_from": f"molecules/{mol_key}",
-                "_to": f"drugs/{m.similar_drug.name.lower()}",
-                "tanimoto": m.similar_drug.similarity,
-                "semantic": m.similar_drug.semantic_similarity,
-            })
+    with stage("commit"):
+        db.commit()
+        db.refresh(run_record)
+
+    # Only committed rows reach the in-memory graph projection
+    with stage("graph_projection"):
+        apply_graph_delta(graph_delta)
 
+    # ArangoDB is written behind, from the outbox rows committed above
+    notify_replicator()
 
     # 6) Return response
     return DiscoveryResponse(
@@ -3,41 +3,59 @@ chemBERTa-based molecular embeddings for ELYSIUM.
 
 We use a pretrained model (e.g. seyonec/ChemBERTa-zinc-base-v1)
 to embed SMILES into a vector space and compute semantic similarity
-to a small library of known drugs.
+to the reference library of known drugs.
+
+With a reference LibraryStore, the library embeddings come from the
+store's embedding column (python -m app.data.loaders ... --embeddings),
+memory-mapped: nothing is encoded at startup, and preloaded or not,
+every worker shares the same page cache. Only rows the column does not
+cover (built with another model, or appended since) are encoded here,
+in batches, into a small in-memory matrix searched alongside it.
 """
 
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Sequence, Tuple
 
 import numpy as np
-import torch
-from transformers import AutoTokenizer, AutoModel
 
-from ..fda_library import FDA_LIKE_DRUGS
+from ..core.config import CHEMBERTA_MODEL
+from ..fda_library import FDA_LIKE_DRUGS, DrugRecord, reference_store
+from ..metrics import FALLBACKS, MODEL_AVAILABLE, model_load
 from ..schemas import SimilarDrug
+from .chemberta import ChemBERTaModel
 
 
-CHEMBERTA_MODEL_NAME = "seyonec/ChemBERTa-zinc-base-v1"
+CHEMBERTA_MODEL_NAME = CHEMBERTA_MODEL
+
+# Library rows encoded per batch when the store's column does not cover them
+LIBRARY_BATCH = 1024
 
 
 class ChemBERTaEmbedder:
-    def __init__(self) -> None:
+    def __init__(self, model_name: str = CHEMBERTA_MODEL_NAME) -> None:
+        self.model_name = model_name
         self._available = False
-        self._tokenizer = None
-        self._model = None
-        self._device = torch.device("cpu")
-        self._drug_embeds: List[Tuple[dict, np.ndarray]] = []
-
-        self._init_model()
+        self._model: Optional[ChemBERTaModel] = None
+        # Library embeddings as contiguous (N, dim) float32 matrices plus
+        # their library rows (records are looked up on a hit): the store's
+        # memory-mapped column, and whatever had to be encoded here. No
+        # per-drug objects whose refcounts or GC headers would dirty pages.
+        self._stored = np.zeros((0, 0), dtype=np.float32)
+        self._stored_ok = np.zeros(0, dtype=bool)
+        self._drug_rows = np.zeros(0, dtype=np.int64)
+        self._drug_matrix = np.zeros((0, 0), dtype=np.float32)
+        self._record: Callable[[int], DrugRecord] = FDA_LIKE_DRUGS.__getitem__
+
+        with model_load("chemberta"):
+            self._init_model()
+        MODEL_AVAILABLE.set(1 if self._available else 0, model="chemberta")
 
     def _init_model(self) -> None:
         try:
-            self._tokenizer = AutoTokenizer.from_pretrained(CHEMBERTA_MODEL_NAME)
-            self._model = AutoModel.from_pretrained(CHEMBERTA_MODEL_NAME)
-            self._model.to(self._device)
-            self._model.eval()
+            self._model = ChemBERTaModel(self.model_name)
             self._available = True
 
-            self._precompute_library_embeddings()
+            with model_load("chemberta_library"):
+                self._load_library_embeddings()
         except Exception as e:
             print("[ChemBERTaEmbedder] Failed to load model, disabling embeddings:", e)
             self._available = False
@@ -45,61 +63,89 @@ class ChemBERTaEmbedder:
     def _smiles_to_embedding(self, smiles: str) -> Optional[np.ndarray]:
         if not self._available:
             return None
-        try:
-            inputs = self._tokenizer(
-                smiles,
-                return_tensors="pt",
-                padding=True,
-                truncation=True,
-                max_length=128,
-            )
-            inputs = {k: v.to(self._device) for k, v in inputs.items()}
-            with torch.no_grad():
-                outputs = self._model(**inputs)
-            # Use CLS token representation
-            hidden = outputs.last_hidden_state[:, 0, :]
-            vec = hidden.cpu().numpy()[0]
-            # Normalize to unit vector
-            norm = np.linalg.norm(vec)
-            if norm == 0:
-                return None
-            return vec / norm
-        except Exception as e:
-            print("[ChemBERTaEmbedder] Error embedding SMILES:", e)
-            return None
+        return self._model.encode_list([smiles])[0]
+
+    def _encode_rows(self, rows: Sequence[int], smiles: Callable[[int], str]) -> None:
+        """Encode library rows in batches into the in-memory matrix."""
+        kept_rows: List[np.ndarray] = []
+        blocks: List[np.ndarray] = []
+        for start in range(0, len(rows), LIBRARY_BATCH):
+            batch = np.asarray(rows[start:start + LIBRARY_BATCH], dtype=np.int64)
+            vectors, ok = self._model.encode([smiles(int(i)) for i in batch])
+            kept_rows.append(batch[ok])
+            blocks.append(vectors[ok])
+        if kept_rows:
+            self._drug_rows = np.concatenate(kept_rows)
+            self._drug_matrix = np.ascontiguousarray(np.vstack(blocks), dtype=np.float32)
+
+    def _load_library_embeddings(self) -> None:
+        store = reference_store()
+        if store is None:
+            rows = [i for i, drug in enumerate(FDA_LIKE_DRUGS) if drug.get("smiles")]
+            self._encode_rows(rows, lambda i: FDA_LIKE_DRUGS[i]["smiles"])
+        else:
+            self._record = store.record
+            covered = 0
+            if store.embedding_model == self.model_name and store.embeddings.shape[1] == self._model.dim:
+                self._stored = store.embeddings
+                self._stored_ok = store.embedded.view(bool)
+                covered = len(self._stored)
+            missing = len(store) - covered
+            if missing:
+                print(
+                    f"[ChemBERTaEmbedder] Encoding {missing} library rows without a stored embedding; "
+                    f"build them once with `python -m app.data.loaders ... --embeddings`"
+                )
+                self._encode_rows(range(covered, len(store)), store.smiles)
+        if not len(self._drug_rows) and not self._stored_ok.any():
+            print("[ChemBERTaEmbedder] No valid embeddings for the reference library")
+
+    def embed(self, smiles: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of a SMILES, or None when the model is unavailable."""
+        return self.embed_many([smiles])[0]
+
+    def embed_many(self, smiles_list: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """embed() for a batch; an unavailable model counts as one fallback per call."""
+        if not self._available:
+            if smiles_list:
+                FALLBACKS.inc(component="chemberta", reason="unavailable")
+            return [None] * len(smiles_list)
+        return self._model.encode_list(smiles_list) if smiles_list else []
 
-    def _precompute_library_embeddings(self) -> None:
-        self._drug_embeds = []
-        for drug in FDA_LIKE_DRUGS:
-            smi = drug.get("smiles")
-            if not smi:
-                continue
-            emb = self._smiles_to_embedding(smi)
-            if emb is not None:
-                self._drug_embeds.append((drug, emb))
-        if not self._drug_embeds:
-            print("[ChemBERTaEmbedder] No valid embeddings for FDA-like drugs")
+    def _has_library(self) -> bool:
+        return bool(len(self._drug_rows)) or bool(len(self._stored))
 
     def most_similar_drug(self, smiles: str) -> Optional[SimilarDrug]:
-        if not self._available or not self._drug_embeds:
+        if not self._available or not self._has_library():
             return None
-
-        query = self._smiles_to_embedding(smiles)
-        if query is None:
+        return self.most_similar_to(self._smiles_to_embedding(smiles))
+
+    def _best(self, query: np.ndarray) -> Optional[Tuple[int, float]]:
+        """(library row, cosine) of the nearest embedded drug over both matrices."""
+        best: Optional[Tuple[int, float]] = None
+        if len(self._stored):
+            # cosine similarity (dot of unit vectors); rows that failed to embed are zeros
+            sims = self._stored @ query
+            sims[~self._stored_ok] = -np.inf
+            i = int(np.argmax(sims))
+            if self._stored_ok[i]:
+                best = (i, float(sims[i]))
+        if len(self._drug_rows):
+            sims = self._drug_matrix @ query
+            i = int(np.argmax(sims))
+            if best is None or sims[i] > best[1]:
+                best = (int(self._drug_rows[i]), float(sims[i]))
+        return best
+
+    def most_similar_to(self, query: Optional[np.ndarray]) -> Optional[SimilarDrug]:
+        """Nearest library drug for an embedding from embed()."""
+        if query is None or not self._has_library():
             return None
-
-        best_drug = None
-        best_sim = -1.0
-
-        for drug, emb in self._drug_embeds:
-            # cosine similarity (dot of unit vectors)
-            sim = float(np.dot(query, emb))
-            if sim > best_sim:
-                best_sim = sim
-                best_drug = drug
-
-        if best_drug is None:
+        best = self._best(np.asarray(query, dtype=np.float32))
+        if best is None:
             return None
+        row, best_sim = best
+        best_drug = self._record(row)
 
         return SimilarDrug(
             name=best_drug["name"],
@@ -114,9 +160,27 @@ class ChemBERTaEmbedder:
 embedder = ChemBERTaEmbedder()
 
 
+def embedder_available() -> bool:
+    """Whether chemBERTa loaded, i.e. embeddings and semantic neighbors can be computed."""
+    return embedder._available
+
+
 def find_most_semantic_drug(smiles: str) -> Optional[SimilarDrug]:
     """
     Public helper used by the discovery pipeline to get the
     chemBERTa-nearest known drug.
     """
     return embedder.most_similar_drug(smiles)
+
+
+def embed_smiles(smiles: str) -> Optional[np.ndarray]:
+    return embedder.embed(smiles)
+
+
+def embed_smiles_batch(smiles_list: Sequence[str]) -> List[Optional[np.ndarray]]:
+    return embedder.embed_many(smiles_list)
+
+
+def find_most_semantic_drug_for_embedding(query: Optional[np.ndarray]) -> Optional[SimilarDrug]:
+    """Same as find_most_semantic_drug, for an embedding from embed_smiles()."""
+    return embedder.most_similar_to(query)
@@ -6,18 +6,25 @@ We define a common interface:
 
 For now we provide:
   - LibraryGenerator: samples from a small drug-like library.
+  - HybridGenerator: library seeds + mutation (BRICS recombination,
+    R-group swaps), filtered in bulk for validity / novelty / range.
 
 Later you can add:
   - TamGenGenerator: wraps TamGen or other Transformer.
-  - HybridGenerator: library + mutation, etc.
 """
 
-from typing import List, Protocol
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Protocol, Sequence, Set, Tuple
 import random
 
+import numpy as np
 from rdkit import Chem
+from rdkit.Chem import BRICS, Descriptors
+from rdkit.rdBase import BlockLogs
 
-from ..data.candidate_library import CANDIDATE_LIBRARY
+from ..core.config import GENERATOR_BACKEND
+from ..metrics import model_load
+from ..data.candidate_library import CANDIDATE_LIBRARY, candidate_store
 
 
 class GeneratorBackend(Protocol):
@@ -25,45 +32,365 @@ class GeneratorBackend(Protocol):
         ...
 
 
+def _load_library_smiles(max_from_store: int = 512) -> List[str]:
+    """
+    Valid seed SMILES from CANDIDATE_LIBRARY, or a random sample of at most
+    `max_from_store` rows when a candidate LibraryStore is configured.
+    """
+    store = candidate_store()
+    if store is not None and len(store):
+        return store.sample_smiles(min(max_from_store, len(store)))
+
+    smiles_list: List[str] = []
+    for entry in CANDIDATE_LIBRARY:
+        smi = entry.get("smiles")
+        if not smi:
+            continue
+        mol = Chem.MolFromSmiles(smi)
+        if mol is not None:
+            smiles_list.append(smi)
+    if not smiles_list:
+        # Fallback to a couple of very simple molecules
+        smiles_list = ["CCO", "CC(=O)O", "CCN(CC)CC"]
+    return smiles_list
+
+
 class LibraryGenerator:
     """
     Simple generator that samples valid SMILES from a predefined library.
 
     This is NOT target-conditional yet; target_id is accepted so that
     we can easily switch to a target-conditioned generator later.
+
+    With a candidate LibraryStore configured, rows are sampled straight from
+    the memory-mapped store instead of an in-memory list.
     """
 
-    def __init__(self) -> None:
-        self._base_smiles = self._load_valid_smiles()
+    name = "library"
 
-    def _load_valid_smiles(self) -> List[str]:
-        smiles_list: List[str] = []
-        for entry in CANDIDATE_LIBRARY:
-            smi = entry.get("smiles")
-            if not smi:
-                continue
-            mol = Chem.MolFromSmiles(smi)
-            if mol is not None:
-                smiles_list.append(smi)
-        if not smiles_list:
-            # Fallback to a couple of very simple molecules
-            smiles_list = ["CCO", "CC(=O)O", "CCN(CC)CC"]
-        return smiles_list
+    def __init__(self) -> None:
+        self._store = candidate_store()
+        self._base_smiles = _load_library_smiles()
 
     def generate(self, target_id: str, num_molecules: int) -> List[str]:
         if num_molecules <= 0:
             return []
+        if self._store is not None and len(self._store):
+            return self._store.sample_smiles(num_molecules)
         # Sample with replacement to allow any requested size.
         return [random.choice(self._base_smiles) for _ in range(num_molecules)]
 
 
+# Substituents used for R-group swaps. Atom 0 is the attachment point.
+R_GROUPS: Tuple[str, ...] = (
+    "C",
+    "CC",
+    "F",
+    "Cl",
+    "O",
+    "N",
+    "OC",
+    "C#N",
+    "C(F)(F)F",
+    "C(=O)N",
+    "C(=O)O",
+    "S(C)(=O)=O",
+    "N1CCOCC1",
+    "c1ccccc1",
+)
+
+
+class HybridGenerator:
+    """
+    Library + mutation generator (scaffold hopping light).
+
+    Seeds come from CANDIDATE_LIBRARY. Each round draws an oversampled batch
+    of proposals from two operators:
+      - BRICS recombination of fragments cut from the seeds
+      - R-group swaps: replace a terminal substituent (or a hydrogen) on a
+        seed with one of R_GROUPS
+
+    The batch is canonicalized and invalid, duplicate, already-seen and
+    out-of-range molecules are dropped in bulk with NumPy masks. Survivors
+    are streamed until the requested count is reached.
+    """
+
+    name = "hybrid"
+
+    def __init__(
+        self,
+        oversample: float = 2.0,
+        min_batch: int = 32,
+        max_batch: int = 4096,
+        max_rounds: int = 50,
+        patience: int = 3,
+        max_pool: int = 2048,
+        mw_range: Tuple[float, float] = (120.0, 550.0),
+        max_heavy_atoms: int = 40,
+        include_seeds: bool = False,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.oversample = oversample
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.max_rounds = max_rounds
+        self.patience = patience
+        self.max_pool = max_pool
+        self.mw_range = mw_range
+        self.max_heavy_atoms = max_heavy_atoms
+        self.include_seeds = include_seeds
+        self._rng = random.Random(seed)
+
+        self._seed_smiles = _load_library_smiles()
+        self._seed_mols = [Chem.MolFromSmiles(s) for s in self._seed_smiles]
+        self._seed_canonical = {Chem.MolToSmiles(m) for m in self._seed_mols}
+        self._r_groups = [Chem.MolFromSmiles(r) for r in R_GROUPS]
+        self._fragments = self._collect_fragments(self._seed_mols)
+        self._index_attachment_points()
+
+    # ---------- operators ----------
+
+    @staticmethod
+    def _collect_fragments(mols: Sequence[Chem.Mol]) -> List[Chem.Mol]:
+        frags: Set[str] = set()
+        for mol in mols:
+            frags.update(BRICS.BRICSDecompose(mol))
+        return [m for m in (Chem.MolFromSmiles(f) for f in sorted(frags)) if m is not None]
+
+    @staticmethod
+    def _compatible_labels() -> Set[Tuple[int, int]]:
+        """
+        BRICS environment pairs that may be joined, e.g. (1, 3) and (3, 1).
+
+        Labels "7a"/"7b" both appear as isotope 7 on fragment dummies.
+        """
+        pairs: Set[Tuple[int, int]] = set()
+        for group in BRICS.reactionDefs:
+            for a, b, _bond in group:
+                a_lbl, b_lbl = int(a.rstrip("ab")), int(b.rstrip("ab"))
+                pairs.add((a_lbl, b_lbl))
+                pairs.add((b_lbl, a_lbl))
+        return pairs
+
+    def _index_attachment_points(self) -> None:
+        # fragment index -> [(dummy atom idx, BRICS label)]
+        self._frag_dummies: List[List[Tuple[int, int]]] = [
+            [(a.GetIdx(), a.GetIsotope()) for a in frag.GetAtoms() if a.GetAtomicNum() == 0]
+            for frag in self._fragments
+        ]
+        # BRICS label -> [(fragment idx, dummy atom idx)]
+        self._by_label: Dict[int, List[Tuple[int, int]]] = {}
+        for f_idx, dummies in enumerate(self._frag_dummies):
+            for atom_idx, label in dummies:
+                self._by_label.setdefault(label, []).append((f_idx, atom_idx))
+        compatible = self._compatible_labels()
+        self._partners: Dict[int, List[Tuple[int, int]]] = {
+            label: [
+                site
+                for other in self._by_label
+                if (label, other) in compatible
+                for site in self._by_label[other]
+            ]
+            for label in self._by_label
+        }
+
+    def _brics_recombine(self) -> Optional[Chem.Mol]:
+        """
+        Join two BRICS fragments on one compatible attachment point.
+
+        This is a single random step of what BRICS.BRICSBuild enumerates
+        exhaustively; sampling it directly is orders of magnitude cheaper.
+        Leftover attachment points are capped with hydrogens.
+        """
+        if not self._fragments:
+            return None
+        f_a = self._rng.randrange(len(self._fragments))
+        if not self._frag_dummies[f_a]:
+            return None
+        d_a, label = self._rng.choice(self._frag_dummies[f_a])
+        partners = self._partners.get(label)
+        if not partners:
+            return None
+        f_b, d_b = self._rng.choice(partners)
+
+        frag_a = self._fragments[f_a]
+        combo = Chem.RWMol(Chem.CombineMols(frag_a, self._fragments[f_b]))
+        d_b += frag_a.GetNumAtoms()
+        combo.GetAtomWithIdx(d_a).SetAtomMapNum(1)
+        combo.GetAtomWithIdx(d_b).SetAtomMapNum(1)
+        try:
+            joined = Chem.RWMol(Chem.molzip(combo))
+            for atom in joined.GetAtoms():
+                if atom.GetAtomicNum() == 0:
+                    atom.SetAtomicNum(1)
+                    atom.SetIsotope(0)
+            return Chem.RemoveHs(joined, sanitize=False)
+        except Exception:
+            return None
+
+    def _r_group_swap(self, pool: Sequence[Chem.Mol]) -> Optional[Chem.Mol]:
+        core = self._rng.choice(pool)
+        rgroup = self._rng.choice(self._r_groups)
+
+        terminal = [
+            a.GetIdx() for a in core.GetAtoms()
+            if a.GetDegree() == 1 and not a.IsInRing() and a.GetAtomicNum() != 1
+        ]
+        with_h = [
+            a.GetIdx() for a in core.GetAtoms()
+            if a.GetTotalNumHs() > 0 and a.GetNumExplicitHs() == 0
+        ]
+
+        rw = Chem.RWMol(Chem.CombineMols(core, rgroup))
+        offset = core.GetNumAtoms()
+
+        if terminal and (not with_h or self._rng.random() < 0.5):
+            # Swap: drop a terminal substituent atom, bond the R-group to its neighbour
+            leaving = self._rng.choice(terminal)
+            anchor = core.GetAtomWithIdx(leaving).GetNeighbors()[0].GetIdx()
+            rw.AddBond(anchor, offset, Chem.BondType.SINGLE)
+            rw.RemoveAtom(leaving)
+        elif with_h:
+            # Decorate: replace an implicit hydrogen with the R-group
+            anchor = self._rng.choice(with_h)
+            rw.AddBond(anchor, offset, Chem.BondType.SINGLE)
+        else:
+            return None
+
+        return rw.GetMol()
+
+    # ---------- bulk filtering ----------
+
+    def _filter_batch(
+        self,
+        proposals: Sequence[Optional[Chem.Mol]],
+        seen: Set[str],
+    ) -> List[Tuple[str, Chem.Mol]]:
+        """
+        Canonicalize a batch and drop invalid / duplicate / out-of-range
+        molecules using vectorized masks over the whole batch.
+        """
+        n = len(proposals)
+        smiles = np.empty(n, dtype=object)
+        mols = np.empty(n, dtype=object)
+        mw = np.zeros(n, dtype=np.float64)
+        heavy = np.zeros(n, dtype=np.int64)
+        valid = np.zeros(n, dtype=bool)
+
+        for i, prop in enumerate(proposals):
+            if prop is None:
+                continue
+            try:
+                smi = Chem.MolToSmiles(prop)
+                mol = Chem.MolFromSmiles(smi)  # full sanitization round-trip
+            except Exception:
+                continue
+            if mol is None:
+                continue
+            smiles[i] = Chem.MolToSmiles(mol)
+            mols[i] = mol
+            mw[i] = Descriptors.MolWt(mol)
+            heavy[i] = mol.GetNumHeavyAtoms()
+            valid[i] = True
+
+        lo, hi = self.mw_range
+        keep = valid & (mw >= lo) & (mw <= hi) & (heavy <= self.max_heavy_atoms)
+        if not keep.any():
+            return []
+
+        candidates = smiles[keep]
+        cand_mols = mols[keep]
+        # In-batch duplicates: keep the first occurrence, preserve proposal order
+        _, first_idx = np.unique(candidates.astype(str), return_index=True)
+        first_idx = np.sort(first_idx)
+        candidates = candidates[first_idx]
+        cand_mols = cand_mols[first_idx]
+        # Cross-batch duplicates (and seeds, unless include_seeds)
+        novel = np.fromiter((s not in seen for s in candidates), dtype=bool, count=len(candidates))
+        return list(zip(candidates[novel], cand_mols[novel]))
+
+    # ---------- public API ----------
+
+    def iter_candidates(self, target_id: str, num_molecules: int) -> Iterator[str]:
+        """
+        Stream valid, unique candidates in oversampled batches until
+        num_molecules have been produced, max_rounds is exhausted, or
+        `patience` rounds in a row produce nothing new.
+
+        Accepted molecules join the mutation pool, so R-group swaps walk
+        further away from the seeds as the request grows.
+        """
+        seen: Set[str] = set() if self.include_seeds else set(self._seed_canonical)
+        pool: List[Chem.Mol] = list(self._seed_mols)
+        produced = 0
+        stalled = 0
+
+        for _ in range(self.max_rounds):
+            remaining = num_molecules - produced
+            if remaining <= 0 or stalled >= self.patience:
+                return
+            batch_size = min(
+                self.max_batch,
+                max(self.min_batch, int(remaining * self.oversample)),
+            )
+
+            # Mutations produce plenty of invalid intermediates; keep RDKit quiet.
+            block = BlockLogs()
+            n_brics = batch_size // 2
+            proposals: List[Optional[Chem.Mol]] = [
+                self._brics_recombine() for _ in range(n_brics)
+            ]
+            proposals.extend(
+                self._r_group_swap(pool) for _ in range(batch_size - n_brics)
+            )
+            accepted = self._filter_batch(proposals, seen)
+            del block
+
+            stalled = 0 if accepted else stalled + 1
+            for smi, mol in accepted:
+                seen.add(smi)
+                if len(pool) < self.max_pool:
+                    pool.append(mol)
+                else:
+                    pool[self._rng.randrange(self.max_pool)] = mol
+                yield smi
+                produced += 1
+                if produced >= num_molecules:
+                    return
+
+    def generate(self, target_id: str, num_molecules: int) -> List[str]:
+        if num_molecules <= 0:
+            return []
+        smiles_list = list(islice(self.iter_candidates(target_id, num_molecules), num_molecules))
+        if len(smiles_list) < num_molecules:
+            # Mutation space is exhausted: top up with seeds not returned yet
+            # (candidates are canonical SMILES), never repeating a structure.
+            returned = set(smiles_list)
+            unused: Dict[str, str] = {}
+            for smi, mol in zip(self._seed_smiles, self._seed_mols):
+                canonical = Chem.MolToSmiles(mol)
+                if canonical not in returned:
+                    unused.setdefault(canonical, smi)
+            spare = list(unused.values())
+            self._rng.shuffle(spare)
+            smiles_list.extend(spare[:num_molecules - len(smiles_list)])
+            if len(smiles_list) < num_molecules:
+                print(f"[HybridGenerator] Only {len(smiles_list)} unique molecules for {target_id} "
+                      f"({num_molecules} requested)")
+        return smiles_list
+
+
 def get_generator() -> GeneratorBackend:
     """
-    Factory for the current generator backend.
+    Factory that returns the configured generator backend
+    (GENERATOR_BACKEND in core.config).
 
-    Later we can add a config flag (like for scoring) to switch between:
-      - library-based
+    Later we can add:
       - TamGen
       - others
     """
-    return LibraryGenerator()
+    if GENERATOR_BACKEND.lower() == "hybrid":
+        with model_load("generator_hybrid"):
+            return HybridGenerator()
+    with model_load("generator_library"):
+        return LibraryGenerator()
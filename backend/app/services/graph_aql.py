@@ -0,0 +1,275 @@
+"""
+AQL implementations of the target and drug graph views.
+
+Selected with ELYSIUM_GRAPH_BACKEND=arango. Each view is one AQL
+traversal over the collections the outbox replicator fills (molecules,
+binds, similar_to, targets, drugs), returning the same response models
+as the SQL versions in kg.py:
+
+- target view: INBOUND from the target over `binds`, then for each
+  molecule its best OUTBOUND `similar_to` edge.
+- drug view: INBOUND from the drug over `similar_to`, then each
+  molecule's best OUTBOUND `binds` edge and target.
+
+The vertex-centric persistent indexes from init_arango (binds
+[_to, score], similar_to [_from, tanimoto] / [_to, tanimoto]) let the
+traversals read edges already ordered by metric. Results are kept in a
+short-TTL cache (GRAPH_CACHE_TTL_SECONDS); Arango trails SQL by the
+replication lag anyway.
+
+Ordering matches SQL except between molecules with equal scores: SQL
+breaks ties by insertion order, AQL by run id and molecule index, so
+paging cursors (keyset on the sort key + run id/index) are not
+interchangeable between the two backends.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..arango_memory import memory_drug_graph, memory_target_graph, register_aql
+from ..arangodb_client import get_arango_db
+from ..core.config import GRAPH_CACHE_MAX_ENTRIES, GRAPH_CACHE_TTL_SECONDS
+from ..metrics import register_cache
+from ..schemas import (
+    DrugGraphEntry,
+    DrugGraphResponse,
+    MoleculeGraphEntry,
+    SimilarDrug,
+    TargetGraphResponse,
+)
+from .kg import GRAPH_SORT_KEYS, _drug_node_info
+from .pagination import decode_cursor, encode_cursor, page_limit
+from .replication import arango_key
+
+TARGET_GRAPH_AQL = """
+FOR m, b IN 1..1 INBOUND @target binds
+    LET sim = FIRST(
+        FOR d, s IN 1..1 OUTBOUND m similar_to
+            FILTER @min_cosine == null OR s.semantic >= @min_cosine
+            FILTER @min_tanimoto == null OR s.tanimoto >= @min_tanimoto
+            SORT s.tanimoto DESC, s._key
+            LIMIT 1
+            RETURN {name: d.name, smiles: d.smiles, indication: d.indication,
+                    tanimoto: s.tanimoto, semantic: s.semantic}
+    )
+    FILTER !@require_similar OR sim != null
+    LET metric = @sort_by == "tanimoto" ? sim.tanimoto : (@sort_by == "cosine" ? sim.semantic : b.score)
+    SORT metric DESC, b.score DESC, m.run_id, m.index
+    FILTER @after == null OR metric < @after[0] OR (metric == @after[0] AND (
+        b.score < @after[1] OR (b.score == @after[1] AND [m.run_id, m.index] > [@after[2], @after[3]])))
+    LIMIT @limit
+    RETURN {run_id: m.run_id, index: m.index, smiles: m.smiles, score: b.score, similar: sim, metric: metric}
+"""
+
+DRUG_GRAPH_AQL = """
+FOR d IN drugs
+    FILTER d.name == @name
+    SORT d._key
+    LIMIT 1
+    FOR m, s IN 1..1 INBOUND d similar_to
+        FILTER @min_cosine == null OR s.semantic >= @min_cosine
+        FILTER @min_tanimoto == null OR s.tanimoto >= @min_tanimoto
+        LET bind = FIRST(
+            FOR t, b IN 1..1 OUTBOUND m binds
+                SORT b.score DESC, b._key
+                LIMIT 1
+                RETURN {score: b.score, target_id: t.symbol}
+        )
+        LET score = bind.score != null ? bind.score : (s.tanimoto != null ? s.tanimoto : 0)
+        SORT score DESC, m.run_id, m.index
+        FILTER @after == null OR score < @after[0] OR (score == @after[0] AND [m.run_id, m.index] > [@after[1], @after[2]])
+        LIMIT @limit
+        RETURN {target_id: bind.target_id, run_id: m.run_id, index: m.index, smiles: m.smiles, score: score}
+"""
+
+
+# ---------- result cache ----------
+
+class _TTLCache:
+    """Small thread-safe LRU whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Tuple, value: Any) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_CACHE = _TTLCache(GRAPH_CACHE_TTL_SECONDS, GRAPH_CACHE_MAX_ENTRIES)
+
+
+def clear_graph_cache() -> None:
+    _CACHE.clear()
+
+
+def graph_cache_stats() -> Dict[str, int]:
+    return {"entries": len(_CACHE._entries), "hits": _CACHE.hits, "misses": _CACHE.misses}
+
+
+register_cache("graph_aql", graph_cache_stats)
+
+
+def _execute(db, query: str, bind_vars: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return list(db.aql.execute(query, bind_vars=bind_vars))
+
+
+# AQL LIMIT needs a number; "no limit"
+_NO_LIMIT = 2 ** 31
+
+
+def _page(rows: List[Dict[str, Any]], n: Optional[int], top_k: Optional[int], served: int):
+    """Trim the n+1 fetched rows to n; True if another page follows."""
+    if n is None:
+        return rows, False
+    has_more = len(rows) > n and (top_k is None or served + n < top_k)
+    return rows[:n], has_more
+
+
+# ---------- views ----------
+
+def get_target_graph_aql(
+    target_id: str,
+    min_cosine: Optional[float] = None,
+    min_tanimoto: Optional[float] = None,
+    sort_by: str = "score",
+    top_k: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db=None,
+) -> TargetGraphResponse:
+    """AQL version of kg.get_target_graph (same filters, sort keys and paging)."""
+    if sort_by not in GRAPH_SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {GRAPH_SORT_KEYS}, got {sort_by!r}")
+
+    cache_key = ("target", target_id, min_cosine, min_tanimoto, sort_by, top_k, limit, cursor, id(db))
+    cached = _CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    cursor_kind = f"target-graph-aql:{sort_by}"
+    after, served = None, 0
+    if cursor:
+        *after, served = decode_cursor(cursor, cursor_kind, 5)
+    n = page_limit(limit, top_k, served)
+
+    rows = [] if n == 0 else _execute(db or get_arango_db(), TARGET_GRAPH_AQL, {
+        "target": f"targets/{arango_key(target_id)}",
+        "min_cosine": min_cosine,
+        "min_tanimoto": min_tanimoto,
+        "require_similar": min_cosine is not None or min_tanimoto is not None,
+        "sort_by": sort_by,
+        "after": after,
+        "limit": _NO_LIMIT if n is None else n + 1,
+    })
+    rows, has_more = _page(rows, n, top_k, served)
+
+    entries: List[MoleculeGraphEntry] = []
+    for row in rows:
+        sim = row.get("similar")
+        entries.append(
+            MoleculeGraphEntry(
+                run_id=row.get("run_id") or "",
+                molecule_index=row.get("index") or 0,
+                smiles=row.get("smiles") or "",
+                score=row.get("score") or 0.0,
+                similar_drug=None if sim is None else SimilarDrug(
+                    name=sim["name"],
+                    smiles=sim.get("smiles") or "",
+                    indication=_drug_node_info(sim.get("indication")),
+                    similarity=sim.get("tanimoto") or 0.0,
+                    semantic_similarity=sim.get("semantic"),
+                ),
+            )
+        )
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(cursor_kind, last.get("metric"), last.get("score"),
+                                    last.get("run_id"), last.get("index"), served + len(rows))
+
+    result = TargetGraphResponse(target_id=target_id, molecules=entries, next_cursor=next_cursor)
+    _CACHE.put(cache_key, result)
+    return result
+
+
+def get_drug_graph_aql(
+    drug_name: str,
+    min_cosine: Optional[float] = None,
+    min_tanimoto: Optional[float] = None,
+    top_k: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db=None,
+) -> DrugGraphResponse:
+    """AQL version of kg.get_drug_graph."""
+    cache_key = ("drug", drug_name, min_cosine, min_tanimoto, top_k, limit, cursor, id(db))
+    cached = _CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    after, served = None, 0
+    if cursor:
+        *after, served = decode_cursor(cursor, "drug-graph-aql", 4)
+    n = page_limit(limit, top_k, served)
+
+    rows = [] if n == 0 else _execute(db or get_arango_db(), DRUG_GRAPH_AQL, {
+        "name": drug_name,
+        "min_cosine": min_cosine,
+        "min_tanimoto": min_tanimoto,
+        "after": after,
+        "limit": _NO_LIMIT if n is None else n + 1,
+    })
+    rows, has_more = _page(rows, n, top_k, served)
+
+    result = DrugGraphResponse(
+        drug_name=drug_name,
+        molecules=[
+            DrugGraphEntry(
+                target_id=row.get("target_id") or "",
+                run_id=row.get("run_id") or "",
+                molecule_index=row.get("index") or 0,
+                smiles=row.get("smiles") or "",
+                score=row.get("score") or 0.0,
+            )
+            for row in rows
+        ],
+        next_cursor=encode_cursor("drug-graph-aql", rows[-1].get("score"), rows[-1].get("run_id"),
+                                  rows[-1].get("index"), served + len(rows)) if has_more else None,
+    )
+    _CACHE.put(cache_key, result)
+    return result
+
+
+# The in-memory stand-in (ARANGO_BACKEND=memory) runs the Python twins of these queries
+register_aql(TARGET_GRAPH_AQL, memory_target_graph)
+register_aql(DRUG_GRAPH_AQL, memory_drug_graph)
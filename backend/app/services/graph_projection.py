@@ -0,0 +1,568 @@
+"""
+In-memory projection of the SQL knowledge graph for multi-hop queries.
+
+kg_nodes get dense integer ids (0..N-1) and every relation gets two
+compressed-sparse-row adjacencies (forward: source -> target, reverse:
+target -> source). Each CSR row is sorted by edge weight, highest first,
+so a fan-out limit of k is simply the first k entries of the row.
+
+The projection is loaded from SQL once (at startup, or lazily on first
+use) and then kept current with the GraphDelta that attach_run_to_kg
+returns: new nodes are appended, new edges go to a small per-row delta
+buffer that is merged into the CSR arrays once it grows large.
+
+Runs committed by other processes (gunicorn workers) are picked up by
+sync(): before serving, get_projection reads the kg_nodes rows above the
+highest id this projection has seen, plus the edges leaving them, at most
+every GRAPH_SYNC_INTERVAL_SECONDS. Ids skipped by transactions that had
+not committed yet are re-checked for GRAPH_SYNC_GAP_SECONDS.
+
+Usage:
+    projection = get_projection(db)
+    projection.neighborhood([node_id], hops=2, relations=["BINDS", "SIMILAR_TO"])
+    projection.paths(source_id, target_id, max_hops=3)
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import (
+    GRAPH_MAX_FANOUT,
+    GRAPH_MAX_NODES,
+    GRAPH_SYNC_GAP_SECONDS,
+    GRAPH_SYNC_INTERVAL_SECONDS,
+)
+from ..models import KGEdge, KGNode
+from ..schemas import GraphEdge, GraphNeighborhoodResponse, GraphNode, GraphPath, GraphPathsResponse
+
+DIRECTIONS = ("out", "in", "both")
+
+# Merge delta buffers into the CSR arrays past this many buffered edges
+# (or 1/8 of the relation's base edges, whichever is larger).
+_COMPACT_MIN_EDGES = 20000
+
+_LOAD_BATCH = 50000
+
+# Node ids per `source_id IN (...)` query when syncing
+_SYNC_CHUNK = 500
+# Unseen ids below the sync mark re-checked at most (oldest dropped first)
+_SYNC_MAX_GAPS = 5000
+
+
+class GraphDelta(NamedTuple):
+    """Rows written by one attach_run_to_kg call, applied after commit."""
+    nodes: List[dict]  # id, node_type, name, external_id, smiles
+    edges: List[dict]  # source_id, target_id, relation, weight
+
+
+def _weight_or_nan(weight: Optional[float]) -> float:
+    return float("nan") if weight is None else float(weight)
+
+
+def _build_csr(num_nodes: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray):
+    """CSR (indptr, indices, weights) with each row sorted by weight descending."""
+    sort_key = np.where(np.isnan(weights), -np.inf, weights)
+    order = np.lexsort((-sort_key, src))
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), weights[order].astype(np.float32)
+
+
+class _Adjacency:
+    """One direction of one relation: CSR arrays plus a per-row delta buffer."""
+
+    def __init__(self, num_nodes: int, src: np.ndarray, dst: np.ndarray, weights: np.ndarray):
+        self.indptr, self.indices, self.weights = _build_csr(num_nodes, src, dst, weights)
+        self.delta: Dict[int, List[Tuple[int, float]]] = {}
+        self.delta_edges = 0
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices) + self.delta_edges
+
+    def add(self, src: int, dst: int, weight: float) -> None:
+        self.delta.setdefault(src, []).append((dst, weight))
+        self.delta_edges += 1
+
+    def has_edge(self, node: int, other: int) -> bool:
+        if node + 1 < len(self.indptr):
+            start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+            if end > start and bool(np.any(self.indices[start:end] == other)):
+                return True
+        return any(nbr == other for nbr, _ in self.delta.get(node, ()))
+
+    def row(self, node: int, limit: Optional[int]) -> List[Tuple[int, float]]:
+        """Neighbors of `node` as (neighbor, weight), best weight first, at most `limit`."""
+        base: List[Tuple[int, float]] = []
+        if node + 1 < len(self.indptr):
+            start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+            if limit is not None:
+                end = min(end, start + limit)
+            base = list(zip(self.indices[start:end].tolist(), self.weights[start:end].tolist()))
+
+        extra = self.delta.get(node)
+        if not extra:
+            return base
+        merged = sorted(base + extra, key=lambda nw: -np.inf if nw[1] != nw[1] else nw[1], reverse=True)
+        return merged if limit is None else merged[:limit]
+
+    def needs_compaction(self) -> bool:
+        return self.delta_edges > max(_COMPACT_MIN_EDGES, len(self.indices) // 8)
+
+    def compact(self, num_nodes: int) -> None:
+        counts = np.diff(self.indptr)
+        src = [np.repeat(np.arange(len(counts), dtype=np.int64), counts)]
+        dst = [self.indices.astype(np.int64)]
+        weights = [self.weights.astype(np.float64)]
+        if self.delta:
+            pairs = [(s, d, w) for s, row in self.delta.items() for d, w in row]
+            src.append(np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs)))
+            dst.append(np.fromiter((p[1] for p in pairs), dtype=np.int64, count=len(pairs)))
+            weights.append(np.fromiter((p[2] for p in pairs), dtype=np.float64, count=len(pairs)))
+        self.indptr, self.indices, self.weights = _build_csr(
+            num_nodes, np.concatenate(src), np.concatenate(dst), np.concatenate(weights)
+        )
+        self.delta = {}
+        self.delta_edges = 0
+
+
+class GraphProjection:
+    """CSR snapshot of kg_nodes / kg_edges with incremental updates."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Dense index -> node attributes (plain lists so appends are cheap)
+        self._sql_ids: List[int] = []
+        self._types: List[str] = []
+        self._names: List[str] = []
+        self._external_ids: List[Optional[str]] = []
+        self._smiles: List[Optional[str]] = []
+        # kg_nodes.id -> dense index; (node_type, external_id or name) -> dense index
+        self._index: Dict[int, int] = {}
+        self._keys: Dict[Tuple[str, str], int] = {}
+        # relation -> (forward, reverse)
+        self._relations: Dict[str, Tuple[_Adjacency, _Adjacency]] = {}
+        # Highest kg_nodes.id read from SQL, and ids below it not seen yet
+        # (their transaction may still commit) -> when they were first missed
+        self._sync_lock = threading.Lock()
+        self._sync_mark = 0
+        self._sync_gaps: Dict[int, float] = {}
+        self._synced_at = time.monotonic()
+
+    # ---------- building ----------
+
+    def _add_node(self, sql_id: int, node_type: str, name: str,
+                  external_id: Optional[str], smiles: Optional[str]) -> None:
+        if sql_id in self._index:
+            return
+        idx = len(self._sql_ids)
+        self._index[sql_id] = idx
+        self._sql_ids.append(sql_id)
+        self._types.append(node_type)
+        self._names.append(name)
+        self._external_ids.append(external_id)
+        self._smiles.append(smiles)
+        # Same "first node wins" rule as the SQL views
+        if external_id:
+            self._keys.setdefault((node_type, external_id), idx)
+        self._keys.setdefault((node_type, name), idx)
+
+    @classmethod
+    def from_sql(cls, db: Session) -> "GraphProjection":
+        projection = cls()
+        for row in db.execute(
+            select(KGNode.id, KGNode.node_type, KGNode.name, KGNode.external_id, KGNode.smiles)
+            .order_by(KGNode.id)
+            .execution_options(yield_per=_LOAD_BATCH)
+        ):
+            projection._add_node(*row)
+        projection._sync_mark = max(projection._sql_ids, default=0)
+
+        by_relation: Dict[str, Tuple[list, list, list]] = {}
+        index = projection._index
+        for relation, source_id, target_id, weight in db.execute(
+            select(KGEdge.relation, KGEdge.source_id, KGEdge.target_id, KGEdge.weight)
+            .execution_options(yield_per=_LOAD_BATCH)
+        ):
+            if relation is None or source_id not in index or target_id not in index:
+                continue
+            src, dst, weights = by_relation.setdefault(relation, ([], [], []))
+            src.append(index[source_id])
+            dst.append(index[target_id])
+            weights.append(_weight_or_nan(weight))
+
+        num_nodes = len(projection._sql_ids)
+        for relation, (src, dst, weights) in by_relation.items():
+            src_arr = np.asarray(src, dtype=np.int64)
+            dst_arr = np.asarray(dst, dtype=np.int64)
+            w_arr = np.asarray(weights, dtype=np.float64)
+            projection._relations[relation] = (
+                _Adjacency(num_nodes, src_arr, dst_arr, w_arr),
+                _Adjacency(num_nodes, dst_arr, src_arr, w_arr),
+            )
+        return projection
+
+    def apply(self, delta: GraphDelta) -> None:
+        """
+        Add the nodes and edges of a committed attach_run_to_kg call.
+
+        Every edge a run writes starts at one of its new generated-molecule
+        nodes, so edges are only added for nodes this delta introduces:
+        applying a delta that is already part of the SQL snapshot is a no-op.
+        """
+        with self._lock:
+            new_nodes = {node["id"] for node in delta.nodes if node["id"] not in self._index}
+            for node in delta.nodes:
+                self._add_node(node["id"], node["node_type"], node["name"],
+                               node.get("external_id"), node.get("smiles"))
+
+            empty = np.zeros(0, dtype=np.int64)
+            num_nodes = len(self._sql_ids)
+            touched: Set[str] = set()
+            for edge in delta.edges:
+                if edge["source_id"] not in new_nodes:
+                    continue
+                src = self._index.get(edge["source_id"])
+                dst = self._index.get(edge["target_id"])
+                if src is None or dst is None:
+                    continue
+                relation = edge["relation"]
+                if relation not in self._relations:
+                    self._relations[relation] = (
+                        _Adjacency(num_nodes, empty, empty, empty.astype(np.float64)),
+                        _Adjacency(num_nodes, empty, empty, empty.astype(np.float64)),
+                    )
+                forward, reverse = self._relations[relation]
+                weight = _weight_or_nan(edge.get("weight"))
+                forward.add(src, dst, weight)
+                reverse.add(dst, src, weight)
+                touched.add(relation)
+
+            for relation in touched:
+                for adjacency in self._relations[relation]:
+                    if adjacency.needs_compaction():
+                        adjacency.compact(num_nodes)
+
+    def sync(self, db: Session, force: bool = False) -> int:
+        """
+        Apply runs other processes committed since the last sync; returns
+        the number of new nodes. Every edge a run writes leaves one of its
+        new nodes and commits with it, so the edges of the new nodes are
+        all there is to read. Rate-limited by GRAPH_SYNC_INTERVAL_SECONDS
+        unless `force`; concurrent callers do not wait for a running sync.
+        """
+        now = time.monotonic()
+        if not force and now - self._synced_at < GRAPH_SYNC_INTERVAL_SECONDS:
+            return 0
+        if not self._sync_lock.acquire(blocking=force):
+            return 0
+        try:
+            self._synced_at = now
+            mark = self._sync_mark
+            condition = KGNode.id > mark
+            if self._sync_gaps:
+                condition = condition | KGNode.id.in_(list(self._sync_gaps))
+            rows = db.execute(
+                select(KGNode.id, KGNode.node_type, KGNode.name, KGNode.external_id, KGNode.smiles)
+                .where(condition)
+                .order_by(KGNode.id)
+            ).all()
+
+            seen = {row.id for row in rows}
+            for node_id in seen:
+                self._sync_gaps.pop(node_id, None)
+            top = max(seen, default=mark)
+            if top > mark:
+                # Ids allocated to transactions that have not committed yet
+                for node_id in range(mark + 1, top):
+                    if node_id not in seen and node_id not in self._index:
+                        self._sync_gaps[node_id] = now
+                self._sync_mark = top
+            for node_id, missed_at in list(self._sync_gaps.items()):
+                if now - missed_at > GRAPH_SYNC_GAP_SECONDS:
+                    del self._sync_gaps[node_id]
+            while len(self._sync_gaps) > _SYNC_MAX_GAPS:
+                del self._sync_gaps[next(iter(self._sync_gaps))]
+
+            new_ids = [row.id for row in rows if row.id not in self._index]
+            if not new_ids:
+                return 0
+            edges: List[dict] = []
+            for start in range(0, len(new_ids), _SYNC_CHUNK):
+                edges.extend(
+                    {"source_id": e.source_id, "target_id": e.target_id, "relation": e.relation, "weight": e.weight}
+                    for e in db.execute(
+                        select(KGEdge.source_id, KGEdge.target_id, KGEdge.relation, KGEdge.weight)
+                        .where(KGEdge.source_id.in_(new_ids[start:start + _SYNC_CHUNK]))
+                    )
+                )
+            self.apply(GraphDelta(nodes=[dict(row._mapping) for row in rows], edges=edges))
+            return len(new_ids)
+        finally:
+            self._sync_lock.release()
+
+    # ---------- lookups ----------
+
+    def resolve(self, node_type: str, key: str) -> Optional[int]:
+        """kg_nodes.id for a node given by external_id or name (e.g. target EGFR, drug Aspirin)."""
+        idx = self._keys.get((node_type, key))
+        return None if idx is None else self._sql_ids[idx]
+
+    def resolve_ref(self, ref: str) -> Optional[int]:
+        """
+        kg_nodes.id for an API node reference: "<node_type>:<external_id or name>"
+        (e.g. "target:EGFR", "drug:Aspirin", "generated_molecule:<run_id>:0")
+        or a bare kg_nodes.id.
+        """
+        if ref.isdigit():
+            return int(ref) if int(ref) in self._index else None
+        node_type, sep, key = ref.partition(":")
+        return self.resolve(node_type, key) if sep else None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "nodes": len(self._sql_ids),
+                "relations": {rel: fwd.num_edges for rel, (fwd, _) in self._relations.items()},
+            }
+
+    def _graph_node(self, idx: int) -> GraphNode:
+        return GraphNode(
+            id=self._sql_ids[idx],
+            node_type=self._types[idx],
+            name=self._names[idx],
+            external_id=self._external_ids[idx],
+            smiles=self._smiles[idx],
+        )
+
+    def _steps(self, relations: Optional[Sequence[str]], direction: str) -> List[Tuple[str, bool, _Adjacency]]:
+        """(relation, is_forward, adjacency) pairs to expand for a traversal."""
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}, got {direction!r}")
+        names = self._relations.keys() if relations is None else [r for r in relations if r in self._relations]
+        steps = []
+        for relation in names:
+            forward, reverse = self._relations[relation]
+            if direction in ("out", "both"):
+                steps.append((relation, True, forward))
+            if direction in ("in", "both"):
+                steps.append((relation, False, reverse))
+        return steps
+
+    def _expand(self, idx: int, steps, max_fanout: Optional[int]) -> List[Tuple[int, str, bool, float]]:
+        """Neighbors of one node over all steps, best weight first, at most max_fanout in total."""
+        found = []
+        for relation, is_forward, adjacency in steps:
+            for nbr, weight in adjacency.row(idx, max_fanout):
+                found.append((nbr, relation, is_forward, weight))
+        if max_fanout is not None and len(found) > max_fanout:
+            found.sort(key=lambda f: -np.inf if f[3] != f[3] else f[3], reverse=True)
+            found = found[:max_fanout]
+        return found
+
+    # ---------- traversals ----------
+
+    def neighborhood(
+        self,
+        seed_ids: Iterable[int],
+        hops: int = 1,
+        relations: Optional[Sequence[str]] = None,
+        direction: str = "both",
+        max_fanout: Optional[int] = GRAPH_MAX_FANOUT,
+        max_nodes: int = GRAPH_MAX_NODES,
+    ) -> GraphNeighborhoodResponse:
+        """
+        Breadth-first k-hop neighborhood of the seed nodes (kg_nodes.id).
+
+        Each visited node expands at most `max_fanout` edges (highest weight
+        first); expansion stops once `max_nodes` nodes have been reached.
+        `truncated` tells the caller that either limit cut something off.
+        """
+        with self._lock:
+            steps = self._steps(relations, direction)
+            seeds = [s for s in seed_ids if s in self._index]
+            visited: Dict[int, int] = {self._index[s]: 0 for s in seeds}
+            frontier = list(visited)
+            edges: Dict[Tuple[int, int, str], Optional[float]] = {}
+            truncated = False
+
+            for depth in range(1, hops + 1):
+                next_frontier = []
+                for idx in frontier:
+                    found = self._expand(idx, steps, None if max_fanout is None else max_fanout + 1)
+                    if max_fanout is not None and len(found) > max_fanout:
+                        found = found[:max_fanout]
+                        truncated = True
+                    for nbr, relation, is_forward, weight in found:
+                        if nbr not in visited:
+                            if len(visited) >= max_nodes:
+                                truncated = True
+                                continue
+                            visited[nbr] = depth
+                            next_frontier.append(nbr)
+                        src, dst = (idx, nbr) if is_forward else (nbr, idx)
+                        edges[(src, dst, relation)] = None if weight != weight else weight
+                frontier = next_frontier
+                if not frontier:
+                    break
+
+            return GraphNeighborhoodResponse(
+                seeds=seeds,
+                hops=hops,
+                nodes=[self._graph_node(idx) for idx in visited],
+                edges=[
+                    GraphEdge(source=self._sql_ids[s], target=self._sql_ids[d], relation=rel, weight=w)
+                    for (s, d, rel), w in edges.items()
+                ],
+                truncated=truncated,
+            )
+
+    def paths(
+        self,
+        source_id: int,
+        target_id: int,
+        max_hops: int = 3,
+        relations: Optional[Sequence[str]] = None,
+        direction: str = "both",
+        max_fanout: Optional[int] = GRAPH_MAX_FANOUT,
+        max_paths: int = 20,
+    ) -> GraphPathsResponse:
+        """
+        Simple paths from source to target (kg_nodes.id), shortest first.
+
+        A fan-out-limited BFS back from the target gives nearby nodes their
+        hop distance to the target; the forward DFS (also fan-out limited)
+        only steps onto nodes that can still reach the target within the
+        remaining hops, and the final hop is an exact adjacency test. The
+        search stays proportional to the paths that exist rather than to
+        max_fanout ** max_hops.
+        """
+        with self._lock:
+            paths: List[GraphPath] = []
+            src = self._index.get(source_id)
+            dst = self._index.get(target_id)
+            if src is None or dst is None:
+                return GraphPathsResponse(source=source_id, target=target_id, paths=[], nodes=[])
+
+            steps = self._steps(relations, direction)
+            back_direction = {"out": "in", "in": "out", "both": "both"}[direction]
+            back_steps = self._steps(relations, back_direction)
+
+            # Hop distance to the target, up to max_hops - 1 (only used to
+            # prune nodes two or more hops out; the last hop is tested exactly)
+            dist = {dst: 0}
+            frontier = [dst]
+            for depth in range(1, max_hops - 1):
+                next_frontier = []
+                for idx in frontier:
+                    for nbr, _, _, _ in self._expand(idx, back_steps, max_fanout):
+                        if nbr not in dist:
+                            dist[nbr] = depth
+                            next_frontier.append(nbr)
+                frontier = next_frontier
+
+            node_path = [src]
+            rel_path: List[str] = []
+            on_path = {src}
+
+            def walk(idx: int, remaining: int) -> None:
+                if remaining == 1:
+                    # Last hop: exact adjacency test, not limited by fan-out
+                    for relation in dict.fromkeys(r for r, _, adj in steps if adj.has_edge(idx, dst)):
+                        if len(paths) >= max_paths:
+                            return
+                        paths.append(GraphPath(
+                            nodes=[self._sql_ids[i] for i in node_path + [dst]],
+                            relations=rel_path + [relation],
+                        ))
+                    return
+                for nbr, relation, _, _ in self._expand(idx, steps, max_fanout):
+                    if len(paths) >= max_paths:
+                        return
+                    if nbr == dst or nbr in on_path:
+                        continue
+                    if remaining > 2 and dist.get(nbr, max_hops) > remaining - 1:
+                        continue
+                    node_path.append(nbr)
+                    rel_path.append(relation)
+                    on_path.add(nbr)
+                    walk(nbr, remaining - 1)
+                    on_path.discard(nbr)
+                    rel_path.pop()
+                    node_path.pop()
+
+            if src != dst:
+                for length in range(1, max_hops + 1):
+                    if len(paths) >= max_paths:
+                        break
+                    walk(src, length)
+
+            members = {self._index[n] for p in paths for n in p.nodes}
+            return GraphPathsResponse(
+                source=source_id,
+                target=target_id,
+                paths=paths,
+                nodes=[self._graph_node(idx) for idx in sorted(members)],
+            )
+
+
+# ---------- process-wide projection ----------
+
+_PROJECTION: Optional[GraphProjection] = None
+_STATE_LOCK = threading.Lock()
+_LOAD_LOCK = threading.Lock()
+# Deltas committed while a (re)load is reading SQL; replayed onto the new projection
+_PENDING: Optional[List[GraphDelta]] = None
+
+
+def load_projection(db: Session) -> GraphProjection:
+    """(Re)build the projection from SQL and make it the process-wide one."""
+    global _PROJECTION, _PENDING
+    with _STATE_LOCK:
+        _PENDING = []
+    try:
+        projection = GraphProjection.from_sql(db)
+    except Exception:
+        with _STATE_LOCK:
+            _PENDING = None
+        raise
+    with _STATE_LOCK:
+        for delta in _PENDING:
+            projection.apply(delta)
+        _PENDING = None
+        _PROJECTION = projection
+
+    stats = projection.stats()
+    print(f"[graph] Projection loaded: {stats['nodes']} nodes, {stats['relations']}")
+    return projection
+
+
+def get_projection(db: Session) -> GraphProjection:
+    """
+    The loaded projection, building it from `db` on first use and
+    syncing it with runs committed by other processes otherwise.
+    """
+    if _PROJECTION is None:
+        with _LOAD_LOCK:
+            if _PROJECTION is None:
+                return load_projection(db)
+    projection = _PROJECTION
+    projection.sync(db)
+    return projection
+
+
+def apply_graph_delta(delta: Optional[GraphDelta]) -> None:
+    """Apply a committed run's KG rows; a no-op until the projection is loaded."""
+    if delta is None:
+        return
+    with _STATE_LOCK:
+        if _PENDING is not None:
+            _PENDING.append(delta)
+        projection = _PROJECTION
+    if projection is not None:
+        projection.apply(delta)
@@ -6,308 +6,577 @@ We store a very simple graph in SQL:
   - KGEdge: SIMILAR_TO, BINDS
 """
 
-from typing import List, Optional
-
-from sqlalchemy.orm import Session
-
-from ..models import KGNode, KGEdge, DiscoveryRun
+import json
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from ..core.config import TARGET_SUMMARY_TOP_N
+from ..models import KGNode, KGEdge, KGTargetSummary, DiscoveryRun
+from .graph_projection import GraphDelta
+from .pagination import decode_cursor, encode_cursor, page_limit
 from ..schemas import (
     Molecule,
     SimilarDrug,
     MoleculeGraphEntry,
     TargetGraphResponse,
+    TargetGraphSummary,
     DrugGraphEntry,
     DrugGraphResponse,
 )
 
-def _get_or_create_target_node(db: Session, target_id: str) -> KGNode:
-    node = (
-        db.query(KGNode)
-        .filter(KGNode.node_type == "target", KGNode.external_id == target_id)
-        .first()
-    )
-    if node:
-        return node
-
-    node = KGNode(
-        node_type="target",
-        external_id=target_id,
-        name=target_id,
-        info=f"Target protein {target_id}",
-    )
-    db.add(node)
-    db.flush()
-    return node
+# Keep IN (...) lists well under SQLite's bound-parameter limit.
+_IN_CHUNK = 500
 
 
-def _get_or_create_drug_node(
-    db: Session,
-    name: str,
-    smiles: Optional[str],
-    indication: Optional[str],
-) -> KGNode:
-    node = (
-        db.query(KGNode)
-        .filter(KGNode.node_type == "drug", KGNode.name == name)
-        .first()
-    )
-    if node:
-        return node
-
-    info_parts = []
-    if indication:
-        info_parts.append(f"Indication: {indication}")
-    info = " ".join(info_parts) if info_parts else None
-
-    node = KGNode(
-        node_type="drug",
-        external_id=None,
-        name=name,
-        smiles=smiles,
-        info=info,
+def _insert_nodes(db: Session, rows: List[dict]) -> List[int]:
+    """Bulk-insert KG nodes and return their ids in input order."""
+    if not rows:
+        return []
+    return list(
+        db.scalars(
+            insert(KGNode).returning(KGNode.id, sort_by_parameter_order=True),
+            rows,
+        )
     )
-    db.add(node)
-    db.flush()
-    return node
 
 
-def _create_generated_molecule_node(
-    db: Session,
-    run: DiscoveryRun,
-    index: int,
-    mol: Molecule,
-) -> KGNode:
-    ext_id = f"{run.id}:{index}"
-    info = f"Generated in run {run.id} for target {run.target_id}"
-    node = KGNode(
-        node_type="generated_molecule",
-        external_id=ext_id,
-        name=f"gen_{run.id[:8]}_{index}",
-        smiles=mol.smiles,
-        info=info,
+def _get_or_create_target_node(db: Session, target_id: str) -> Tuple[int, Optional[dict]]:
+    """Target node id, plus the new node's row if it had to be created."""
+    node_id = db.scalar(
+        select(KGNode.id)
+        .where(KGNode.node_type == "target", KGNode.external_id == target_id)
+        .limit(1)
     )
-    db.add(node)
-    db.flush()
-    return node
+    if node_id is not None:
+        return node_id, None
 
+    row = {
+        "node_type": "target",
+        "external_id": target_id,
+        "name": target_id,
+        "info": f"Target protein {target_id}",
+    }
+    row["id"] = _insert_nodes(db, [row])[0]
+    return row["id"], row
 
-def attach_run_to_kg(db: Session, run: DiscoveryRun, molecules: List[Molecule]) -> None:
+
+def _drug_node_info(indication: Optional[str]) -> Optional[str]:
+    return f"Indication: {indication}" if indication else None
+
+
+def _resolve_drug_nodes(db: Session, drugs: Dict[str, SimilarDrug]) -> Tuple[Dict[str, int], List[dict]]:
+    """
+    Map drug name -> KG node id for every drug referenced by a run,
+    creating missing drug nodes in one bulk insert (their rows are
+    returned as well).
+    """
+    names = list(drugs)
+    node_ids: Dict[str, int] = {}
+    for i in range(0, len(names), _IN_CHUNK):
+        chunk = names[i:i + _IN_CHUNK]
+        for name, node_id in db.execute(
+            select(KGNode.name, KGNode.id)
+            .where(KGNode.node_type == "drug", KGNode.name.in_(chunk))
+            .order_by(KGNode.id)
+        ):
+            node_ids.setdefault(name, node_id)
+
+    missing = [name for name in names if name not in node_ids]
+    new_rows = [
+        {
+            "node_type": "drug",
+            "external_id": None,
+            "name": name,
+            "smiles": drugs[name].smiles,
+            "info": _drug_node_info(drugs[name].indication),
+        }
+        for name in missing
+    ]
+    for row, node_id in zip(new_rows, _insert_nodes(db, new_rows)):
+        row["id"] = node_id
+        node_ids[row["name"]] = node_id
+    return node_ids, new_rows
+
+
+def attach_run_to_kg(db: Session, run: DiscoveryRun, molecules: List[Molecule]) -> GraphDelta:
     """
     For each generated molecule:
       - create a KG node
       - link to the target with BINDS
       - link to most similar known drug with SIMILAR_TO
+
+    Everything is written with bulk INSERTs: target and drug nodes are
+    resolved once per run into an in-memory map, generated-molecule nodes
+    are inserted in one statement (RETURNING their ids), then all edges.
+
+    Returns the new nodes and edges as a GraphDelta; apply it to the
+    in-memory graph projection once the transaction has committed.
     """
-    # Make sure target node exists
-    target_node = _get_or_create_target_node(db, run.target_id)
+    target_node_id, target_row = _get_or_create_target_node(db, run.target_id)
 
-    for idx, mol in enumerate(molecules):
-        gen_node = _create_generated_molecule_node(db, run, idx, mol)
+    drugs = {m.similar_drug.name: m.similar_drug for m in molecules if m.similar_drug is not None}
+    drug_node_ids, new_nodes = _resolve_drug_nodes(db, drugs)
+    if target_row is not None:
+        new_nodes.append(target_row)
 
+    info = f"Generated in run {run.id} for target {run.target_id}"
+    gen_rows = [
+        {
+            "node_type": "generated_molecule",
+            "external_id": f"{run.id}:{idx}",
+            "name": f"gen_{run.id[:8]}_{idx}",
+            "smiles": mol.smiles,
+            "info": info,
+        }
+        for idx, mol in enumerate(molecules)
+    ]
+    gen_node_ids = _insert_nodes(db, gen_rows)
+    for row, node_id in zip(gen_rows, gen_node_ids):
+        row["id"] = node_id
+    new_nodes.extend(gen_rows)
+
+    edges: List[dict] = []
+    for gen_node_id, mol in zip(gen_node_ids, molecules):
         # BINDS edge: generated molecule -> target
-        bind_edge = KGEdge(
-            source_id=gen_node.id,
-            target_id=target_node.id,
-            relation="BINDS",
-            weight=mol.score,  # use predicted affinity score
-            extra=None,
-        )
-        db.add(bind_edge)
+        edges.append({
+            "source_id": gen_node_id,
+            "target_id": target_node_id,
+            "relation": "BINDS",
+            "weight": mol.score,  # use predicted affinity score
+            "tanimoto": None,
+            "cosine": None,
+            "extra": None,
+        })
 
         # SIMILAR_TO edge: generated molecule -> known drug (if available)
         if mol.similar_drug is not None:
             drug = mol.similar_drug
-            drug_node = _get_or_create_drug_node(
-                db,
-                name=drug.name,
-                smiles=drug.smiles,
-                indication=drug.indication,
-            )
+            semantic = mol.similar_drug_semantic
+
+            edges.append({
+                "source_id": gen_node_id,
+                "target_id": drug_node_ids[drug.name],
+                "relation": "SIMILAR_TO",
+                "weight": drug.similarity,
+                "tanimoto": drug.similarity,
+                "cosine": semantic.semantic_similarity if semantic is not None else None,
+                "extra": None,
+            })
+
+    if edges:
+        db.execute(insert(KGEdge), edges)
+
+    _update_target_summary(db, run.target_id, [
+        MoleculeGraphEntry(
+            run_id=run.id,
+            molecule_index=idx,
+            smiles=mol.smiles,
+            score=mol.score,
+            similar_drug=None if mol.similar_drug is None else SimilarDrug(
+                name=mol.similar_drug.name,
+                smiles=mol.similar_drug.smiles,
+                indication=_drug_node_info(mol.similar_drug.indication),
+                similarity=mol.similar_drug.similarity,
+                semantic_similarity=(
+                    mol.similar_drug_semantic.semantic_similarity
+                    if mol.similar_drug_semantic is not None else None
+                ),
+            ),
+        )
+        for idx, mol in enumerate(molecules)
+    ])
+    return GraphDelta(nodes=new_nodes, edges=edges)
+
+
+def _parse_external_id(external_id: Optional[str]) -> Tuple[str, int]:
+    """Parse run_id and index from a generated-molecule external_id like "runid:index"."""
+    run_id = ""
+    molecule_index = 0
+    if external_id and ":" in external_id:
+        run_part, idx_part = external_id.split(":", 1)
+        run_id = run_part
+        try:
+            molecule_index = int(idx_part)
+        except ValueError:
+            molecule_index = 0
+    return run_id, molecule_index
+
+
+def _node_id_subquery(node_type: str, column, value: str):
+    """Scalar subquery for the first KG node of `node_type` matching column == value."""
+    return (
+        select(KGNode.id)
+        .where(KGNode.node_type == node_type, column == value)
+        .order_by(KGNode.id)
+        .limit(1)
+        .scalar_subquery()
+    )
 
-            extra_parts = []
-            extra_parts.append(f"Tanimoto={drug.similarity:.4f}")
-            if (
-                mol.similar_drug_semantic is not None
-                and mol.similar_drug_semantic.semantic_similarity is not None
-            ):
-                extra_parts.append(
-                    f"chemBERTa_cosine={mol.similar_drug_semantic.semantic_similarity:.4f}"
-                )
-            extra = "; ".join(extra_parts) if extra_parts else None
-
-            sim_edge = KGEdge(
-                source_id=gen_node.id,
-                target_id=drug_node.id,
-                relation="SIMILAR_TO",
-                weight=drug.similarity,
-                extra=extra,
-            )
-            db.add(sim_edge)
 
-def get_target_graph(db: Session, target_id: str) -> TargetGraphResponse:
+def _similar_to_filters(sim, min_cosine: Optional[float], min_tanimoto: Optional[float]) -> list:
+    """SQL conditions on a SIMILAR_TO edge alias for the optional metric thresholds."""
+    conditions = []
+    if min_cosine is not None:
+        conditions.append(sim.cosine >= min_cosine)
+    if min_tanimoto is not None:
+        conditions.append(sim.tanimoto >= min_tanimoto)
+    return conditions
+
+
+# Orderings for get_target_graph(sort_by=...)
+GRAPH_SORT_KEYS = ("score", "tanimoto", "cosine")
+
+
+def _after_desc(column, value):
+    """Rows strictly after a non-NULL `value` in `column DESC NULLS LAST` order."""
+    return or_(column < value, column.is_(None))
+
+
+def get_target_graph(
+    db: Session,
+    target_id: str,
+    min_cosine: Optional[float] = None,
+    min_tanimoto: Optional[float] = None,
+    sort_by: str = "score",
+    top_k: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> TargetGraphResponse:
     """
     Build a simple graph view for a target:
 
     - Find the target node.
     - Find all BINDS edges (generated molecule -> target).
     - For each generated molecule, find its SIMILAR_TO edge to a known drug.
+
+    All three steps are one query: BINDS edges joined to their generated
+    molecule, outer-joined to its best SIMILAR_TO edge (highest weight,
+    picked by a correlated subquery, so there is one row per molecule)
+    and that edge's drug node.
+
+    min_cosine / min_tanimoto keep only molecules with a SIMILAR_TO edge
+    meeting the thresholds; sort_by orders by binding score (default) or
+    by the similar drug's Tanimoto / cosine. Both are evaluated in SQL on
+    the typed edge columns.
+
+    top_k (best k overall) and limit (page size) become the query's LIMIT;
+    next_cursor continues after the last row (keyset on the sort key and
+    the BINDS edge id).
     """
-    target_node = (
-        db.query(KGNode)
-        .filter(KGNode.node_type == "target", KGNode.external_id == target_id)
-        .first()
+    if sort_by not in GRAPH_SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {GRAPH_SORT_KEYS}, got {sort_by!r}")
+
+    gen = aliased(KGNode)
+    drug = aliased(KGNode)
+    bind = aliased(KGEdge)
+    sim = aliased(KGEdge)
+    best = aliased(KGEdge)
+
+    sim_filters = _similar_to_filters(best, min_cosine, min_tanimoto)
+    best_sim_id = (
+        select(best.id)
+        .where(best.source_id == gen.id, best.relation == "SIMILAR_TO", *sim_filters)
+        .order_by(best.weight.desc(), best.id)
+        .limit(1)
+        .correlate(gen)
+        .scalar_subquery()
     )
 
-    if target_node is None:
-        # No graph info yet for this target
-        return TargetGraphResponse(target_id=target_id, molecules=[])
-
-    bind_edges = (
-        db.query(KGEdge)
-        .filter(KGEdge.relation == "BINDS", KGEdge.target_id == target_node.id)
-        .all()
+    metric = None
+    if sort_by == "score":
+        ordering = (bind.weight.desc(), bind.id)
+    else:
+        metric = sim.cosine if sort_by == "cosine" else sim.tanimoto
+        ordering = (metric.desc().nulls_last(), bind.weight.desc(), bind.id)
+
+    query = (
+        select(
+            bind.id,
+            gen.external_id,
+            gen.smiles,
+            bind.weight,
+            sim.weight,
+            sim.cosine,
+            sim.tanimoto,
+            drug.name,
+            drug.smiles,
+            drug.info,
+        )
+        .select_from(bind)
+        .join(gen, gen.id == bind.source_id)
+        .outerjoin(sim, sim.id == best_sim_id)
+        .outerjoin(drug, drug.id == sim.target_id)
+        .where(
+            bind.relation == "BINDS",
+            bind.target_id == _node_id_subquery("target", KGNode.external_id, target_id),
+        )
+        .order_by(*ordering)
     )
+    if sim_filters:
+        query = query.where(sim.id.is_not(None))
+
+    served = 0
+    cursor_kind = f"target-graph:{sort_by}"
+    if cursor:
+        last_metric, last_weight, last_id, served = decode_cursor(cursor, cursor_kind, 4)
+        after_bind = or_(bind.weight < last_weight, and_(bind.weight == last_weight, bind.id > last_id))
+        if metric is None:
+            query = query.where(after_bind)
+        elif last_metric is None:
+            query = query.where(metric.is_(None), after_bind)
+        else:
+            query = query.where(or_(
+                _after_desc(metric, last_metric),
+                and_(metric == last_metric, after_bind),
+            ))
+
+    n = page_limit(limit, top_k, served)
+    if n is not None:
+        query = query.limit(n + 1)
+    rows = db.execute(query).all() if n != 0 else []
+
+    has_more = n is not None and len(rows) > n and (top_k is None or served + n < top_k)
+    if n is not None:
+        rows = rows[:n]
 
     entries: List[MoleculeGraphEntry] = []
-
-    for bind in bind_edges:
-        gen_node = db.query(KGNode).filter(KGNode.id == bind.source_id).first()
-        if gen_node is None:
-            continue
-
-        # Parse run_id and index from external_id like "runid:index"
-        run_id = ""
-        molecule_index = 0
-        if gen_node.external_id and ":" in gen_node.external_id:
-            run_part, idx_part = gen_node.external_id.split(":", 1)
-            run_id = run_part
-            try:
-                molecule_index = int(idx_part)
-            except ValueError:
-                molecule_index = 0
-
-        # Find the SIMILAR_TO edge (if any)
-        sim_edge = (
-            db.query(KGEdge)
-            .filter(
-                KGEdge.relation == "SIMILAR_TO",
-                KGEdge.source_id == gen_node.id,
-            )
-            .order_by(KGEdge.weight.desc())
-            .first()
-        )
+    for (bind_id, external_id, gen_smiles, bind_weight, sim_weight,
+         sim_cosine, sim_tanimoto, drug_name, drug_smiles, drug_info) in rows:
+        run_id, molecule_index = _parse_external_id(external_id)
 
         similar: Optional[SimilarDrug] = None
-        if sim_edge is not None:
-            drug_node = db.query(KGNode).filter(KGNode.id == sim_edge.target_id).first()
-            if drug_node is not None:
-                tanimoto = sim_edge.weight or 0.0
-                cosine = None
-
-                if sim_edge.extra:
-                    for part in sim_edge.extra.split(";"):
-                        part = part.strip()
-                        if part.startswith("chemBERTa_cosine="):
-                            try:
-                                cosine = float(part.split("=", 1)[1])
-                            except ValueError:
-                                pass
-
-                similar = SimilarDrug(
-                    name=drug_node.name,
-                    smiles=drug_node.smiles or "",
-                    indication=drug_node.info,  # may contain "Indication: ..."
-                    similarity=tanimoto,
-                    semantic_similarity=cosine,
-                )
+        if drug_name is not None:
+            similar = SimilarDrug(
+                name=drug_name,
+                smiles=drug_smiles or "",
+                indication=drug_info,  # may contain "Indication: ..."
+                similarity=sim_weight or 0.0,
+                semantic_similarity=sim_cosine,
+            )
 
         entries.append(
             MoleculeGraphEntry(
                 run_id=run_id,
                 molecule_index=molecule_index,
-                smiles=gen_node.smiles or "",
-                score=bind.weight or 0.0,
+                smiles=gen_smiles or "",
+                score=bind_weight or 0.0,
                 similar_drug=similar,
             )
         )
 
-    # Sort by score descending
-    entries.sort(key=lambda e: e.score, reverse=True)
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        last_metric = {"score": last[3], "cosine": last[5], "tanimoto": last[6]}[sort_by]
+        next_cursor = encode_cursor(cursor_kind, last_metric, last[3], last[0], served + len(rows))
 
     return TargetGraphResponse(
         target_id=target_id,
         molecules=entries,
+        next_cursor=next_cursor,
     )
 
-def get_drug_graph(db: Session, drug_name: str) -> DrugGraphResponse:
+def get_drug_graph(
+    db: Session,
+    drug_name: str,
+    min_cosine: Optional[float] = None,
+    min_tanimoto: Optional[float] = None,
+    top_k: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> DrugGraphResponse:
     """
     For a given drug name, return all generated molecules that are SIMILAR_TO it,
-    across all targets and runs.
+    across all targets and runs, best score first.
+
+    One query: SIMILAR_TO edges into the drug node, joined to the generated
+    molecule and outer-joined to its best BINDS edge and target node.
+    min_cosine / min_tanimoto filter the SIMILAR_TO edges in SQL; the score
+    (BINDS weight, else the SIMILAR_TO weight) is ordered and limited in
+    SQL too, with keyset paging on (score, SIMILAR_TO edge id).
     """
-    # Find the drug node
-    drug_node = (
-        db.query(KGNode)
-        .filter(KGNode.node_type == "drug", KGNode.name == drug_name)
-        .first()
+    gen = aliased(KGNode)
+    target = aliased(KGNode)
+    sim = aliased(KGEdge)
+    bind = aliased(KGEdge)
+    best = aliased(KGEdge)
+
+    # Best BINDS edge per molecule; the ordering matches the
+    # (relation, source_id, weight) index, so this is one index probe.
+    best_bind_id = (
+        select(best.id)
+        .where(best.source_id == gen.id, best.relation == "BINDS")
+        .order_by(best.weight.desc(), best.id)
+        .limit(1)
+        .correlate(gen)
+        .scalar_subquery()
     )
-    if drug_node is None:
-        return DrugGraphResponse(drug_name=drug_name, molecules=[])
-
-    # Find SIMILAR_TO edges where target is this drug
-    sim_edges = (
-        db.query(KGEdge)
-        .filter(KGEdge.relation == "SIMILAR_TO", KGEdge.target_id == drug_node.id)
-        .all()
+    score = func.coalesce(bind.weight, sim.weight, 0.0)
+
+    query = (
+        select(
+            sim.id,
+            score,
+            gen.external_id,
+            gen.smiles,
+            target.external_id,
+        )
+        .select_from(sim)
+        .join(gen, gen.id == sim.source_id)
+        .outerjoin(bind, bind.id == best_bind_id)
+        .outerjoin(target, target.id == bind.target_id)
+        .where(
+            sim.relation == "SIMILAR_TO",
+            sim.target_id == _node_id_subquery("drug", KGNode.name, drug_name),
+            *_similar_to_filters(sim, min_cosine, min_tanimoto),
+        )
+        .order_by(score.desc(), sim.id)
     )
 
-    entries: List[DrugGraphEntry] = []
+    served = 0
+    if cursor:
+        last_score, last_id, served = decode_cursor(cursor, "drug-graph", 3)
+        query = query.where(or_(score < last_score, and_(score == last_score, sim.id > last_id)))
 
-    for sim_edge in sim_edges:
-        gen_node = db.query(KGNode).filter(KGNode.id == sim_edge.source_id).first()
-        if gen_node is None:
-            continue
-
-        # Parse run_id and index from external_id like "runid:index"
-        run_id = ""
-        molecule_index = 0
-        if gen_node.external_id and ":" in gen_node.external_id:
-            run_part, idx_part = gen_node.external_id.split(":", 1)
-            run_id = run_part
-            try:
-                molecule_index = int(idx_part)
-            except ValueError:
-                molecule_index = 0
-
-        # Find the target this generated molecule binds to
-        bind_edge = (
-            db.query(KGEdge)
-            .filter(
-                KGEdge.relation == "BINDS",
-                KGEdge.source_id == gen_node.id,
-            )
-            .first()
-        )
+    n = page_limit(limit, top_k, served)
+    if n is not None:
+        query = query.limit(n + 1)
+    rows = db.execute(query).all() if n != 0 else []
 
-        target_id = ""
-        score = sim_edge.weight or 0.0
-        if bind_edge is not None:
-            target_node = db.query(KGNode).filter(KGNode.id == bind_edge.target_id).first()
-            if target_node is not None and target_node.external_id:
-                target_id = target_node.external_id
-            if bind_edge.weight is not None:
-                score = bind_edge.weight
+    has_more = n is not None and len(rows) > n and (top_k is None or served + n < top_k)
+    if n is not None:
+        rows = rows[:n]
 
+    entries: List[DrugGraphEntry] = []
+    for sim_id, entry_score, external_id, gen_smiles, target_ext in rows:
+        run_id, molecule_index = _parse_external_id(external_id)
         entries.append(
             DrugGraphEntry(
-                target_id=target_id,
+                target_id=target_ext or "",
                 run_id=run_id,
                 molecule_index=molecule_index,
-                smiles=gen_node.smiles or "",
-                score=score,
+                smiles=gen_smiles or "",
+                score=entry_score,
             )
         )
 
-    # Sort by score descending
-    entries.sort(key=lambda e: e.score, reverse=True)
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor("drug-graph", rows[-1][1], rows[-1][0], served + len(rows))
+
+    return DrugGraphResponse(drug_name=drug_name, molecules=entries, next_cursor=next_cursor)
+
+
+# ---------- materialized target summaries ----------
+
+def _top_entries(entries: Iterable[MoleculeGraphEntry]) -> List[MoleculeGraphEntry]:
+    # Stable sort: on equal scores older molecules stay first, like get_target_graph
+    return sorted(entries, key=lambda e: e.score, reverse=True)[:TARGET_SUMMARY_TOP_N]
+
+
+def _drug_histogram(entries: Iterable[MoleculeGraphEntry]) -> Counter:
+    return Counter(e.similar_drug.name for e in entries if e.similar_drug is not None)
 
-    return DrugGraphResponse(drug_name=drug_name, molecules=entries)
+
+def _store_summary(
+    summary: KGTargetSummary,
+    top: List[MoleculeGraphEntry],
+    histogram: Counter,
+) -> None:
+    summary.top_molecules = json.dumps([e.model_dump() for e in top])
+    summary.drug_histogram = json.dumps(dict(histogram.most_common()))
+
+
+def _insert_summary_ignore(db: Session, target_id: str) -> None:
+    """INSERT an empty summary row (version 0) unless another transaction created one."""
+    row = {"target_id": target_id, "version": 0, "molecule_count": 0, "run_count": 0}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        db.execute(dialect_insert(KGTargetSummary).values(**row).on_conflict_do_nothing(index_elements=["target_id"]))
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(KGTargetSummary).values(**row))
+    except IntegrityError:
+        pass
+
+
+def _locked_summary(db: Session, target_id: str) -> KGTargetSummary:
+    """
+    The target's summary row, locked for this transaction (SELECT ... FOR
+    UPDATE). Concurrent first runs for a target both try to create it: the
+    insert is ON CONFLICT DO NOTHING, so the loser waits for the winner's
+    row and re-selects it instead of failing on the primary key.
+    """
+    query = select(KGTargetSummary).where(KGTargetSummary.target_id == target_id).with_for_update()
+    summary = db.scalars(query).first()
+    if summary is None:
+        _insert_summary_ignore(db, target_id)
+        summary = db.scalars(query).one()
+    return summary
+
+
+def rebuild_target_summary(db: Session, target_id: str) -> KGTargetSummary:
+    """
+    Recompute a target's summary from the graph tables (first run for a
+    target, or databases written before summaries existed). Not committed.
+    """
+    summary = _locked_summary(db, target_id)
+    graph = get_target_graph(db, target_id)
+
+    summary.version = (summary.version or 0) + 1
+    summary.molecule_count = len(graph.molecules)
+    summary.run_count = db.scalar(
+        select(func.count()).select_from(DiscoveryRun).where(DiscoveryRun.target_id == target_id)
+    ) or 0
+    _store_summary(summary, _top_entries(graph.molecules), _drug_histogram(graph.molecules))
+    return summary
+
+
+def _update_target_summary(db: Session, target_id: str, entries: List[MoleculeGraphEntry]) -> None:
+    """
+    Fold one run's molecules into the target summary: O(run size + N),
+    independent of how many molecules the target already has.
+    """
+    summary = _locked_summary(db, target_id)
+    if not summary.version:
+        # Row created just now: this run's rows are already flushed, so the rebuild includes them
+        rebuild_target_summary(db, target_id)
+        return
+
+    top = [MoleculeGraphEntry(**e) for e in json.loads(summary.top_molecules)]
+    histogram = Counter(json.loads(summary.drug_histogram))
+    histogram.update(_drug_histogram(entries))
+
+    summary.version += 1
+    summary.molecule_count += len(entries)
+    summary.run_count += 1
+    _store_summary(summary, _top_entries(top + entries), histogram)
+
+
+def get_target_summary_version(db: Session, target_id: str) -> Optional[int]:
+    """Current summary version (one primary-key lookup), None if the target has none."""
+    return db.scalar(select(KGTargetSummary.version).where(KGTargetSummary.target_id == target_id))
+
+
+def get_target_summary(db: Session, target_id: str) -> Optional[TargetGraphSummary]:
+    summary = db.get(KGTargetSummary, target_id)
+    if summary is None:
+        return None
+    return TargetGraphSummary(
+        target_id=summary.target_id,
+        version=summary.version,
+        molecule_count=summary.molecule_count,
+        run_count=summary.run_count,
+        top_molecules=json.loads(summary.top_molecules),
+        drug_histogram=json.loads(summary.drug_histogram),
+        updated_at=summary.updated_at,
+    )
@@ -0,0 +1,99 @@
+"""
+Keyset (cursor) pagination and field projection helpers for list endpoints.
+
+A cursor is the sort key of the last item on a page — e.g. (created_at,
+id) for /runs or the last id for a run's molecules — serialized as
+URL-safe base64 JSON. The next page is the rows strictly after that key
+in the endpoint's ORDER BY, so each page costs an index range scan of
+`limit` rows no matter how deep the client has paged (OFFSET would scan
+and discard every earlier row).
+
+Cursors are opaque to clients; each endpoint decides what goes in one.
+"""
+
+import base64
+import binascii
+import datetime as dt
+import json
+from typing import Any, AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+# Upper bound for ?limit= on paged endpoints
+MAX_PAGE_SIZE = 1000
+# ?limit= when omitted on the molecule listings (a run from /discover, at
+# most 100 molecules, still comes back whole)
+DEFAULT_PAGE_SIZE = 100
+
+# ?exclude= groups -> Molecule fields they drop
+PROJECTION_GROUPS: Dict[str, tuple] = {
+    "notes": ("notes",),
+    "neighbors": ("similar_drug", "similar_drug_semantic"),
+    "admet": ("admet",),
+}
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not issued by this endpoint (or was tampered with)."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, dt.datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return dt.datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(kind: str, *key: Any) -> str:
+    """Cursor for the row whose sort key is `key`; `kind` ties it to one ordering."""
+    payload = json.dumps([kind, [_encode_value(v) for v in key]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, kind: str, size: int) -> List[Any]:
+    """Sort key from a cursor made by encode_cursor(kind, ...) with `size` values."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_kind, key = json.loads(raw)
+        key = [_decode_value(v) for v in key]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}") from e
+    if cursor_kind != kind or not isinstance(key, list) or len(key) != size:
+        raise InvalidCursor("Cursor does not belong to this listing")
+    return key
+
+
+def page_limit(limit: Optional[int], top_k: Optional[int], served: int) -> Optional[int]:
+    """
+    Rows to fetch for this page: the page size, capped by what is left of
+    top_k after `served` rows on earlier pages. None = no limit.
+    """
+    if top_k is None:
+        return limit
+    remaining = max(0, top_k - served)
+    return remaining if limit is None else min(limit, remaining)
+
+
+def parse_exclude(values: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """?exclude=notes&exclude=neighbors or ?exclude=notes,neighbors -> group names."""
+    groups = set()
+    for value in values or ():
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if part not in PROJECTION_GROUPS:
+                raise ValueError(f"Unknown exclude group {part!r}; expected one of {sorted(PROJECTION_GROUPS)}")
+            groups.add(part)
+    return frozenset(groups)
+
+
+def excluded_fields(groups: AbstractSet[str], allowed: Sequence[str] = ()) -> FrozenSet[str]:
+    """Molecule field names dropped by the given groups (optionally limited to `allowed` fields)."""
+    fields = {field for group in groups for field in PROJECTION_GROUPS[group]}
+    if allowed:
+        fields &= set(allowed)
+    return frozenset(fields)
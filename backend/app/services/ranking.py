@@ -0,0 +1,369 @@
+"""
+Multi-objective ranking of discovery candidates.
+
+Each objective is one numeric column (DTI score, similarity to known
+drugs, an ADMET property) with a direction: maximise, minimise, or keep
+inside a target range. Three orderings are available:
+
+  pareto        non-dominated fronts (front 1 first), then NSGA-II
+                crowding distance inside a front (diverse trade-offs
+                first), then the weighted aggregate
+  weighted      weighted arithmetic mean of per-objective desirabilities
+  desirability  weighted geometric mean (Derringer): a candidate that
+                fails one objective completely scores 0. With the
+                default bounds (the column's own min / max) that is the
+                worst candidate on every objective, whatever its other
+                values; such ties fall back to the weighted mean
+
+Everything works on NumPy columns. The non-dominated sort is a sweep in
+O(N log N) for one or two objectives and an efficient non-dominated sort
+(ENS: binary search over fronts) for more, with an O(log N) staircase
+dominance test per front for three objectives: ranking 10^5 candidates
+(sort plus crowding) takes about 0.3 s with two objectives and 0.9 s
+with three (benchmarks/bench_ranking.py). From four objectives on the
+test is a vectorised scan of the front, roughly quadratic (about 1 s at
+10^4 candidates).
+Missing values (no neighbour drug, no ADMET) rank worst: below the worst
+real value, which gets the same desirability (0), and fewer missing
+values breaks ties before input order does.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ..schemas import Molecule, RankingObjective
+
+
+def _admet(field: str) -> Callable[[Molecule], Optional[float]]:
+    return lambda m: getattr(m.admet, field) if m.admet is not None else None
+
+
+# RankingMetric name -> value for one molecule (None when unknown)
+METRICS: Dict[str, Callable[[Molecule], Optional[float]]] = {
+    "score": lambda m: m.score,
+    "similarity": lambda m: m.similar_drug.similarity if m.similar_drug is not None else None,
+    "semantic_similarity": lambda m: (
+        m.similar_drug_semantic.semantic_similarity if m.similar_drug_semantic is not None else None
+    ),
+    "molecular_weight": _admet("molecular_weight"),
+    "logp": _admet("logp"),
+    "tpsa": _admet("tpsa"),
+    "hbd": _admet("hbd"),
+    "hba": _admet("hba"),
+    "rotatable_bonds": _admet("rotatable_bonds"),
+    "lipinski_violations": _admet("lipinski_violations"),
+}
+
+
+class Ranking(NamedTuple):
+    order: np.ndarray      # candidate indices, best first
+    front: np.ndarray      # Pareto front per candidate (1 = non-dominated)
+    crowding: np.ndarray   # crowding distance inside its front (inf at the edges)
+    aggregate: np.ndarray  # weighted or desirability score in [0, 1]
+
+
+def molecule_columns(molecules: Sequence[Molecule], metrics: Sequence[str]) -> Dict[str, np.ndarray]:
+    """float64 column per metric, NaN where a molecule has no value."""
+    columns = {}
+    for metric in dict.fromkeys(metrics):
+        getter = METRICS[metric]
+        values = (getter(m) for m in molecules)
+        columns[metric] = np.fromiter(
+            (np.nan if v is None else v for v in values), dtype=np.float64, count=len(molecules)
+        )
+    return columns
+
+
+# ---------- objective transforms ----------
+
+def _oriented(values: np.ndarray, objective: RankingObjective) -> np.ndarray:
+    """The column turned into "larger is better", -inf where missing."""
+    if objective.direction == "max":
+        out = values.copy()
+    elif objective.direction == "min":
+        out = -values
+    else:
+        # Distance outside [low, high], 0 inside
+        out = -np.maximum(objective.low - values, 0.0) - np.maximum(values - objective.high, 0.0)
+    out[np.isnan(out)] = -np.inf
+    return out
+
+
+def desirability(values: np.ndarray, objective: RankingObjective) -> np.ndarray:
+    """
+    Per-candidate desirability in [0, 1]. max / min ramp linearly between
+    low and high (default: the column's own min and max); target is 1
+    inside [low, high] and falls to 0 one range-width outside it.
+    Missing values get 0.
+    """
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return np.zeros(len(values))
+    if objective.direction == "target":
+        width = objective.high - objective.low
+        if width <= 0:
+            width = float(finite.max() - finite.min()) or 1.0
+        distance = np.maximum(objective.low - values, 0.0) + np.maximum(values - objective.high, 0.0)
+        d = 1.0 - distance / width
+    else:
+        low = objective.low if objective.low is not None else float(finite.min())
+        high = objective.high if objective.high is not None else float(finite.max())
+        if high <= low:
+            d = np.ones(len(values))
+        elif objective.direction == "max":
+            d = (values - low) / (high - low)
+        else:
+            d = (high - values) / (high - low)
+    d = np.clip(d, 0.0, 1.0)
+    d[np.isnan(values)] = 0.0
+    return d
+
+
+def aggregate(
+    columns: Dict[str, np.ndarray], objectives: Sequence[RankingObjective], geometric: bool = False
+) -> np.ndarray:
+    """Weighted arithmetic (or geometric) mean of the objectives' desirabilities."""
+    n = len(next(iter(columns.values()))) if columns else 0
+    weights = np.array([o.weight for o in objectives], dtype=np.float64)
+    total = weights.sum()
+    if not n or total <= 0:
+        return np.zeros(n)
+    weights /= total
+    if not geometric:
+        out = np.zeros(n)
+        for objective, w in zip(objectives, weights):
+            out += w * desirability(columns[objective.metric], objective)
+        return out
+    log_sum = np.zeros(n)
+    for objective, w in zip(objectives, weights):
+        if w == 0:
+            continue
+        with np.errstate(divide="ignore"):
+            log_sum += w * np.log(desirability(columns[objective.metric], objective))
+    return np.exp(log_sum)
+
+
+# ---------- non-dominated sorting ----------
+
+def _fronts_1d(f: np.ndarray) -> np.ndarray:
+    # Each distinct value is its own front, largest first
+    _, inverse = np.unique(-f, return_inverse=True)
+    return inverse.reshape(-1) + 1
+
+
+def _fronts_2d(points: np.ndarray) -> np.ndarray:
+    """
+    Sweep by the first objective (descending): a point joins the first
+    front whose latest member does not dominate it. Those members' second
+    objectives increase with the front index, so the front is found by
+    binary search.
+    """
+    n = len(points)
+    f1, f2 = points[:, 0], points[:, 1]
+    order = np.lexsort((-f2, -f1))
+    fronts = np.empty(n, dtype=np.int64)
+    # Per front: latest member's -f2 (ascending across fronts) and f1
+    last_neg_f2: List[float] = []
+    last_f1: List[float] = []
+    for i in order.tolist():
+        a, b = f1[i], f2[i]
+        # First front whose latest member has f2 < b can take the point ...
+        k = bisect_right(last_neg_f2, -b)
+        # ... unless the previous front's latest member equals it exactly
+        if k > 0 and last_f1[k - 1] == a and -last_neg_f2[k - 1] == b:
+            k -= 1
+        if k == len(last_neg_f2):
+            last_neg_f2.append(-b)
+            last_f1.append(a)
+        else:
+            last_neg_f2[k] = -b
+            last_f1[k] = a
+        fronts[i] = k + 1
+    return fronts
+
+
+class _Front:
+    """
+    Members of one front. Points arrive in lexicographically descending
+    order without duplicates, so an earlier point that is >= p in every
+    objective dominates p, and the first objective always is.
+
+    The (2nd, 3rd) objectives of the members are kept as a staircase:
+    their 2-D maxima, sorted by the 2nd objective ascending (so the 3rd
+    descends). Whether some member is >= p in both is one binary search;
+    with three objectives that is the dominance test, with more it rules
+    most points out before the full vectorised comparison.
+    """
+
+    __slots__ = ("rows", "size", "stair_f2", "stair_f3", "exact")
+
+    def __init__(self, dims: int) -> None:
+        self.rows = np.empty((8, dims))
+        self.size = 0
+        self.stair_f2: List[float] = []
+        self.stair_f3: List[float] = []
+        self.exact = dims == 3
+
+    def dominates(self, p: np.ndarray, f2: float, f3: float) -> bool:
+        i = bisect_left(self.stair_f2, f2)
+        if i == len(self.stair_f2) or self.stair_f3[i] < f3:
+            return False
+        if self.exact:
+            return True
+        return bool((self.rows[:self.size] >= p).all(axis=1).any())
+
+    def add(self, p: np.ndarray, f2: float, f3: float) -> None:
+        if not self.exact:
+            if self.size == len(self.rows):
+                self.rows = np.concatenate([self.rows, np.empty_like(self.rows)])
+            self.rows[self.size] = p
+            self.size += 1
+            # With more objectives p may sit under a step already
+            i = bisect_left(self.stair_f2, f2)
+            if i < len(self.stair_f2) and self.stair_f3[i] >= f3:
+                return
+        # Drop the steps p covers (2nd and 3rd objective both <=), insert p
+        end = bisect_right(self.stair_f2, f2)
+        start = end
+        while start > 0 and self.stair_f3[start - 1] <= f3:
+            start -= 1
+        self.stair_f2[start:end] = [f2]
+        self.stair_f3[start:end] = [f3]
+
+
+def _fronts_nd(points: np.ndarray) -> np.ndarray:
+    """
+    ENS-BS (Zhang et al., 2015): visit points in lexicographic order, so
+    only already-placed points can dominate the current one, and binary
+    search the front it belongs to.
+    """
+    unique, inverse = np.unique(points, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.lexsort(tuple(-unique[:, j] for j in reversed(range(unique.shape[1]))))
+    f2s, f3s = unique[:, 1].tolist(), unique[:, 2].tolist()
+    fronts: List[_Front] = []
+    unique_front = np.empty(len(unique), dtype=np.int64)
+    for i in order.tolist():
+        p, f2, f3 = unique[i], f2s[i], f3s[i]
+        lo, hi = 0, len(fronts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if fronts[mid].dominates(p, f2, f3):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(fronts):
+            fronts.append(_Front(unique.shape[1]))
+        fronts[lo].add(p, f2, f3)
+        unique_front[i] = lo + 1
+    return unique_front[inverse]
+
+
+def non_dominated_fronts(points: np.ndarray) -> np.ndarray:
+    """
+    Pareto front of each row of `points` (N, M), every column to be
+    maximised: 1 for non-dominated rows, 2 for rows dominated only by
+    front 1, and so on. Equal rows share a front.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2:
+        raise ValueError("points must be a 2-D array (candidates x objectives)")
+    if not len(points):
+        return np.zeros(0, dtype=np.int64)
+    # -inf (missing) compares fine; NaN would not
+    points = np.where(np.isnan(points), -np.inf, points)
+    if points.shape[1] == 1:
+        return _fronts_1d(points[:, 0])
+    if points.shape[1] == 2:
+        return _fronts_2d(points)
+    return _fronts_nd(points)
+
+
+def crowding_distance(points: np.ndarray, fronts: np.ndarray) -> np.ndarray:
+    """
+    NSGA-II crowding distance of each row within its front: the sum over
+    objectives of the gap between its neighbours, normalised by the
+    front's range. The extremes of every objective get inf, except for
+    objectives that are constant over the front (they tell nothing).
+    """
+    n, dims = points.shape
+    distance = np.zeros(n)
+    if not n:
+        return distance
+    for j in range(dims):
+        values = points[:, j]
+        finite = np.isfinite(values)
+        values = np.where(finite, values, np.nan)
+        order = np.lexsort((values, fronts))
+        v, f = values[order], fronts[order]
+        start = np.r_[True, f[1:] != f[:-1]]
+        end = np.r_[f[1:] != f[:-1], True]
+        # Per-front range, broadcast back to the members
+        group = np.cumsum(start) - 1
+        lo = np.fmin.reduceat(v, np.flatnonzero(start))[group]
+        hi = np.fmax.reduceat(v, np.flatnonzero(start))[group]
+        span = hi - lo
+        varies = np.isfinite(span) & (span > 0)
+
+        gap = np.zeros(n)
+        inner = ~start & ~end
+        prev_v = np.r_[np.nan, v[:-1]]
+        next_v = np.r_[v[1:], np.nan]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            gap[inner] = (next_v[inner] - prev_v[inner]) / span[inner]
+        gap[~varies | np.isnan(gap) | np.isnan(v)] = 0.0
+        # Missing values sort last: the extremes are the finite min / max
+        gap[varies & ((v == lo) | (v == hi))] = np.inf
+        distance[order] += gap
+    return distance
+
+
+# ---------- ranking ----------
+
+def rank(
+    columns: Dict[str, np.ndarray], objectives: Sequence[RankingObjective], method: str = "pareto"
+) -> Ranking:
+    """Rank candidates given one column per objective metric (see molecule_columns)."""
+    n = len(next(iter(columns.values()))) if columns else 0
+    index = np.arange(n)
+    # Objectives without a value: a missing value and the worst real one both get d = 0
+    missing = np.zeros(n, dtype=np.int64)
+    for objective in objectives:
+        missing += np.isnan(columns[objective.metric])
+    scores = aggregate(columns, objectives)
+
+    if method == "desirability":
+        geometric = aggregate(columns, objectives, geometric=True)
+        order = np.lexsort((index, missing, -scores, -geometric))
+        return Ranking(order, np.ones(n, dtype=np.int64), np.zeros(n), geometric)
+    if method != "pareto":
+        order = np.lexsort((index, missing, -scores))
+        return Ranking(order, np.ones(n, dtype=np.int64), np.zeros(n), scores)
+
+    points = np.column_stack([_oriented(columns[o.metric], o) for o in objectives]) if n else np.zeros((0, 0))
+    fronts = non_dominated_fronts(points) if n else np.zeros(0, dtype=np.int64)
+    crowding = crowding_distance(points, fronts) if n else np.zeros(0)
+    # Best first: lowest front, most isolated, highest aggregate, fewest missing, then input order
+    order = np.lexsort((index, missing, -scores, -crowding, fronts))
+    return Ranking(order, fronts, crowding, scores)
+
+
+def rank_molecules(
+    molecules: List[Molecule], objectives: Sequence[RankingObjective], method: str = "pareto"
+) -> List[Molecule]:
+    """
+    The molecules best first. With more than one objective, or a
+    non-Pareto method, each molecule's notes get its front / aggregate.
+    """
+    if not molecules:
+        return molecules
+    columns = molecule_columns(molecules, [o.metric for o in objectives])
+    ranking = rank(columns, objectives, method)
+    if len(objectives) > 1 or method != "pareto":
+        for i, m in enumerate(molecules):
+            detail = f"Pareto front {ranking.front[i]}, " if method == "pareto" else ""
+            note = f"Ranked by {method}: {detail}aggregate={ranking.aggregate[i]:.2f}."
+            m.notes = f"{m.notes} {note}" if m.notes else note
+    return [molecules[i] for i in ranking.order.tolist()]
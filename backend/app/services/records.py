@@ -0,0 +1,206 @@
+"""
+Conversions between stored MoleculeRecord rows and API Molecule objects.
+
+Neighbors and ADMET are computed once per structure and kept in the
+molecule registry (services.registry); reads join it and only map columns
+back to schemas. Rows written before the registry still carry their own
+copy, which the migration moves over.
+"""
+
+from typing import AbstractSet, Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import func
+
+from ..models import MoleculeRecord, RegisteredMolecule
+from ..schemas import ADMETProperties, Molecule, SimilarDrug
+
+
+ADMET_FIELDS = (
+    "molecular_weight",
+    "logp",
+    "hbd",
+    "hba",
+    "rotatable_bonds",
+    "tpsa",
+    "lipinski_violations",
+    "lipinski_pass",
+)
+
+
+def annotation_columns(
+    fp_neighbor: Optional[SimilarDrug],
+    semantic_neighbor: Optional[SimilarDrug],
+    admet: Optional[ADMETProperties],
+) -> Dict[str, Any]:
+    """Column values for the neighbor + ADMET block of a MoleculeRecord."""
+    cols: Dict[str, Any] = {
+        "fp_neighbor_name": None,
+        "fp_neighbor_smiles": None,
+        "fp_neighbor_indication": None,
+        "fp_similarity": None,
+        "semantic_neighbor_name": None,
+        "semantic_neighbor_smiles": None,
+        "semantic_neighbor_indication": None,
+        "semantic_similarity": None,
+    }
+    if fp_neighbor is not None:
+        cols.update(
+            fp_neighbor_name=fp_neighbor.name,
+            fp_neighbor_smiles=fp_neighbor.smiles,
+            fp_neighbor_indication=fp_neighbor.indication,
+            fp_similarity=fp_neighbor.similarity,
+        )
+    if semantic_neighbor is not None:
+        cols.update(
+            semantic_neighbor_name=semantic_neighbor.name,
+            semantic_neighbor_smiles=semantic_neighbor.smiles,
+            semantic_neighbor_indication=semantic_neighbor.indication,
+            semantic_similarity=semantic_neighbor.semantic_similarity,
+        )
+    for field in ADMET_FIELDS:
+        cols[field] = getattr(admet, field) if admet is not None else None
+    return cols
+
+
+def molecule_record_row(run_id: str, mol: Molecule, registry_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Parameters for a bulk INSERT into `molecules`. Neighbors and ADMET live
+    on the registry row; they are only stored inline without one.
+    """
+    row = {
+        "run_id": run_id,
+        "smiles": mol.smiles,
+        "score": mol.score,
+        "source": mol.source,
+        "notes": mol.notes,
+        "registry_id": registry_id,
+    }
+    if registry_id is None:
+        row.update(annotation_columns(mol.similar_drug, mol.similar_drug_semantic, mol.admet))
+    return row
+
+
+NEIGHBOR_FIELDS = (
+    "fp_neighbor_name",
+    "fp_neighbor_smiles",
+    "fp_neighbor_indication",
+    "fp_similarity",
+    "semantic_neighbor_name",
+    "semantic_neighbor_smiles",
+    "semantic_neighbor_indication",
+    "semantic_similarity",
+)
+
+
+def record_columns(exclude: AbstractSet[str] = frozenset()) -> List[Any]:
+    """
+    Columns molecule_from_record needs, minus the ?exclude= groups (see
+    services.pagination), so skipped blocks are not even read. Neighbor
+    and ADMET columns come from the registry (falling back to legacy
+    inline values), so the query must use join_registry().
+    """
+    names = ["id", "smiles", "score", "source"]
+    if "notes" not in exclude:
+        names.append("notes")
+    columns: List[Any] = [getattr(MoleculeRecord, name) for name in names]
+
+    shared: List[str] = []
+    if "neighbors" not in exclude:
+        shared.extend(NEIGHBOR_FIELDS)
+    if "admet" not in exclude:
+        shared.extend(ADMET_FIELDS)
+    columns.extend(
+        func.coalesce(getattr(RegisteredMolecule, name), getattr(MoleculeRecord, name)).label(name)
+        for name in shared
+    )
+    return columns
+
+
+def join_registry(query, exclude: AbstractSet[str] = frozenset()):
+    """Outer-join the registry onto a MoleculeRecord select when record_columns reads it."""
+    if "neighbors" in exclude and "admet" in exclude:
+        return query
+    return query.outerjoin(RegisteredMolecule, RegisteredMolecule.id == MoleculeRecord.registry_id)
+
+
+def molecule_from_record(rec: MoleculeRecord, exclude: AbstractSet[str] = frozenset()) -> Molecule:
+    """
+    Rebuild the API Molecule from stored columns (no recomputation).
+
+    `rec` may also be a row selected with record_columns(exclude); the
+    excluded blocks are then left empty.
+    """
+    fp_neighbor = None
+    semantic_neighbor = None
+    if "neighbors" not in exclude:
+        if rec.fp_neighbor_name is not None:
+            fp_neighbor = SimilarDrug(
+                name=rec.fp_neighbor_name,
+                smiles=rec.fp_neighbor_smiles or "",
+                indication=rec.fp_neighbor_indication,
+                similarity=rec.fp_similarity or 0.0,
+            )
+
+        if rec.semantic_neighbor_name is not None:
+            semantic_neighbor = SimilarDrug(
+                name=rec.semantic_neighbor_name,
+                smiles=rec.semantic_neighbor_smiles or "",
+                indication=rec.semantic_neighbor_indication,
+                similarity=0.0,  # fingerprint similarity lives on fp_neighbor
+                semantic_similarity=rec.semantic_similarity,
+            )
+
+    admet = None
+    if "admet" not in exclude and rec.lipinski_pass is not None:
+        admet = ADMETProperties(**{field: getattr(rec, field) for field in ADMET_FIELDS})
+
+    return Molecule(
+        smiles=rec.smiles,
+        score=rec.score,
+        source=rec.source,
+        notes=None if "notes" in exclude else rec.notes,
+        similar_drug=fp_neighbor,
+        similar_drug_semantic=semantic_neighbor,
+        admet=admet,
+    )
+
+
+def molecule_dict_from_record(rec: Mapping[str, Any], exclude: AbstractSet[str] = frozenset()) -> Dict[str, Any]:
+    """
+    Same as molecule_from_record(row, exclude).model_dump() minus the
+    excluded fields, without building (and validating) pydantic objects.
+    Stored columns are already typed, so this is the fast path for large
+    reads (see app.serialization).
+
+    `rec` is the row's ._mapping: key lookups there are ~10x cheaper than
+    Row attribute access, which adds up over 20 columns x 10k rows.
+    """
+    mol: Dict[str, Any] = {"smiles": rec["smiles"], "score": rec["score"], "source": rec["source"]}
+    if "notes" not in exclude:
+        mol["notes"] = rec["notes"]
+
+    if "neighbors" not in exclude:
+        mol["similar_drug"] = None
+        mol["similar_drug_semantic"] = None
+        if rec["fp_neighbor_name"] is not None:
+            mol["similar_drug"] = {
+                "name": rec["fp_neighbor_name"],
+                "smiles": rec["fp_neighbor_smiles"] or "",
+                "indication": rec["fp_neighbor_indication"],
+                "similarity": rec["fp_similarity"] or 0.0,
+                "semantic_similarity": None,
+            }
+        if rec["semantic_neighbor_name"] is not None:
+            mol["similar_drug_semantic"] = {
+                "name": rec["semantic_neighbor_name"],
+                "smiles": rec["semantic_neighbor_smiles"] or "",
+                "indication": rec["semantic_neighbor_indication"],
+                "similarity": 0.0,
+                "semantic_similarity": rec["semantic_similarity"],
+            }
+
+    if "admet" not in exclude:
+        mol["admet"] = None
+        if rec["lipinski_pass"] is not None:
+            mol["admet"] = {field: rec[field] for field in ADMET_FIELDS}
+    return mol
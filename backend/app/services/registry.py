@@ -0,0 +1,385 @@
+"""
+Canonical molecule registry shared across runs.
+
+Every distinct structure gets one molecule_registry row, keyed by its
+InChIKey (or "smiles:<canonical SMILES>" when RDKit cannot make one), with
+the data that depends only on the structure: packed Morgan fingerprint,
+chemBERTa embedding, nearest known drugs and ADMET. MoleculeRecord rows
+reference it by registry_id, so a molecule the generator samples in many
+runs is annotated and stored once.
+
+Lookups go through a per-process LRU keyed by SMILES
+(REGISTRY_CACHE_SIZE), then one indexed IN query against the registry;
+only molecules missing from both are annotated from scratch.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from rdkit import Chem
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import REGISTRY_CACHE_SIZE
+from ..metrics import Counter, register_cache, stage
+from ..models import RegisteredMolecule
+from ..schemas import ADMETProperties, Molecule, SimilarDrug
+from ..similarity import _smiles_to_fp, find_most_similar_drug_for_fp
+from .admet import calculate_admet
+from .embeddings import embed_smiles_batch, embedder_available, find_most_semantic_drug_for_embedding
+from .records import ADMET_FIELDS, annotation_columns
+from .runs import bump_run_revisions
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit.
+_IN_CHUNK = 500
+
+
+class MoleculeIdentity(NamedTuple):
+    key: str                 # registry_key
+    inchikey: Optional[str]
+    canonical_smiles: str
+
+
+class MoleculeAnnotation(NamedTuple):
+    identity: MoleculeIdentity
+    fp_neighbor: Optional[SimilarDrug]
+    semantic_neighbor: Optional[SimilarDrug]
+    admet: Optional[ADMETProperties]
+    fingerprint: Optional[bytes] = None  # only when computed in this process
+    embedding: Optional[bytes] = None
+
+
+class _LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str) -> Optional[Any]:
+        """get() without touching recency or the hit/miss counts."""
+        return self._data.get(key)
+
+    def put(self, key: str, value: Any) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_IDENTITIES = _LRU(REGISTRY_CACHE_SIZE)
+_ANNOTATIONS = _LRU(REGISTRY_CACHE_SIZE)
+
+LOOKUPS = Counter(
+    "elysium_registry_lookups_total",
+    "Molecule annotations by where they came from: cache, registry or computed.",
+    ("result",),
+)
+
+
+def registry_cache_stats() -> Dict[str, int]:
+    return {
+        "entries": len(_ANNOTATIONS),
+        "hits": _ANNOTATIONS.hits,
+        "misses": _ANNOTATIONS.misses,
+    }
+
+
+register_cache("molecule_registry", registry_cache_stats)
+
+
+# ---------- identity ----------
+
+def molecule_identity(smiles: str) -> MoleculeIdentity:
+    """Registry key, InChIKey and canonical SMILES for a SMILES string."""
+    cached = _IDENTITIES.get(smiles)
+    if cached is not None:
+        return cached
+
+    mol = Chem.MolFromSmiles(smiles)
+    if mol is None:
+        identity = MoleculeIdentity(key=f"smiles:{smiles}", inchikey=None, canonical_smiles=smiles)
+    else:
+        canonical = Chem.MolToSmiles(mol)
+        try:
+            inchikey = Chem.MolToInchiKey(mol) or None
+        except Exception:
+            inchikey = None
+        identity = MoleculeIdentity(
+            key=inchikey or f"smiles:{canonical}",
+            inchikey=inchikey,
+            canonical_smiles=canonical,
+        )
+    _IDENTITIES.put(smiles, identity)
+    return identity
+
+
+def _chunks(values: Sequence[Any]):
+    for i in range(0, len(values), _IN_CHUNK):
+        yield values[i:i + _IN_CHUNK]
+
+
+def _fingerprint(smiles: str) -> Tuple[Optional[np.ndarray], Optional[bytes], Optional[int]]:
+    fp = _smiles_to_fp(smiles)
+    if fp is None:
+        return None, None, None
+    return fp, fp.tobytes(), int(np.unpackbits(fp).sum())
+
+
+# ---------- annotations ----------
+
+def _is_annotated(row) -> bool:
+    """
+    Whether a registry row's stored annotations can be reused. A row
+    without an embedding went through the semantic stage while chemBERTa
+    was unavailable: once it is available, the row is annotated again and
+    register() fills in its semantic neighbor.
+    """
+    if row.embedding is None and embedder_available():
+        return False
+    return (
+        row.fp_neighbor_name is not None
+        or row.semantic_neighbor_name is not None
+        or row.lipinski_pass is not None
+    )
+
+
+def _annotation_from_row(identity: MoleculeIdentity, row) -> MoleculeAnnotation:
+    fp_neighbor = None
+    if row.fp_neighbor_name is not None:
+        fp_neighbor = SimilarDrug(
+            name=row.fp_neighbor_name,
+            smiles=row.fp_neighbor_smiles or "",
+            indication=row.fp_neighbor_indication,
+            similarity=row.fp_similarity or 0.0,
+        )
+    semantic_neighbor = None
+    if row.semantic_neighbor_name is not None:
+        semantic_neighbor = SimilarDrug(
+            name=row.semantic_neighbor_name,
+            smiles=row.semantic_neighbor_smiles or "",
+            indication=row.semantic_neighbor_indication,
+            similarity=0.0,
+            semantic_similarity=row.semantic_similarity,
+        )
+    admet = None
+    if row.lipinski_pass is not None:
+        admet = ADMETProperties(**{field: getattr(row, field) for field in ADMET_FIELDS})
+    return MoleculeAnnotation(identity, fp_neighbor, semantic_neighbor, admet)
+
+
+def _compute_annotations(pending: Dict[str, MoleculeIdentity]) -> Dict[str, MoleculeAnnotation]:
+    """
+    Fingerprint, embedding, nearest known drugs and ADMET, from scratch,
+    one stage at a time over all pending SMILES (so each is timed as a
+    discovery stage).
+    """
+    with stage("fingerprint_similarity"):
+        fingerprints = {smiles: _fingerprint(smiles)[:2] for smiles in pending}
+        fp_neighbors = {
+            smiles: find_most_similar_drug_for_fp(fp) if fp is not None else None
+            for smiles, (fp, _) in fingerprints.items()
+        }
+    with stage("semantic_similarity"):
+        embeddings = dict(zip(pending, embed_smiles_batch(list(pending))))
+        semantic_neighbors = {
+            smiles: find_most_semantic_drug_for_embedding(embedding)
+            for smiles, embedding in embeddings.items()
+        }
+    with stage("admet"):
+        admet = {smiles: calculate_admet(smiles) for smiles in pending}
+
+    return {
+        smiles: MoleculeAnnotation(
+            identity=identity,
+            fp_neighbor=fp_neighbors[smiles],
+            semantic_neighbor=semantic_neighbors[smiles],
+            admet=admet[smiles],
+            fingerprint=fingerprints[smiles][1],
+            embedding=None if embeddings[smiles] is None
+            else np.asarray(embeddings[smiles], dtype=np.float32).tobytes(),
+        )
+        for smiles, identity in pending.items()
+    }
+
+
+def compute_annotation(smiles: str, identity: Optional[MoleculeIdentity] = None) -> MoleculeAnnotation:
+    """Fingerprint, embedding, nearest known drugs and ADMET, from scratch."""
+    return _compute_annotations({smiles: identity or molecule_identity(smiles)})[smiles]
+
+
+def annotate_smiles(db: Session, smiles_list: Iterable[str]) -> Dict[str, MoleculeAnnotation]:
+    """
+    Annotations for each distinct SMILES: from the LRU, else from the
+    registry, else computed (and cached; written by register_molecules).
+    """
+    result: Dict[str, MoleculeAnnotation] = {}
+    pending: Dict[str, MoleculeIdentity] = {}
+    with stage("registry_lookup"):
+        for smiles in dict.fromkeys(smiles_list):
+            cached = _ANNOTATIONS.get(smiles)
+            if cached is not None:
+                result[smiles] = cached
+            else:
+                pending[smiles] = molecule_identity(smiles)
+
+        stored: Dict[str, Any] = {}
+        keys = sorted({identity.key for identity in pending.values()})
+        for chunk in _chunks(keys):
+            for row in db.scalars(select(RegisteredMolecule).where(RegisteredMolecule.registry_key.in_(chunk))):
+                if _is_annotated(row):
+                    stored[row.registry_key] = row
+
+        missing: Dict[str, MoleculeIdentity] = {}
+        for smiles, identity in pending.items():
+            row = stored.get(identity.key)
+            if row is None:
+                missing[smiles] = identity
+                continue
+            result[smiles] = _annotation_from_row(identity, row)
+            _ANNOTATIONS.put(smiles, result[smiles])
+
+    computed = _compute_annotations(missing)
+    for smiles, annotation in computed.items():
+        _ANNOTATIONS.put(smiles, annotation)
+    result.update(computed)
+
+    LOOKUPS.inc(len(result) - len(pending), result="cache")
+    LOOKUPS.inc(len(pending) - len(missing), result="registry")
+    LOOKUPS.inc(len(missing), result="computed")
+    return result
+
+
+# ---------- registration ----------
+
+def _registry_ids(db: Session, keys: Sequence[str]) -> Dict[str, int]:
+    ids: Dict[str, int] = {}
+    for chunk in _chunks(list(keys)):
+        ids.update(db.execute(
+            select(RegisteredMolecule.registry_key, RegisteredMolecule.id)
+            .where(RegisteredMolecule.registry_key.in_(chunk))
+        ).tuples().all())
+    return ids
+
+
+def _insert_ignore(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """INSERT rows, skipping keys another transaction registered meanwhile."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        db.execute(dialect_insert(RegisteredMolecule).on_conflict_do_nothing(index_elements=["registry_key"]), rows)
+        return
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(RegisteredMolecule), [row])
+        except IntegrityError:
+            pass
+
+
+def _complete_semantic(db: Session, known: Dict[str, Tuple[str, Dict[str, Any]]]) -> None:
+    """
+    Store the embedding and semantic neighbor computed in this process on
+    registered rows that have none (see _is_annotated), bumping the
+    revisions of the runs that show them.
+    """
+    params: List[Dict[str, Any]] = []
+    for chunk in _chunks(sorted(known)):
+        for key, row_id in db.execute(
+            select(RegisteredMolecule.registry_key, RegisteredMolecule.id)
+            .where(RegisteredMolecule.registry_key.in_(chunk), RegisteredMolecule.embedding.is_(None))
+        ).tuples():
+            smiles, columns = known[key]
+            cached = _ANNOTATIONS.peek(smiles)
+            if cached is None or cached.embedding is None:
+                continue
+            params.append({
+                "id": row_id,
+                "embedding": cached.embedding,
+                **{name: value for name, value in columns.items() if name.startswith("semantic_")},
+            })
+    if params:
+        db.execute(update(RegisteredMolecule), params)
+        bump_run_revisions(db, [p["id"] for p in params])
+
+
+def register(db: Session, entries: Sequence[Tuple[str, Dict[str, Any]]]) -> List[int]:
+    """
+    Registry ids for (smiles, annotation columns) pairs, inserting the
+    structures not registered yet (not committed). The annotation columns
+    only matter for new rows; existing rows keep theirs, except that rows
+    still missing the semantic stage get it from this run.
+    """
+    identities = [molecule_identity(smiles) for smiles, _ in entries]
+    ids = _registry_ids(db, sorted({identity.key for identity in identities}))
+    if ids and embedder_available():
+        _complete_semantic(db, {
+            identity.key: entry for entry, identity in zip(entries, identities) if identity.key in ids
+        })
+
+    rows: Dict[str, Dict[str, Any]] = {}
+    for (smiles, columns), identity in zip(entries, identities):
+        if identity.key in ids or identity.key in rows:
+            continue
+        cached = _ANNOTATIONS.peek(smiles)
+        if cached is not None and cached.fingerprint is not None:
+            fp_bytes = cached.fingerprint
+            popcount = int(np.unpackbits(np.frombuffer(fp_bytes, dtype=np.uint8)).sum())
+        else:
+            _, fp_bytes, popcount = _fingerprint(smiles)
+        rows[identity.key] = {
+            "registry_key": identity.key,
+            "inchikey": identity.inchikey,
+            "canonical_smiles": identity.canonical_smiles,
+            "fingerprint": fp_bytes,
+            "fp_popcount": popcount,
+            "embedding": cached.embedding if cached is not None else None,
+            **columns,
+        }
+
+    if rows:
+        _insert_ignore(db, list(rows.values()))
+        ids.update(_registry_ids(db, list(rows)))
+    return [ids[identity.key] for identity in identities]
+
+
+def register_molecules(db: Session, molecules: Sequence[Molecule]) -> List[int]:
+    """Registry ids for a run's molecules (see register)."""
+    return register(db, [
+        (m.smiles, annotation_columns(m.similar_drug, m.similar_drug_semantic, m.admet))
+        for m in molecules
+    ])
+
+
+def find_registered(db: Session, smiles: Optional[str] = None, inchikey: Optional[str] = None
+                    ) -> Optional[RegisteredMolecule]:
+    """Registry row for a SMILES (any spelling of the structure) or an InChIKey."""
+    if inchikey:
+        return db.scalar(select(RegisteredMolecule).where(RegisteredMolecule.inchikey == inchikey.strip().upper()))
+    if smiles:
+        key = molecule_identity(smiles.strip()).key
+        return db.scalar(select(RegisteredMolecule).where(RegisteredMolecule.registry_key == key))
+    return None
@@ -0,0 +1,428 @@
+"""
+Write-behind replication of discovery runs to ArangoDB.
+
+persist_run queues every Arango document a run produces (target, drugs,
+molecules, BINDS and SIMILAR_TO edges) in the SQL arango_outbox table,
+inside the same transaction as the run itself. A background
+ArangoReplicator thread drains the outbox in batches with import_bulk
+(on_duplicate="update"). Document keys are derived from the run id and
+molecule index, so a batch that is retried after a partial failure, or
+drained by two workers at once, converges to the same documents.
+
+An Arango outage therefore no longer fails /discover: rows wait in the
+outbox and the replicator retries with exponential backoff. Connection
+errors never count against rows, so an outage does not park anything.
+
+Each batch is claimed first (claimed_by / claimed_until, with FOR UPDATE
+SKIP LOCKED where the database has it), so several replicators (one per
+gunicorn worker) split the outbox instead of importing the same rows.
+When Arango rejects documents, the batch is halved until the bad row is
+on its own. Only that row is charged an attempt; it is moved out of line
+(next_attempt_at, exponential backoff) so the rows behind it keep
+flowing, and after ARANGO_REPLICATION_MAX_ATTEMPTS rejections it is
+parked (kept, reported by replication_status(), not retried).
+"""
+
+import datetime as dt
+import json
+import random
+import re
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..arangodb_client import DOCUMENT_ERRORS, get_arango_db
+from ..core.config import (
+    ARANGO_REPLICATION_BATCH,
+    ARANGO_REPLICATION_CLAIM_SECONDS,
+    ARANGO_REPLICATION_MAX_ATTEMPTS,
+    ARANGO_REPLICATION_MAX_BACKOFF_SECONDS,
+    ARANGO_REPLICATION_POLL_SECONDS,
+)
+from ..db import SessionLocal
+from ..metrics import Counter, Histogram
+from ..models import ArangoOutbox
+from ..schemas import Molecule
+
+ARANGO_WRITE_SECONDS = Histogram(
+    "elysium_arango_write_seconds",
+    "Time to import one outbox batch into ArangoDB.",
+    ("outcome",),
+)
+ARANGO_WRITE_ROWS = Counter(
+    "elysium_arango_replicated_rows_total",
+    "Outbox rows written to ArangoDB.",
+)
+
+# Vertices are imported before edges within a batch
+VERTEX_COLLECTIONS = ("targets", "drugs", "molecules")
+EDGE_COLLECTIONS = ("binds", "similar_to")
+
+_ILLEGAL_KEY_CHARS = re.compile(r"[^A-Za-z0-9_\-:.@()+,=;$!*'%]")
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit.
+_IN_CHUNK = 500
+
+
+class ImportRejected(RuntimeError):
+    """import_bulk reported per-document errors without raising."""
+
+
+# Arango refused the documents themselves (bad key, bad edge, ...), as
+# opposed to being unreachable.
+_DOCUMENT_ERRORS = DOCUMENT_ERRORS + (ImportRejected,)
+
+
+def arango_key(value: str) -> str:
+    """A legal, deterministic Arango _key for an arbitrary name."""
+    return _ILLEGAL_KEY_CHARS.sub("_", value)[:254] or "_"
+
+
+def outbox_rows(run_id: str, target_id: str, molecules: List[Molecule]) -> List[Dict[str, Any]]:
+    """Outbox rows (collection, doc_key, JSON document) for one run."""
+    docs: List[tuple] = []
+    target_key = arango_key(target_id)
+    docs.append(("targets", {"_key": target_key, "symbol": target_id}))
+
+    drug_keys: Dict[str, str] = {}
+    for m in molecules:
+        drug = m.similar_drug
+        if drug is not None and drug.name not in drug_keys:
+            drug_keys[drug.name] = arango_key(drug.name.lower())
+            docs.append(("drugs", {
+                "_key": drug_keys[drug.name],
+                "name": drug.name,
+                "smiles": drug.smiles,
+                "indication": drug.indication,
+            }))
+
+    for idx, m in enumerate(molecules):
+        mol_key = f"{run_id}_{idx}"
+        docs.append(("molecules", {
+            "_key": mol_key,
+            "run_id": run_id,
+            "index": idx,
+            "target_id": target_id,
+            "smiles": m.smiles,
+            "score": m.score,
+        }))
+
+        # molecule BINDS target
+        docs.append(("binds", {
+            "_key": f"{mol_key}_binds",
+            "_from": f"molecules/{mol_key}",
+            "_to": f"targets/{target_key}",
+            "score": m.score,
+            "source": "ELYSIUM/DeepPurpose",
+        }))
+
+        # SIMILAR_TO known drug
+        if m.similar_drug is not None:
+            docs.append(("similar_to", {
+                "_key": f"{mol_key}_similar",
+                "_from": f"molecules/{mol_key}",
+                "_to": f"drugs/{drug_keys[m.similar_drug.name]}",
+                "tanimoto": m.similar_drug.similarity,
+                "semantic": (
+                    m.similar_drug_semantic.semantic_similarity
+                    if m.similar_drug_semantic is not None else None
+                ),
+            }))
+
+    return [
+        {"collection": collection, "doc_key": doc["_key"], "document": json.dumps(doc)}
+        for collection, doc in docs
+    ]
+
+
+def enqueue_run(db: Session, run_id: str, target_id: str, molecules: List[Molecule]) -> None:
+    """Queue a run's Arango documents in the caller's transaction (not committed)."""
+    db.execute(insert(ArangoOutbox), outbox_rows(run_id, target_id, molecules))
+
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), _IN_CHUNK):
+        yield ids[i:i + _IN_CHUNK]
+
+
+class ArangoReplicator:
+    """Background thread draining arango_outbox into ArangoDB."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        arango_factory=get_arango_db,
+        batch_size: int = ARANGO_REPLICATION_BATCH,
+        poll_seconds: float = ARANGO_REPLICATION_POLL_SECONDS,
+        max_backoff: float = ARANGO_REPLICATION_MAX_BACKOFF_SECONDS,
+        max_attempts: int = ARANGO_REPLICATION_MAX_ATTEMPTS,
+        claim_seconds: float = ARANGO_REPLICATION_CLAIM_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.arango_factory = arango_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.claim_seconds = claim_seconds
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._arango = None
+        self._batch_limit = batch_size
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.replicated_total = 0
+        self.set_aside_total = 0
+        self.consecutive_failures = 0
+        self.last_success_at: Optional[dt.datetime] = None
+        self.last_error: Optional[str] = None
+
+    # ---------- draining ----------
+
+    def _import(self, rows) -> None:
+        if self._arango is None:
+            self._arango = self.arango_factory()
+
+        by_collection: Dict[str, List[dict]] = {}
+        for row in rows:
+            by_collection.setdefault(row.collection, []).append(json.loads(row.document))
+        order = [c for c in VERTEX_COLLECTIONS + EDGE_COLLECTIONS if c in by_collection]
+        order += [c for c in by_collection if c not in order]
+
+        for collection in order:
+            result = self._arango.collection(collection).import_bulk(
+                by_collection[collection],
+                on_duplicate="update",
+                halt_on_error=True,
+                details=True,
+            )
+            if isinstance(result, dict) and result.get("errors"):
+                raise ImportRejected(f"{collection}: {result.get('details') or result['errors']}")
+
+    def _retry_delay(self, attempts: int) -> float:
+        return min(self.max_backoff, 0.5 * 2 ** max(0, attempts - 1))
+
+    def _claim(self, db: Session, now: dt.datetime):
+        """
+        Claim up to one batch of ready rows for this replicator and return
+        them. Rows another replicator holds (unexpired claim), rows waiting
+        for a retry and parked rows are skipped.
+        """
+        token = f"{self.name}-{uuid.uuid4().hex[:8]}"
+        available = and_(
+            ArangoOutbox.attempts < self.max_attempts,
+            or_(ArangoOutbox.next_attempt_at.is_(None), ArangoOutbox.next_attempt_at <= now),
+            or_(ArangoOutbox.claimed_until.is_(None), ArangoOutbox.claimed_until < now),
+        )
+        candidates = (
+            select(ArangoOutbox.id)
+            .where(available)
+            .order_by(ArangoOutbox.id)
+            .limit(self._batch_limit)
+            .with_for_update(skip_locked=True)
+        )
+        # `available` is repeated on the UPDATE: a replicator that raced for
+        # the same rows re-checks it once the winner commits and gets none.
+        db.execute(
+            update(ArangoOutbox)
+            .where(ArangoOutbox.id.in_(candidates), available)
+            .values(claimed_by=token, claimed_until=now + dt.timedelta(seconds=self.claim_seconds))
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return db.execute(
+            select(ArangoOutbox.id, ArangoOutbox.collection, ArangoOutbox.document, ArangoOutbox.attempts)
+            .where(ArangoOutbox.claimed_by == token)
+            .order_by(ArangoOutbox.id)
+        ).all()
+
+    def _release(self, db: Session, ids: List[int]) -> None:
+        for chunk in _chunks(ids):
+            db.execute(
+                update(ArangoOutbox)
+                .where(ArangoOutbox.id.in_(chunk))
+                .values(claimed_by=None, claimed_until=None)
+            )
+        db.commit()
+
+    def drain_once(self) -> int:
+        """Replicate one batch; returns the number of rows replicated (0 = nothing ready)."""
+        with self.session_factory() as db:
+            now = dt.datetime.utcnow()
+            rows = self._claim(db, now)
+            if not rows:
+                return 0
+            ids = [row.id for row in rows]
+
+            start = time.perf_counter()
+            try:
+                self._import(rows)
+            except _DOCUMENT_ERRORS as e:
+                ARANGO_WRITE_SECONDS.observe(time.perf_counter() - start, outcome="rejected")
+                self.last_error = f"{type(e).__name__}: {e}"[:2000]
+                if len(rows) > 1:
+                    # Halve the batch until the bad document is on its own;
+                    # the rows sharing a batch with it are not charged
+                    self._batch_limit = max(1, len(rows) // 2)
+                    self._release(db, ids)
+                    raise
+                # Isolated: charge it and move it out of line so the rows
+                # behind it keep flowing
+                row = rows[0]
+                attempts = row.attempts + 1
+                db.execute(
+                    update(ArangoOutbox)
+                    .where(ArangoOutbox.id == row.id)
+                    .values(
+                        attempts=attempts,
+                        last_error=self.last_error,
+                        next_attempt_at=now + dt.timedelta(seconds=self._retry_delay(attempts)),
+                        claimed_by=None,
+                        claimed_until=None,
+                    )
+                )
+                db.commit()
+                self.set_aside_total += 1
+                self._batch_limit = self.batch_size
+                raise
+            except Exception as e:
+                ARANGO_WRITE_SECONDS.observe(time.perf_counter() - start, outcome="error")
+                # Unreachable / timing out: re-fetch the (pooled) handle next time
+                self._arango = None
+                self.last_error = f"{type(e).__name__}: {e}"[:2000]
+                self._release(db, ids)
+                raise
+
+            ARANGO_WRITE_SECONDS.observe(time.perf_counter() - start, outcome="ok")
+            ARANGO_WRITE_ROWS.inc(len(ids))
+
+            for chunk in _chunks(ids):
+                db.execute(delete(ArangoOutbox).where(ArangoOutbox.id.in_(chunk)))
+            db.commit()
+
+        self._batch_limit = min(self.batch_size, self._batch_limit * 2)
+        self.replicated_total += len(ids)
+        self.last_success_at = dt.datetime.utcnow()
+        return len(ids)
+
+    def drain(self, max_seconds: Optional[float] = None) -> int:
+        """Drain until the outbox is empty (or time runs out) in the calling thread."""
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        total = 0
+        while deadline is None or time.monotonic() < deadline:
+            n = self.drain_once()
+            if n == 0:
+                break
+            total += n
+        return total
+
+    # ---------- background thread ----------
+
+    def _run(self) -> None:
+        backoff = 0.0
+        while not self._stop.is_set():
+            try:
+                n = self.drain_once()
+                backoff = 0.0
+                self.consecutive_failures = 0
+                if n:
+                    continue
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+            except _DOCUMENT_ERRORS as e:
+                # A smaller batch, or the rows behind a set-aside one: no backoff
+                if self._batch_limit == self.batch_size:
+                    print(f"[replication] Arango rejected a document, retrying it later: {e}")
+                continue
+            except Exception as e:
+                self.consecutive_failures += 1
+                backoff = min(self.max_backoff, max(0.5, backoff * 2))
+                print(f"[replication] Arango batch failed ({self.consecutive_failures}x), "
+                      f"retrying in {backoff:.1f}s: {e}")
+                self._stop.wait(backoff * random.uniform(0.5, 1.0))
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="arango-replicator", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def notify(self) -> None:
+        """Wake the thread now instead of at the next poll."""
+        self._wake.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+# ---------- process-wide replicator ----------
+
+_REPLICATOR: Optional[ArangoReplicator] = None
+
+
+def get_replicator() -> ArangoReplicator:
+    global _REPLICATOR
+    if _REPLICATOR is None:
+        _REPLICATOR = ArangoReplicator()
+    return _REPLICATOR
+
+
+def start_replicator() -> None:
+    get_replicator().start()
+
+
+def stop_replicator() -> None:
+    if _REPLICATOR is not None:
+        _REPLICATOR.stop()
+
+
+def notify_replicator() -> None:
+    if _REPLICATOR is not None:
+        _REPLICATOR.notify()
+
+
+def replication_status(db: Session) -> Dict[str, Any]:
+    """Outbox backlog and replication lag, plus this process's replicator state."""
+    replicator = get_replicator()
+    pending_filter = ArangoOutbox.attempts < replicator.max_attempts
+    pending, oldest = db.execute(
+        select(func.count(), func.min(ArangoOutbox.created_at)).where(pending_filter)
+    ).one()
+    parked = db.scalar(select(func.count()).select_from(ArangoOutbox).where(~pending_filter)) or 0
+    retrying = db.scalar(
+        select(func.count()).select_from(ArangoOutbox)
+        .where(pending_filter, ArangoOutbox.next_attempt_at > dt.datetime.utcnow())
+    ) or 0
+
+    lag = 0.0
+    if pending and oldest is not None:
+        lag = max(0.0, (dt.datetime.utcnow() - oldest).total_seconds())
+
+    return {
+        "running": replicator.running,
+        "pending": pending or 0,
+        "parked": parked,
+        "retrying": retrying,
+        "lag_seconds": round(lag, 3),
+        "oldest_pending_at": oldest if pending else None,
+        "replicated_total": replicator.replicated_total,
+        "consecutive_failures": replicator.consecutive_failures,
+        "last_success_at": replicator.last_success_at,
+        "last_error": replicator.last_error,
+    }
@@ -0,0 +1,202 @@
+"""
+Paged reads of stored discovery runs (/runs and /runs/{id}).
+
+Both listings use keyset pagination (services.pagination): runs by
+(created_at, id) newest first, a run's molecules by id, which is the
+order run_discovery ranked them in (persist_run inserts them that way),
+each backed by a composite index. Only the columns a response
+needs are selected, so ?exclude= also saves the reads.
+
+A run's rows never change, but the registry annotations it shows can
+(app.backfill_runs): every such change bumps discovery_runs.revision,
+which HTTP caching of /runs/{id} keys on.
+"""
+
+from typing import AbstractSet, Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models import DiscoveryRun, MoleculeRecord
+from ..schemas import DiscoveryResponse, DiscoveryRunListResponse, DiscoveryRunSummary
+from .pagination import decode_cursor, encode_cursor, page_limit
+from .records import join_registry, molecule_dict_from_record, molecule_from_record, record_columns
+
+RUNS_CURSOR = "runs"
+# Renamed with the switch from (score, id) to id order: old cursors are rejected
+MOLECULES_CURSOR = "run-molecules-ranked"
+
+
+def list_runs_page(
+    db: Session,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    registry_id: Optional[int] = None,
+) -> DiscoveryRunListResponse:
+    """
+    One page of runs, newest first, and the cursor of the next page.
+    With registry_id, only runs containing that registered molecule
+    (an ix_molecules_registry_run lookup).
+    """
+    query = select(
+        DiscoveryRun.id,
+        DiscoveryRun.target_id,
+        DiscoveryRun.num_molecules,
+        DiscoveryRun.created_at,
+    ).order_by(DiscoveryRun.created_at.desc(), DiscoveryRun.id.desc())
+    if registry_id is not None:
+        query = query.where(DiscoveryRun.id.in_(
+            select(MoleculeRecord.run_id).where(MoleculeRecord.registry_id == registry_id)
+        ))
+
+    if cursor:
+        created_at, run_id = decode_cursor(cursor, RUNS_CURSOR, 2)
+        query = query.where(or_(
+            DiscoveryRun.created_at < created_at,
+            and_(DiscoveryRun.created_at == created_at, DiscoveryRun.id < run_id),
+        ))
+
+    # One extra row tells whether there is a next page
+    rows = db.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return DiscoveryRunListResponse(
+        runs=[
+            DiscoveryRunSummary(
+                run_id=row.id,
+                target_id=row.target_id,
+                num_molecules=row.num_molecules,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ],
+        next_cursor=encode_cursor(RUNS_CURSOR, rows[-1].created_at, rows[-1].id) if has_more else None,
+    )
+
+
+RunPage = Tuple[Any, List[Any], Optional[str]]
+
+_REVISION = func.coalesce(DiscoveryRun.revision, 1)
+
+
+def run_revision(db: Session, run_id: str) -> Optional[int]:
+    """The run's revision, or None if the run does not exist (one primary-key read)."""
+    return db.execute(select(_REVISION).where(DiscoveryRun.id == run_id)).scalar()
+
+
+def bump_run_revisions(db: Session, registry_ids: List[int]) -> None:
+    """Mark the runs showing these registry rows as changed (caller commits)."""
+    for start in range(0, len(registry_ids), 500):
+        chunk = registry_ids[start:start + 500]
+        db.execute(
+            update(DiscoveryRun)
+            .where(DiscoveryRun.id.in_(
+                select(MoleculeRecord.run_id).where(MoleculeRecord.registry_id.in_(chunk))
+            ))
+            .values(revision=_REVISION + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def fetch_run_page(
+    db: Session,
+    run_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    top_k: Optional[int] = None,
+    exclude: AbstractSet[str] = frozenset(),
+) -> Optional[RunPage]:
+    """
+    The database part of get_run_page: (run row, molecule rows, next
+    cursor), or None if the run does not exist. Async endpoints run this
+    on the async session and build the response (run_page_response /
+    run_page_content) off the event loop.
+    """
+    run = db.execute(
+        select(DiscoveryRun.id, DiscoveryRun.target_id, DiscoveryRun.num_molecules, _REVISION.label("revision"))
+        .where(DiscoveryRun.id == run_id)
+    ).first()
+    if run is None:
+        return None
+
+    served = 0
+    query = (
+        join_registry(select(*record_columns(exclude)).select_from(MoleculeRecord), exclude)
+        .where(MoleculeRecord.run_id == run_id)
+        .order_by(MoleculeRecord.id)
+    )
+    if cursor:
+        last_id, served = decode_cursor(cursor, MOLECULES_CURSOR, 2)
+        query = query.where(MoleculeRecord.id > last_id)
+
+    n = page_limit(limit, top_k, served)
+    if n is not None:
+        query = query.limit(n + 1)
+    rows = db.execute(query).all() if n != 0 else []
+
+    has_more = n is not None and len(rows) > n and (top_k is None or served + n < top_k)
+    rows = rows[:n] if n is not None else rows
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(MOLECULES_CURSOR, last.id, served + len(rows))
+    return run, rows, next_cursor
+
+
+def run_page_response(page: RunPage, exclude: AbstractSet[str] = frozenset()) -> DiscoveryResponse:
+    run, rows, next_cursor = page
+    return DiscoveryResponse(
+        run_id=run.id,
+        target_id=run.target_id,
+        num_molecules=run.num_molecules,
+        molecules=[molecule_from_record(row, exclude) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+def run_page_content(page: RunPage, exclude: AbstractSet[str] = frozenset()) -> Dict[str, Any]:
+    """
+    The page as plain JSON-ready dicts (excluded fields left out), for the
+    fast serialization path: no pydantic objects are built.
+    """
+    run, rows, next_cursor = page
+    return {
+        "run_id": run.id,
+        "target_id": run.target_id,
+        "num_molecules": run.num_molecules,
+        "molecules": [molecule_dict_from_record(row._mapping, exclude) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+def get_run_page(
+    db: Session,
+    run_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    top_k: Optional[int] = None,
+    exclude: AbstractSet[str] = frozenset(),
+) -> Optional[DiscoveryResponse]:
+    """
+    A run with (a page of) its molecules in ranked order, best first.
+    None if the run does not exist.
+
+    limit = page size (None: the rest of the run), top_k = only the k
+    best molecules overall, across pages. Both become SQL LIMITs.
+    """
+    page = fetch_run_page(db, run_id, limit, cursor, top_k, exclude)
+    return run_page_response(page, exclude) if page is not None else None
+
+
+def get_run_content(
+    db: Session,
+    run_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    top_k: Optional[int] = None,
+    exclude: AbstractSet[str] = frozenset(),
+) -> Optional[Dict[str, Any]]:
+    """get_run_page as plain dicts (see run_page_content)."""
+    page = fetch_run_page(db, run_id, limit, cursor, top_k, exclude)
+    return run_page_content(page, exclude) if page is not None else None
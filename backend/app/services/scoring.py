@@ -9,6 +9,7 @@ We define a common interface for "score(drugs, target)" and provide:
 from typing import List, Protocol
 
 from ..core.config import SCORER_BACKEND
+from ..metrics import FALLBACKS, MODEL_AVAILABLE, model_load
 
 
 class ScoringBackend(Protocol):
@@ -19,6 +20,8 @@ class ScoringBackend(Protocol):
 class StubScorer:
     """Deterministic scoring stub."""
 
+    name = "stub"
+
     def score(self, smiles_list: List[str], target_sequence: str, target_id: str) -> List[float]:
         base = 1.0
         step = 0.05
@@ -40,7 +43,14 @@ class DeepPurposeScorer:
     def __init__(self) -> None:
         self._stub = StubScorer()
         self._model = None
-        self._available = self._try_init_model()
+        with model_load("deeppurpose"):
+            self._available = self._try_init_model()
+        MODEL_AVAILABLE.set(1 if self._available else 0, model="deeppurpose")
+
+    @property
+    def name(self) -> str:
+        # Metrics label: what actually scores the molecules
+        return "deeppurpose" if self._available else "stub"
 
     def _try_init_model(self) -> bool:
         try:
@@ -54,10 +64,14 @@ class DeepPurposeScorer:
             print("[DeepPurposeScorer] Failed to import DeepPurpose, using stub instead:", e)
             return False
 
+    def _fallback(self, reason: str, smiles_list: List[str], target_sequence: str, target_id: str) -> List[float]:
+        FALLBACKS.inc(component="scorer", reason=reason)
+        return self._stub.score(smiles_list, target_sequence, target_id)
+
     def score(self, smiles_list: List[str], target_sequence: str, target_id: str) -> List[float]:
         # If DeepPurpose is not available, use stub.
         if not self._available:
-            return self._stub.score(smiles_list, target_sequence, target_id)
+            return self._fallback("unavailable", smiles_list, target_sequence, target_id)
 
         if not smiles_list:
             return []
@@ -84,7 +98,7 @@ class DeepPurposeScorer:
                 df = pd.DataFrame(result)
 
             if df.empty:
-                return self._stub.score(smiles_list, target_sequence, target_id)
+                return self._fallback("no_predictions", smiles_list, target_sequence, target_id)
 
             # Heuristic: find score column.
             score_col = None
@@ -97,7 +111,7 @@ class DeepPurposeScorer:
             if score_col is None:
                 numeric_cols = df.select_dtypes(include=[np.number]).columns
                 if len(numeric_cols) == 0:
-                    return self._stub.score(smiles_list, target_sequence, target_id)
+                    return self._fallback("no_predictions", smiles_list, target_sequence, target_id)
                 score_col = numeric_cols[0]
 
             # Build mapping from drug name to score.
@@ -117,7 +131,7 @@ class DeepPurposeScorer:
         except Exception as e:
             # If anything goes wrong in DeepPurpose, fall back and don't crash the API.
             print("[DeepPurposeScorer] Error during scoring, falling back to stub:", e)
-            return self._stub.score(smiles_list, target_sequence, target_id)
+            return self._fallback("error", smiles_list, target_sequence, target_id)
 
 
 def get_scorer() -> ScoringBackend:
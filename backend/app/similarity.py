@@ -1,48 +1,104 @@
-from typing import Tuple, Optional
-from rdkit import Chem, DataStructs
-from rdkit.Chem import AllChem
-from .fda_library import FDA_LIKE_DRUGS
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+from .data.library_store import LibraryStore
+from .fda_library import FDA_LIKE_DRUGS, DrugRecord, reference_store
+from .metrics import model_load
 from .schemas import SimilarDrug
 from .services.embeddings import find_most_semantic_drug
 
 
-def _smiles_to_fp(smiles: str):
-    """Return Morgan fingerprint for a SMILES string, or None if invalid."""
+FP_BITS = 2048
+_FP_GEN = rdFingerprintGenerator.GetMorganGenerator(radius=2, fpSize=FP_BITS)
+
+# Bits set in each byte value, for popcounts over packed fingerprints.
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# Rows scored per step; bounds temporaries when the library is memory-mapped.
+_SCAN_CHUNK = 65536
+
+
+def _smiles_to_fp(smiles: str) -> Optional[np.ndarray]:
+    """Return the packed Morgan fingerprint (uint8, FP_BITS // 8) for a SMILES, or None if invalid."""
     mol = Chem.MolFromSmiles(smiles)
     if mol is None:
         return None
-    return AllChem.GetMorganFingerprintAsBitVect(mol, radius=2, nBits=2048)
+    return np.packbits(_FP_GEN.GetFingerprintAsNumPy(mol).astype(np.uint8))
+
+
+class _ReferenceIndex:
+    """
+    Packed fingerprint matrix for the reference drugs.
+
+    Backed by the memory-mapped LibraryStore when one is configured,
+    otherwise built once from FDA_LIKE_DRUGS.
+    """
+
+    def __init__(self, store: Optional[LibraryStore] = None) -> None:
+        store = store if store is not None else reference_store()
+        if store is not None:
+            self.fps = store.fingerprints
+            self.counts = store.fp_counts
+            self.record: Callable[[int], DrugRecord] = store.record
+            return
+
+        drugs = []
+        rows = []
+        for drug in FDA_LIKE_DRUGS:
+            fp = _smiles_to_fp(drug["smiles"])
+            if fp is not None:
+                drugs.append(drug)
+                rows.append(fp)
+        self.fps = np.vstack(rows) if rows else np.zeros((0, FP_BITS // 8), dtype=np.uint8)
+        self.counts = _POPCOUNT[self.fps].sum(axis=1, dtype=np.uint16)
+        self.record = drugs.__getitem__
+
+    def __len__(self) -> int:
+        return len(self.fps)
+
+    def best_match(self, query: np.ndarray) -> Tuple[int, float]:
+        """Index and Tanimoto similarity of the closest reference fingerprint."""
+        q_count = int(_POPCOUNT[query].sum())
+        best_idx, best_sim = -1, -1.0
+        for start in range(0, len(self.fps), _SCAN_CHUNK):
+            block = np.asarray(self.fps[start:start + _SCAN_CHUNK])
+            inter = _POPCOUNT[block & query].sum(axis=1, dtype=np.int32)
+            union = self.counts[start:start + _SCAN_CHUNK].astype(np.int32) + q_count - inter
+            sims = np.divide(inter, union, out=np.zeros(len(inter)), where=union > 0)
+            i = int(np.argmax(sims))
+            if sims[i] > best_sim:
+                best_idx, best_sim = start + i, float(sims[i])
+        return best_idx, best_sim
 
 
 # Precompute fingerprints for library drugs
-_LIB_FPS = []
-for drug in FDA_LIKE_DRUGS:
-    fp = _smiles_to_fp(drug["smiles"])
-    if fp is not None:
-        _LIB_FPS.append((drug, fp))
+with model_load("reference_fingerprints"):
+    _LIB_INDEX = _ReferenceIndex()
 
 
 def find_most_similar_drug(smiles: str) -> Optional[SimilarDrug]:
     """
     For a candidate molecule, return the most similar known drug
-    from the tiny FDA-like library using Tanimoto similarity.
+    from the reference library using Tanimoto similarity.
     """
     fp = _smiles_to_fp(smiles)
-    if fp is None or not _LIB_FPS:
+    if fp is None:
         return None
+    return find_most_similar_drug_for_fp(fp)
 
-    best = None
-    best_sim = -1.0
 
-    for drug, lib_fp in _LIB_FPS:
-        sim = DataStructs.TanimotoSimilarity(fp, lib_fp)
-        if sim > best_sim:
-            best_sim = sim
-            best = drug
+def find_most_similar_drug_for_fp(fp: np.ndarray) -> Optional[SimilarDrug]:
+    """Same, for an already computed packed fingerprint (see _smiles_to_fp)."""
+    if not len(_LIB_INDEX):
+        return None
 
-    if best is None:
+    best_idx, best_sim = _LIB_INDEX.best_match(fp)
+    if best_idx < 0:
         return None
 
+    best = _LIB_INDEX.record(best_idx)
     return SimilarDrug(
         name=best["name"],
         smiles=best["smiles"],
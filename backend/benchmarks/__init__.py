@@ -0,0 +1,11 @@
+"""
+Benchmarks for ELYSIUM hot paths.
+
+Run from the backend/ folder, e.g.:
+    python -m benchmarks.bench_generation
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+
+suite.py times every hot path at several synthetic sizes and compares
+against a saved baseline; the bench_* scripts dig into one feature each.
+Synthetic data comes from benchmarks.synthetic.
+"""
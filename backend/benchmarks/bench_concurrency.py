@@ -0,0 +1,175 @@
+"""
+Mixed read/write concurrency benchmark for the SQL layer.
+
+Writer processes persist discovery runs (the SQL part of POST /discover,
+one process per writer like separate uvicorn workers, so the GIL does not
+hide lock contention); reader threads run the queries behind GET /runs and
+GET /runs/{id} on a few small seeded runs, so read latency mostly measures lock waits rather than
+serialization work. Each engine configuration runs against a fresh
+SQLite file:
+
+  - legacy: rollback journal, default pragmas (the old db.py)
+  - tuned:  build_engine() with WAL, synchronous=NORMAL, busy timeout, pool
+
+    python -m benchmarks.bench_concurrency --seconds 10 --writers 2 --readers 8
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+_TMP = tempfile.mkdtemp(prefix="elysium-bench-")
+os.environ.setdefault("ELYSIUM_DATABASE_URL", f"sqlite:///{_TMP}/app.db")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, build_engine
+from app.services.discovery import persist_run
+from app.services.runs import get_run_content, list_runs_page
+from benchmarks.synthetic import synthetic_molecules
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _make_engine(mode: str, url: str):
+    if mode == "legacy":
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return build_engine(url)
+
+
+def _writer_process(mode: str, url: str, seconds: float, molecules_per_run: int, out: "mp.Queue") -> None:
+    engine = _make_engine(mode, url)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    molecules = synthetic_molecules(molecules_per_run)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            with Session() as db:
+                persist_run(db, "EGFR", molecules)
+                db.commit()
+            latencies.append(time.perf_counter() - t0)
+        except Exception as exc:
+            name = f"write:{type(exc).__name__}: {str(exc).splitlines()[0][:80]}"
+            errors[name] = errors.get(name, 0) + 1
+    engine.dispose()
+    out.put((latencies, errors))
+
+
+def run_mix(mode: str, url: str, seconds: float, writers: int, readers: int, molecules_per_run: int) -> Dict:
+    engine = _make_engine(mode, url)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    molecules = synthetic_molecules(molecules_per_run)
+
+    with Session() as db:
+        seeded = [persist_run(db, "EGFR", molecules[:10])[0].id for _ in range(5)]
+        db.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    read_lat: List[float] = []
+    write_lat: List[float] = []
+    errors = {"read": 0, "write": 0}
+    error_kinds: Dict[str, int] = {}
+
+    def _record_error(kind: str, exc: Exception) -> None:
+        with lock:
+            errors[kind] += 1
+            name = f"{kind}:{type(exc).__name__}: {str(exc).splitlines()[0][:80]}"
+            error_kinds[name] = error_kinds.get(name, 0) + 1
+
+    def reader() -> None:
+        rng = random.Random()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                with Session() as db:
+                    if rng.random() < 0.5:
+                        list_runs_page(db)
+                    else:
+                        get_run_content(db, rng.choice(seeded))
+                with lock:
+                    read_lat.append(time.perf_counter() - t0)
+            except Exception as exc:
+                _record_error("read", exc)
+
+    # spawn, not fork: a forked child holding copies of the parent's SQLite
+    # file descriptors can silently drop the parent's POSIX locks.
+    ctx = mp.get_context("spawn")
+    out: "mp.Queue" = ctx.Queue()
+    procs = [
+        ctx.Process(target=_writer_process, args=(mode, url, seconds, molecules_per_run, out))
+        for _ in range(writers)
+    ]
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    for p in procs:
+        p.start()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    for _ in procs:
+        lat, errs = out.get()
+        write_lat.extend(lat)
+        for name, count in errs.items():
+            errors["write"] += count
+            error_kinds[name] = error_kinds.get(name, 0) + count
+    for p in procs:
+        p.join()
+    engine.dispose()
+
+    def summary(lat: List[float], kind: str) -> Dict:
+        return {
+            "ops": len(lat),
+            "ops_per_sec": round(len(lat) / seconds, 1),
+            "p50_ms": round(_percentile(lat, 50) * 1000, 2),
+            "p95_ms": round(_percentile(lat, 95) * 1000, 2),
+            "p99_ms": round(_percentile(lat, 99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else 0.0,
+            "errors": errors[kind],
+        }
+
+    return {
+        "reads": summary(read_lat, "read"),
+        "writes": summary(write_lat, "write"),
+        "error_kinds": error_kinds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--molecules", type=int, default=100, help="molecules per written run")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("legacy", "tuned"):
+        url = f"sqlite:///{os.path.join(_TMP, mode + '.db')}"
+        results[mode] = run_mix(mode, url, args.seconds, args.writers, args.readers, args.molecules)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Generator throughput benchmark.
+
+Figure of merit: valid, unique molecules produced per second.
+
+    python -m benchmarks.bench_generation --sizes 100 1000 --repeats 3
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List
+
+from rdkit import Chem
+
+from app.services.generation import HybridGenerator, LibraryGenerator
+
+
+def _valid_unique(smiles_list: List[str]) -> int:
+    canon = set()
+    for smi in smiles_list:
+        mol = Chem.MolFromSmiles(smi)
+        if mol is not None:
+            canon.add(Chem.MolToSmiles(mol))
+    return len(canon)
+
+
+def bench(generator, name: str, size: int, repeats: int) -> Dict[str, float]:
+    best = float("inf")
+    unique = 0
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = generator.generate("EGFR", size)
+        elapsed = time.perf_counter() - t0
+        best = min(best, elapsed)
+        unique = _valid_unique(out)
+    return {
+        "generator": name,
+        "size": size,
+        "seconds": round(best, 4),
+        "valid_unique": unique,
+        "valid_unique_per_sec": round(unique / best, 1) if best > 0 else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    generators = {
+        "library": LibraryGenerator(),
+        "hybrid": HybridGenerator(seed=0),
+    }
+    results = [
+        bench(gen, name, size, args.repeats)
+        for size in args.sizes
+        for name, gen in generators.items()
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
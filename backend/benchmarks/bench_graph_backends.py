@@ -0,0 +1,176 @@
+"""
+Parity and latency of the SQL and AQL graph views.
+
+Persists `--runs` discovery runs over a few targets (varied binding
+scores, Tanimoto / cosine values, some molecules without a similar drug),
+replicates them to the in-memory Arango stand-in through the outbox, and
+checks that get_target_graph / get_drug_graph and their AQL counterparts
+return the same molecules in the same metric order for every sort key
+and filter combination. Equal scores may be tie-broken differently (SQL:
+insertion order, AQL: run id + index), so order is compared on the sort
+metric and content as a multiset. Each AQL view is also walked page by
+page (limit + next_cursor) and must equal its unpaged result.
+
+The stand-in has no AQL engine; it runs the Python equivalent registered
+for each query (app/arango_memory.py). Against a real server, run with
+ARANGO_BACKEND=http and --live to compare the actual AQL.
+
+    python -m benchmarks.bench_graph_backends --runs 20 --molecules 300
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from sqlalchemy.orm import sessionmaker
+
+from app.arango_memory import MemoryArangoDatabase
+from app.arangodb_client import get_arango_db
+from app.db import Base, build_engine
+from app.fda_library import FDA_LIKE_DRUGS
+from app.init_arango import init_arango_schema
+from app.schemas import Molecule, SimilarDrug
+from app.services.discovery import persist_run
+from app.services.graph_aql import clear_graph_cache, get_drug_graph_aql, get_target_graph_aql
+from app.services.kg import GRAPH_SORT_KEYS, get_drug_graph, get_target_graph
+from app.services.replication import ArangoReplicator
+
+TARGETS = ("EGFR", "BRAF", "KRAS")
+FILTERS = ((None, None), (0.5, None), (None, 0.4), (0.3, 0.6))
+
+
+def varied_molecules(n: int, rng: random.Random):
+    mols = []
+    for i in range(n):
+        drug = FDA_LIKE_DRUGS[rng.randrange(len(FDA_LIKE_DRUGS))]
+        similar = None
+        if rng.random() > 0.1:
+            similar = SimilarDrug(
+                name=drug["name"],
+                smiles=drug["smiles"],
+                indication=drug.get("indication"),
+                similarity=round(rng.random(), 3),
+                semantic_similarity=None if rng.random() < 0.2 else round(rng.random(), 3),
+            )
+        mols.append(Molecule(
+            smiles="C" * (1 + i % 20) + "O",
+            score=round(rng.random(), 2),  # coarse, so there are ties
+            source="StubScorer",
+            similar_drug=similar,
+            similar_drug_semantic=similar,
+        ))
+    return mols
+
+
+def _target_metric(entry, sort_by):
+    if sort_by == "score":
+        return entry.score
+    drug = entry.similar_drug
+    if drug is None:
+        return None
+    return drug.similarity if sort_by == "tanimoto" else drug.semantic_similarity
+
+
+def _same(sql_entries, aql_entries, metric) -> bool:
+    if [metric(e) for e in sql_entries] != [metric(e) for e in aql_entries]:
+        return False
+    key = lambda e: json.dumps(e.model_dump(), sort_keys=True)
+    return sorted(map(key, sql_entries)) == sorted(map(key, aql_entries))
+
+
+def _walk(fetch, page_size: int):
+    """Concatenate all pages of a paged view."""
+    entries, cursor = [], None
+    while True:
+        page = fetch(limit=page_size, cursor=cursor)
+        entries += page.molecules
+        cursor = page.next_cursor
+        if cursor is None:
+            return entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--molecules", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--live", action="store_true", help="replicate into get_arango_db() instead of a fresh stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    arango = get_arango_db() if args.live else MemoryArangoDatabase()
+    init_arango_schema(arango)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'graph.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        for i in range(args.runs):
+            with session_factory() as db:
+                persist_run(db, TARGETS[i % len(TARGETS)], varied_molecules(args.molecules, rng))
+                db.commit()
+        ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango).drain()
+
+        mismatches = []
+        checks = 0
+        with session_factory() as db:
+            for target in TARGETS:
+                for sort_by in GRAPH_SORT_KEYS:
+                    for min_cosine, min_tanimoto in FILTERS:
+                        sql = get_target_graph(db, target, min_cosine, min_tanimoto, sort_by).molecules
+                        aql = get_target_graph_aql(target, min_cosine, min_tanimoto, sort_by, db=arango).molecules
+                        checks += 1
+                        if not _same(sql, aql, lambda e: _target_metric(e, sort_by)):
+                            mismatches.append(["target", target, sort_by, min_cosine, min_tanimoto, len(sql), len(aql)])
+                        paged = _walk(lambda **page: get_target_graph_aql(
+                            target, min_cosine, min_tanimoto, sort_by, db=arango, **page), 37)
+                        if paged != aql:
+                            mismatches.append(["target-pages", target, sort_by, min_cosine, min_tanimoto])
+            for drug in {d["name"] for d in FDA_LIKE_DRUGS}:
+                for min_cosine, min_tanimoto in FILTERS:
+                    sql = get_drug_graph(db, drug, min_cosine, min_tanimoto).molecules
+                    aql = get_drug_graph_aql(drug, min_cosine, min_tanimoto, db=arango).molecules
+                    checks += 1
+                    if not _same(sql, aql, lambda e: e.score):
+                        mismatches.append(["drug", drug, min_cosine, min_tanimoto, len(sql), len(aql)])
+                    paged = _walk(lambda **page: get_drug_graph_aql(
+                        drug, min_cosine, min_tanimoto, db=arango, **page), 11)
+                    if paged != aql:
+                        mismatches.append(["drug-pages", drug, min_cosine, min_tanimoto])
+
+            timings = {}
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                get_target_graph(db, TARGETS[0])
+            timings["sql_target_ms"] = (time.perf_counter() - t0) / args.repeat * 1000
+
+            clear_graph_cache()
+            t0 = time.perf_counter()
+            get_target_graph_aql(TARGETS[0], db=arango)
+            timings["aql_target_cold_ms"] = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                get_target_graph_aql(TARGETS[0], db=arango)
+            timings["aql_target_cached_ms"] = (time.perf_counter() - t0) / args.repeat * 1000
+        engine.dispose()
+
+    print(json.dumps({
+        "backend": "live" if args.live else "memory stand-in",
+        "runs": args.runs,
+        "molecules_per_run": args.molecules,
+        "checks": checks,
+        "parity": not mismatches,
+        "mismatches": mismatches[:10],
+        **{k: round(v, 3) for k, v in timings.items()},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Graph projection benchmark on a synthetic SQL graph.
+
+Reuses the bench_kg_views graph (one BINDS + one SIMILAR_TO edge per
+generated molecule), then times loading the CSR projection from SQL,
+k-hop neighborhoods, target -> drug path queries and applying the delta
+of a new run.
+
+    python -m benchmarks.bench_graph_projection --molecules 500000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Callable, Dict
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from sqlalchemy.orm import Session
+
+from app.db import Base, build_engine
+from app.services.graph_projection import GraphDelta, GraphProjection
+from benchmarks.synthetic import build_synthetic_graph
+
+
+def _latency_ms(fn: Callable, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--molecules", type=int, default=100000)
+    parser.add_argument("--targets", type=int, default=5)
+    parser.add_argument("--drugs", type=int, default=200)
+    parser.add_argument("--fanout", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'kg.db')}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            build_synthetic_graph(db, args.molecules, args.targets, args.drugs)
+
+            t0 = time.perf_counter()
+            projection = GraphProjection.from_sql(db)
+            load_s = time.perf_counter() - t0
+        engine.dispose()
+
+    target = projection.resolve("target", "T0")
+    drug = projection.resolve("drug", "drug_0")
+    results = {
+        "edges": args.molecules * 2,
+        "load_seconds": round(load_s, 3),
+        "neighborhood_2hop": _latency_ms(
+            lambda: projection.neighborhood([target], hops=2, max_fanout=args.fanout), args.repeat
+        ),
+        "neighborhood_3hop": _latency_ms(
+            lambda: projection.neighborhood([target], hops=3, max_fanout=args.fanout), args.repeat
+        ),
+        "paths_target_to_drug": _latency_ms(
+            lambda: projection.paths(target, drug, max_hops=3, max_fanout=args.fanout), args.repeat
+        ),
+    }
+
+    # One 10k-molecule run worth of new nodes and edges
+    next_id = max(projection._sql_ids) + 1
+    delta = GraphDelta(
+        nodes=[{"id": next_id + i, "node_type": "generated_molecule", "name": f"new_{i}",
+                "external_id": f"new:{i}", "smiles": "CCO"} for i in range(10000)],
+        edges=[{"source_id": next_id + i, "target_id": target, "relation": "BINDS", "weight": 0.5}
+               for i in range(10000)],
+    )
+    t0 = time.perf_counter()
+    projection.apply(delta)
+    results["apply_10k_delta_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+    results["neighborhood_2hop_after_delta"] = _latency_ms(
+        lambda: projection.neighborhood([target], hops=2, max_fanout=args.fanout), args.repeat
+    )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cost of polling a finished run: GET /runs/{id} on a large stored run
+(one MAX_PAGE_SIZE page of it), cold (read + serialize), warm (served from the RUN_BODIES LRU), gzip
+(first compression, then the cached variant) and conditional (304 from
+the ETag, no database read).
+
+    python -m benchmarks.bench_http_cache --molecules 10000 --repeats 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("ARANGO_BACKEND", "memory")
+os.environ.setdefault("ELYSIUM_ARANGO_REPLICATION", "0")
+_TMP = tempfile.mkdtemp(prefix="elysium-bench-")
+os.environ.setdefault("ELYSIUM_DATABASE_URL", f"sqlite:///{_TMP}/app.db")
+
+import httpx
+
+from app.db import SessionLocal
+from app.http_cache import RUN_BODIES
+from app.main import app
+from app.services.discovery import persist_run
+from app.services.pagination import MAX_PAGE_SIZE
+from benchmarks.synthetic import synthetic_molecules
+
+
+async def _time(client: httpx.AsyncClient, path: str, headers: Dict[str, str], repeats: int) -> Dict:
+    samples: List[float] = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append(time.perf_counter() - t0)
+    return {
+        "status": response.status_code,
+        "median_ms": round(statistics.median(samples) * 1000, 2),
+        "wire_bytes": int(response.headers.get("content-length", 0)),
+    }
+
+
+async def _run(run_id: str, repeats: int) -> Dict:
+    path = f"/runs/{run_id}?limit={MAX_PAGE_SIZE}"
+    plain = {"accept-encoding": "identity"}
+    gzip_ = {"accept-encoding": "gzip"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        RUN_BODIES.clear()
+        results = {"cold": await _time(client, path, plain, 1)}
+        results["warm"] = await _time(client, path, plain, repeats)
+        results["gzip_first"] = await _time(client, path, gzip_, 1)
+        results["gzip_warm"] = await _time(client, path, gzip_, repeats)
+        etag = (await client.get(path, headers=gzip_)).headers["etag"]
+        results["conditional_304"] = await _time(client, path, {**gzip_, "if-none-match": etag}, repeats)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--molecules", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        run, _ = persist_run(db, "EGFR", synthetic_molecules(args.molecules))
+        db.commit()
+        run_id = run.id
+
+    results = asyncio.run(_run(run_id, args.repeats))
+    print(json.dumps({"molecules": args.molecules, "get_run": results, "cache": RUN_BODIES.stats()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Knowledge-graph view benchmark on a synthetic SQL graph.
+
+Builds `--molecules` generated-molecule nodes, each with one BINDS edge to
+one of `--targets` targets and one SIMILAR_TO edge to one of `--drugs`
+drugs (2 edges per molecule, so 50k molecules = 100k edges), then times
+get_target_graph / get_drug_graph against the previous N+1 implementation
+and checks they return the same payload.
+
+    python -m benchmarks.bench_kg_views --molecules 50000 --targets 5
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from sqlalchemy.orm import Session
+
+from app.db import Base, build_engine
+from app.models import KGEdge, KGNode
+from app.schemas import DrugGraphEntry, DrugGraphResponse, MoleculeGraphEntry, SimilarDrug, TargetGraphResponse
+from app.services.kg import _parse_external_id, get_drug_graph, get_target_graph
+from benchmarks.synthetic import build_synthetic_graph
+
+
+# ---------- previous implementation (one query per edge / node) ----------
+
+def legacy_target_graph(db: Session, target_id: str) -> TargetGraphResponse:
+    target_node = db.query(KGNode).filter(KGNode.node_type == "target", KGNode.external_id == target_id).first()
+    if target_node is None:
+        return TargetGraphResponse(target_id=target_id, molecules=[])
+    entries = []
+    for bind in db.query(KGEdge).filter(KGEdge.relation == "BINDS", KGEdge.target_id == target_node.id).all():
+        gen_node = db.query(KGNode).filter(KGNode.id == bind.source_id).first()
+        run_id, idx = _parse_external_id(gen_node.external_id)
+        sim_edge = (db.query(KGEdge).filter(KGEdge.relation == "SIMILAR_TO", KGEdge.source_id == gen_node.id)
+                    .order_by(KGEdge.weight.desc()).first())
+        similar = None
+        if sim_edge is not None:
+            drug_node = db.query(KGNode).filter(KGNode.id == sim_edge.target_id).first()
+            similar = SimilarDrug(name=drug_node.name, smiles=drug_node.smiles or "", indication=drug_node.info,
+                                  similarity=sim_edge.weight or 0.0, semantic_similarity=sim_edge.cosine)
+        entries.append(MoleculeGraphEntry(run_id=run_id, molecule_index=idx, smiles=gen_node.smiles or "",
+                                          score=bind.weight or 0.0, similar_drug=similar))
+    entries.sort(key=lambda e: e.score, reverse=True)
+    return TargetGraphResponse(target_id=target_id, molecules=entries)
+
+
+def legacy_drug_graph(db: Session, drug_name: str) -> DrugGraphResponse:
+    drug_node = db.query(KGNode).filter(KGNode.node_type == "drug", KGNode.name == drug_name).first()
+    if drug_node is None:
+        return DrugGraphResponse(drug_name=drug_name, molecules=[])
+    entries = []
+    for sim_edge in db.query(KGEdge).filter(KGEdge.relation == "SIMILAR_TO", KGEdge.target_id == drug_node.id).all():
+        gen_node = db.query(KGNode).filter(KGNode.id == sim_edge.source_id).first()
+        run_id, idx = _parse_external_id(gen_node.external_id)
+        bind_edge = db.query(KGEdge).filter(KGEdge.relation == "BINDS", KGEdge.source_id == gen_node.id).first()
+        target_id, score = "", sim_edge.weight or 0.0
+        if bind_edge is not None:
+            target_node = db.query(KGNode).filter(KGNode.id == bind_edge.target_id).first()
+            target_id = target_node.external_id or ""
+            if bind_edge.weight is not None:
+                score = bind_edge.weight
+        entries.append(DrugGraphEntry(target_id=target_id, run_id=run_id, molecule_index=idx,
+                                      smiles=gen_node.smiles or "", score=score))
+    entries.sort(key=lambda e: e.score, reverse=True)
+    return DrugGraphResponse(drug_name=drug_name, molecules=entries)
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--molecules", type=int, default=50000)
+    parser.add_argument("--targets", type=int, default=5)
+    parser.add_argument("--drugs", type=int, default=20)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'kg.db')}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            build_synthetic_graph(db, args.molecules, args.targets, args.drugs)
+
+            results = []
+            for name, new_fn, old_fn, key in (
+                ("target_graph", get_target_graph, legacy_target_graph, "T0"),
+                ("drug_graph", get_drug_graph, legacy_drug_graph, "drug_0"),
+            ):
+                new_out, new_t = _timed(new_fn, db, key)
+                row = {"view": name, "rows": len(new_out.molecules), "seconds": round(new_t, 4)}
+                if not args.skip_legacy:
+                    old_out, old_t = _timed(old_fn, db, key)
+                    row.update(
+                        legacy_seconds=round(old_t, 4),
+                        speedup=round(old_t / new_t, 1) if new_t else None,
+                        same_payload=old_out.model_dump() == new_out.model_dump(),
+                    )
+                results.append(row)
+        engine.dispose()
+
+    print(json.dumps({"edges": args.molecules * 2, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+SQL persistence benchmark: per-row ORM writes vs. the bulk path.
+
+Times writing one run (run row + molecules + KG nodes/edges) into a fresh
+SQLite file at several sizes:
+
+    python -m benchmarks.bench_persistence --sizes 100 10000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")  # ChemBERTa is imported but not used here
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db import Base
+from app.models import DiscoveryRun, KGEdge, KGNode, MoleculeRecord
+from app.schemas import Molecule
+from app.services.discovery import persist_run
+from benchmarks.synthetic import synthetic_molecules
+
+
+def persist_per_row(db: Session, target_id: str, molecules: List[Molecule]) -> DiscoveryRun:
+    """The previous write path: one ORM add per row, one flush per KG node, one lookup per drug."""
+    run = DiscoveryRun(target_id=target_id, num_molecules=len(molecules))
+    db.add(run)
+    db.flush()
+    for m in molecules:
+        db.add(MoleculeRecord(run_id=run.id, smiles=m.smiles, score=m.score, source=m.source, notes=m.notes))
+
+    target = db.query(KGNode).filter(KGNode.node_type == "target", KGNode.external_id == target_id).first()
+    if target is None:
+        target = KGNode(node_type="target", external_id=target_id, name=target_id)
+        db.add(target)
+        db.flush()
+    for idx, m in enumerate(molecules):
+        gen = KGNode(node_type="generated_molecule", external_id=f"{run.id}:{idx}",
+                     name=f"gen_{run.id[:8]}_{idx}", smiles=m.smiles)
+        db.add(gen)
+        db.flush()
+        db.add(KGEdge(source_id=gen.id, target_id=target.id, relation="BINDS", weight=m.score))
+        drug = db.query(KGNode).filter(KGNode.node_type == "drug", KGNode.name == m.similar_drug.name).first()
+        if drug is None:
+            drug = KGNode(node_type="drug", name=m.similar_drug.name, smiles=m.similar_drug.smiles)
+            db.add(drug)
+            db.flush()
+        db.add(KGEdge(source_id=gen.id, target_id=drug.id, relation="SIMILAR_TO", weight=m.similar_drug.similarity))
+    return run
+
+
+def _time_write(fn: Callable, molecules: List[Molecule]) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            t0 = time.perf_counter()
+            fn(db, "EGFR", molecules)
+            db.commit()
+            elapsed = time.perf_counter() - t0
+        engine.dispose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000])
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    for size in args.sizes:
+        molecules = synthetic_molecules(size)
+        for name, fn in (("per_row", persist_per_row), ("bulk", persist_run)):
+            elapsed = _time_write(fn, molecules)
+            results.append({
+                "path": name,
+                "molecules": size,
+                "seconds": round(elapsed, 4),
+                "molecules_per_sec": round(size / elapsed, 1),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Outbox replication benchmark against the in-memory Arango stand-in.
+
+Persists `--runs` discovery runs (each queues its Arango documents in
+arango_outbox), then drains the outbox with ArangoReplicator and checks
+the stand-in ends up with exactly one document per key. A simulated
+outage (failed import calls) in the middle of the drain must not lose or
+duplicate anything.
+
+For comparison, the old request-path cost: one insert() per document.
+
+Before timing, the replicator's failure handling is checked on small
+outboxes: a document Arango rejects is set aside without holding up or
+charging the rows around it, is retried after its backoff and parked
+after max_attempts, an outage releases the batch without charging it,
+re-importing a run converges to the same documents, and two replicators
+never claim the same rows.
+
+    python -m benchmarks.bench_replication --runs 20 --molecules 500
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import tempfile
+import time
+from typing import Dict
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.arango_memory import MemoryArangoDatabase
+from app.arangodb_client import ArangoDocumentError
+from app.db import Base, build_engine
+from app.models import ArangoOutbox
+from app.services.discovery import persist_run
+from app.services.replication import ArangoReplicator, ImportRejected, outbox_rows
+from benchmarks.synthetic import synthetic_molecules
+
+
+def _drain(replicator: ArangoReplicator) -> int:
+    """Drain like the background thread: rejected batches are retried right away."""
+    total = 0
+    while True:
+        try:
+            n = replicator.drain_once()
+        except (ImportRejected, ArangoDocumentError):
+            continue
+        if n == 0:
+            return total
+        total += n
+
+
+def _check(tmp: str) -> Dict[str, bool]:
+    engine = build_engine(f"sqlite:///{os.path.join(tmp, 'checks.db')}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    molecules = synthetic_molecules(20)
+    rows = outbox_rows("check-run", "EGFR", molecules)
+    bad = {"collection": "molecules", "doc_key": "bad key", "document": json.dumps({"_key": "bad key"})}
+    checks: Dict[str, bool] = {}
+
+    def outbox():
+        with Session(engine) as db:
+            return db.execute(select(ArangoOutbox.doc_key, ArangoOutbox.attempts, ArangoOutbox.next_attempt_at,
+                                     ArangoOutbox.claimed_by)).all()
+
+    # Poison row in the middle of the outbox
+    with Session(engine) as db:
+        db.execute(insert(ArangoOutbox), rows[:30] + [bad] + rows[30:])
+        db.commit()
+    arango = MemoryArangoDatabase()
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango,
+                                  batch_size=16, max_attempts=3, max_backoff=60)
+    replicated = _drain(replicator)
+    left = outbox()
+    checks["poison_row_set_aside"] = replicated == len(rows) and [r.doc_key for r in left] == ["bad key"]
+    checks["only_isolated_row_charged"] = left[0].attempts == 1 and left[0].next_attempt_at is not None
+
+    # Not retried before its backoff; retried (and charged) after; parked at max_attempts
+    waited = replicator.drain_once() == 0
+    for _ in range(2):
+        with Session(engine) as db:
+            db.execute(update(ArangoOutbox).values(next_attempt_at=dt.datetime.utcnow() - dt.timedelta(seconds=1)))
+            db.commit()
+        _drain(replicator)
+    left = outbox()
+    checks["retried_after_backoff_then_parked"] = waited and left[0].attempts == 3 and replicator.drain_once() == 0
+
+    # Outage: the batch is released, nothing is charged, the next drain imports it
+    with Session(engine) as db:
+        db.execute(insert(ArangoOutbox), rows)
+        db.commit()
+    arango = MemoryArangoDatabase()
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=1000)
+    arango.fail_next(1)
+    try:
+        replicator.drain_once()
+        failed = False
+    except ConnectionError:
+        failed = True
+    released = [r for r in outbox() if r.doc_key != "bad key"]
+    checks["outage_releases_uncharged"] = failed and len(released) == len(rows) and all(
+        r.attempts == 0 and r.claimed_by is None for r in released
+    )
+
+    # Re-importing the same run converges to the same documents
+    _drain(replicator)
+    first = {name: arango.collection(name).all() for name in ("molecules", "binds", "similar_to")}
+    with Session(engine) as db:
+        db.execute(insert(ArangoOutbox), rows)
+        db.commit()
+    _drain(replicator)
+    checks["reimport_idempotent"] = all(
+        sorted(arango.collection(name).all(), key=lambda d: d["_key"]) == sorted(docs, key=lambda d: d["_key"])
+        for name, docs in first.items()
+    )
+
+    # Two replicators over one outbox claim disjoint rows
+    with Session(engine) as db:
+        db.execute(insert(ArangoOutbox), rows)
+        db.commit()
+    a = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=25)
+    b = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=25)
+    now = dt.datetime.utcnow()
+    with Session(engine) as db_a, Session(engine) as db_b:
+        claimed_a = {r.id for r in a._claim(db_a, now)}
+        claimed_b = {r.id for r in b._claim(db_b, now)}
+    checks["claims_disjoint"] = len(claimed_a) == 25 and len(claimed_b) == 25 and not claimed_a & claimed_b
+
+    engine.dispose()
+    return checks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--molecules", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--outage-calls", type=int, default=3)
+    args = parser.parse_args()
+
+    molecules = synthetic_molecules(args.molecules)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        checks = _check(tmp)
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'outbox.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False)
+
+        run_ids = []
+        for _ in range(args.runs):
+            with session_factory() as db:
+                run, _ = persist_run(db, "EGFR", molecules)
+                run_ids.append(run.id)
+                db.commit()
+        with Session(engine) as db:
+            queued = db.scalar(select(func.count()).select_from(ArangoOutbox))
+
+        arango = MemoryArangoDatabase()
+        replicator = ArangoReplicator(
+            session_factory=session_factory,
+            arango_factory=lambda: arango,
+            batch_size=args.batch_size,
+        )
+
+        # Outage partway through: retry until the failures are used up
+        replicated = replicator.drain_once()
+        arango.fail_next(args.outage_calls)
+        failures = 0
+        t0 = time.perf_counter()
+        while True:
+            try:
+                n = replicator.drain_once()
+            except ConnectionError:
+                failures += 1
+                continue
+            if n == 0:
+                break
+            replicated += n
+        drain_s = time.perf_counter() - t0
+
+        with Session(engine) as db:
+            left = db.scalar(select(func.count()).select_from(ArangoOutbox))
+        engine.dispose()
+
+    expected = {}
+    for run_id in run_ids:
+        for row in outbox_rows(run_id, "EGFR", molecules):
+            expected.setdefault(row["collection"], set()).add(row["doc_key"])
+    counts = {name: arango.collection(name).count() for name in expected}
+
+    # Old path: one HTTP-style insert per document, on the request
+    legacy = MemoryArangoDatabase()
+    docs = [(row["collection"], json.loads(row["document"])) for row in outbox_rows(run_ids[0], "EGFR", molecules)]
+    t0 = time.perf_counter()
+    for collection, doc in docs:
+        legacy.collection(collection).insert(doc, overwrite=True)
+    legacy_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "checks": checks,
+        "all_checks_pass": all(checks.values()),
+        "runs": args.runs,
+        "outbox_rows": queued,
+        "replicated_rows": replicated,
+        "left_in_outbox": left,
+        "injected_failures": failures,
+        "drain_rows_per_sec": round((replicated) / drain_s, 1) if drain_s else None,
+        "documents_match": counts == {name: len(keys) for name, keys in expected.items()},
+        "collection_counts": counts,
+        "legacy_single_insert_calls_per_run": len(docs),
+        "legacy_single_run_seconds_in_memory": round(legacy_s, 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
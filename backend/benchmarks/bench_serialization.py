@@ -0,0 +1,103 @@
+"""
+Response serialization benchmark: GET /runs/{id} on a large stored run
+(one MAX_PAGE_SIZE page of it), with the plain FastAPI path (pydantic objects, response_model
+re-validation, stdlib json) against the fast path (dicts from columns,
+orjson) and the columnar layout, plus the build / encode split.
+
+Requests go through the real app in-process (httpx.ASGITransport); the
+rows layout of the fast path must decode to the same JSON as the plain
+path, which is checked.
+
+    python -m benchmarks.bench_serialization --molecules 10000 --repeats 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("ARANGO_BACKEND", "memory")
+os.environ.setdefault("ELYSIUM_ARANGO_REPLICATION", "0")
+_TMP = tempfile.mkdtemp(prefix="elysium-bench-")
+os.environ.setdefault("ELYSIUM_DATABASE_URL", f"sqlite:///{_TMP}/app.db")
+
+import httpx
+
+from app import main as app_main
+from app import serialization
+from app.db import SessionLocal
+from app.services.discovery import persist_run
+from app.services.pagination import MAX_PAGE_SIZE
+from app.services.runs import get_run_content, get_run_page
+from benchmarks.synthetic import synthetic_molecules
+
+
+def _best(fn: Callable[[], Any], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+async def _http_cases(run_id: str, repeats: int) -> Dict[str, Dict[str, Any]]:
+    transport = httpx.ASGITransport(app=app_main.app)
+    results: Dict[str, Dict[str, Any]] = {}
+    bodies: Dict[str, bytes] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        for name, fast, params in [
+            ("plain", False, {}),
+            ("fast", True, {}),
+            ("fast_columnar", True, {"layout": "columnar"}),
+            ("plain_exclude_neighbors", False, {"exclude": "neighbors"}),
+            ("fast_exclude_neighbors", True, {"exclude": "neighbors"}),
+        ]:
+            app_main.FAST_JSON = fast
+            best = float("inf")
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                response = await client.get(f"/runs/{run_id}", params={"limit": MAX_PAGE_SIZE, **params})
+                best = min(best, time.perf_counter() - t0)
+                response.raise_for_status()
+            bodies[name] = response.content
+            results[name] = {"ms": round(best * 1000, 1), "bytes": len(response.content)}
+
+    for plain, fast in [("plain", "fast"), ("plain_exclude_neighbors", "fast_exclude_neighbors")]:
+        results[fast]["same_payload"] = json.loads(bodies[plain]) == json.loads(bodies[fast])
+        results[fast]["speedup"] = round(results[plain]["ms"] / results[fast]["ms"], 1)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--molecules", type=int, default=10000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        run, _ = persist_run(db, "EGFR", synthetic_molecules(args.molecules))
+        db.commit()
+        run_id = run.id
+
+        model = get_run_page(db, run_id)
+        content = get_run_content(db, run_id)
+        components = {
+            "build_models_ms": round(_best(lambda: get_run_page(db, run_id), args.repeats) * 1000, 1),
+            "build_dicts_ms": round(_best(lambda: get_run_content(db, run_id), args.repeats) * 1000, 1),
+            "encode_model_dump_json_ms": round(_best(model.model_dump_json, args.repeats) * 1000, 1),
+            "encode_stdlib_json_ms": round(_best(lambda: json.dumps(content), args.repeats) * 1000, 1),
+            "encode_fast_ms": round(_best(lambda: serialization.dumps(content), args.repeats) * 1000, 1),
+            "encoder": "orjson" if serialization.orjson is not None else "json",
+        }
+
+    http = asyncio.run(_http_cases(run_id, args.repeats))
+    print(json.dumps({"molecules": args.molecules, "components": components, "get_run": http}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
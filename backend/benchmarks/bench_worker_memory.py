@@ -0,0 +1,191 @@
+"""
+Worker memory benchmark: the same gunicorn / uvicorn-worker server with
+and without preload-then-fork (gunicorn.conf.py, ELYSIUM_PRELOAD), and
+plain `uvicorn --workers` for reference.
+
+Each server is started with --workers processes on a ChemBERTa-sized
+stand-in checkpoint (so the model weights are real tensors, offline),
+warmed up with discovery runs and reads, and then measured from
+/proc/<pid>/smaps_rollup: per-worker RSS / PSS / private bytes and the
+total PSS of master + workers. A worker's private bytes are what one more
+worker costs, which gives the number of workers that fit in --budget-mib.
+
+    python -m benchmarks.bench_worker_memory --workers 4
+    python -m benchmarks.bench_worker_memory --modes preload,no_preload --output mem.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+from app.memory import worker_memory_report
+from benchmarks.loadtest import _free_port
+from benchmarks.standin_model import save_standin_model
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MIB = 1024 * 1024
+
+MODES = ("preload", "no_preload", "uvicorn")
+
+_OFFLINE_ENV = {
+    "HF_HUB_OFFLINE": "1",
+    "ELYSIUM_SCORER_BACKEND": "stub",
+    "ARANGO_BACKEND": "memory",
+    "ELYSIUM_ARANGO_REPLICATION": "0",
+}
+
+
+def _command(mode: str, port: int, workers: int) -> List[str]:
+    if mode == "uvicorn":
+        return [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+    return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app", "--log-level", "warning"]
+
+
+def _environment(mode: str, port: int, workers: int, model_dir: str, data_dir: str) -> Dict[str, str]:
+    env = os.environ.copy()
+    for key, value in _OFFLINE_ENV.items():
+        env.setdefault(key, value)
+    env.update({
+        "ELYSIUM_CHEMBERTA_MODEL": model_dir,
+        "ELYSIUM_DATABASE_URL": f"sqlite:///{data_dir}/{mode}.db",
+        "ELYSIUM_BIND": f"127.0.0.1:{port}",
+        "ELYSIUM_WORKERS": str(workers),
+        "ELYSIUM_PRELOAD": "1" if mode == "preload" else "0",
+    })
+    return env
+
+
+def _wait_for_workers(base_url: str, proc: subprocess.Popen, workers: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                if len(worker_memory_report(proc.pid)["workers"]) >= workers:
+                    return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not come up")
+
+
+def _warm_up(base_url: str, requests: int, num_molecules: int) -> None:
+    """Discovery runs plus reads, so every worker has run the models and caches."""
+    # A fresh connection per request, so the requests spread over the workers
+    limits = httpx.Limits(max_keepalive_connections=0)
+    with httpx.Client(base_url=base_url, timeout=120, limits=limits) as client:
+        run_ids = []
+        for i in range(requests):
+            response = client.post(
+                "/discover",
+                json={"target_id": "EGFR", "num_molecules": num_molecules},
+                headers={"X-Client-Id": f"warmup-{i}"},
+            )
+            response.raise_for_status()
+            run_ids.append(response.json()["run_id"])
+        for run_id in run_ids:
+            client.get(f"/runs/{run_id}").raise_for_status()
+            client.get("/runs").raise_for_status()
+
+
+def measure(
+    mode: str, workers: int, model_dir: str, warmup: int, num_molecules: int, timeout: float, data_dir: str
+) -> Dict[str, Any]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = _environment(mode, port, workers, model_dir, data_dir)
+    # Create the schema first: workers importing the app side by side
+    # (no preload) would race on CREATE TABLE
+    subprocess.run([sys.executable, "-c", "import app.main"], cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+    proc = subprocess.Popen(_command(mode, port, workers), cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for_workers(base_url, proc, workers, timeout)
+        _warm_up(base_url, warmup * workers, num_molecules)
+        time.sleep(1.0)
+        report = worker_memory_report(proc.pid)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+    per_worker = report["workers"]
+    master = report["master"] or {}
+    private = sum(w.get("private", 0) for w in per_worker) / max(1, len(per_worker))
+    return {
+        "mode": mode,
+        "workers": len(per_worker),
+        "total_pss_mib": round(report["totals"]["pss"] / MIB, 1),
+        "master_pss_mib": round(master.get("pss", 0) / MIB, 1),
+        "worker_rss_mib": [round(w.get("rss", 0) / MIB, 1) for w in per_worker],
+        "worker_pss_mib": [round(w.get("pss", 0) / MIB, 1) for w in per_worker],
+        "worker_private_mib": [round(w.get("private", 0) / MIB, 1) for w in per_worker],
+        "mean_private_mib": round(private / MIB, 1),
+    }
+
+
+def _workers_fitting(row: Dict[str, Any], budget_mib: float) -> int:
+    """Workers that fit in the budget: (budget - shared part) / per-worker private part."""
+    n = max(1, row["workers"])
+    shared = row["total_pss_mib"] - n * row["mean_private_mib"]
+    return max(0, int((budget_mib - shared) // max(row["mean_private_mib"], 1.0)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", default="preload,no_preload", help=f"comma-separated of {', '.join(MODES)}")
+    parser.add_argument("--warmup", type=int, default=3, help="discovery runs per worker before measuring")
+    parser.add_argument("--num-molecules", type=int, default=20)
+    parser.add_argument("--hidden-size", type=int, default=768, help="stand-in model width (ChemBERTa: 768)")
+    parser.add_argument("--layers", type=int, default=6, help="stand-in model depth (ChemBERTa: 6)")
+    parser.add_argument("--budget-mib", type=float, default=8192, help="node memory for the workers-per-node estimate")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    rows = []
+    # Stand-in model and the servers' databases, removed afterwards
+    with tempfile.TemporaryDirectory(prefix="elysium-mem-") as tmp:
+        model_dir = save_standin_model(
+            os.path.join(tmp, f"chemberta-{args.hidden_size}x{args.layers}"),
+            hidden_size=args.hidden_size,
+            layers=args.layers,
+        )
+        for mode in modes:
+            row = measure(mode, args.workers, model_dir, args.warmup, args.num_molecules, args.startup_timeout, tmp)
+            row["workers_per_budget"] = _workers_fitting(row, args.budget_mib)
+            rows.append(row)
+            print(
+                f"{mode:>11}: total PSS {row['total_pss_mib']:8.1f} MiB, "
+                f"per worker private {row['mean_private_mib']:7.1f} MiB, "
+                f"{row['workers_per_budget']} workers in {args.budget_mib:.0f} MiB",
+                file=sys.stderr,
+            )
+
+    report = {"workers": args.workers, "budget_mib": args.budget_mib, "results": rows}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
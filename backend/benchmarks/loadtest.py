@@ -0,0 +1,388 @@
+"""
+Load generator for the ELYSIUM API: drives /discover, /runs/{id}, /runs
+and /graph/* in a weighted mix at a fixed concurrency and reports
+throughput, p50/p95/p99 latency and error rate per endpoint.
+
+    python -m benchmarks.loadtest                                  # in-process, 30 s
+    python -m benchmarks.loadtest --concurrency 32 --duration 60 \\
+        --mix discover=1,run=6,runs=3,graph_target=2,graph_drug=2,neighborhood=1
+    python -m benchmarks.loadtest --target uvicorn --workers 4     # local uvicorn
+    python -m benchmarks.loadtest --url http://staging:8000        # running server
+    python -m benchmarks.loadtest --max-error-rate 0.01 --max-p99-ms 500  # release gate
+
+Targets:
+  asgi     the app in this process through httpx.ASGITransport (no sockets,
+           measures the app plus the event loop / threadpool it runs on)
+  uvicorn  a uvicorn subprocess on a free local port, same environment
+  --url    an already running server (its own configuration applies)
+
+For asgi and uvicorn the app is configured to run offline: stub scorer,
+the in-memory Arango stand-in and a throwaway SQLite database, unless
+those ELYSIUM_* / ARANGO_* variables are already set, and trusts the
+X-Client-Id header the workers send. Against --url, set
+ELYSIUM_CLIENT_ID_HEADER=x-client-id on the server for --clients to
+matter; otherwise all workers share one peer address. Before measuring,
+--seed-runs discovery runs are posted so reads have data to hit.
+
+Exits 1 when --max-error-rate or --max-p99-ms is exceeded. Needs httpx
+(pip install -r requirements-dev.txt).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+DEFAULT_MIX = "discover=1,run=6,runs=3,graph_target=2,graph_drug=2"
+TARGETS = ["EGFR", "DRD2"]
+
+# Error rate / latency percentiles reported per endpoint
+PERCENTILES = (50, 95, 99)
+
+
+class Pool:
+    """What the request builders pick from; run ids grow as /discover succeeds."""
+
+    def __init__(self, rng: random.Random, num_molecules: int) -> None:
+        self.rng = rng
+        self.num_molecules = num_molecules
+        self.run_ids: List[str] = []
+        # Imported here: app modules read the ELYSIUM_* environment on import
+        from app.fda_library import FDA_LIKE_DRUGS
+
+        self.drugs = [drug["name"] for drug in FDA_LIKE_DRUGS]
+
+    def add_run(self, response: httpx.Response) -> None:
+        if response.status_code == 200:
+            self.run_ids.append(response.json()["run_id"])
+
+    def run_id(self) -> str:
+        return self.rng.choice(self.run_ids) if self.run_ids else "missing"
+
+
+class Endpoint(NamedTuple):
+    name: str
+    # -> (method, path, params, json body)
+    build: Callable[[Pool], Tuple[str, str, Optional[Dict], Optional[Dict]]]
+
+
+ENDPOINTS: Dict[str, Endpoint] = {
+    endpoint.name: endpoint
+    for endpoint in [
+        Endpoint("discover", lambda p: (
+            "POST", "/discover", None,
+            {"target_id": p.rng.choice(TARGETS), "num_molecules": p.num_molecules},
+        )),
+        Endpoint("run", lambda p: ("GET", f"/runs/{p.run_id()}", None, None)),
+        Endpoint("runs", lambda p: ("GET", "/runs", {"limit": 20}, None)),
+        Endpoint("graph_target", lambda p: ("GET", f"/graph/target/{p.rng.choice(TARGETS)}", {"limit": 100}, None)),
+        Endpoint("graph_summary", lambda p: ("GET", f"/graph/target/{p.rng.choice(TARGETS)}/summary", None, None)),
+        Endpoint("graph_drug", lambda p: ("GET", f"/graph/drug/{p.rng.choice(p.drugs)}", {"limit": 100}, None)),
+        Endpoint("neighborhood", lambda p: (
+            "GET", "/graph/neighborhood", {"node": f"target:{p.rng.choice(TARGETS)}", "hops": 2}, None,
+        )),
+    ]
+}
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """ "discover=1,run=6" -> {"discover": 1.0, "run": 6.0} (unknown names are an error)."""
+    mix: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {name!r} in mix (known: {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Mix needs at least one endpoint with a positive weight")
+    return mix
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str]) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if error is not None:
+            per_endpoint = self.errors.setdefault(endpoint, {})
+            per_endpoint[error] = per_endpoint.get(error, 0) + 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def stats(latencies: List[float], errors: Dict[str, int]) -> Dict[str, Any]:
+            ordered = sorted(latencies)
+            failed = sum(errors.values())
+            row: Dict[str, Any] = {
+                "requests": len(ordered),
+                "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(failed / len(ordered), 4) if ordered else 0.0,
+            }
+            for pct in PERCENTILES:
+                row[f"p{pct}_ms"] = round(_percentile(ordered, pct) * 1000, 2)
+            row["max_ms"] = round(ordered[-1] * 1000, 2) if ordered else 0.0
+            if errors:
+                row["errors"] = dict(sorted(errors.items()))
+            return row
+
+        endpoints = {
+            name: stats(latencies, self.errors.get(name, {}))
+            for name, latencies in sorted(self.latencies.items())
+        }
+        all_errors: Dict[str, int] = {}
+        for per_endpoint in self.errors.values():
+            for error, n in per_endpoint.items():
+                all_errors[error] = all_errors.get(error, 0) + n
+        overall = stats([s for latencies in self.latencies.values() for s in latencies], all_errors)
+        return {"elapsed_seconds": round(elapsed, 3), "overall": overall, "endpoints": endpoints}
+
+
+async def _send(
+    client: httpx.AsyncClient, pool: Pool, endpoint: Endpoint, client_id: str = "loadtest"
+) -> Tuple[float, Optional[str]]:
+    method, path, params, body = endpoint.build(pool)
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, path, params=params, json=body, headers={"X-Client-Id": client_id})
+    except Exception as exc:
+        return time.perf_counter() - start, type(exc).__name__
+    elapsed = time.perf_counter() - start
+    if endpoint.name == "discover":
+        pool.add_run(response)
+    # 4xx on reads of seeded data is a harness or app bug, so it counts too
+    return elapsed, None if response.status_code < 400 else f"HTTP {response.status_code}"
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: Optional[float],
+    total_requests: Optional[int],
+    seed_runs: int,
+    num_molecules: int,
+    seed: int = 0,
+    clients: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Seed, then run `concurrency` closed-loop workers until the duration or
+    request budget is spent. Workers are spread over `clients` X-Client-Id
+    values (default: one per worker) for /discover fair queuing.
+    """
+    rng = random.Random(seed)
+    pool = Pool(rng, num_molecules)
+    for _ in range(seed_runs):
+        await _send(client, pool, ENDPOINTS["discover"])
+    if seed_runs and not pool.run_ids:
+        raise RuntimeError("Seeding failed: no /discover call succeeded")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = Recorder()
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_endpoint() -> Optional[Endpoint]:
+        nonlocal issued
+        if total_requests is not None and issued >= total_requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        return ENDPOINTS[rng.choices(names, weights)[0]]
+
+    clients = max(1, clients or concurrency)
+
+    async def worker(index: int) -> None:
+        client_id = f"loadtest-{index % clients}"
+        while True:
+            endpoint = next_endpoint()
+            if endpoint is None:
+                return
+            seconds, error = await _send(client, pool, endpoint, client_id)
+            recorder.record(endpoint.name, seconds, error)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+# ---------- targets ----------
+
+def _apply_offline_env(tmp: str) -> None:
+    """Offline defaults for the app under test, with its files under `tmp`."""
+    offline = {
+        "HF_HUB_OFFLINE": "1",
+        "ELYSIUM_SCORER_BACKEND": "stub",
+        "ARANGO_BACKEND": "memory",
+        "ELYSIUM_DATABASE_URL": f"sqlite:///{tmp}/load.db",
+        "ELYSIUM_PROFILING_DIR": os.path.join(tmp, "profiles"),
+        # The load generator stands in for the gateway that would set it
+        "ELYSIUM_CLIENT_ID_HEADER": "x-client-id",
+    }
+    for key, value in offline.items():
+        os.environ.setdefault(key, value)
+
+
+async def _run_asgi(args, mix, tmp: str) -> Dict[str, Any]:
+    _apply_offline_env(tmp)
+    from app.main import app
+
+    # ASGITransport does not send lifespan events; run startup/shutdown here
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            return await _drive(client, args, mix)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_healthy(base_url: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.perf_counter() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"uvicorn did not become healthy within {timeout:.0f}s")
+
+
+async def _run_uvicorn(args, mix, tmp: str) -> Dict[str, Any]:
+    _apply_offline_env(tmp)
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(args.workers), "--log-level", "warning", "--no-access-log",
+    ]
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen(cmd, cwd=backend_dir, env=os.environ.copy())
+    try:
+        await _wait_healthy(base_url, proc, args.startup_timeout)
+        return await _run_url(base_url, args, mix)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def _run_url(base_url: str, args, mix) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        return await _drive(client, args, mix)
+
+
+async def _drive(client: httpx.AsyncClient, args, mix) -> Dict[str, Any]:
+    return await drive(
+        client,
+        mix,
+        concurrency=args.concurrency,
+        duration=None if args.requests else args.duration,
+        total_requests=args.requests,
+        seed_runs=args.seed_runs,
+        num_molecules=args.num_molecules,
+        seed=args.seed,
+        clients=args.clients,
+    )
+
+
+def _gate(report: Dict[str, Any], max_error_rate: Optional[float], max_p99_ms: Optional[float]) -> List[str]:
+    failures = []
+    for name, row in report["endpoints"].items():
+        if max_error_rate is not None and row["error_rate"] > max_error_rate:
+            failures.append(f"{name}: error rate {row['error_rate']:.2%} > {max_error_rate:.2%}")
+        if max_p99_ms is not None and row["p99_ms"] > max_p99_ms:
+            failures.append(f"{name}: p99 {row['p99_ms']:.1f} ms > {max_p99_ms:.1f} ms")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--url", default=None, help="load an already running server instead")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (--target uvicorn)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint=weight,... of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--clients", type=int, default=None, help="distinct X-Client-Id values (default: one per worker; "
+                        "the server must set ELYSIUM_CLIENT_ID_HEADER=x-client-id)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests instead")
+    parser.add_argument("--num-molecules", type=int, default=20, help="molecules per /discover call")
+    parser.add_argument("--seed-runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--output", default=None, help="also write the report JSON here")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Database and profiles of the in-process / local server, removed afterwards
+    with tempfile.TemporaryDirectory(prefix="elysium-load-") as tmp:
+        if args.url:
+            target, runner = args.url, _run_url(args.url, args, mix)
+        elif args.target == "uvicorn":
+            target, runner = f"uvicorn x{args.workers}", _run_uvicorn(args, mix, tmp)
+        else:
+            target, runner = "asgi", _run_asgi(args, mix, tmp)
+        results = asyncio.run(runner)
+
+    report = {
+        "config": {
+            "target": target,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration": None if args.requests else args.duration,
+            "requests": args.requests,
+            "num_molecules": args.num_molecules,
+            "seed_runs": args.seed_runs,
+        },
+        **results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    print(text)
+
+    failures = _gate(results, args.max_error_rate, args.max_p99_ms)
+    for failure in failures:
+        print(f"[loadtest] FAIL {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
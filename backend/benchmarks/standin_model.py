@@ -0,0 +1,95 @@
+"""
+Deterministic tiny stand-in for the ChemBERTa checkpoint.
+
+Benchmarks (and offline dev setups) need an embedder that behaves like
+ChemBERTaEmbedder without downloading weights. save_standin_model() writes
+a 2-layer, 64-wide RoBERTa with seeded random weights and a
+character-level SMILES tokenizer to a directory that
+AutoTokenizer / AutoModel.from_pretrained (and so ChemBERTaEmbedder, or
+ELYSIUM_CHEMBERTA_MODEL) can load. Same seed, same vectors.
+
+    python -m benchmarks.standin_model /tmp/chemberta-standin
+"""
+
+import argparse
+import os
+import string
+
+import torch
+from tokenizers import Regex, Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import Split
+from tokenizers.processors import TemplateProcessing
+from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaModel
+
+from app.core.config import CHEMBERTA_MODEL
+
+SPECIAL_TOKENS = ["<s>", "<pad>", "</s>", "<unk>"]
+# Every character that shows up in SMILES (and then some)
+SMILES_CHARS = sorted(set(string.ascii_letters + string.digits + "()[]=#@+-\\/%.:*$~&!?>"))
+
+
+def _tokenizer() -> PreTrainedTokenizerFast:
+    vocab = {tok: i for i, tok in enumerate(SPECIAL_TOKENS + SMILES_CHARS)}
+    tok = Tokenizer(WordLevel(vocab=vocab, unk_token="<unk>"))
+    tok.pre_tokenizer = Split(Regex("."), behavior="isolated")
+    tok.post_processor = TemplateProcessing(
+        single="<s> $A </s>",
+        special_tokens=[("<s>", vocab["<s>"]), ("</s>", vocab["</s>"])],
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tok,
+        bos_token="<s>",
+        eos_token="</s>",
+        pad_token="<pad>",
+        unk_token="<unk>",
+        model_max_length=128,
+    )
+
+
+def save_standin_model(path: str, seed: int = 0, hidden_size: int = 64, layers: int = 2) -> str:
+    """Write the stand-in tokenizer + model to `path` (idempotent) and return it."""
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+    tokenizer = _tokenizer()
+    torch.manual_seed(seed)
+    config = RobertaConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=layers,
+        num_attention_heads=4,
+        intermediate_size=hidden_size * 2,
+        max_position_embeddings=132,  # 128 tokens + RoBERTa's padding offset
+        pad_token_id=tokenizer.pad_token_id,
+        bos_token_id=tokenizer.bos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+    )
+    model = RobertaModel(config)
+    model.eval()
+    os.makedirs(path, exist_ok=True)
+    tokenizer.save_pretrained(path)
+    model.save_pretrained(path)
+    return path
+
+
+def chemberta_cached(model_name: str = CHEMBERTA_MODEL) -> bool:
+    """True if the real checkpoint loads without the network (local dir or HF cache)."""
+    try:
+        from transformers import AutoConfig
+
+        AutoConfig.from_pretrained(model_name, local_files_only=True)
+        return True
+    except Exception:
+        return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(save_standin_model(args.path, seed=args.seed))
+
+
+if __name__ == "__main__":
+    main()
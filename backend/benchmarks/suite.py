@@ -0,0 +1,354 @@
+"""
+Hot-path benchmark suite on synthetic data, with baseline comparison.
+
+    python -m benchmarks.suite                                   # sizes 10^2, 10^4
+    python -m benchmarks.suite --sizes 100 10000 1000000 --no-caps
+    python -m benchmarks.suite --output out.json --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+
+Each case times one hot path at every size (best of --repeats, within a
+time budget). What "size" scales depends on the case: the reference
+library for find_most_similar_drug, the knowledge graph for the graph
+views, the number of molecules for everything else. Cases doing RDKit or
+model work per molecule are capped (CAPS) unless --no-caps; capped sizes
+are reported as skipped.
+
+With --baseline, a case regresses when it is more than --threshold slower
+(relative) and at least --min-delta seconds slower (absolute, so
+microsecond jitter does not fail a run); the exit status is then 1.
+Baselines are machine-specific: regenerate them on the machine that
+compares against them.
+
+Runs offline: ChemBERTa uses the cached checkpoint when there is one,
+otherwise the deterministic stand-in from benchmarks.standin_model.
+"""
+
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+from sqlalchemy.orm import Session
+
+from app import similarity
+from app.data.library_store import LibraryStore
+from app.db import Base, build_engine
+from app.models import DiscoveryRun
+from app.services.admet import calculate_admet
+from app.services.embeddings import ChemBERTaEmbedder
+from app.services.generation import LibraryGenerator
+from app.services.kg import attach_run_to_kg, get_drug_graph, get_target_graph
+from app.services.scoring import StubScorer
+from benchmarks.standin_model import chemberta_cached, save_standin_model
+from benchmarks.synthetic import build_reference_store, build_synthetic_graph, synthetic_molecules, synthetic_smiles
+
+DEFAULT_SIZES = [100, 10000]
+
+# Largest size run by default for cases with per-molecule RDKit / model work
+CAPS = {
+    "embeddings.ChemBERTaEmbedder.embed": 10000,
+    "admet.calculate_admet": 10000,
+    "kg.attach_run_to_kg": 100000,
+}
+
+# Fingerprint queries per find_most_similar_drug measurement
+SIMILARITY_QUERIES = 20
+GRAPH_PAGE = 100
+GRAPH_TARGETS = 5
+GRAPH_DRUGS = 20
+
+
+class Context:
+    """Shared, lazily built fixtures (temp dir, embedder, graphs per size)."""
+
+    def __init__(self, workdir: str, embedder_mode: str) -> None:
+        self.workdir = workdir
+        self.embedder_mode = embedder_mode
+        self._embedder: Optional[ChemBERTaEmbedder] = None
+        self.embedder_kind: Optional[str] = None
+        self._graphs: Dict[int, Session] = {}
+
+    @property
+    def embedder(self) -> ChemBERTaEmbedder:
+        if self._embedder is None:
+            use_real = self.embedder_mode == "real" or (self.embedder_mode == "auto" and chemberta_cached())
+            if use_real:
+                self._embedder, self.embedder_kind = ChemBERTaEmbedder(), "chemberta"
+            else:
+                path = save_standin_model(os.path.join(self.workdir, "chemberta-standin"))
+                self._embedder, self.embedder_kind = ChemBERTaEmbedder(path), "standin"
+        return self._embedder
+
+    def graph(self, size: int) -> Session:
+        if size not in self._graphs:
+            engine = build_engine(f"sqlite:///{os.path.join(self.workdir, f'kg_{size}.db')}")
+            Base.metadata.create_all(bind=engine)
+            db = Session(engine)
+            build_synthetic_graph(db, size, GRAPH_TARGETS, GRAPH_DRUGS)
+            self._graphs[size] = db
+        return self._graphs[size]
+
+    def close(self) -> None:
+        for db in self._graphs.values():
+            engine = db.get_bind()
+            db.close()
+            engine.dispose()
+
+
+# A case turns (size, context) into `prepare`; each repeat calls prepare()
+# (untimed) to get the zero-argument callable that is timed.
+Prepare = Callable[[], Callable[[], Any]]
+
+
+class Case(NamedTuple):
+    name: str
+    scales: str  # what `size` counts
+    items: Callable[[int], int]  # work items per timed call, for per-item figures
+    setup: Callable[[int, Context], Prepare]
+
+
+def _once(fn: Callable[[], Any]) -> Prepare:
+    return lambda: fn
+
+
+def _similarity(size: int, ctx: Context) -> Prepare:
+    store = LibraryStore(build_reference_store(os.path.join(ctx.workdir, f"ref_{size}"), size))
+    index = similarity._ReferenceIndex(store)
+    queries = synthetic_smiles(SIMILARITY_QUERIES, seed=1)
+
+    def run() -> None:
+        previous, similarity._LIB_INDEX = similarity._LIB_INDEX, index
+        try:
+            for smi in queries:
+                similarity.find_most_similar_drug(smi)
+        finally:
+            similarity._LIB_INDEX = previous
+
+    return _once(run)
+
+
+def _embed(size: int, ctx: Context) -> Prepare:
+    embedder = ctx.embedder
+    smiles = synthetic_smiles(size)
+    return _once(lambda: embedder.embed_many(smiles))
+
+
+def _admet(size: int, ctx: Context) -> Prepare:
+    smiles = synthetic_smiles(size)
+    return _once(lambda: [calculate_admet(smi) for smi in smiles])
+
+
+def _stub_scorer(size: int, ctx: Context) -> Prepare:
+    scorer = StubScorer()
+    smiles = synthetic_smiles(size)
+    return _once(lambda: scorer.score(smiles, "MKT", "EGFR"))
+
+
+def _library_generator(size: int, ctx: Context) -> Prepare:
+    generator = LibraryGenerator()
+    return _once(lambda: generator.generate("EGFR", size))
+
+
+def _attach_run(size: int, ctx: Context) -> Prepare:
+    molecules = synthetic_molecules(size)
+    engine = build_engine(f"sqlite:///{os.path.join(ctx.workdir, f'attach_{size}.db')}")
+    Base.metadata.create_all(bind=engine)
+
+    def prepare() -> Callable[[], Any]:
+        # Every repeat attaches a new run to the same (growing) graph
+        db = Session(engine)
+        run = DiscoveryRun(target_id="EGFR", num_molecules=len(molecules))
+        db.add(run)
+        db.flush()
+
+        def attach() -> None:
+            try:
+                attach_run_to_kg(db, run, molecules)
+                db.commit()
+            finally:
+                db.close()
+
+        return attach
+
+    return prepare
+
+
+def _target_graph(size: int, ctx: Context) -> Prepare:
+    db = ctx.graph(size)
+    return _once(lambda: get_target_graph(db, "T0", limit=GRAPH_PAGE))
+
+
+def _drug_graph(size: int, ctx: Context) -> Prepare:
+    db = ctx.graph(size)
+    return _once(lambda: get_drug_graph(db, "drug_0", limit=GRAPH_PAGE))
+
+
+CASES: List[Case] = [
+    Case("similarity.find_most_similar_drug", "reference library rows", lambda n: SIMILARITY_QUERIES, _similarity),
+    Case("embeddings.ChemBERTaEmbedder.embed", "molecules", lambda n: n, _embed),
+    Case("admet.calculate_admet", "molecules", lambda n: n, _admet),
+    Case("scoring.StubScorer.score", "molecules", lambda n: n, _stub_scorer),
+    Case("generation.LibraryGenerator.generate", "molecules", lambda n: n, _library_generator),
+    Case("kg.attach_run_to_kg", "molecules in the run", lambda n: n, _attach_run),
+    Case("kg.get_target_graph", f"graph molecules (first page of {GRAPH_PAGE})", lambda n: 1, _target_graph),
+    Case("kg.get_drug_graph", f"graph molecules (first page of {GRAPH_PAGE})", lambda n: 1, _drug_graph),
+]
+
+
+def _best_time(prepare: Prepare, repeats: int, budget: float) -> Dict[str, Any]:
+    """Best of `repeats` runs, stopping early once `budget` seconds are spent."""
+    best = float("inf")
+    done = 0
+    spent = 0.0
+    while done < repeats and (done == 0 or spent < budget):
+        fn = prepare()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        best = min(best, elapsed)
+        spent += elapsed
+        done += 1
+    return {"seconds": best, "repeats": done}
+
+
+def run_suite(
+    sizes: List[int],
+    repeats: int = 3,
+    budget: float = 10.0,
+    caps: bool = True,
+    only: Optional[List[str]] = None,
+    embedder: str = "auto",
+) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory(prefix="elysium-bench-") as workdir:
+        ctx = Context(workdir, embedder)
+        try:
+            for case in CASES:
+                if only and not any(key in case.name for key in only):
+                    continue
+                for size in sizes:
+                    row: Dict[str, Any] = {"case": case.name, "size": size, "scales": case.scales}
+                    cap = CAPS.get(case.name)
+                    if caps and cap is not None and size > cap:
+                        row["skipped"] = f"above cap {cap} (use --no-caps)"
+                        results.append(row)
+                        continue
+                    timing = _best_time(case.setup(size, ctx), repeats, budget)
+                    items = case.items(size)
+                    row.update(
+                        seconds=round(timing["seconds"], 6),
+                        repeats=timing["repeats"],
+                        items=items,
+                        per_item_us=round(timing["seconds"] / items * 1e6, 3) if items else None,
+                    )
+                    results.append(row)
+                    print(f"[bench] {case.name} @ {size}: {row['seconds']:.6f}s", file=sys.stderr)
+        finally:
+            ctx.close()
+
+    return {
+        "meta": {
+            "created_at": dt.datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "embedder": ctx.embedder_kind,
+            "sizes": sizes,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.25,
+    min_delta: float = 0.002,
+) -> List[Dict[str, Any]]:
+    """Per (case, size) verdict against a baseline: ok / regression / improved / new."""
+    base = {
+        (row["case"], row["size"]): row["seconds"]
+        for row in baseline.get("results", [])
+        if "seconds" in row
+    }
+    rows = []
+    for row in current["results"]:
+        if "seconds" not in row:
+            continue
+        key = (row["case"], row["size"])
+        before = base.get(key)
+        entry = {"case": row["case"], "size": row["size"], "seconds": row["seconds"], "baseline_seconds": before}
+        if before is None:
+            entry["status"] = "new"
+        else:
+            delta = row["seconds"] - before
+            ratio = row["seconds"] / before if before > 0 else float("inf")
+            entry["ratio"] = round(ratio, 3)
+            if ratio > 1 + threshold and delta > min_delta:
+                entry["status"] = "regression"
+            elif ratio < 1 / (1 + threshold) and -delta > min_delta:
+                entry["status"] = "improved"
+            else:
+                entry["status"] = "ok"
+        rows.append(entry)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=10.0, help="seconds per case/size before repeats stop")
+    parser.add_argument("--no-caps", action="store_true", help="run per-molecule cases at every size")
+    parser.add_argument("--only", nargs="+", default=None, help="substrings of case names to run")
+    parser.add_argument("--embedder", choices=["auto", "real", "standin"], default="auto")
+    parser.add_argument("--output", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="relative slowdown counted as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="absolute slowdown (s) below which nothing regresses")
+    parser.add_argument("--save-baseline", default=None, help="write these results as the new baseline")
+    args = parser.parse_args()
+
+    report = run_suite(
+        args.sizes,
+        repeats=args.repeats,
+        budget=args.budget,
+        caps=not args.no_caps,
+        only=args.only,
+        embedder=args.embedder,
+    )
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            report["comparison"] = compare(report, json.load(fh), args.threshold, args.min_delta)
+        regressions = [row for row in report["comparison"] if row["status"] == "regression"]
+
+    text = json.dumps(report, indent=2)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    if not args.output:
+        print(text)
+
+    if regressions:
+        for row in regressions:
+            print(
+                f"[bench] REGRESSION {row['case']} @ {row['size']}: "
+                f"{row['baseline_seconds']:.6f}s -> {row['seconds']:.6f}s (x{row['ratio']})",
+                file=sys.stderr,
+            )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
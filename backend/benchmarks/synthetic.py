@@ -0,0 +1,151 @@
+"""
+Synthetic data for the benchmarks: candidate SMILES, run molecules,
+reference libraries and SQL knowledge graphs, at any size and always the
+same for the same seed.
+
+Everything is generated without RDKit work per row where the benchmark
+does not need real chemistry (reference fingerprints are random bits with
+a Morgan-like density), so the 10^6 sizes build in seconds.
+"""
+
+import os
+from typing import Dict, Iterator, List
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.data.library_store import FP_BITS
+from app.data.loaders import _fresh_meta, _StoreWriter
+from app.fda_library import FDA_LIKE_DRUGS
+from app.models import KGEdge, KGNode
+from app.schemas import Molecule, SimilarDrug
+
+# Building blocks: prefix + core + chain + terminal is always valid SMILES
+_PREFIXES = ["", "C", "CC(=O)N", "OCC", "N#C", "FC(F)(F)", "CN(C)C", "O=C(O)", "COC(=O)", "Cl"]
+_CORES = ["c1ccccc1", "c1ccncc1", "C1CCNCC1", "c1ccc2ccccc2c1", "C1CCOC1", "c1ccsc1", "C1CC1", "c1cnc(cn1)"]
+_TERMINALS = ["", "O", "N", "F", "Cl", "C(=O)O", "C#N", "OC"]
+
+# Morgan r=2 / 2048 bits sets roughly 2-3% of the bits on drug-like
+# molecules; AND-ing 5 random bytes sets each bit with p = 1/32.
+_FP_AND_ROUNDS = 5
+
+_CHUNK = 65536
+
+
+def synthetic_smiles(n: int, seed: int = 0) -> List[str]:
+    """n valid, drug-like-ish SMILES (with repeats once n exceeds a few tens of thousands)."""
+    rng = np.random.default_rng(seed)
+    p = rng.integers(0, len(_PREFIXES), n)
+    c = rng.integers(0, len(_CORES), n)
+    k = rng.integers(0, 8, n)
+    t = rng.integers(0, len(_TERMINALS), n)
+    return [
+        f"{_PREFIXES[pi]}{_CORES[ci]}{'C' * ki}{_TERMINALS[ti]}"
+        for pi, ci, ki, ti in zip(p.tolist(), c.tolist(), k.tolist(), t.tolist())
+    ]
+
+
+def synthetic_molecules(n: int) -> List[Molecule]:
+    """Scored run molecules with both neighbors filled in (the persist_run / attach_run_to_kg input)."""
+    mols = []
+    for i in range(n):
+        drug = FDA_LIKE_DRUGS[i % len(FDA_LIKE_DRUGS)]
+        neighbor = SimilarDrug(
+            name=drug["name"],
+            smiles=drug["smiles"],
+            indication=drug.get("indication"),
+            similarity=0.5,
+            semantic_similarity=0.8,
+        )
+        mols.append(
+            Molecule(
+                smiles="C" * (1 + i % 20) + "O",
+                score=1.0 - i / max(n, 1),
+                source="StubScorer",
+                notes="synthetic",
+                similar_drug=neighbor,
+                similar_drug_semantic=neighbor,
+            )
+        )
+    return mols
+
+
+def _random_fingerprints(n: int, rng: np.random.Generator) -> np.ndarray:
+    fps = rng.integers(0, 256, (n, FP_BITS // 8), dtype=np.uint8)
+    for _ in range(_FP_AND_ROUNDS - 1):
+        fps &= rng.integers(0, 256, (n, FP_BITS // 8), dtype=np.uint8)
+    return fps
+
+
+def build_reference_store(path: str, n: int, seed: int = 0) -> str:
+    """
+    Write an n-row LibraryStore (the ELYSIUM_REFERENCE_LIBRARY_STORE format)
+    with random fingerprints to `path`. Reuses an existing store of that size.
+    """
+    meta_path = os.path.join(path, "meta.json")
+    if os.path.exists(meta_path):
+        from app.data.library_store import LibraryStore
+
+        if len(LibraryStore(path)) == n:
+            return path
+    os.makedirs(path, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    writer = _StoreWriter(path, _fresh_meta("synthetic", "smiles"))
+    try:
+        for start in range(0, n, _CHUNK):
+            size = min(_CHUNK, n - start)
+            fps = _random_fingerprints(size, rng)
+            counts = np.unpackbits(fps, axis=1).sum(axis=1)
+            smiles = synthetic_smiles(size, seed=seed + start)
+            writer.append([
+                (smi, f"ref_{start + i}", "synthetic", fps[i].tobytes(), int(counts[i]))
+                for i, smi in enumerate(smiles)
+            ])
+            writer.checkpoint(start + size)
+    finally:
+        writer.close()
+    return path
+
+
+def _graph_rows(molecules: int, targets: int, drugs: int, first_gen: int) -> Iterator[List[Dict]]:
+    for start in range(0, molecules, _CHUNK):
+        edges: List[Dict] = []
+        for i in range(start, min(start + _CHUNK, molecules)):
+            gen_id = first_gen + i
+            sim = (i * 7919 % 1000) / 1000
+            edges.append({"source_id": gen_id, "target_id": 1 + i % targets, "relation": "BINDS",
+                          "weight": (i * 104729 % 10007) / 10007})
+            edges.append({"source_id": gen_id, "target_id": 1 + targets + i % drugs, "relation": "SIMILAR_TO",
+                          "weight": sim, "tanimoto": sim, "cosine": round(1 - sim, 4)})
+        yield edges
+
+
+def build_synthetic_graph(db: Session, molecules: int, targets: int, drugs: int, runs: int = 100) -> None:
+    """
+    `molecules` generated-molecule nodes, each with one BINDS edge to one of
+    `targets` targets (T0, T1, ...) and one SIMILAR_TO edge to one of
+    `drugs` drugs (drug_0, ...). Inserted in chunks, so 10^6 molecules fit
+    in memory. Expects empty KG tables (node ids start at 1).
+    """
+    db.execute(insert(KGNode), [
+        {"node_type": "target", "external_id": f"T{t}", "name": f"T{t}"} for t in range(targets)
+    ] + [
+        {"node_type": "drug", "name": f"drug_{d}", "smiles": "CCO", "info": f"Indication: thing {d}"}
+        for d in range(drugs)
+    ])
+    first_gen = targets + drugs + 1
+    for start in range(0, molecules, _CHUNK):
+        db.execute(insert(KGNode), [
+            {
+                "node_type": "generated_molecule",
+                "external_id": f"run{i % runs}:{i}",
+                "name": f"gen_{i}",
+                "smiles": "C" * (1 + i % 30),
+            }
+            for i in range(start, min(start + _CHUNK, molecules))
+        ])
+    for edges in _graph_rows(molecules, targets, drugs, first_gen):
+        db.execute(insert(KGEdge), edges)
+    db.commit()
@@ -0,0 +1,84 @@
+"""
+Gunicorn settings for production: uvicorn workers forked from a preloaded
+master.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+With preload_app the master imports app.main once, which loads the
+models (ChemBERTa, the scorer) and the reference library arrays, and the
+workers are forked from it. Their pages stay shared copy-on-write until
+written, so per-worker memory is the private part only (see
+`python -m app.memory MASTER_PID` or GET /health/memory).
+
+What keeps the pages shared:
+  - the big data is in few objects (torch tensors, contiguous NumPy
+    matrices, memory-mapped library stores), so refcount updates touch
+    a handful of headers instead of every row;
+  - GC is off while the master loads and everything it built is moved
+    to the permanent generation (gc.freeze) before forking, so worker
+    collections never write to inherited objects;
+  - inherited database connections are dropped in each worker.
+
+State that stays per worker process:
+  - the graph projection behind /graph/neighborhood and /graph/paths:
+    each worker applies its own runs right away and picks up the other
+    workers' runs from kg_nodes / kg_edges before serving, at most every
+    ELYSIUM_GRAPH_SYNC_INTERVAL_SECONDS;
+  - the ArangoDB replicator: every worker runs one over the shared
+    outbox; batches are claimed first, so each row is imported by one of
+    them (ELYSIUM_ARANGO_REPLICATION=0 turns them all off);
+  - discovery admission control: the ELYSIUM_DISCOVERY_MAX_* limits and
+    per-client fairness apply per worker, so the server as a whole
+    admits up to workers x those limits. Size them for one worker.
+
+Settings (environment):
+  ELYSIUM_BIND             address, default 0.0.0.0:8000
+  ELYSIUM_WORKERS          worker processes, default 2
+  ELYSIUM_PRELOAD          1 = preload-then-fork (default), 0 = each worker imports the app
+  ELYSIUM_WORKER_TIMEOUT   seconds a worker may stay silent before it is restarted
+  ELYSIUM_TORCH_THREADS    torch threads per worker, default cores // workers
+"""
+
+import gc
+import os
+import sys
+
+bind = os.getenv("ELYSIUM_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("ELYSIUM_WORKERS", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("ELYSIUM_PRELOAD", "1") == "1"
+timeout = int(os.getenv("ELYSIUM_WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Each worker runs its own torch intra-op pool; split the cores between them
+torch_threads = int(os.getenv("ELYSIUM_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // max(1, workers))
+
+if preload_app:
+    # No collections while the master loads: freed objects would leave
+    # holes in pages the workers then share (and dirty when refilled)
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        gc.collect()
+        gc.freeze()
+        server.log.info("Preloaded app frozen: %d objects shared with workers", gc.get_freeze_count())
+
+
+def pre_fork(server, worker):
+    # Respawned workers: also freeze whatever the master allocated since
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    if preload_app:
+        from app.db import dispose_inherited_connections
+
+        dispose_inherited_connections()
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
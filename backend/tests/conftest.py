@@ -0,0 +1,30 @@
+"""
+Shared setup for the backend tests: no network, no model weights, no
+Arango server. Set before anything imports app.core.config.
+
+    cd backend && python -m pytest
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("ARANGO_BACKEND", "memory")
+os.environ.setdefault("ELYSIUM_SCORER_BACKEND", "stub")
+os.environ.setdefault(
+    "ELYSIUM_DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='elysium-tests-'), 'app.db')}"
+)
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base, build_engine
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """A fresh SQLite database with the app schema."""
+    engine = build_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
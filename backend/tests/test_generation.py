@@ -0,0 +1,26 @@
+"""HybridGenerator output: unique structures, even when it runs dry."""
+
+from rdkit import Chem
+
+from app.services.generation import HybridGenerator
+
+
+def _canonical(smiles_list):
+    return [Chem.MolToSmiles(Chem.MolFromSmiles(s)) for s in smiles_list]
+
+
+def test_generate_returns_unique_molecules():
+    out = HybridGenerator(seed=0).generate("EGFR", 200)
+    assert len(out) == 200
+    assert len(set(_canonical(out))) == 200
+
+
+def test_exhausted_generator_tops_up_with_unused_seeds_only(capsys):
+    generator = HybridGenerator(seed=0, max_rounds=0)  # nothing from mutations
+    seeds = set(_canonical(generator._seed_smiles))
+
+    out = generator.generate("EGFR", len(seeds) + 10)
+    assert sorted(_canonical(out)) == sorted(seeds)
+    assert "Only" in capsys.readouterr().out
+
+    assert len(set(_canonical(generator.generate("EGFR", 2)))) == 2
@@ -0,0 +1,217 @@
+"""
+The AQL graph views (services/graph_aql.py) against the SQL ones (kg.py).
+
+Every test runs on the in-memory stand-in, which executes the Python
+twins in app/arango_memory.py, and again on a real ArangoDB when one
+answers at ARANGO_URL (a scratch database is created and dropped), so
+the AQL text itself is checked too. Without a server the "arango" cases
+are skipped.
+"""
+
+import json
+import random
+import re
+import uuid
+
+import pytest
+from arango import ArangoClient
+from arango.http import DefaultHTTPClient
+
+from app.arango_memory import MemoryArangoDatabase
+from app.arangodb_client import ARANGO_PASSWORD, ARANGO_URL, ARANGO_USERNAME
+from app.fda_library import FDA_LIKE_DRUGS
+from app.init_arango import EDGE_COLLECTIONS, VERTEX_COLLECTIONS, init_arango_schema
+from app.schemas import Molecule, SimilarDrug
+from app.services.discovery import persist_run
+from app.services.graph_aql import (
+    DRUG_GRAPH_AQL,
+    TARGET_GRAPH_AQL,
+    clear_graph_cache,
+    get_drug_graph_aql,
+    get_target_graph_aql,
+)
+from app.services.kg import GRAPH_SORT_KEYS, get_drug_graph, get_target_graph
+from app.services.replication import ArangoReplicator
+
+TARGETS = ("EGFR", "BRAF")
+FILTERS = ((None, None), (0.5, None), (None, 0.4), (0.3, 0.6))
+
+
+def _molecules(n: int, rng: random.Random):
+    mols = []
+    for i in range(n):
+        drug = FDA_LIKE_DRUGS[rng.randrange(len(FDA_LIKE_DRUGS))]
+        similar = None
+        if rng.random() > 0.1:
+            similar = SimilarDrug(
+                name=drug["name"],
+                smiles=drug["smiles"],
+                indication=drug.get("indication"),
+                similarity=round(rng.random(), 3),
+                semantic_similarity=None if rng.random() < 0.2 else round(rng.random(), 3),
+            )
+        mols.append(Molecule(
+            smiles="C" * (1 + i % 20) + "O",
+            score=round(rng.random(), 2),  # coarse, so there are ties
+            source="StubScorer",
+            similar_drug=similar,
+            similar_drug_semantic=similar,
+        ))
+    return mols
+
+
+def _live_database():
+    """A scratch database on the server at ARANGO_URL, or skip."""
+    client = ArangoClient(hosts=ARANGO_URL, http_client=DefaultHTTPClient(request_timeout=2, retry_attempts=1))
+    system = client.db("_system", username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
+    try:
+        system.version()
+    except Exception as e:
+        client.close()
+        pytest.skip(f"no ArangoDB at {ARANGO_URL}: {type(e).__name__}")
+    name = f"elysium_test_{uuid.uuid4().hex[:8]}"
+    system.create_database(name)
+    return client, system, name
+
+
+@pytest.fixture(params=["memory", "arango"])
+def arango(request):
+    if request.param == "memory":
+        db = MemoryArangoDatabase()
+        init_arango_schema(db)
+        yield db
+        return
+    client, system, name = _live_database()
+    try:
+        db = client.db(name, username=ARANGO_USERNAME, password=ARANGO_PASSWORD)
+        init_arango_schema(db)
+        yield db
+    finally:
+        system.delete_database(name, ignore_missing=True)
+        client.close()
+
+
+@pytest.fixture
+def graph(session_factory, arango):
+    """Runs over TARGETS in SQL, replicated into `arango`."""
+    rng = random.Random(0)
+    for i in range(6):
+        with session_factory() as db:
+            persist_run(db, TARGETS[i % len(TARGETS)], _molecules(60, rng))
+            db.commit()
+    ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango).drain()
+    clear_graph_cache()
+    yield session_factory, arango
+    clear_graph_cache()
+
+
+def _same(sql_entries, aql_entries, metric) -> None:
+    # Ties are broken differently (SQL: insertion order, AQL: run id + index):
+    # compare the order on the metric, the content as a multiset.
+    assert [metric(e) for e in aql_entries] == [metric(e) for e in sql_entries]
+    key = lambda e: json.dumps(e.model_dump(), sort_keys=True)
+    assert sorted(map(key, aql_entries)) == sorted(map(key, sql_entries))
+
+
+def _walk(fetch, page_size: int):
+    entries, cursor = [], None
+    while True:
+        page = fetch(limit=page_size, cursor=cursor)
+        entries += page.molecules
+        cursor = page.next_cursor
+        if cursor is None:
+            return entries
+
+
+def _target_metric(sort_by):
+    def metric(entry):
+        if sort_by == "score":
+            return entry.score
+        drug = entry.similar_drug
+        if drug is None:
+            return None
+        return drug.similarity if sort_by == "tanimoto" else drug.semantic_similarity
+    return metric
+
+
+@pytest.mark.parametrize("sort_by", GRAPH_SORT_KEYS)
+@pytest.mark.parametrize("min_cosine,min_tanimoto", FILTERS)
+def test_target_graph_matches_sql(graph, sort_by, min_cosine, min_tanimoto):
+    session_factory, arango = graph
+    for target in TARGETS:
+        with session_factory() as db:
+            sql = get_target_graph(db, target, min_cosine, min_tanimoto, sort_by).molecules
+        aql = get_target_graph_aql(target, min_cosine, min_tanimoto, sort_by, db=arango).molecules
+        assert sql
+        _same(sql, aql, _target_metric(sort_by))
+        assert _walk(lambda **page: get_target_graph_aql(
+            target, min_cosine, min_tanimoto, sort_by, db=arango, **page), 17) == aql
+
+
+@pytest.mark.parametrize("min_cosine,min_tanimoto", FILTERS)
+def test_drug_graph_matches_sql(graph, min_cosine, min_tanimoto):
+    session_factory, arango = graph
+    for drug in sorted({d["name"] for d in FDA_LIKE_DRUGS}):
+        with session_factory() as db:
+            sql = get_drug_graph(db, drug, min_cosine, min_tanimoto).molecules
+        aql = get_drug_graph_aql(drug, min_cosine, min_tanimoto, db=arango).molecules
+        _same(sql, aql, lambda e: e.score)
+        assert _walk(lambda **page: get_drug_graph_aql(
+            drug, min_cosine, min_tanimoto, db=arango, **page), 7) == aql
+
+
+# ---------- query text vs bind variables ----------
+
+class _RecordingAQL:
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, query, bind_vars=None, **kwargs):
+        self.calls.append((query, bind_vars))
+        return iter([])
+
+
+class _RecordingDatabase:
+    def __init__(self):
+        self.aql = _RecordingAQL()
+
+
+def _bind_parameters(query: str):
+    return set(re.findall(r"(?<![@\w])@(\w+)", query))
+
+
+def _collections(query: str):
+    traversed = re.findall(r"\b(?:INBOUND|OUTBOUND|ANY)\s+\S+\s+(\w+)", query)
+    scanned = re.findall(r"\bFOR\s+\w+\s+IN\s+([a-z_]+)\b", query)
+    return set(traversed) | set(scanned)
+
+
+@pytest.mark.parametrize("cursor_page", [False, True])
+def test_bind_vars_cover_the_query(cursor_page):
+    clear_graph_cache()
+    db = _RecordingDatabase()
+    get_target_graph_aql("EGFR", 0.5, None, "tanimoto", limit=5, db=db)
+    get_drug_graph_aql("Aspirin", None, 0.4, limit=5, db=db)
+    if cursor_page:
+        # Pages after the first pass `after`; everything else stays the same
+        from app.services.pagination import encode_cursor
+        get_target_graph_aql("EGFR", limit=5, cursor=encode_cursor("target-graph-aql:score", 0.5, 0.5, "r", 1, 5),
+                             db=db)
+        get_drug_graph_aql("Aspirin", limit=5, cursor=encode_cursor("drug-graph-aql", 0.5, "r", 1, 5), db=db)
+
+    for query, bind_vars in db.aql.calls:
+        assert query in (TARGET_GRAPH_AQL, DRUG_GRAPH_AQL)
+        assert _bind_parameters(query) == set(bind_vars)
+        assert isinstance(bind_vars["limit"], int)
+        after = bind_vars["after"]
+        assert after is None or len(after) == (4 if query == TARGET_GRAPH_AQL else 3)
+    target_vars = next(b for q, b in db.aql.calls if q == TARGET_GRAPH_AQL)
+    assert target_vars["target"] == "targets/EGFR"
+    assert target_vars["limit"] == 6  # one extra row tells whether another page follows
+
+
+def test_queries_use_known_collections():
+    known = set(VERTEX_COLLECTIONS) | set(EDGE_COLLECTIONS)
+    assert _collections(TARGET_GRAPH_AQL) == {"binds", "similar_to"}
+    assert _collections(DRUG_GRAPH_AQL) == {"drugs", "similar_to", "binds"}
+    assert _collections(TARGET_GRAPH_AQL + DRUG_GRAPH_AQL) <= known
@@ -0,0 +1,128 @@
+"""
+Registry rows annotated while chemBERTa was unavailable get their
+semantic neighbor once it is (services/registry.py, app.backfill_runs).
+The embedder is faked: no model weights here.
+"""
+
+import numpy as np
+import pytest
+from sqlalchemy import select
+
+from app import backfill_runs
+from app.models import RegisteredMolecule
+from app.schemas import Molecule, SimilarDrug
+from app.services import registry
+from app.services.discovery import persist_run
+from app.services.runs import run_revision
+
+SMILES = ["CCO", "c1ccccc1O", "CC(=O)Nc1ccc(O)cc1"]
+NEIGHBOR = SimilarDrug(name="Aspirin", smiles="CC(=O)Oc1ccccc1C(=O)O", indication=None,
+                       similarity=0.0, semantic_similarity=0.9)
+
+
+class _Embedder:
+    def __init__(self):
+        self.available = False
+        self.requested = []  # every SMILES the semantic stage ran for
+        self.embedded = []
+
+    def embed(self, smiles_list):
+        self.requested += smiles_list
+        if not self.available:
+            return [None] * len(smiles_list)
+        self.embedded += smiles_list
+        return [np.ones(4, dtype=np.float32) / 2 for _ in smiles_list]
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    fake = _Embedder()
+    monkeypatch.setattr(registry, "embedder_available", lambda: fake.available)
+    monkeypatch.setattr(backfill_runs, "embedder_available", lambda: fake.available)
+    monkeypatch.setattr(registry, "embed_smiles_batch", fake.embed)
+    monkeypatch.setattr(registry, "find_most_semantic_drug_for_embedding",
+                        lambda embedding: None if embedding is None else NEIGHBOR)
+    monkeypatch.setattr(registry, "_ANNOTATIONS", registry._LRU(100))
+    return fake
+
+
+def _new_process(monkeypatch):
+    """Forget annotations cached in this process, as after a restart."""
+    monkeypatch.setattr(registry, "_ANNOTATIONS", registry._LRU(100))
+
+
+def _discover(db, smiles_list):
+    annotations = registry.annotate_smiles(db, smiles_list)
+    molecules = [
+        Molecule(smiles=smi, score=0.5, source="StubScorer", similar_drug=annotations[smi].fp_neighbor,
+                 similar_drug_semantic=annotations[smi].semantic_neighbor, admet=annotations[smi].admet)
+        for smi in smiles_list
+    ]
+    run, _ = persist_run(db, "EGFR", molecules)
+    db.commit()
+    return run.id
+
+
+def _rows(session_factory):
+    with session_factory() as db:
+        return db.execute(
+            select(RegisteredMolecule.canonical_smiles, RegisteredMolecule.semantic_neighbor_name,
+                   RegisteredMolecule.embedding, RegisteredMolecule.lipinski_pass)
+        ).all()
+
+
+def test_later_run_fills_in_semantic_neighbor(session_factory, embedder, monkeypatch):
+    with session_factory() as db:
+        first = _discover(db, SMILES)
+        revision = run_revision(db, first)
+    rows = _rows(session_factory)
+    assert len(rows) == len(SMILES)
+    assert all(r.semantic_neighbor_name is None and r.embedding is None and r.lipinski_pass is not None
+               for r in rows)
+
+    # chemBERTa is back: the rows are stale, annotated again and completed by the next run
+    embedder.available = True
+    _new_process(monkeypatch)
+    with session_factory() as db:
+        _discover(db, SMILES[:2])
+        assert run_revision(db, first) == revision + 1
+    completed = {r.canonical_smiles: r for r in _rows(session_factory)}
+    for smiles in SMILES[:2]:
+        assert completed[registry.molecule_identity(smiles).canonical_smiles].semantic_neighbor_name == "Aspirin"
+        assert completed[registry.molecule_identity(smiles).canonical_smiles].embedding is not None
+
+    # Completed rows are reused as they are; only the one still missing is embedded
+    embedder.embedded.clear()
+    _new_process(monkeypatch)
+    with session_factory() as db:
+        annotations = registry.annotate_smiles(db, SMILES)
+    assert embedder.embedded == [SMILES[2]]
+    assert all(annotations[s].semantic_neighbor == NEIGHBOR for s in SMILES)
+
+
+def test_without_embedder_rows_are_not_stale(session_factory, embedder, monkeypatch):
+    with session_factory() as db:
+        _discover(db, SMILES)
+    embedder.requested.clear()
+    _new_process(monkeypatch)
+    with session_factory() as db:
+        registry.annotate_smiles(db, SMILES)
+    # Nothing recomputed: every annotation came from the registry
+    assert embedder.requested == []
+    assert all(r.embedding is None for r in _rows(session_factory))
+
+
+def test_backfill_completes_semantic_stage(session_factory, embedder, monkeypatch):
+    with session_factory() as db:
+        run_id = _discover(db, SMILES)
+        revision = run_revision(db, run_id)
+    monkeypatch.setattr(backfill_runs, "engine", session_factory.kw["bind"])
+    monkeypatch.setattr(backfill_runs, "SessionLocal", session_factory)
+
+    assert backfill_runs.backfill() == 0
+    embedder.available = True
+    assert backfill_runs.backfill() == len(SMILES)
+    assert all(r.semantic_neighbor_name == "Aspirin" and r.embedding is not None for r in _rows(session_factory))
+    with session_factory() as db:
+        assert run_revision(db, run_id) == revision + 1
+    assert backfill_runs.backfill() == 0
@@ -0,0 +1,197 @@
+"""
+The outbox replicator (services/replication.py) against the in-memory
+Arango stand-in: outages, rejected documents and replays.
+"""
+
+import datetime as dt
+import json
+import threading
+import time
+
+import pytest
+from sqlalchemy import insert, select, update
+
+from app.arango_memory import MemoryArangoDatabase
+from app.arangodb_client import DOCUMENT_ERRORS
+from app.models import ArangoOutbox
+from app.services.replication import ArangoReplicator, ImportRejected, outbox_rows
+from benchmarks.synthetic import synthetic_molecules
+
+BAD = {"collection": "molecules", "doc_key": "bad key", "document": json.dumps({"_key": "bad key"})}
+
+
+@pytest.fixture
+def arango():
+    return MemoryArangoDatabase()
+
+
+@pytest.fixture
+def rows():
+    return outbox_rows("run-1", "EGFR", synthetic_molecules(20))
+
+
+def _queue(session_factory, rows):
+    with session_factory() as db:
+        db.execute(insert(ArangoOutbox), rows)
+        db.commit()
+
+
+def _outbox(session_factory):
+    with session_factory() as db:
+        return db.execute(
+            select(ArangoOutbox.doc_key, ArangoOutbox.attempts, ArangoOutbox.next_attempt_at,
+                   ArangoOutbox.claimed_by).order_by(ArangoOutbox.id)
+        ).all()
+
+
+def _make_ready(session_factory):
+    """Fast-forward past every pending retry delay."""
+    with session_factory() as db:
+        db.execute(update(ArangoOutbox).values(next_attempt_at=dt.datetime.utcnow() - dt.timedelta(seconds=1)))
+        db.commit()
+
+
+def _drain(replicator):
+    """Drain like the background thread: rejected batches are retried right away."""
+    total = 0
+    while True:
+        try:
+            n = replicator.drain_once()
+        except DOCUMENT_ERRORS + (ImportRejected,):
+            continue
+        if n == 0:
+            return total
+        total += n
+
+
+def _documents(arango, rows):
+    return {
+        collection: sorted(arango.collection(collection).all(), key=lambda d: d["_key"])
+        for collection in {row["collection"] for row in rows}
+    }
+
+
+def test_outage_spanning_several_batches(session_factory, arango, rows):
+    _queue(session_factory, rows)
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=10)
+    assert replicator.drain_once() == 10
+
+    arango.fail_next(3)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            replicator.drain_once()
+        # The failed batch is released, and an outage charges nothing
+        left = _outbox(session_factory)
+        assert len(left) == len(rows) - 10
+        assert all(r.attempts == 0 and r.claimed_by is None and r.next_attempt_at is None for r in left)
+
+    assert replicator.drain() == len(rows) - 10
+    assert _outbox(session_factory) == []
+    assert replicator.replicated_total == len(rows)
+    for collection, docs in _documents(arango, rows).items():
+        assert {d["_key"] for d in docs} == {r["doc_key"] for r in rows if r["collection"] == collection}
+
+
+def test_background_thread_backs_off_through_an_outage(session_factory, arango, rows):
+    _queue(session_factory, rows)
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango,
+                                  batch_size=10, poll_seconds=0.05, max_backoff=0.2)
+    waits = []
+    wait = replicator._stop.wait
+    replicator._stop.wait = lambda timeout=None: waits.append(timeout) or wait(timeout)
+
+    arango.fail_next(3)
+    replicator.start()
+    try:
+        deadline = time.monotonic() + 10
+        while _outbox(session_factory) and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        replicator.stop()
+
+    assert _outbox(session_factory) == []
+    # One jittered wait per failure, within max_backoff; success resets the count
+    assert len(waits) == 3 and all(0 < w <= 0.2 for w in waits)
+    assert replicator.consecutive_failures == 0
+    assert replicator.last_success_at is not None
+
+
+def test_rejected_row_is_isolated_by_halving(session_factory, arango, rows):
+    _queue(session_factory, rows[:30] + [BAD] + rows[30:])
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango,
+                                  batch_size=16, max_attempts=3)
+
+    limits = []
+    while True:
+        try:
+            if replicator.drain_once() == 0:
+                break
+        except DOCUMENT_ERRORS + (ImportRejected,):
+            limits.append(replicator._batch_limit)
+
+    # Halved on each rejection (the clean half doubles it back) down to the
+    # bad row alone, then full batches again behind it
+    assert limits == [8, 8, 4, 4, 2, 2, 1, 16]
+    assert replicator.set_aside_total == 1
+    left = _outbox(session_factory)
+    assert [r.doc_key for r in left] == ["bad key"]
+    assert left[0].attempts == 1
+    # Every other row made it; none of them was charged on the way
+    assert replicator.replicated_total == len(rows)
+
+
+def test_rejected_row_waits_out_its_backoff_then_parks(session_factory, arango, rows):
+    _queue(session_factory, [BAD] + rows[:5])
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango,
+                                  batch_size=16, max_attempts=3, max_backoff=1.5)
+
+    delays = []
+    for attempt in range(1, 4):
+        before = dt.datetime.utcnow()
+        _drain(replicator)
+        (row,) = _outbox(session_factory)
+        assert row.attempts == attempt
+        assert row.claimed_by is None
+        delays.append((row.next_attempt_at - before).total_seconds())
+        # Not retried before its delay is up
+        assert replicator.drain_once() == 0
+        assert _outbox(session_factory)[0].attempts == attempt
+        _make_ready(session_factory)
+
+    # Exponential (0.5s, 1s, 2s) but capped at max_backoff
+    assert [round(d * 2) / 2 for d in delays] == [0.5, 1.0, 1.5]
+    # Parked at max_attempts: kept, never claimed again
+    assert replicator.drain_once() == 0
+    (row,) = _outbox(session_factory)
+    assert row.attempts == 3 and "bad key" in (replicator.last_error or "")
+
+
+def test_reimport_is_idempotent(session_factory, arango, rows):
+    replicator = ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=7)
+    _queue(session_factory, rows)
+    _drain(replicator)
+    first = _documents(arango, rows)
+
+    # The same run queued twice more (a retried transaction, a replay), drained in other batch sizes
+    _queue(session_factory, rows + rows)
+    replicator.batch_size = replicator._batch_limit = 13
+    assert _drain(replicator) == 2 * len(rows)
+    assert _documents(arango, rows) == first
+
+
+def test_concurrent_replicators_converge(session_factory, arango, rows):
+    _queue(session_factory, rows)
+    replicators = [
+        ArangoReplicator(session_factory=session_factory, arango_factory=lambda: arango, batch_size=5)
+        for _ in range(3)
+    ]
+    threads = [threading.Thread(target=_drain, args=(r,)) for r in replicators]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _outbox(session_factory) == []
+    # Claims are disjoint: every row was imported by exactly one replicator
+    assert sum(r.replicated_total for r in replicators) == len(rows)
+    assert sum(len(docs) for docs in _documents(arango, rows).values()) == len(rows)